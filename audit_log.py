@@ -0,0 +1,228 @@
+"""
+Audit log recording with a buffered, batched writer.
+
+Creating, changing or deleting a resource in AUDITED_TABLES records an
+audit_log_events row (e.g. task_created, project_deleted) for its
+workspace. Records are collected when the session flushes, handed to the
+writer only when the transaction commits (rolled back changes are not
+audited), and written by a background thread in multi-row INSERTs, so
+mutations never wait on the audit log:
+
+    AUDIT_LOG=0                   disable recording
+    AUDIT_LOG_BATCH_SIZE=500      rows per INSERT
+    AUDIT_LOG_FLUSH_MS=200        a partial batch is written after this long
+    AUDIT_LOG_MAX_QUEUED=50000    records beyond this are dropped (counted on /metrics)
+
+Tasks written with set-based Core statements (POST /tasks/bulk, template
+instantiation) are reported through audit_core_writes(). Records still
+queued at shutdown are flushed. Read them with
+GET /workspaces/{workspace_gid}/audit_log_events.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import event, insert, inspect
+from sqlalchemy.orm import Session
+
+from database import RoutingSession, engine
+from metrics import COLLECTORS, Counter
+from utils import generate_gid
+
+logger = logging.getLogger(__name__)
+
+# Table name -> Asana resource type, for the tables whose changes are audited
+AUDITED_TABLES = {
+    "projects": "project",
+    "tasks": "task",
+    "teams": "team",
+    "portfolios": "portfolio",
+    "goals": "goal",
+    "tags": "tag",
+    "custom_fields": "custom_field",
+    "workspace_memberships": "workspace_membership",
+    "project_memberships": "project_membership",
+}
+
+AUDIT_DROPPED = Counter("audit_log_events_dropped_total", "Audit records dropped (queue full or write failed)")
+AUDIT_WRITTEN = Counter("audit_log_events_written_total", "Audit records written")
+
+# Set by install_audit_log; Core write records are only collected while auditing is on
+_installed = False
+
+# Client details of the request being served, set by AuditContextMiddleware
+audit_context: ContextVar[Optional[Dict[str, Any]]] = ContextVar("audit_context", default=None)
+
+
+class AuditContextMiddleware:
+    """ASGI middleware recording where a request came from, for the audit records it causes"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        client = scope.get("client")
+        context = {"context_type": "api", "client_ip_address": client[0] if client else None, "user_agent": None}
+        for name, value in scope.get("headers", ()):
+            if name == b"user-agent":
+                context["user_agent"] = value.decode("latin-1")
+        token = audit_context.set(context)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            audit_context.reset(token)
+
+
+class AuditLogWriter:
+    """Queues audit records and inserts them in batches from a background thread"""
+
+    def __init__(self, batch_size: int, flush_seconds: float, max_queued: int):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.records: queue.Queue = queue.Queue(max_queued)
+        self.thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def submit(self, records: List[Dict[str, Any]]):
+        for record in records:
+            try:
+                self.records.put_nowait(record)
+            except queue.Full:
+                # Never block a request on the audit log
+                AUDIT_DROPPED.inc()
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        from models.audit_log_event import AuditLogEvent
+        try:
+            with engine.begin() as connection:
+                connection.execute(insert(AuditLogEvent.__table__), batch)
+            AUDIT_WRITTEN.inc(amount=len(batch))
+        except Exception:
+            logger.exception("Dropped %d audit record(s): write failed", len(batch))
+            AUDIT_DROPPED.inc(amount=len(batch))
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.monotonic() + self.flush_seconds
+            while len(batch) < self.batch_size:
+                try:
+                    item = self.records.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            if batch:
+                self._write(batch)
+
+    def shutdown(self):
+        self.records.put(None)
+        self.thread.join(timeout=10)
+
+
+def _entry(resource_type: str, action: str, workspace_id, gid, name, details: Dict[str, Any],
+           now: datetime, context: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "gid": generate_gid(),
+        "resource_type": "audit_log_event",
+        "workspace_id": workspace_id,
+        "event_type": f"{resource_type}_{action}",
+        # The API has no authentication, so requests cannot be attributed to a user
+        "actor_type": "anonymous" if context else "asana",
+        "actor_gid": None,
+        "resource_type_name": resource_type,
+        "resource_gid": gid,
+        "resource_name": name,
+        "context": context or {"context_type": "asana"},
+        "details": details,
+        "created_at": now,
+    }
+
+
+def _record(obj, action: str, now: datetime, context: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    state = inspect(obj)
+    resource_type = AUDITED_TABLES.get(state.mapper.local_table.name)
+    if resource_type is None:
+        return None
+    details = {}
+    if action == "changed":
+        changed = [attr.key for attr in state.mapper.column_attrs if state.attrs[attr.key].history.has_changes()]
+        if not changed:
+            return None
+        details["changed_fields"] = sorted(changed)
+    return _entry(
+        resource_type, action, getattr(obj, "workspace_id", None), getattr(obj, "gid", None),
+        getattr(obj, "name", None), details, now, context
+    )
+
+
+def audit_core_writes(session: Session, table: str, action: str, rows: Iterable[Any]):
+    """
+    Record audit events for rows written with Core INSERT/UPDATE/DELETE statements,
+    which the flush hook never sees. Each row has gid, name and workspace_id, plus
+    changed_fields for action "changed". Queued with the session's other records,
+    so they are submitted on commit; call only once the statements have succeeded.
+    """
+    if not _installed or table not in AUDITED_TABLES:
+        return
+    now = datetime.now(timezone.utc)
+    context = audit_context.get()
+    pending = session.info.setdefault("audit_records", [])
+    for row in rows:
+        details = {"changed_fields": sorted(row.changed_fields)} if action == "changed" else {}
+        pending.append(_entry(AUDITED_TABLES[table], action, row.workspace_id, row.gid, row.name, details, now, context))
+
+
+def _after_flush(session: Session, flush_context):
+    now = datetime.now(timezone.utc)
+    context = audit_context.get()
+    pending = session.info.setdefault("audit_records", [])
+    for objects, action in ((session.new, "created"), (session.dirty, "changed"), (session.deleted, "deleted")):
+        for obj in objects:
+            record = _record(obj, action, now, context)
+            if record is not None:
+                pending.append(record)
+
+
+def _discard(session: Session, *args):
+    session.info.pop("audit_records", None)
+
+
+def install_audit_log(app) -> Optional[AuditLogWriter]:
+    """Record audit events for committed changes, unless AUDIT_LOG=0"""
+    global _installed
+    if os.getenv("AUDIT_LOG") == "0":
+        return None
+    writer = AuditLogWriter(
+        batch_size=int(os.getenv("AUDIT_LOG_BATCH_SIZE", "500")),
+        flush_seconds=float(os.getenv("AUDIT_LOG_FLUSH_MS", "200")) / 1000,
+        max_queued=int(os.getenv("AUDIT_LOG_MAX_QUEUED", "50000"))
+    )
+    writer.start()
+
+    def after_commit(session: Session):
+        records = session.info.pop("audit_records", None)
+        if records:
+            writer.submit(records)
+
+    _installed = True
+    event.listen(RoutingSession, "after_flush", _after_flush)
+    event.listen(RoutingSession, "after_commit", after_commit)
+    event.listen(RoutingSession, "after_rollback", _discard)
+    app.add_middleware(AuditContextMiddleware)
+    app.add_event_handler("shutdown", writer.shutdown)
+    COLLECTORS.extend([AUDIT_WRITTEN, AUDIT_DROPPED])
+    return writer
@@ -0,0 +1,112 @@
+"""
+Benchmark: single-item task endpoints vs POST /tasks/bulk
+
+Creates, updates and deletes the same number of tasks through both paths
+against a running local API and prints the wall time and throughput of each.
+
+    python -m benchmarks.bulk_tasks --count 2000 --batch-size 500 [--project <gid>]
+"""
+import argparse
+import time
+import requests
+from config import LOCAL_API_URL
+
+
+def _check(response: requests.Response, expected: int = 200):
+    if response.status_code != expected:
+        raise RuntimeError(
+            f"{response.request.method} {response.url} -> {response.status_code} (expected {expected}): "
+            f"{response.text[:200]}"
+        )
+    return response.json()
+
+
+def run_single(session: requests.Session, count: int, project: str = None) -> dict:
+    timings = {}
+
+    start = time.perf_counter()
+    gids = []
+    for i in range(count):
+        data = {"name": f"Benchmark task {i}"}
+        if project:
+            data["projects"] = [project]
+        # Single-item endpoints take the bare request model, not a {"data": ...} envelope
+        gids.append(_check(session.post(f"{LOCAL_API_URL}/tasks", json=data), 201)["data"]["gid"])
+    timings["create"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for gid in gids:
+        if not _check(session.put(f"{LOCAL_API_URL}/tasks/{gid}", json={"completed": True}))["data"]["completed"]:
+            raise RuntimeError(f"PUT /tasks/{gid} did not complete the task")
+    timings["update"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for gid in gids:
+        _check(session.delete(f"{LOCAL_API_URL}/tasks/{gid}"))
+    timings["delete"] = time.perf_counter() - start
+    return timings
+
+
+def _bulk(session: requests.Session, actions: list, batch_size: int, expected: int = 200) -> list:
+    results = []
+    for start in range(0, len(actions), batch_size):
+        body = {"actions": actions[start:start + batch_size]}
+        results.extend(_check(session.post(f"{LOCAL_API_URL}/tasks/bulk", json=body))["data"])
+    if len(results) != len(actions):
+        raise RuntimeError(f"{len(actions)} bulk action(s) sent, {len(results)} result(s) returned")
+    failed = [result for result in results if result["status_code"] != expected]
+    if failed:
+        raise RuntimeError(f"{len(failed)} bulk action(s) failed, first: {failed[0]}")
+    return results
+
+
+def run_bulk(session: requests.Session, count: int, batch_size: int, project: str = None) -> dict:
+    timings = {}
+
+    start = time.perf_counter()
+    creates = []
+    for i in range(count):
+        data = {"name": f"Benchmark task {i}"}
+        if project:
+            data["projects"] = [project]
+        creates.append({"action": "create", "data": data})
+    gids = [result["body"]["data"]["gid"] for result in _bulk(session, creates, batch_size, expected=201)]
+    timings["create"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _bulk(session, [{"action": "update", "task": gid, "data": {"completed": True}} for gid in gids], batch_size)
+    timings["update"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _bulk(session, [{"action": "delete", "task": gid} for gid in gids], batch_size)
+    timings["delete"] = time.perf_counter() - start
+    return timings
+
+
+def print_report(count: int, single: dict, bulk: dict):
+    print("=" * 70)
+    print(f"BULK TASK BENCHMARK ({count} tasks)")
+    print("=" * 70)
+    print(f"{'phase':<10}{'single (s)':>14}{'single ops/s':>16}{'bulk (s)':>12}{'bulk ops/s':>14}{'speedup':>10}")
+    for phase in ("create", "update", "delete"):
+        print(
+            f"{phase:<10}{single[phase]:>14.2f}{count / single[phase]:>16.0f}"
+            f"{bulk[phase]:>12.2f}{count / bulk[phase]:>14.0f}{single[phase] / bulk[phase]:>9.1f}x"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare single-item task endpoints with POST /tasks/bulk")
+    parser.add_argument("--count", type=int, default=1000, help="Tasks to create, update and delete per path")
+    parser.add_argument("--batch-size", type=int, default=500, help="Actions per bulk request")
+    parser.add_argument("--project", help="Project gid to add the tasks to (exercises counter maintenance)")
+    args = parser.parse_args()
+
+    session = requests.Session()
+    single = run_single(session, args.count, args.project)
+    bulk = run_bulk(session, args.count, args.batch_size, args.project)
+    print_report(args.count, single, bulk)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+"""
+Endpoint latency benchmark
+
+Starts the app with uvicorn against a local benchmark database (seeded with
+synthetic_data.py at the chosen scale), then drives every GET route of every
+router in main.py with an async load generator at several concurrency levels.
+Path and query gids are filled from the seeded data. For each route and level
+the report records throughput, p50/p95/p99 latency, error count and SQL
+statements per request (from the X-Query-Count header).
+
+    python -m benchmarks.endpoints --database-url postgresql://localhost/asana_bench \\
+        --tasks 100000 --concurrency 1,8,32 --requests 200 --output bench.json
+
+Compare a run against an earlier report to catch regressions:
+
+    python -m benchmarks.endpoints --database-url ... --skip-seed --compare bench.json
+
+Write paths are covered separately by benchmarks/bulk_tasks.py, since they
+would change the dataset between runs.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+API_PREFIX = "/api/1.0"
+GID_SAMPLE_SIZE = 50
+# Query parameters that are not gids but are required by some list endpoints
+STATIC_QUERY_VALUES = {"resource_type": "user", "query": "Task", "resource_subtype": "default_task"}
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def _table_aliases(table_names) -> Dict[str, str]:
+    """Map the resource names used in gid parameters ("story", "custom_field") to tables"""
+    aliases = {}
+    for name in table_names:
+        aliases[name] = name
+        if name.endswith("ies"):
+            aliases[name[:-3] + "y"] = name
+        if name.endswith("es"):
+            aliases.setdefault(name[:-2], name)
+        if name.endswith("s"):
+            aliases.setdefault(name[:-1], name)
+    # Parameters whose name differs from the resource they reference
+    aliases.update({"parent": "tasks", "assignee": "users", "owner": "users", "target": "tasks"})
+    return aliases
+
+
+def sample_gids(seed: int, size: int = GID_SAMPLE_SIZE) -> Dict[str, List[str]]:
+    """A deterministic sample of gids per table; synthetic ids run 1..N, so pick ids directly"""
+    from sqlalchemy import text
+    from database import Base, engine, import_models
+
+    import_models()
+    rng = random.Random(seed)
+    samples = {}
+    with engine.connect() as connection:
+        for name, table in Base.metadata.tables.items():
+            if "gid" not in table.columns:
+                continue
+            max_id = connection.execute(text(f'SELECT max(id) FROM "{name}"')).scalar()
+            if not max_id:
+                continue
+            ids = [rng.randint(1, max_id) for _ in range(size)]
+            samples[name] = [row[0] for row in connection.execute(
+                text(f'SELECT gid FROM "{name}" WHERE id = ANY(:ids)'), {"ids": ids}
+            ).all()]
+    return samples
+
+
+def build_scenarios(samples: Dict[str, List[str]]) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    One scenario per GET route of the app, with gid parameters bound to sampled gids.
+    Returns the scenarios and the routes skipped because a required value is unknown.
+    """
+    from fastapi.routing import APIRoute
+    import main
+
+    # Routers are registered lazily by default
+    main.app.state.router_loader.load()
+    aliases = _table_aliases(samples)
+    scenarios, skipped = [], []
+    for route in main.app.routes:
+        if not isinstance(route, APIRoute) or "GET" not in route.methods or not route.path.startswith(API_PREFIX):
+            continue
+        label = f"GET {route.path}"
+        path_params = {}
+        for param in route.dependant.path_params:
+            table = aliases.get(re.sub(r"_gid$", "", param.name))
+            if table not in samples or not samples[table]:
+                break
+            path_params[param.name] = table
+        else:
+            query_params = {}
+            for param in route.dependant.query_params:
+                if not param.required:
+                    continue
+                table = aliases.get(param.name)
+                if table in samples and samples[table]:
+                    query_params[param.name] = table
+                elif param.name in STATIC_QUERY_VALUES:
+                    query_params[param.name] = None
+                else:
+                    break
+            else:
+                scenarios.append({
+                    "label": label, "path": route.path, "path_params": path_params, "query_params": query_params
+                })
+                continue
+        skipped.append(label)
+    return scenarios, skipped
+
+
+def _request_url(scenario: Dict[str, Any], samples: Dict[str, List[str]], rng: random.Random) -> Tuple[str, Dict[str, str]]:
+    path = scenario["path"]
+    for name, table in scenario["path_params"].items():
+        path = path.replace("{" + name + "}", rng.choice(samples[table]))
+    params = {
+        name: rng.choice(samples[table]) if table else STATIC_QUERY_VALUES[name]
+        for name, table in scenario["query_params"].items()
+    }
+    return path, params
+
+
+async def run_level(client: httpx.AsyncClient, scenario: Dict[str, Any], samples: Dict[str, List[str]],
+                    concurrency: int, total_requests: int, seed: int) -> Dict[str, Any]:
+    """Send total_requests requests for one route with `concurrency` requests in flight"""
+    rng = random.Random(f"{seed}:{scenario['label']}:{concurrency}")
+    requests = [_request_url(scenario, samples, rng) for _ in range(total_requests)]
+    latencies, query_counts, statuses = [], [], {}
+    queue = iter(requests)
+
+    async def worker():
+        for path, params in queue:
+            started = time.perf_counter()
+            try:
+                response = await client.get(path, params=params)
+                status = response.status_code
+                count = response.headers.get("X-Query-Count")
+                if count is not None:
+                    query_counts.append(int(count))
+            except httpx.HTTPError:
+                status = "error"
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items() if status == "error" or int(status) >= 500)
+    return {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+        "queries_per_request": round(sum(query_counts) / len(query_counts), 2) if query_counts else None,
+        "errors": errors,
+        "status_codes": statuses,
+    }
+
+
+async def run_benchmark(base_url: str, scenarios, samples, levels: List[int], total_requests: int,
+                        seed: int, warmup: int) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        for scenario in scenarios:
+            if warmup:
+                await run_level(client, scenario, samples, 1, warmup, seed)
+            results[scenario["label"]] = {}
+            for concurrency in levels:
+                result = await run_level(client, scenario, samples, concurrency, total_requests, seed)
+                results[scenario["label"]][str(concurrency)] = result
+                print(
+                    f"{scenario['label']:<70} c={concurrency:<4} {result['throughput_rps']:>8.1f} rps  "
+                    f"p50 {result['p50_ms']:>7.1f}  p99 {result['p99_ms']:>7.1f} ms  "
+                    f"queries {result['queries_per_request']}  errors {result['errors']}"
+                )
+    return results
+
+
+def start_server(database_url: str, port: int, workers: int) -> subprocess.Popen:
+    env = dict(os.environ, DATABASE_URL=database_url, QUERY_COUNT_HEADER="1")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning", "--no-access-log"],
+        env=env
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1.0).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError("uvicorn did not become healthy within 60s")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    """Routes whose p95 latency grew by more than threshold, or which now run more SQL statements"""
+    regressions = []
+    for label, levels in current["routes"].items():
+        for level, result in levels.items():
+            before = baseline.get("routes", {}).get(label, {}).get(level)
+            if not before:
+                continue
+            if before["p95_ms"] and result["p95_ms"] > before["p95_ms"] * (1 + threshold):
+                regressions.append(
+                    f"{label} c={level}: p95 {before['p95_ms']:.1f} -> {result['p95_ms']:.1f} ms"
+                )
+            if (before.get("queries_per_request") is not None and result.get("queries_per_request") is not None
+                    and result["queries_per_request"] > before["queries_per_request"]):
+                regressions.append(
+                    f"{label} c={level}: queries/request "
+                    f"{before['queries_per_request']} -> {result['queries_per_request']}"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every GET endpoint across concurrency levels")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"), required=os.getenv("DATABASE_URL") is None,
+                        help="Benchmark database (will be truncated and reseeded unless --skip-seed)")
+    parser.add_argument("--tasks", type=int, default=100_000, help="Dataset scale for synthetic_data.py")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse the data already in the database")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per route and concurrency level")
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests per route before measuring")
+    parser.add_argument("--route", action="append", help="Only routes whose path contains this text (repeatable)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--server-workers", type=int, default=1)
+    parser.add_argument("--output", default="benchmark_report.json")
+    parser.add_argument("--compare", help="Earlier report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative p95 growth when comparing")
+    args = parser.parse_args()
+
+    # database.py reads DATABASE_URL at import time
+    os.environ["DATABASE_URL"] = args.database_url
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    if not args.skip_seed:
+        from database import init_db
+        from synthetic_data import generate
+        init_db()
+        generate(args.tasks, args.seed)
+
+    samples = sample_gids(args.seed)
+    scenarios, skipped = build_scenarios(samples)
+    if args.route:
+        scenarios = [scenario for scenario in scenarios if any(part in scenario["path"] for part in args.route)]
+    print(f"Benchmarking {len(scenarios)} route(s) at concurrency {levels}; {len(skipped)} skipped")
+
+    server = start_server(args.database_url, args.port, args.server_workers)
+    try:
+        routes = asyncio.run(run_benchmark(
+            f"http://127.0.0.1:{args.port}",
+            scenarios, samples, levels, args.requests, args.seed, args.warmup
+        ))
+    finally:
+        server.terminate()
+        server.wait()
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "tasks": args.tasks,
+            "seed": args.seed,
+            "concurrency": levels,
+            "requests_per_level": args.requests,
+            "server_workers": args.server_workers,
+            "skipped_routes": skipped,
+        },
+        "routes": routes,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare_reports(json.load(f), report, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) against {args.compare}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
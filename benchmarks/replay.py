@@ -0,0 +1,244 @@
+"""
+Replay captured traffic against a local instance
+
+Plays back JSONL written by traffic_capture.py, preserving the captured
+inter-arrival times scaled by --speed (1 = real time, 10 = ten times faster,
+max = as fast as --max-in-flight allows). Gids in paths, query strings and
+JSON bodies are remapped consistently onto gids sampled from the local
+(synthetic) dataset, using the path segment, parameter or body key to pick
+the table. Reports latency distributions per route.
+
+    python -m benchmarks.replay captures/capture.jsonl* --base-url http://localhost:8000 \\
+        --speed 10 --output replay_report.json
+
+Writes in the capture are replayed too and will change the local data;
+pass --methods GET to replay reads only.
+"""
+import argparse
+import asyncio
+import glob
+import hashlib
+import json
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+import httpx
+
+from benchmarks.endpoints import percentile, sample_gids, _table_aliases
+
+GID_PATTERN = re.compile(r"^(?:[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|\d+)$", re.IGNORECASE)
+SAMPLE_SIZE = 500
+
+
+def load_capture(patterns: List[str], methods: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Records from every matching file (rotated files included), in arrival order"""
+    records = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)):
+            with open(path) as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    record = json.loads(line)
+                    if methods is None or record["method"] in methods:
+                        records.append(record)
+    records.sort(key=lambda record: record["ts"])
+    return records
+
+
+def route_template(path: str) -> str:
+    """Collapse gid path segments so requests group by route"""
+    return "/".join("{gid}" if GID_PATTERN.match(segment) else segment for segment in path.split("/"))
+
+
+class GidMapper:
+    """Consistently maps captured gids onto gids that exist in the local dataset"""
+
+    def __init__(self, samples: Dict[str, List[str]]):
+        self.samples = {table: gids for table, gids in samples.items() if gids}
+        self.aliases = _table_aliases(self.samples)
+        self.mapping: Dict[Tuple[str, str], str] = {}
+
+    def table_for(self, name: Optional[str]) -> Optional[str]:
+        if not name:
+            return None
+        name = re.sub(r"(_gid|_gids)$", "", name)
+        table = self.aliases.get(name)
+        return table if table in self.samples else None
+
+    def map(self, gid: str, table: Optional[str]) -> str:
+        if table is None or not GID_PATTERN.match(gid):
+            return gid
+        key = (table, gid)
+        if key not in self.mapping:
+            # Hash-based choice keeps the mapping stable across runs
+            digest = int(hashlib.sha1(f"{table}:{gid}".encode()).hexdigest(), 16)
+            choices = self.samples[table]
+            self.mapping[key] = choices[digest % len(choices)]
+        return self.mapping[key]
+
+    def map_path(self, path: str) -> str:
+        segments = path.split("/")
+        for index, segment in enumerate(segments):
+            if index and GID_PATTERN.match(segment):
+                segments[index] = self.map(segment, self.table_for(segments[index - 1]))
+        return "/".join(segments)
+
+    def map_query(self, query: str) -> str:
+        if not query:
+            return query
+        return urlencode([(name, self.map(value, self.table_for(name))) for name, value in parse_qsl(query, keep_blank_values=True)])
+
+    def map_body(self, value: Any, key: Optional[str] = None) -> Any:
+        if isinstance(value, dict):
+            return {name: self.map_body(item, name) for name, item in value.items()}
+        if isinstance(value, list):
+            return [self.map_body(item, key) for item in value]
+        if isinstance(value, str):
+            return self.map(value, self.table_for(key))
+        return value
+
+
+def prepare(records: List[Dict[str, Any]], mapper: GidMapper) -> List[Dict[str, Any]]:
+    """Remapped requests with their offsets from the first captured request"""
+    if not records:
+        return []
+    start = records[0]["ts"]
+    prepared = []
+    for record in records:
+        content = None
+        if record.get("body"):
+            try:
+                content = json.dumps(mapper.map_body(json.loads(record["body"]))).encode()
+            except ValueError:
+                content = record["body"].encode()
+        query = mapper.map_query(record.get("query") or "")
+        path = mapper.map_path(record["path"])
+        prepared.append({
+            "offset": record["ts"] - start,
+            "method": record["method"],
+            "url": path + ("?" + query if query else ""),
+            "content": content,
+            "route": f"{record['method']} {route_template(record['path'])}",
+            "captured_ms": record.get("duration_ms"),
+        })
+    return prepared
+
+
+async def replay(base_url: str, requests: List[Dict[str, Any]], speed: Optional[float],
+                 max_in_flight: int) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Any]]:
+    """Send the requests on their (scaled) schedule; returns per-route samples and schedule stats"""
+    results: Dict[str, Dict[str, Any]] = {}
+    send_lag_ms: List[float] = []
+    slots = asyncio.Semaphore(max_in_flight)
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        async def send(request):
+            started = time.perf_counter()
+            try:
+                response = await client.request(
+                    request["method"], request["url"], content=request["content"],
+                    headers={"Content-Type": "application/json"} if request["content"] else None
+                )
+                status = str(response.status_code)
+            except httpx.HTTPError:
+                status = "error"
+            finally:
+                slots.release()
+            elapsed = (time.perf_counter() - started) * 1000
+            route = results.setdefault(request["route"], {"latencies": [], "captured": [], "statuses": {}})
+            route["latencies"].append(elapsed)
+            if request["captured_ms"] is not None:
+                route["captured"].append(request["captured_ms"])
+            route["statuses"][status] = route["statuses"].get(status, 0) + 1
+
+        began = time.perf_counter()
+        tasks = []
+        for request in requests:
+            if speed is not None:
+                due = request["offset"] / speed
+                delay = due - (time.perf_counter() - began)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            # Timed replay only waits here when the server falls max_in_flight requests behind
+            await slots.acquire()
+            if speed is not None:
+                send_lag_ms.append(max(0.0, (time.perf_counter() - began - due) * 1000))
+            tasks.append(asyncio.create_task(send(request)))
+        await asyncio.gather(*tasks)
+        duration = time.perf_counter() - began
+
+    send_lag_ms.sort()
+    schedule = {
+        "requests": len(requests),
+        "duration_s": round(duration, 2),
+        "achieved_rps": round(len(requests) / duration, 1) if duration else 0.0,
+        "captured_span_s": round(requests[-1]["offset"], 2) if requests else 0.0,
+        "send_lag_p99_ms": round(percentile(send_lag_ms, 0.99), 2) if send_lag_ms else None,
+    }
+    return results, schedule
+
+
+def summarize(results: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    summary = {}
+    for route, samples in sorted(results.items()):
+        latencies = sorted(samples["latencies"])
+        captured = sorted(samples["captured"])
+        summary[route] = {
+            "requests": len(latencies),
+            "p50_ms": round(percentile(latencies, 0.50), 2),
+            "p95_ms": round(percentile(latencies, 0.95), 2),
+            "p99_ms": round(percentile(latencies, 0.99), 2),
+            "max_ms": round(latencies[-1], 2),
+            "captured_p50_ms": round(percentile(captured, 0.50), 2) if captured else None,
+            "captured_p99_ms": round(percentile(captured, 0.99), 2) if captured else None,
+            "status_codes": samples["statuses"],
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay traffic captured by traffic_capture.py")
+    parser.add_argument("captures", nargs="+", help="Capture files or glob patterns")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--speed", default="1", help="Time scale: 1, 10, ... or max")
+    parser.add_argument("--max-in-flight", type=int, default=64, help="Upper bound on concurrent requests")
+    parser.add_argument("--methods", help="Comma-separated methods to replay (default: all)")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for sampling local gids")
+    parser.add_argument("--output", default="replay_report.json")
+    args = parser.parse_args()
+
+    methods = [method.strip().upper() for method in args.methods.split(",")] if args.methods else None
+    records = load_capture(args.captures, methods)
+    if not records:
+        parser.error("No captured requests found")
+
+    mapper = GidMapper(sample_gids(args.seed, SAMPLE_SIZE))
+    requests = prepare(records, mapper)
+
+    speed = None if args.speed == "max" else float(args.speed)
+    print(f"Replaying {len(requests)} request(s) at {args.speed}x against {args.base_url}...")
+    results, schedule = asyncio.run(replay(args.base_url, requests, speed, args.max_in_flight))
+    routes = summarize(results)
+
+    for route, result in routes.items():
+        print(
+            f"{route:<70} n={result['requests']:<6} p50 {result['p50_ms']:>7.1f}  "
+            f"p95 {result['p95_ms']:>7.1f}  p99 {result['p99_ms']:>7.1f} ms"
+        )
+    print(
+        f"{schedule['requests']} requests in {schedule['duration_s']}s "
+        f"({schedule['achieved_rps']} rps); p99 send lag {schedule['send_lag_p99_ms']} ms"
+    )
+
+    with open(args.output, "w") as f:
+        json.dump({"speed": args.speed, "schedule": schedule, "routes": routes}, f, indent=2)
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
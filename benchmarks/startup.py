@@ -0,0 +1,103 @@
+"""
+Cold start benchmark
+
+Measures, in fresh processes, how long `import main` takes and how long a
+uvicorn worker takes to answer /health and then its first API request, with
+lazy router loading on and off (LAZY_ROUTERS, see routers.py). Each figure is
+the median over --runs processes.
+
+    python -m benchmarks.startup --database-url postgresql://localhost/asana_bench --runs 5
+
+The database must already be initialized (e.g. by the first run of the app);
+otherwise the first boot also pays for creating the schema.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict
+
+import httpx
+
+IMPORT_SNIPPET = "import time; started = time.perf_counter(); import main; print(time.perf_counter() - started)"
+FIRST_API_PATH = "/api/1.0/workspaces"
+POLL_INTERVAL = 0.01
+
+
+def time_import(env: Dict[str, str]) -> float:
+    """Seconds spent importing main in a fresh interpreter"""
+    return float(subprocess.check_output([sys.executable, "-c", IMPORT_SNIPPET], env=env, text=True).strip())
+
+
+def time_boot(env: Dict[str, str], port: int) -> Dict[str, float]:
+    """Seconds from spawning uvicorn to the first /health answer, and then to the first API answer"""
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        env=env
+    )
+    try:
+        deadline = started + 60
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError("uvicorn exited during startup")
+            if time.perf_counter() > deadline:
+                raise RuntimeError("uvicorn did not become healthy within 60s")
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1.0).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            time.sleep(POLL_INTERVAL)
+        healthy = time.perf_counter()
+        response = httpx.get(f"http://127.0.0.1:{port}{FIRST_API_PATH}", timeout=60.0)
+        first_request = time.perf_counter()
+        response.raise_for_status()
+        second_request_started = time.perf_counter()
+        httpx.get(f"http://127.0.0.1:{port}{FIRST_API_PATH}", timeout=60.0).raise_for_status()
+        return {
+            "healthy_s": healthy - started,
+            "first_request_s": first_request - healthy,
+            "warm_request_s": time.perf_counter() - second_request_started,
+        }
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def run_mode(lazy: bool, database_url: str, runs: int, port: int) -> Dict[str, Any]:
+    env = dict(os.environ, DATABASE_URL=database_url, LAZY_ROUTERS="1" if lazy else "0")
+    imports = [time_import(env) for _ in range(runs)]
+    boots = [time_boot(env, port) for _ in range(runs)]
+    result = {"import_ms": round(statistics.median(imports) * 1000, 1)}
+    for key in ("healthy_s", "first_request_s", "warm_request_s"):
+        result[key[:-2] + "_ms"] = round(statistics.median(boot[key] for boot in boots) * 1000, 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import and first-request times of the app")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"), required=os.getenv("DATABASE_URL") is None)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per measurement")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--output", default="startup_report.json")
+    args = parser.parse_args()
+
+    report = {}
+    for mode, lazy in (("eager", False), ("lazy", True)):
+        report[mode] = result = run_mode(lazy, args.database_url, args.runs, args.port)
+        print(
+            f"{mode:<6} import {result['import_ms']:>7.1f} ms  healthy {result['healthy_ms']:>7.1f} ms  "
+            f"first request {result['first_request_ms']:>7.1f} ms  warm request {result['warm_request_ms']:>6.1f} ms"
+        )
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Shared test fixtures: a SQLite database with every table, for the services
+whose SQL also runs outside Postgres, and a rolled back transaction on
+DATABASE_URL (pg_db) for the ones that do not. Tests that need Postgres data
+(partitioning, the API comparisons) connect to DATABASE_URL themselves.
+"""
+import asyncio
+import os
+
+import httpx
+import pytest
+from sqlalchemy import ARRAY, create_engine, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.compiler import compiles
+
+# The audit writer inserts through the Postgres engine, outside the test database
+os.environ.setdefault("AUDIT_LOG", "0")
+
+from database import Base, RoutingSession, get_db, import_models
+
+
+@compiles(ARRAY, "sqlite")
+def _array_as_json(type_, compiler, **kw):
+    return "JSON"
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """A file database, so separate sessions use separate connections like they would on Postgres"""
+    import_models()
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def _enforce_foreign_keys(connection, _):
+    connection.execute("PRAGMA foreign_keys=ON")
+
+
+@pytest.fixture
+def foreign_keys(engine):
+    """
+    Enforce foreign keys on the test database like Postgres does (SQLite only checks
+    them when asked, per connection). Opt in: most tests leave out the parent rows.
+    """
+    engine.dispose()
+    event.listen(engine, "connect", _enforce_foreign_keys)
+
+
+@pytest.fixture
+def db(engine):
+    session = RoutingSession(bind=engine, autoflush=False)
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def pg_db():
+    """A session on DATABASE_URL whose writes, commits included, are rolled back; skipped without Postgres"""
+    from database import engine as postgres
+
+    try:
+        connection = postgres.connect()
+    except OperationalError:
+        pytest.skip("Postgres is not reachable at DATABASE_URL")
+    transaction = connection.begin()
+    session = RoutingSession(bind=connection, autoflush=False, join_transaction_mode="create_savepoint")
+    yield session
+    session.close()
+    transaction.rollback()
+    connection.close()
+
+
+@pytest.fixture
+def api(engine):
+    """Send a request to the app, served from the test database: api("POST", "/tasks", json=...)"""
+    import main
+
+    def test_db():
+        session = RoutingSession(bind=engine, autoflush=False)
+        try:
+            yield session
+        finally:
+            session.close()
+
+    async def send(method, path, **kwargs):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test/api/1.0") as client:
+            return await client.request(method, path, **kwargs)
+
+    main.app.dependency_overrides[get_db] = test_db
+    yield lambda method, path, **kwargs: asyncio.run(send(method, path, **kwargs))
+    main.app.dependency_overrides.pop(get_db, None)
@@ -2,20 +2,41 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Body
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from typing import Optional, List
+from datetime import date
 from database import get_db
 from utils import generate_gid
 from models.allocation import Allocation
 from models.user import User
 from models.project import Project
+from models.team import Team
+from models.team_membership import TeamMembership
+from models.workspace import Workspace
+from models.workspace_membership import WorkspaceMembership
 from schemas.allocation import (
     AllocationResponse, AllocationResponseWrapper, AllocationListResponse,
-    AllocationRequest, Effort, EmptyResponse
+    AllocationRequest, Effort, EmptyResponse,
+    WorkloadDataPoint, WorkloadSeries, WorkloadConflict, Workload, WorkloadResponse
 )
 from schemas.base import UserCompact, ProjectCompact
+from services.time_rollups import GRANULARITIES, MAX_REPORT_PERIODS, periods
+from services.workload import EFFORT_TYPES, HOURS_PER_DAY, MAX_DAYS, cache as workload_cache, workload
 
 router = APIRouter()
 
 
+def _check_allocation(start_date: Optional[date], end_date: Optional[date], effort_type: Optional[str]):
+    if effort_type is not None and effort_type not in EFFORT_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"effort_type: must be one of {', '.join(EFFORT_TYPES)}"
+        )
+    if start_date and end_date and end_date < start_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end_date: must not be before start_date"
+        )
+
+
 @router.get("/allocations", response_model=AllocationListResponse)
 def get_allocations(
     parent: Optional[str] = Query(None, description="Globally unique identifier for the project to filter allocations by"),
@@ -200,6 +221,8 @@ def create_allocation(
             detail="assignee, parent, start_date, and end_date are required"
         )
     
+    _check_allocation(allocation_data.start_date, allocation_data.end_date, allocation_data.effort_type)
+
     try:
         assignee_id = int(allocation_data.assignee)
         parent_id = int(allocation_data.parent)
@@ -248,6 +271,7 @@ def create_allocation(
     db.add(new_allocation)
     db.commit()
     db.refresh(new_allocation)
+    workload_cache.invalidate([assignee_id])
     
     assignee_obj = UserCompact(
         gid=assignee.gid,
@@ -321,6 +345,12 @@ def update_allocation(
         )
     
     update_data = allocation_data.dict(exclude_unset=True)
+    _check_allocation(
+        update_data.get("start_date", allocation.start_date),
+        update_data.get("end_date", allocation.end_date),
+        update_data.get("effort_type", allocation.effort_type)
+    )
+    previous_assignee_id = allocation.assignee_id
     
     if "assignee" in update_data and update_data["assignee"]:
         try:
@@ -367,6 +397,7 @@ def update_allocation(
     
     db.commit()
     db.refresh(allocation)
+    workload_cache.invalidate([previous_assignee_id, allocation.assignee_id])
     
     # Build response
     assignee_obj = None
@@ -436,8 +467,10 @@ def delete_allocation(
         )
     
     try:
+        assignee_id = allocation.assignee_id
         db.delete(allocation)
         db.commit()
+        workload_cache.invalidate([assignee_id])
     except IntegrityError as e:
         db.rollback()
         raise HTTPException(
@@ -453,3 +486,105 @@ def delete_allocation(
     
     return EmptyResponse(data={})
 
+
+
+@router.get("/workspaces/{workspace_gid}/workload", response_model=WorkloadResponse)
+def get_workload(
+    workspace_gid: str = Path(..., description="Globally unique identifier for the workspace or organization"),
+    start: date = Query(..., description="First day of the workload"),
+    end: date = Query(..., description="Last day of the workload (inclusive)"),
+    team: Optional[str] = Query(None, description="Only include members of this team"),
+    granularity: str = Query("week", description="Period of each data point: day, week or month"),
+    opt_pretty: Optional[bool] = Query(False, description="Pretty output format"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get workload: hours allocated per user and period against capacity, for a team or the
+    whole workspace, with the runs of days each user is allocated beyond capacity.
+    """
+    if granularity not in GRANULARITIES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"granularity: must be one of {', '.join(GRANULARITIES)}"
+        )
+    if end < start:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="end: must not be before start")
+    if (end - start).days + 1 > MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A workload covers at most {MAX_DAYS} days"
+        )
+    starts = periods(start, end, granularity)
+    if len(starts) > MAX_REPORT_PERIODS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A workload covers at most {MAX_REPORT_PERIODS} periods; use a coarser granularity"
+        )
+
+    workspace_id = db.query(Workspace.id).filter(Workspace.gid == workspace_gid).scalar()
+    if workspace_id is None:
+        raise HTTPException(status_code=404, detail="Workspace not found")
+    if team:
+        team_id = db.query(Team.id).filter(Team.gid == team).scalar()
+        if team_id is None:
+            raise HTTPException(status_code=404, detail="Team not found")
+        user_ids = {row[0] for row in db.query(TeamMembership.user_id).filter(
+            TeamMembership.team_id == team_id, TeamMembership.user_id.isnot(None)
+        ).all()}
+    else:
+        # Active members, and anyone allocated to the workspace's projects in the window
+        user_ids = {row[0] for row in db.query(WorkspaceMembership.user_id).filter(
+            WorkspaceMembership.workspace_id == workspace_id, WorkspaceMembership.is_active.isnot(False),
+            WorkspaceMembership.user_id.isnot(None)
+        ).all()}
+        user_ids |= {row[0] for row in db.query(Allocation.assignee_id).join(
+            Project, Project.id == Allocation.parent_id
+        ).filter(
+            Project.workspace_id == workspace_id, Allocation.assignee_id.isnot(None),
+            Allocation.start_date <= end, Allocation.end_date >= start
+        ).distinct().all()}
+
+    result = workload(db, workspace_id, user_ids, start, end, starts)
+
+    # Users of the workload in one query
+    users = {row.id: row for row in db.query(User).filter(User.id.in_(user_ids)).all()} if user_ids else {}
+
+    def user_compact(user_id):
+        member = users.get(user_id)
+        return {"gid": member.gid, "resource_type": "user", "name": member.name or ""} if member else None
+
+    series = []
+    for key in sorted(result["series"], key=lambda key: (key is not None, key or 0)):
+        values = result["series"][key]
+        data_points = []
+        for index, period in enumerate(starts):
+            allocated, capacity = float(values["allocated"][index]), float(values["capacity"][index])
+            data_points.append(WorkloadDataPoint(
+                start_on=period,
+                allocated_hours=round(allocated, 2),
+                capacity_hours=round(capacity, 2),
+                utilization=round(allocated / capacity, 4) if capacity else None
+            ))
+        series.append(WorkloadSeries(
+            user=user_compact(key),
+            allocated_hours=round(float(values["allocated"].sum()), 2),
+            capacity_hours=round(float(values["capacity"].sum()), 2),
+            over_allocated_days=values["over_days"],
+            data_points=data_points
+        ))
+
+    conflicts = [
+        WorkloadConflict(
+            user=user_compact(conflict["user_id"]),
+            start_on=conflict["start_on"],
+            end_on=conflict["end_on"],
+            peak_hours=round(conflict["peak_hours"], 2),
+            excess_hours=round(conflict["excess_hours"], 2)
+        )
+        for conflict in result["conflicts"]
+    ]
+
+    return WorkloadResponse(data=Workload(
+        start_on=start, end_on=end, granularity=granularity, hours_per_day=HOURS_PER_DAY,
+        series=series, conflicts=conflicts
+    ))
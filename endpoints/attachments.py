@@ -4,6 +4,7 @@ from sqlalchemy.exc import IntegrityError
 from typing import Optional, List
 from database import get_db
 from utils import generate_gid
+from partitioning import workspace_filter
 from models.attachment import Attachment
 from models.user import User
 from models.project import Project
@@ -18,6 +19,14 @@ from schemas.base import UserCompact, ProjectCompact, TaskCompact
 router = APIRouter()
 
 
+def _parent_workspace_id(db: Session, project: Optional[Project], task: Optional[Task],
+                         project_brief: Optional[ProjectBrief]) -> Optional[int]:
+    """Workspace of an attachment's parent (a brief's comes from its project)"""
+    if project or task:
+        return (project or task).workspace_id
+    return db.query(Project.workspace_id).filter(Project.id == project_brief.project_id).scalar()
+
+
 @router.get("/attachments", response_model=AttachmentListResponse)
 def get_attachments_for_object(
     parent: str = Query(..., description="Globally unique identifier for object to fetch attachments from. Must be a GID for a project, project_brief, or task"),
@@ -49,8 +58,11 @@ def get_attachments_for_object(
             detail="Parent object not found"
         )
     
-    # Query attachments
-    query = db.query(Attachment).filter(Attachment.parent_id == parent_id)
+    # Query attachments (workspace_id lets a partitioned table prune to one partition)
+    workspace_id = _parent_workspace_id(db, project, task, project_brief)
+    query = db.query(Attachment).filter(
+        Attachment.parent_id == parent_id, workspace_filter(Attachment.workspace_id, workspace_id)
+    )
     attachments = query.limit(limit).all()
     
     attachment_compacts = []
@@ -182,6 +194,7 @@ def create_attachment_for_object(
         )
     
     parent_type = "project" if project else ("task" if task else "project_brief")
+    workspace_id = _parent_workspace_id(db, project, task, project_brief)
     
     # Get current user (in real implementation, from auth token)
     created_by = db.query(User).first()
@@ -207,6 +220,7 @@ def create_attachment_for_object(
         host=None,
         parent_id=parent_id,
         parent_type=parent_type,
+        workspace_id=workspace_id,
         permanent_url=download_url,
         created_by_id=created_by.id
     )
@@ -0,0 +1,93 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Request
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+from typing import Optional
+from database import get_db
+from models.audit_log_event import AuditLogEvent
+from models.workspace import Workspace
+from schemas.audit_log_event import (
+    AuditLogEventResponse, AuditLogEventListResponse, AuditLogEventActor,
+    AuditLogEventResource, AuditLogEventContext
+)
+from schemas.base import NextPage
+from utils import decode_cursor, encode_cursor, next_page_link
+
+router = APIRouter()
+
+
+def _event_response(event: AuditLogEvent) -> AuditLogEventResponse:
+    return AuditLogEventResponse(
+        gid=event.gid,
+        created_at=event.created_at,
+        event_type=event.event_type,
+        actor=AuditLogEventActor(actor_type=event.actor_type or "asana", gid=event.actor_gid),
+        resource=AuditLogEventResource(
+            resource_type=event.resource_type_name,
+            gid=event.resource_gid,
+            name=event.resource_name
+        ),
+        details=event.details or {},
+        context=AuditLogEventContext(**event.context) if event.context else None
+    )
+
+
+@router.get("/workspaces/{workspace_gid}/audit_log_events", response_model=AuditLogEventListResponse)
+def get_audit_log_events(
+    request: Request,
+    workspace_gid: str = Path(..., description="Globally unique identifier for the workspace or organization"),
+    start_at: Optional[datetime] = Query(None, description="Filter to events created after this time (inclusive)"),
+    end_at: Optional[datetime] = Query(None, description="Filter to events created before this time (exclusive)"),
+    event_type: Optional[str] = Query(None, description="Filter to events of this type"),
+    actor_type: Optional[str] = Query(None, description="Filter to events with an actor of this type"),
+    actor_gid: Optional[str] = Query(None, description="Filter to events triggered by the actor with this ID"),
+    resource_gid: Optional[str] = Query(None, description="Filter to events with this resource ID"),
+    limit: Optional[int] = Query(50, ge=1, le=100, description="Results per page"),
+    offset: Optional[str] = Query(None, description="Offset token"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get audit log events (GET request): Returns the audit log events of the workspace, oldest first.
+    Pages are keyset cursors over (created_at, id), so each page is one index range scan.
+    """
+    workspace_id = db.query(Workspace.id).filter(Workspace.gid == workspace_gid).scalar()
+    if workspace_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Workspace not found"
+        )
+
+    query = db.query(AuditLogEvent).filter(AuditLogEvent.workspace_id == workspace_id)
+    if start_at:
+        query = query.filter(AuditLogEvent.created_at >= start_at)
+    if end_at:
+        query = query.filter(AuditLogEvent.created_at < end_at)
+    if event_type:
+        query = query.filter(AuditLogEvent.event_type == event_type)
+    if actor_type:
+        query = query.filter(AuditLogEvent.actor_type == actor_type)
+    if actor_gid:
+        query = query.filter(AuditLogEvent.actor_gid == actor_gid)
+    if resource_gid:
+        query = query.filter(AuditLogEvent.resource_gid == resource_gid)
+    if offset:
+        position = decode_cursor(offset)
+        if position is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="offset: Your pagination token is invalid."
+            )
+        created_at, event_id = position
+        query = query.filter(
+            AuditLogEvent.created_at >= created_at,
+            tuple_(AuditLogEvent.created_at, AuditLogEvent.id) > tuple_(created_at, event_id)
+        )
+
+    events = query.order_by(AuditLogEvent.created_at, AuditLogEvent.id).limit(limit + 1).all()
+
+    next_page = None
+    if len(events) > limit:
+        events = events[:limit]
+        next_page = NextPage(**next_page_link(request, encode_cursor(events[-1].created_at, events[-1].id)))
+
+    return AuditLogEventListResponse(data=[_event_response(event) for event in events], next_page=next_page)
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query, Body
 from sqlalchemy.orm import Session
 from typing import Optional
 from database import get_db
+from tracing import span
 from schemas.batch import BatchRequestWrapper, BatchResponseWrapper, BatchResponse
 
 router = APIRouter()
@@ -20,15 +21,20 @@ def create_batch_request(
     # and return the responses
     
     responses = []
-    for request_item in batch_data.data:
-        # Simplified: just return a mock response
-        # In reality, you'd make the actual HTTP requests based on request_item.method and request_item.relative_path
-        response = BatchResponse(
-            status_code=200,
-            headers={},
-            body={"data": {"gid": "12345", "resource_type": "task"}}
-        )
-        responses.append(response)
+    for index, request_item in enumerate(batch_data.data):
+        with span("batch.action", {
+            "batch.index": index,
+            "http.request.method": request_item.method,
+            "batch.relative_path": request_item.relative_path,
+        }):
+            # Simplified: just return a mock response
+            # In reality, you'd make the actual HTTP requests based on request_item.method and request_item.relative_path
+            response = BatchResponse(
+                status_code=200,
+                headers={},
+                body={"data": {"gid": "12345", "resource_type": "task"}}
+            )
+            responses.append(response)
 
     return BatchResponseWrapper(data=responses)
 
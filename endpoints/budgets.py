@@ -11,10 +11,50 @@ from schemas.budget import (
     BudgetRequest, BudgetEstimate, BudgetActual, BudgetTotal, EmptyResponse
 )
 from schemas.base import ProjectCompact
+from services.budgets import recompute_budgets
+from services.portfolio_rollups import invalidate_projects
 
 router = APIRouter()
 
 
+def _budget_response(budget: Budget, parent_obj: ProjectCompact) -> BudgetResponse:
+    estimate_obj = None
+    if budget.estimate_enabled is not None or budget.estimate_source or budget.estimate_value:
+        estimate_obj = BudgetEstimate(
+            enabled=budget.estimate_enabled,
+            source=budget.estimate_source,
+            billable_status_filter=budget.estimate_billable_status_filter,
+            value=float(budget.estimate_value) if budget.estimate_value else None,
+            units=budget.estimate_units
+        )
+    
+    actual_obj = None
+    if budget.actual_value is not None or budget.actual_billable_status_filter:
+        actual_obj = BudgetActual(
+            billable_status_filter=budget.actual_billable_status_filter,
+            value=float(budget.actual_value) if budget.actual_value is not None else None,
+            units=budget.actual_units
+        )
+    
+    total_obj = None
+    if budget.total_enabled is not None or budget.total_value:
+        total_obj = BudgetTotal(
+            enabled=budget.total_enabled,
+            value=float(budget.total_value) if budget.total_value else None,
+            units=budget.total_units
+        )
+    
+    return BudgetResponse(
+        gid=budget.gid,
+        resource_type=budget.resource_type,
+        budget_type=budget.budget_type,
+        estimate=estimate_obj,
+        actual=actual_obj,
+        total=total_obj,
+        parent=parent_obj
+    )
+
+
 @router.get("/budgets", response_model=BudgetListResponse)
 def get_budgets(
     parent: str = Query(..., description="Globally unique identifier for the budget's parent object. This currently can only be a project"),
@@ -42,53 +82,15 @@ def get_budgets(
     
     budgets = db.query(Budget).filter(Budget.parent_id == parent_id).all()
     
-    budget_responses = []
-    for budget in budgets:
-        parent_obj = ProjectCompact(
-            gid=project.gid,
-            resource_type=project.resource_type,
-            name=project.name,
-            resource_subtype=None
-        )
-        
-        estimate_obj = None
-        if budget.estimate_enabled is not None or budget.estimate_source or budget.estimate_value:
-            estimate_obj = BudgetEstimate(
-                enabled=budget.estimate_enabled,
-                source=budget.estimate_source,
-                billable_status_filter=budget.estimate_billable_status_filter,
-                value=float(budget.estimate_value) if budget.estimate_value else None,
-                units=budget.estimate_units
-            )
-        
-        actual_obj = None
-        if budget.actual_value or budget.actual_billable_status_filter:
-            actual_obj = BudgetActual(
-                billable_status_filter=budget.actual_billable_status_filter,
-                value=float(budget.actual_value) if budget.actual_value else None,
-                units=budget.actual_units
-            )
-        
-        total_obj = None
-        if budget.total_enabled is not None or budget.total_value:
-            total_obj = BudgetTotal(
-                enabled=budget.total_enabled,
-                value=float(budget.total_value) if budget.total_value else None,
-                units=budget.total_units
-            )
-        
-        budget_data = {
-            "gid": budget.gid,
-            "resource_type": budget.resource_type,
-            "budget_type": budget.budget_type,
-            "estimate": estimate_obj,
-            "actual": actual_obj,
-            "total": total_obj,
-            "parent": parent_obj
-        }
-        budget_responses.append(BudgetResponse(**budget_data))
+    parent_obj = ProjectCompact(
+        gid=project.gid,
+        resource_type=project.resource_type,
+        name=project.name,
+        resource_subtype=None
+    )
     
-    return BudgetListResponse(data=budget_responses)
+    # actual_value is maintained by services/budgets.py, so listing never reads time entries
+    return BudgetListResponse(data=[_budget_response(budget, parent_obj) for budget in budgets])
 
 
 @router.post("/budgets", response_model=BudgetResponseWrapper, status_code=status.HTTP_201_CREATED)
@@ -132,7 +134,6 @@ def create_budget(
         estimate_value=budget_data.estimate_value,
         estimate_units=budget_data.estimate_units,
         actual_billable_status_filter=budget_data.actual_billable_status_filter,
-        actual_value=budget_data.actual_value,
         actual_units=budget_data.actual_units,
         total_enabled=budget_data.total_enabled,
         total_value=budget_data.total_value,
@@ -141,6 +142,10 @@ def create_budget(
     )
     
     db.add(new_budget)
+    db.flush()
+    # The actual is computed from the project's time entries, never taken from the request
+    recompute_budgets(db, [parent_id])
+    invalidate_projects(db, [parent_id])
     db.commit()
     db.refresh(new_budget)
     
@@ -151,43 +156,7 @@ def create_budget(
         resource_subtype=None
     )
     
-    estimate_obj = None
-    if new_budget.estimate_enabled is not None or new_budget.estimate_source or new_budget.estimate_value:
-        estimate_obj = BudgetEstimate(
-            enabled=new_budget.estimate_enabled,
-            source=new_budget.estimate_source,
-            billable_status_filter=new_budget.estimate_billable_status_filter,
-            value=float(new_budget.estimate_value) if new_budget.estimate_value else None,
-            units=new_budget.estimate_units
-        )
-    
-    actual_obj = None
-    if new_budget.actual_value or new_budget.actual_billable_status_filter:
-        actual_obj = BudgetActual(
-            billable_status_filter=new_budget.actual_billable_status_filter,
-            value=float(new_budget.actual_value) if new_budget.actual_value else None,
-            units=new_budget.actual_units
-        )
-    
-    total_obj = None
-    if new_budget.total_enabled is not None or new_budget.total_value:
-        total_obj = BudgetTotal(
-            enabled=new_budget.total_enabled,
-            value=float(new_budget.total_value) if new_budget.total_value else None,
-            units=new_budget.total_units
-        )
-    
-    budget_response = BudgetResponse(
-        gid=new_budget.gid,
-        resource_type=new_budget.resource_type,
-        budget_type=new_budget.budget_type,
-        estimate=estimate_obj,
-        actual=actual_obj,
-        total=total_obj,
-        parent=parent_obj
-    )
-    
-    return BudgetResponseWrapper(data=budget_response)
+    return BudgetResponseWrapper(data=_budget_response(new_budget, parent_obj))
 
 
 @router.get("/budgets/{budget_gid}", response_model=BudgetResponseWrapper)
@@ -229,43 +198,7 @@ def get_budget(
         resource_subtype=None
     )
     
-    estimate_obj = None
-    if budget.estimate_enabled is not None or budget.estimate_source or budget.estimate_value:
-        estimate_obj = BudgetEstimate(
-            enabled=budget.estimate_enabled,
-            source=budget.estimate_source,
-            billable_status_filter=budget.estimate_billable_status_filter,
-            value=float(budget.estimate_value) if budget.estimate_value else None,
-            units=budget.estimate_units
-        )
-    
-    actual_obj = None
-    if budget.actual_value or budget.actual_billable_status_filter:
-        actual_obj = BudgetActual(
-            billable_status_filter=budget.actual_billable_status_filter,
-            value=float(budget.actual_value) if budget.actual_value else None,
-            units=budget.actual_units
-        )
-    
-    total_obj = None
-    if budget.total_enabled is not None or budget.total_value:
-        total_obj = BudgetTotal(
-            enabled=budget.total_enabled,
-            value=float(budget.total_value) if budget.total_value else None,
-            units=budget.total_units
-        )
-    
-    budget_data = {
-        "gid": budget.gid,
-        "resource_type": budget.resource_type,
-        "budget_type": budget.budget_type,
-        "estimate": estimate_obj,
-        "actual": actual_obj,
-        "total": total_obj,
-        "parent": parent_obj
-    }
-    
-    return BudgetResponseWrapper(data=BudgetResponse(**budget_data))
+    return BudgetResponseWrapper(data=_budget_response(budget, parent_obj))
 
 
 @router.put("/budgets/{budget_gid}", response_model=BudgetResponseWrapper)
@@ -310,8 +243,6 @@ def update_budget(
         budget.estimate_units = update_data["estimate_units"]
     if "actual_billable_status_filter" in update_data:
         budget.actual_billable_status_filter = update_data["actual_billable_status_filter"]
-    if "actual_value" in update_data:
-        budget.actual_value = update_data["actual_value"]
     if "actual_units" in update_data:
         budget.actual_units = update_data["actual_units"]
     if "total_enabled" in update_data:
@@ -321,6 +252,10 @@ def update_budget(
     if "total_units" in update_data:
         budget.total_units = update_data["total_units"]
     
+    if "budget_type" in update_data or "actual_billable_status_filter" in update_data:
+        db.flush()
+        recompute_budgets(db, [budget.parent_id])
+    invalidate_projects(db, [budget.parent_id])
     db.commit()
     db.refresh(budget)
     
@@ -332,43 +267,7 @@ def update_budget(
         resource_subtype=None
     )
     
-    estimate_obj = None
-    if budget.estimate_enabled is not None or budget.estimate_source or budget.estimate_value:
-        estimate_obj = BudgetEstimate(
-            enabled=budget.estimate_enabled,
-            source=budget.estimate_source,
-            billable_status_filter=budget.estimate_billable_status_filter,
-            value=float(budget.estimate_value) if budget.estimate_value else None,
-            units=budget.estimate_units
-        )
-    
-    actual_obj = None
-    if budget.actual_value or budget.actual_billable_status_filter:
-        actual_obj = BudgetActual(
-            billable_status_filter=budget.actual_billable_status_filter,
-            value=float(budget.actual_value) if budget.actual_value else None,
-            units=budget.actual_units
-        )
-    
-    total_obj = None
-    if budget.total_enabled is not None or budget.total_value:
-        total_obj = BudgetTotal(
-            enabled=budget.total_enabled,
-            value=float(budget.total_value) if budget.total_value else None,
-            units=budget.total_units
-        )
-    
-    budget_response = BudgetResponse(
-        gid=budget.gid,
-        resource_type=budget.resource_type,
-        budget_type=budget.budget_type,
-        estimate=estimate_obj,
-        actual=actual_obj,
-        total=total_obj,
-        parent=parent_obj
-    )
-    
-    return BudgetResponseWrapper(data=budget_response)
+    return BudgetResponseWrapper(data=_budget_response(budget, parent_obj))
 
 
 @router.delete("/budgets/{budget_gid}", response_model=EmptyResponse)
@@ -387,6 +286,7 @@ def delete_budget(
         )
     
     try:
+        invalidate_projects(db, [budget.parent_id])
         db.delete(budget)
         db.commit()
     except IntegrityError as e:
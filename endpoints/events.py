@@ -1,13 +1,24 @@
+from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import JSONResponse
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
 from typing import Optional
 from database import get_db
 from models.event import Event
 from models.user import User
+from retention import POLICIES
 from schemas.event import EventResponse, EventListResponse
+from utils import decode_cursor, encode_cursor
 
 router = APIRouter()
 
+SYNC_PAGE_SIZE = 100
+SYNC_TOKEN_EXPIRED = (
+    "Sync token invalid or too old. If you are attempting to keep resources in sync, "
+    "you must fetch the full dataset for this query now and use the new sync token for the next sync."
+)
+
 
 @router.get("/events", response_model=EventListResponse)
 def get_events(
@@ -22,6 +33,18 @@ def get_events(
     since the sync token was created.
     """
     query = db.query(Event)
+    position = None
+    if sync:
+        position = decode_cursor(sync)
+        # The token carries its own timestamp, so expiry is checked without touching the table
+        if position is None or position[0] < POLICIES["events"].cutoff():
+            return JSONResponse(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                content={
+                    "errors": [{"message": SYNC_TOKEN_EXPIRED}],
+                    "sync": encode_cursor(datetime.now(timezone.utc), 0)
+                }
+            )
     
     if resource:
         try:
@@ -33,8 +56,23 @@ def get_events(
                 detail="Invalid resource GID format"
             )
     
-    # Order by created_at descending
-    events = query.order_by(Event.created_at.desc()).limit(100).all()
+    if position is not None:
+        # Events after the token, oldest first; the created_at bound prunes older partitions
+        created_at, event_id = position
+        events = query.filter(
+            Event.created_at >= created_at, tuple_(Event.created_at, Event.id) > tuple_(created_at, event_id)
+        ).order_by(Event.created_at, Event.id).limit(SYNC_PAGE_SIZE + 1).all()
+        has_more = len(events) > SYNC_PAGE_SIZE
+        events = events[:SYNC_PAGE_SIZE]
+        next_sync = encode_cursor(events[-1].created_at, events[-1].id) if events else sync
+    else:
+        # Order by created_at descending
+        events = query.order_by(Event.created_at.desc()).limit(SYNC_PAGE_SIZE).all()
+        has_more = False
+        next_sync = (
+            encode_cursor(events[0].created_at, events[0].id) if events
+            else encode_cursor(datetime.now(timezone.utc), 0)
+        )
     
     # Convert to response format
     event_responses = []
@@ -66,5 +104,5 @@ def get_events(
         }
         event_responses.append(EventResponse(**event_data))
     
-    return EventListResponse(data=event_responses)
+    return EventListResponse(data=event_responses, sync=next_sync, has_more=has_more)
 
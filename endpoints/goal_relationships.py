@@ -8,6 +8,7 @@ from schemas.goal_relationship import (
     GoalRelationshipResponse, GoalRelationshipResponseWrapper,
     GoalRelationshipListResponse, GoalRelationshipCompact
 )
+from services.goal_progress import supporting_resources
 
 router = APIRouter()
 
@@ -22,12 +23,11 @@ def get_goal_relationships(
     """
     Get Goal Relationships (GET request): Returns compact goal relationship records.
     """
-    try:
-        goal_id = int(goal_gid)
-    except ValueError:
+    goal_id = db.query(Goal.id).filter(Goal.gid == goal_gid).scalar()
+    if goal_id is None:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid goal GID format"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Goal not found"
         )
     
     # Get relationships where this goal is the supported goal
@@ -35,6 +35,11 @@ def get_goal_relationships(
         GoalRelationship.supported_goal_id == goal_id
     ).all()
     
+    # Supporting goals, projects and tasks of the whole list, one query per type
+    supporting = supporting_resources(
+        db, [(rel.supporting_resource_type, rel.supporting_resource_id) for rel in relationships]
+    )
+    
     relationship_compacts = []
     for rel in relationships:
         rel_data = {
@@ -42,7 +47,7 @@ def get_goal_relationships(
             "resource_type": rel.resource_type,
             "resource_subtype": rel.resource_subtype,
             "contribution_weight": float(rel.contribution_weight) if rel.contribution_weight else None,
-            "supporting_resource": None
+            "supporting_resource": supporting.get((rel.supporting_resource_type, rel.supporting_resource_id))
         }
         relationship_compacts.append(GoalRelationshipCompact(**rel_data))
     
@@ -59,28 +64,24 @@ def get_goal_relationship(
     """
     Get a Goal Relationship (GET request): Returns the complete goal relationship record.
     """
-    try:
-        rel_id = int(goal_relationship_gid)
-    except ValueError:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid goal relationship GID format"
-        )
-    
-    relationship = db.query(GoalRelationship).filter(GoalRelationship.id == rel_id).first()
+    relationship = db.query(GoalRelationship).filter(GoalRelationship.gid == goal_relationship_gid).first()
     if not relationship:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Goal relationship not found"
         )
     
+    key = (relationship.supporting_resource_type, relationship.supporting_resource_id)
+    supported_goal = db.query(Goal).filter(Goal.id == relationship.supported_goal_id).first()
     rel_data = {
         "gid": relationship.gid,
         "resource_type": relationship.resource_type,
         "resource_subtype": relationship.resource_subtype,
         "contribution_weight": float(relationship.contribution_weight) if relationship.contribution_weight else None,
-        "supported_goal": None,
-        "supporting_resource": None
+        "supported_goal": {
+            "gid": supported_goal.gid, "resource_type": "goal", "name": supported_goal.name
+        } if supported_goal else None,
+        "supporting_resource": supporting_resources(db, [key]).get(key)
     }
     
     return GoalRelationshipResponseWrapper(data=GoalRelationshipResponse(**rel_data))
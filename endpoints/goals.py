@@ -10,15 +10,87 @@ from models.team import Team
 from models.workspace import Workspace
 from models.time_period import TimePeriod
 from models.status_update import StatusUpdate
+from models.goal_metric import GoalMetric
+from models.goal_relationship import GoalRelationship
 from schemas.goal import (
     GoalResponse, GoalResponseWrapper, GoalListResponse, GoalCompact,
     GoalRequest, GoalUpdateRequest, GoalAddSubgoalRequest, GoalRemoveSubgoalRequest,
     GoalAddSupportingWorkRequest, GoalAddSupportingRelationshipRequest,
-    GoalRemoveSupportingRelationshipRequest, EmptyResponse
+    GoalRemoveSupportingRelationshipRequest, GoalMetricRequest, GoalMetricCurrentValueRequest,
+    GoalMetricResponse, EmptyResponse
+)
+from schemas.goal_relationship import GoalRelationshipResponse, GoalRelationshipResponseWrapper
+from services.goal_progress import (
+    PROGRESS_SOURCES, SUPPORTING_MODELS, creates_cycle, display_value, recompute_goal_progress, supported_goals,
+    supporting_resources
 )
 
 router = APIRouter()
 
+METRIC_UNITS = ("none", "currency", "percentage")
+
+
+def _get_goal(db: Session, goal_gid: str) -> Goal:
+    goal = db.query(Goal).filter(Goal.gid == goal_gid).first()
+    if not goal:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Goal not found"
+        )
+    return goal
+
+
+def _metric_response(metric: Optional[GoalMetric]) -> Optional[GoalMetricResponse]:
+    if metric is None:
+        return None
+    current = metric.current_number_value
+    return GoalMetricResponse(
+        gid=metric.gid,
+        resource_type=metric.resource_type or "goal_metric",
+        resource_subtype=metric.resource_subtype,
+        precision=metric.precision,
+        unit=metric.unit,
+        currency_code=metric.currency_code,
+        initial_number_value=float(metric.initial_number_value) if metric.initial_number_value is not None else None,
+        target_number_value=float(metric.target_number_value) if metric.target_number_value is not None else None,
+        current_number_value=float(current) if current is not None else None,
+        current_display_value=display_value(current, metric.unit, metric.precision),
+        progress_source=metric.progress_source,
+        is_custom_weight=metric.is_custom_weight,
+        progress=float(metric.progress or 0)
+    )
+
+
+def _goal_response(db: Session, goal: Goal) -> GoalResponseWrapper:
+    """The goal with its stored metric and progress"""
+    metric = db.query(GoalMetric).filter(GoalMetric.goal_id == goal.id).first()
+    return GoalResponseWrapper(data=GoalResponse(
+        gid=goal.gid,
+        resource_type=goal.resource_type,
+        name=goal.name,
+        html_notes=goal.html_notes,
+        notes=goal.notes,
+        due_on=goal.due_on,
+        start_on=goal.start_on,
+        is_workspace_level=goal.is_workspace_level,
+        liked=goal.liked,
+        status=goal.status,
+        num_likes=goal.num_likes,
+        metric=_metric_response(metric)
+    ))
+
+
+def _supporting_resource(db: Session, gid: str):
+    """(type, id) of the goal, project or task with this gid"""
+    for kind, model in SUPPORTING_MODELS.items():
+        resource_id = db.query(model.id).filter(model.gid == gid).scalar()
+        if resource_id is not None:
+            return kind, resource_id
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="supporting_resource: Not a goal, project or task"
+    )
+
 
 @router.get("/goals", response_model=GoalListResponse)
 def get_goals(
@@ -96,29 +168,8 @@ def get_goal(
     """
     Get a Goal (GET request): Returns the complete goal record for a single goal.
     """
-    goal = db.query(Goal).filter(Goal.gid == goal_gid).first()
-    if not goal:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Goal not found"
-        )
-    
-    # Build response
-    goal_data = {
-        "gid": goal.gid,
-        "resource_type": goal.resource_type,
-        "name": goal.name,
-        "html_notes": goal.html_notes,
-        "notes": goal.notes,
-        "due_on": goal.due_on,
-        "start_on": goal.start_on,
-        "is_workspace_level": goal.is_workspace_level,
-        "liked": goal.liked,
-        "status": goal.status,
-        "num_likes": goal.num_likes
-    }
-    
-    return GoalResponseWrapper(data=GoalResponse(**goal_data))
+    goal = _get_goal(db, goal_gid)
+    return _goal_response(db, goal)
 
 
 @router.post("/goals", response_model=GoalResponseWrapper, status_code=status.HTTP_201_CREATED)
@@ -253,7 +304,12 @@ def delete_goal(
         )
     
     try:
+        # The goals it supported lose an input
+        supported = supported_goals(db, "goal", [goal.id])
+        db.query(GoalMetric).filter(GoalMetric.goal_id == goal.id).delete(synchronize_session=False)
         db.delete(goal)
+        db.flush()
+        recompute_goal_progress(db, supported)
         db.commit()
     except IntegrityError as e:
         db.rollback()
@@ -270,3 +326,166 @@ def delete_goal(
     
     return EmptyResponse()
 
+
+
+@router.post("/goals/{goal_gid}/setMetric", response_model=GoalResponseWrapper)
+def set_goal_metric(
+    goal_gid: str = Path(..., description="Globally unique identifier for the goal"),
+    metric_data: GoalMetricRequest = Body(..., alias="data"),
+    opt_pretty: Optional[bool] = Query(False, description="Pretty output format"),
+    opt_fields: Optional[str] = Query(None, description="Comma-separated list of fields to include"),
+    db: Session = Depends(get_db)
+):
+    """
+    Create a goal metric (POST request): Creates or replaces the goal's metric and recomputes its progress.
+    """
+    goal = _get_goal(db, goal_gid)
+    if metric_data.progress_source is not None and metric_data.progress_source not in PROGRESS_SOURCES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"progress_source: must be one of {', '.join(PROGRESS_SOURCES)}"
+        )
+    if metric_data.unit is not None and metric_data.unit not in METRIC_UNITS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"unit: must be one of {', '.join(METRIC_UNITS)}"
+        )
+
+    metric = db.query(GoalMetric).filter(GoalMetric.goal_id == goal.id).first()
+    if metric is None:
+        metric = GoalMetric(gid=generate_gid(), resource_type="goal_metric", goal_id=goal.id, progress=0)
+        db.add(metric)
+    for name, value in metric_data.dict(exclude_unset=True).items():
+        setattr(metric, name, value)
+    if metric.progress_source is None:
+        metric.progress_source = "manual"
+    if metric.current_number_value is None and metric.progress_source == "manual":
+        metric.current_number_value = metric.initial_number_value
+    db.flush()
+    goal.metric_id = metric.id
+    recompute_goal_progress(db, [goal.id])
+    db.commit()
+    db.refresh(goal)
+
+    return _goal_response(db, goal)
+
+
+@router.post("/goals/{goal_gid}/setMetricCurrentValue", response_model=GoalResponseWrapper)
+def set_goal_metric_current_value(
+    goal_gid: str = Path(..., description="Globally unique identifier for the goal"),
+    value_data: GoalMetricCurrentValueRequest = Body(..., alias="data"),
+    opt_pretty: Optional[bool] = Query(False, description="Pretty output format"),
+    opt_fields: Optional[str] = Query(None, description="Comma-separated list of fields to include"),
+    db: Session = Depends(get_db)
+):
+    """
+    Update a goal metric (POST request): Sets a manual metric's current value; the goals it supports are recomputed.
+    """
+    goal = _get_goal(db, goal_gid)
+    metric = db.query(GoalMetric).filter(GoalMetric.goal_id == goal.id).first()
+    if metric is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Goal has no metric; use setMetric first"
+        )
+    if PROGRESS_SOURCES.get(metric.progress_source):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"current_number_value: computed from {metric.progress_source}, cannot be set"
+        )
+    metric.current_number_value = value_data.current_number_value
+    db.flush()
+    recompute_goal_progress(db, [goal.id])
+    db.commit()
+
+    return _goal_response(db, goal)
+
+
+@router.post("/goals/{goal_gid}/addSupportingRelationship", response_model=GoalRelationshipResponseWrapper)
+def add_supporting_relationship(
+    goal_gid: str = Path(..., description="Globally unique identifier for the goal"),
+    relationship_data: GoalAddSupportingRelationshipRequest = Body(..., alias="data"),
+    opt_pretty: Optional[bool] = Query(False, description="Pretty output format"),
+    opt_fields: Optional[str] = Query(None, description="Comma-separated list of fields to include"),
+    db: Session = Depends(get_db)
+):
+    """
+    Add a supporting goal relationship (POST request): A goal, project or task starts counting towards the goal.
+    """
+    goal = _get_goal(db, goal_gid)
+    kind, resource_id = _supporting_resource(db, relationship_data.supporting_resource)
+    if kind == "goal" and creates_cycle(db, resource_id, goal.id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="supporting_resource: The goal already supports this goal, directly or through other goals"
+        )
+    existing = db.query(GoalRelationship.id).filter(
+        GoalRelationship.supported_goal_id == goal.id,
+        GoalRelationship.supporting_resource_type == kind,
+        GoalRelationship.supporting_resource_id == resource_id
+    ).first()
+    if existing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="supporting_resource: Already supports this goal"
+        )
+    if relationship_data.contribution_weight is not None and relationship_data.contribution_weight < 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="contribution_weight: must not be negative"
+        )
+
+    relationship = GoalRelationship(
+        gid=generate_gid(),
+        resource_type="goal_relationship",
+        resource_subtype="subgoal" if kind == "goal" else "supporting_work",
+        supporting_goal_id=resource_id if kind == "goal" else None,
+        supporting_resource_type=kind,
+        supporting_resource_id=resource_id,
+        supported_goal_id=goal.id,
+        contribution_weight=relationship_data.contribution_weight
+    )
+    db.add(relationship)
+    db.flush()
+    recompute_goal_progress(db, [goal.id])
+    db.commit()
+    db.refresh(relationship)
+
+    supporting = supporting_resources(db, [(kind, resource_id)]).get((kind, resource_id))
+    return GoalRelationshipResponseWrapper(data=GoalRelationshipResponse(
+        gid=relationship.gid,
+        resource_type=relationship.resource_type,
+        resource_subtype=relationship.resource_subtype,
+        contribution_weight=float(relationship.contribution_weight)
+        if relationship.contribution_weight is not None else None,
+        supporting_resource=supporting,
+        supported_goal={"gid": goal.gid, "resource_type": "goal", "name": goal.name}
+    ))
+
+
+@router.post("/goals/{goal_gid}/removeSupportingRelationship", response_model=EmptyResponse)
+def remove_supporting_relationship(
+    goal_gid: str = Path(..., description="Globally unique identifier for the goal"),
+    relationship_data: GoalRemoveSupportingRelationshipRequest = Body(..., alias="data"),
+    opt_pretty: Optional[bool] = Query(False, description="Pretty output format"),
+    db: Session = Depends(get_db)
+):
+    """
+    Remove a supporting goal relationship (POST request): The resource stops counting towards the goal.
+    """
+    goal = _get_goal(db, goal_gid)
+    kind, resource_id = _supporting_resource(db, relationship_data.supporting_resource)
+    removed = db.query(GoalRelationship).filter(
+        GoalRelationship.supported_goal_id == goal.id,
+        GoalRelationship.supporting_resource_type == kind,
+        GoalRelationship.supporting_resource_id == resource_id
+    ).delete(synchronize_session=False)
+    if not removed:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="supporting_resource: Does not support this goal"
+        )
+    recompute_goal_progress(db, [goal.id])
+    db.commit()
+
+    return EmptyResponse()
@@ -3,7 +3,8 @@ from sqlalchemy.orm import Session
 from typing import Optional
 from database import get_db
 from models.job import Job
-from schemas.job import JobResponse, JobResponseWrapper
+from services.jobs import job_response
+from schemas.job import JobResponseWrapper
 
 router = APIRouter()
 
@@ -25,17 +26,4 @@ def get_job(
             detail="Job not found"
         )
     
-    job_data = {
-        "gid": job.gid,
-        "resource_type": job.resource_type,
-        "resource_subtype": job.resource_subtype,
-        "status": job.status,
-        "new_project": None,
-        "new_task": None,
-        "new_project_template": None,
-        "new_graph_export": None,
-        "new_resource_export": None
-    }
-    
-    return JobResponseWrapper(data=JobResponse(**job_data))
-
+    return JobResponseWrapper(data=job_response(job))
@@ -1,21 +1,51 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Body, Request
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from typing import Optional
 from database import get_db
-from utils import generate_gid
+from utils import generate_gid, decode_cursor, encode_cursor, next_page_link
 from models.portfolio import Portfolio
+from models.portfolio_item import PortfolioItem
+from models.project import Project
 from models.user import User
 from models.workspace import Workspace
 from schemas.portfolio import (
     PortfolioResponse, PortfolioResponseWrapper, PortfolioListResponse,
     PortfolioCompact, PortfolioRequest, PortfolioUpdateRequest,
-    PortfolioAddItemRequest, PortfolioRemoveItemRequest, EmptyResponse
+    PortfolioAddItemRequest, PortfolioRemoveItemRequest, EmptyResponse,
+    PortfolioAggregates, PortfolioItemResponse, PortfolioItemListResponse
+)
+from services.portfolio_rollups import (
+    add_nesting, ensure_closure, get_rollups, invalidate_portfolios, is_nested_in, project_aggregates,
+    remove_nesting, remove_portfolio
 )
 
 router = APIRouter()
 
 
+def _get_portfolio(db: Session, portfolio_gid: str) -> Portfolio:
+    portfolio = db.query(Portfolio).filter(Portfolio.gid == portfolio_gid).first()
+    if not portfolio:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Portfolio not found"
+        )
+    return portfolio
+
+
+def _get_item(db: Session, item_gid: str):
+    """The project or portfolio with this gid"""
+    item = db.query(Project).filter(Project.gid == item_gid).first() \
+        or db.query(Portfolio).filter(Portfolio.gid == item_gid).first()
+    if not item:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="item: Not a project or portfolio"
+        )
+    return item
+
+
 @router.get("/portfolios", response_model=PortfolioListResponse)
 def get_portfolios(
     workspace: Optional[str] = Query(None, description="The workspace to filter results on"),
@@ -80,13 +110,15 @@ def get_portfolio(
             detail="Portfolio not found"
         )
     
+    rollup = get_rollups(db, [portfolio.id]).get(portfolio.id)
     portfolio_data = {
         "gid": portfolio.gid,
         "resource_type": portfolio.resource_type,
         "name": portfolio.name,
         "color": portfolio.color,
         "public": portfolio.public,
-        "created_at": portfolio.created_at
+        "created_at": portfolio.created_at,
+        "aggregates": PortfolioAggregates(**rollup) if rollup else None
     }
     
     return PortfolioResponseWrapper(data=PortfolioResponse(**portfolio_data))
@@ -121,6 +153,8 @@ def create_portfolio(
         portfolio.public = portfolio_data.public
     
     db.add(portfolio)
+    db.flush()
+    ensure_closure(db, [portfolio.id])
     db.commit()
     db.refresh(portfolio)
     
@@ -191,6 +225,7 @@ def delete_portfolio(
         )
     
     try:
+        remove_portfolio(db, portfolio.id)
         db.delete(portfolio)
         db.commit()
     except IntegrityError as e:
@@ -208,3 +243,138 @@ def delete_portfolio(
     
     return EmptyResponse()
 
+
+@router.get("/portfolios/{portfolio_gid}/items", response_model=PortfolioItemListResponse)
+def get_items_for_portfolio(
+    request: Request,
+    portfolio_gid: str = Path(..., description="Globally unique identifier for the portfolio"),
+    opt_pretty: Optional[bool] = Query(False, description="Pretty output format"),
+    opt_fields: Optional[str] = Query(None, description="Comma-separated list of fields to include"),
+    limit: Optional[int] = Query(50, ge=1, le=100, description="Results per page"),
+    offset: Optional[str] = Query(None, description="Offset token"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get portfolio items (GET request): Returns the projects and portfolios in the portfolio, in
+    the order they were added, each with its aggregates. Nested portfolios are served from
+    their cached rollups; projects' aggregates are grouped in one query over the page.
+    """
+    portfolio = _get_portfolio(db, portfolio_gid)
+
+    query = db.query(PortfolioItem).filter(PortfolioItem.portfolio_id == portfolio.id)
+    if offset:
+        position = decode_cursor(offset)
+        if position is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="offset: Your pagination token is invalid."
+            )
+        created_at, item_id = position
+        query = query.filter(
+            PortfolioItem.created_at >= created_at,
+            tuple_(PortfolioItem.created_at, PortfolioItem.id) > tuple_(created_at, item_id)
+        )
+    items = query.order_by(PortfolioItem.created_at, PortfolioItem.id).limit(limit + 1).all()
+
+    next_page = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_page = next_page_link(request, encode_cursor(items[-1].created_at, items[-1].id))
+
+    project_ids = [item.project_id for item in items if item.project_id is not None]
+    portfolio_ids = [item.item_portfolio_id for item in items if item.item_portfolio_id is not None]
+    projects = {project.id: project for project in db.query(Project).filter(Project.id.in_(project_ids)).all()} \
+        if project_ids else {}
+    portfolios = {row.id: row for row in db.query(Portfolio).filter(Portfolio.id.in_(portfolio_ids)).all()} \
+        if portfolio_ids else {}
+    project_rollups = project_aggregates(db, project_ids)
+    portfolio_rollups = get_rollups(db, portfolio_ids)
+
+    data = []
+    for item in items:
+        if item.project_id is not None:
+            resource, rollup = projects.get(item.project_id), project_rollups.get(item.project_id)
+        else:
+            resource, rollup = portfolios.get(item.item_portfolio_id), portfolio_rollups.get(item.item_portfolio_id)
+        if resource is None or rollup is None:
+            continue
+        data.append(PortfolioItemResponse(
+            gid=resource.gid,
+            resource_type=resource.resource_type or ("project" if item.project_id is not None else "portfolio"),
+            name=resource.name,
+            aggregates=PortfolioAggregates(**rollup)
+        ))
+
+    return PortfolioItemListResponse(data=data, next_page=next_page)
+
+
+@router.post("/portfolios/{portfolio_gid}/addItem", response_model=EmptyResponse)
+def add_item_for_portfolio(
+    portfolio_gid: str = Path(..., description="Globally unique identifier for the portfolio"),
+    item_data: PortfolioAddItemRequest = Body(..., alias="data"),
+    opt_pretty: Optional[bool] = Query(False, description="Pretty output format"),
+    db: Session = Depends(get_db)
+):
+    """
+    Add a portfolio item (POST request): Adds a project or a portfolio to the portfolio.
+    Items are listed in the order they were added; insert_before and insert_after are not supported.
+    """
+    portfolio = _get_portfolio(db, portfolio_gid)
+    item = _get_item(db, item_data.item)
+
+    if isinstance(item, Project):
+        exists = db.query(PortfolioItem).filter(
+            PortfolioItem.portfolio_id == portfolio.id, PortfolioItem.project_id == item.id
+        ).first()
+        if not exists:
+            db.add(PortfolioItem(portfolio_id=portfolio.id, project_id=item.id))
+    else:
+        # Lock both portfolios in id order so concurrent nesting changes cannot form a cycle together
+        db.query(Portfolio).filter(Portfolio.id.in_([portfolio.id, item.id])).order_by(Portfolio.id) \
+            .with_for_update().all()
+        ensure_closure(db, [portfolio.id, item.id])
+        if is_nested_in(db, portfolio.id, item.id):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="item: A portfolio cannot contain itself or a portfolio it is nested in"
+            )
+        exists = db.query(PortfolioItem).filter(
+            PortfolioItem.portfolio_id == portfolio.id, PortfolioItem.item_portfolio_id == item.id
+        ).first()
+        if not exists:
+            db.add(PortfolioItem(portfolio_id=portfolio.id, item_portfolio_id=item.id))
+            add_nesting(db, portfolio.id, item.id)
+    invalidate_portfolios(db, [portfolio.id])
+    db.commit()
+
+    return EmptyResponse()
+
+
+@router.post("/portfolios/{portfolio_gid}/removeItem", response_model=EmptyResponse)
+def remove_item_for_portfolio(
+    portfolio_gid: str = Path(..., description="Globally unique identifier for the portfolio"),
+    item_data: PortfolioRemoveItemRequest = Body(..., alias="data"),
+    opt_pretty: Optional[bool] = Query(False, description="Pretty output format"),
+    db: Session = Depends(get_db)
+):
+    """
+    Remove a portfolio item (POST request): Removes a project or a portfolio from the portfolio.
+    """
+    portfolio = _get_portfolio(db, portfolio_gid)
+    item = _get_item(db, item_data.item)
+
+    if isinstance(item, Project):
+        removed = db.query(PortfolioItem).filter(
+            PortfolioItem.portfolio_id == portfolio.id, PortfolioItem.project_id == item.id
+        ).delete(synchronize_session=False)
+    else:
+        removed = db.query(PortfolioItem).filter(
+            PortfolioItem.portfolio_id == portfolio.id, PortfolioItem.item_portfolio_id == item.id
+        ).delete(synchronize_session=False)
+        if removed:
+            remove_nesting(db, portfolio.id, item.id)
+    if removed:
+        invalidate_portfolios(db, [portfolio.id])
+    db.commit()
+
+    return EmptyResponse()
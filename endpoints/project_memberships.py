@@ -4,6 +4,7 @@ from sqlalchemy.exc import IntegrityError
 from typing import Optional
 from database import get_db
 from utils import generate_gid
+from partitioning import workspace_filter
 from models.project_membership import ProjectMembership
 from models.project import Project
 from models.user import User
@@ -38,7 +39,12 @@ def get_project_memberships(
             detail="Invalid project GID format"
         )
     
-    query = db.query(ProjectMembership).filter(ProjectMembership.project_id == project_id)
+    # workspace_id lets a partitioned project_memberships table prune to one partition
+    workspace_id = db.query(Project.workspace_id).filter(Project.id == project_id).scalar()
+    query = db.query(ProjectMembership).filter(
+        ProjectMembership.project_id == project_id,
+        workspace_filter(ProjectMembership.workspace_id, workspace_id)
+    )
     
     if user:
         if user.lower() == "me":
@@ -187,7 +193,8 @@ def create_project_membership(
     membership = ProjectMembership(
         gid=generate_gid(),
         resource_type="project_membership",
-        project_id=project_id
+        project_id=project_id,
+        workspace_id=project.workspace_id
     )
     
     if membership_data.user:
@@ -7,6 +7,7 @@ from utils import generate_gid
 from models.project_status import ProjectStatus
 from models.project import Project
 from models.user import User
+from services.portfolio_rollups import invalidate_projects
 from schemas.project_status import (
     ProjectStatusResponse, ProjectStatusResponseWrapper, ProjectStatusListResponse,
     ProjectStatusCompact, ProjectStatusRequest, EmptyResponse
@@ -139,6 +140,10 @@ def create_project_status(
     )
     
     db.add(project_status)
+    db.flush()
+    # The newest status is the project's current one, counted in its portfolios' rollups
+    project.current_status_update_id = project_status.id
+    invalidate_projects(db, [project.id])
     db.commit()
     db.refresh(project_status)
     
@@ -172,6 +177,14 @@ def delete_project_status(
         )
     
     try:
+        project = db.query(Project).filter(Project.current_status_update_id == project_status.id).first()
+        if project:
+            # Fall back to the newest remaining status
+            project.current_status_update_id = db.query(ProjectStatus.id).filter(
+                ProjectStatus.project_id == project.id, ProjectStatus.id != project_status.id
+            ).order_by(ProjectStatus.id.desc()).limit(1).scalar()
+            invalidate_projects(db, [project.id])
+            db.flush()
         db.delete(project_status)
         db.commit()
     except IntegrityError as e:
@@ -1,16 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Body, BackgroundTasks
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from typing import Optional
+from datetime import date
 from database import get_db
 from utils import generate_gid
 from models.project import Project
 from models.user import User
 from models.workspace import Workspace
 from models.team import Team
+from services.task_counts import get_task_counts
+from services.goal_progress import remove_supporting_resources
+from services.portfolio_rollups import invalidate_projects, remove_projects
+from services.jobs import create_job, run_job, job_response
+from services.duplication import duplicate_project, parse_include, PROJECT_INCLUDE_OPTIONS
+from schemas.job import JobResponseWrapper
+from schemas.task import TaskCountResponse, TaskCountResponseWrapper
 from schemas.project import (
     ProjectResponse, ProjectResponseWrapper, ProjectListResponse,
-    ProjectCompact, ProjectRequest, ProjectUpdateRequest, EmptyResponse
+    ProjectCompact, ProjectRequest, ProjectUpdateRequest, ProjectDuplicateRequest, EmptyResponse
 )
 
 router = APIRouter()
@@ -102,6 +110,27 @@ def get_project(
     return ProjectResponseWrapper(data=ProjectResponse(**project_data))
 
 
+@router.get("/projects/{project_gid}/task_counts", response_model=TaskCountResponseWrapper)
+def get_task_counts_for_project(
+    project_gid: str = Path(..., description="Globally unique identifier for the project"),
+    opt_pretty: Optional[bool] = Query(False, description="Pretty output format"),
+    opt_fields: Optional[str] = Query(None, description="Comma-separated list of fields to include"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get task count of a project (GET request): Returns the number of tasks, completed tasks
+    and milestones in the project, read from the incrementally maintained counters.
+    """
+    project = db.query(Project).filter(Project.gid == project_gid).first()
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found"
+        )
+    
+    return TaskCountResponseWrapper(data=TaskCountResponse(**get_task_counts(db, project.id)))
+
+
 @router.post("/projects", response_model=ProjectResponseWrapper, status_code=status.HTTP_201_CREATED)
 def create_project(
     project_data: ProjectRequest = Body(..., alias="data"),
@@ -191,6 +220,7 @@ def update_project(
     if project_data.start_on is not None:
         project.start_on = project_data.start_on
     
+    invalidate_projects(db, [project.id])
     db.commit()
     db.refresh(project)
     
@@ -224,6 +254,8 @@ def delete_project(
         )
     
     try:
+        remove_supporting_resources(db, "project", [project.id])
+        remove_projects(db, [project.id])
         db.delete(project)
         db.commit()
     except IntegrityError as e:
@@ -241,3 +273,67 @@ def delete_project(
     
     return EmptyResponse()
 
+
+
+@router.post("/projects/{project_gid}/duplicate", response_model=JobResponseWrapper, status_code=status.HTTP_201_CREATED)
+def duplicate_project_endpoint(
+    background_tasks: BackgroundTasks,
+    project_gid: str = Path(..., description="Globally unique identifier for the project"),
+    duplicate_data: ProjectDuplicateRequest = Body(..., alias="data"),
+    opt_pretty: Optional[bool] = Query(False, description="Pretty output format"),
+    opt_fields: Optional[str] = Query(None, description="Comma-separated list of fields to include"),
+    db: Session = Depends(get_db)
+):
+    """
+    Duplicate a project (POST request): Creates and returns a job that will asynchronously handle the duplication.
+    """
+    project = db.query(Project).filter(Project.gid == project_gid).first()
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found"
+        )
+    
+    try:
+        include = parse_include(duplicate_data.include, PROJECT_INCLUDE_OPTIONS)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    team_id = None
+    if duplicate_data.team:
+        team_obj = db.query(Team).filter(Team.gid == duplicate_data.team).first()
+        if not team_obj:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Team not found"
+            )
+        team_id = team_obj.id
+    
+    # schedule_dates shifts every copied task date by the distance between the
+    # project's current due date (or start date) and the requested one
+    day_offset = 0
+    schedule_dates = duplicate_data.schedule_dates or {}
+    try:
+        if schedule_dates.get("due_on") and project.due_date:
+            day_offset = (date.fromisoformat(schedule_dates["due_on"]) - project.due_date).days
+        elif schedule_dates.get("start_on") and project.start_on:
+            day_offset = (date.fromisoformat(schedule_dates["start_on"]) - project.start_on).days
+    except (TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid schedule_dates"
+        )
+    
+    job = create_job(db, "duplicate_project")
+    db.commit()
+    db.refresh(job)
+    
+    background_tasks.add_task(
+        run_job, job.id, duplicate_project, project.id, duplicate_data.name, include,
+        team_id=team_id, day_offset=day_offset
+    )
+    
+    return JobResponseWrapper(data=job_response(job))
@@ -10,6 +10,7 @@ from schemas.rate import (
     RateResponse, RateListResponse, RateResponseWrapper, RateRequest
 )
 from schemas.project_membership import EmptyResponse
+from services.budgets import recompute_budgets
 from utils import generate_gid
 
 router = APIRouter()
@@ -60,10 +61,13 @@ def create_rate(
         currency_code=rate_data.currency_code,
         parent_id=project.id,
         resource_id=resource_id,
-        resource_type_field="user" if resource_id else None
+        resource_type_field="user" if resource_id else None,
+        effective_from=rate_data.effective_from
     )
 
     db.add(rate)
+    db.flush()
+    recompute_budgets(db, [project.id])
     db.commit()
     db.refresh(rate)
 
@@ -102,7 +106,11 @@ def update_rate(
         rate.rate = rate_data.rate
     if rate_data.currency_code is not None:
         rate.currency_code = rate_data.currency_code
+    if rate_data.effective_from is not None:
+        rate.effective_from = rate_data.effective_from
 
+    db.flush()
+    recompute_budgets(db, [rate.parent_id])
     db.commit()
     db.refresh(rate)
 
@@ -121,7 +129,10 @@ def delete_rate(
         raise HTTPException(status_code=404, detail="Rate not found")
 
     try:
+        project_id = rate.parent_id
         db.delete(rate)
+        db.flush()
+        recompute_budgets(db, [project_id])
         db.commit()
     except IntegrityError as e:
         db.rollback()
@@ -1,27 +1,152 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Path
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Body, Request
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
 from typing import Optional
 from database import get_db
 from models.reaction import Reaction
-from schemas.reaction import ReactionResponse, ReactionListResponse
+from models.status_update import StatusUpdate
+from models.story import Story
+from models.user import User
+from schemas.reaction import (
+    ReactionResponse, ReactionListResponse, ReactionRequest, ReactionSummaryItem, ReactionSummaryResponse
+)
+from services.reactions import DEFAULT_USER_ID, add_reaction, remove_reaction, reaction_summaries
+from utils import decode_cursor, encode_cursor, next_page_link
 
 router = APIRouter()
 
+TARGETS = {
+    "story": (Story, "Story not found"),
+    "status_update": (StatusUpdate, "Status update not found"),
+}
+
+
+def _target_id(db: Session, target_type: str, gid: str) -> int:
+    model, not_found = TARGETS[target_type]
+    target_id = db.query(model.id).filter(model.gid == gid).scalar()
+    if target_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=not_found
+        )
+    return target_id
+
+
+def _summary_response(db: Session, target_type: str, target_id: int) -> ReactionSummaryResponse:
+    summary = reaction_summaries(db, target_type, [target_id], DEFAULT_USER_ID)[target_id]
+    return ReactionSummaryResponse(data=[ReactionSummaryItem(**item) for item in summary])
+
+
+def _react(db: Session, target_type: str, gid: str, reaction: ReactionRequest, add: bool) -> ReactionSummaryResponse:
+    for name in ("emoji_base", "emoji_skin_tone"):
+        value = getattr(reaction, name)
+        length = Reaction.__table__.c[name].type.length
+        if value is not None and not 0 < len(value) <= length:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{name}: must be 1 to {length} characters"
+            )
+    target_id = _target_id(db, target_type, gid)
+    if add:
+        add_reaction(db, target_type, target_id, DEFAULT_USER_ID, reaction.emoji_base, reaction.emoji_skin_tone)
+    else:
+        remove_reaction(db, target_type, target_id, DEFAULT_USER_ID, reaction.emoji_base)
+    db.commit()
+    return _summary_response(db, target_type, target_id)
+
 
 @router.get("/status_updates/{status_update_gid}/reactions", response_model=ReactionListResponse)
 def get_reactions_for_status_update(
+    request: Request,
     status_update_gid: str = Path(..., description="Globally unique identifier for the status update."),
+    emoji_base: Optional[str] = Query(None, description="Only return reactions with this emoji"),
     limit: Optional[int] = Query(50, ge=1, le=100, description="Results per page"),
     offset: Optional[str] = Query(None, description="Offset token"),
     opt_pretty: Optional[bool] = Query(False, description="Pretty output format"),
     opt_fields: Optional[str] = Query(None, description="Comma-separated list of fields to include"),
     db: Session = Depends(get_db)
 ):
-    """Get reactions for a status update"""
-    # In a real implementation, you'd filter by status_update_gid
-    reactions = db.query(Reaction).filter(Reaction.target_type == "status_update").limit(limit).all()
+    """Get reactions for a status update, oldest first"""
+    target_id = _target_id(db, "status_update", status_update_gid)
+
+    query = db.query(Reaction).filter(Reaction.target_type == "status_update", Reaction.target_id == target_id)
+    if emoji_base:
+        query = query.filter(Reaction.emoji_base == emoji_base)
+    if offset:
+        position = decode_cursor(offset)
+        if position is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="offset: Your pagination token is invalid."
+            )
+        created_at, reaction_id = position
+        query = query.filter(
+            Reaction.created_at >= created_at, tuple_(Reaction.created_at, Reaction.id) > tuple_(created_at, reaction_id)
+        )
+    reactions = query.order_by(Reaction.created_at, Reaction.id).limit(limit + 1).all()
+
+    next_page = None
+    if len(reactions) > limit:
+        reactions = reactions[:limit]
+        next_page = next_page_link(request, encode_cursor(reactions[-1].created_at, reactions[-1].id))
+
+    # Reacting users of the page in one query
+    user_ids = {reaction.user_id for reaction in reactions if reaction.user_id}
+    users = {user.id: user for user in db.query(User).filter(User.id.in_(user_ids)).all()} if user_ids else {}
+
+    data = []
+    for reaction in reactions:
+        user = users.get(reaction.user_id)
+        data.append(ReactionResponse(
+            gid=reaction.gid,
+            resource_type=reaction.resource_type or "reaction",
+            emoji_base=reaction.emoji_base,
+            emoji_skin_tone=reaction.emoji_skin_tone,
+            user={"gid": user.gid, "resource_type": "user", "name": user.name or ""} if user else None
+        ))
+
+    return ReactionListResponse(data=data, next_page=next_page)
+
+
+@router.post("/stories/{story_gid}/addReaction", response_model=ReactionSummaryResponse)
+def add_reaction_to_story(
+    story_gid: str = Path(..., description="Globally unique identifier for the story"),
+    reaction: ReactionRequest = Body(..., alias="data"),
+    opt_pretty: Optional[bool] = Query(False, description="Pretty output format"),
+    db: Session = Depends(get_db)
+):
+    """Add a reaction to a story: returns the story's updated reaction summary (adding it twice is a no-op)"""
+    return _react(db, "story", story_gid, reaction, add=True)
+
+
+@router.post("/stories/{story_gid}/removeReaction", response_model=ReactionSummaryResponse)
+def remove_reaction_from_story(
+    story_gid: str = Path(..., description="Globally unique identifier for the story"),
+    reaction: ReactionRequest = Body(..., alias="data"),
+    opt_pretty: Optional[bool] = Query(False, description="Pretty output format"),
+    db: Session = Depends(get_db)
+):
+    """Remove a reaction from a story: returns the story's updated reaction summary"""
+    return _react(db, "story", story_gid, reaction, add=False)
 
-    return ReactionListResponse(
-        data=[ReactionResponse.from_orm(r) for r in reactions]
-    )
 
+@router.post("/status_updates/{status_update_gid}/addReaction", response_model=ReactionSummaryResponse)
+def add_reaction_to_status_update(
+    status_update_gid: str = Path(..., description="Globally unique identifier for the status update"),
+    reaction: ReactionRequest = Body(..., alias="data"),
+    opt_pretty: Optional[bool] = Query(False, description="Pretty output format"),
+    db: Session = Depends(get_db)
+):
+    """Add a reaction to a status update: returns its updated reaction summary (adding it twice is a no-op)"""
+    return _react(db, "status_update", status_update_gid, reaction, add=True)
+
+
+@router.post("/status_updates/{status_update_gid}/removeReaction", response_model=ReactionSummaryResponse)
+def remove_reaction_from_status_update(
+    status_update_gid: str = Path(..., description="Globally unique identifier for the status update"),
+    reaction: ReactionRequest = Body(..., alias="data"),
+    opt_pretty: Optional[bool] = Query(False, description="Pretty output format"),
+    db: Session = Depends(get_db)
+):
+    """Remove a reaction from a status update: returns its updated reaction summary"""
+    return _react(db, "status_update", status_update_gid, reaction, add=False)
@@ -10,6 +10,7 @@ from schemas.status_update import (
     StatusUpdateResponse, StatusUpdateResponseWrapper, StatusUpdateListResponse,
     StatusUpdateCompact, StatusUpdateRequest, EmptyResponse
 )
+from services.reactions import DEFAULT_USER_ID, reaction_summaries, delete_reactions
 
 router = APIRouter()
 
@@ -50,6 +51,7 @@ def get_status_update(
                 "email": author.email
             }
     
+    summaries = reaction_summaries(db, "status_update", [status_update.id], viewer_id=DEFAULT_USER_ID)
     status_data = {
         "gid": status_update.gid,
         "resource_type": status_update.resource_type,
@@ -60,7 +62,8 @@ def get_status_update(
         "status_type": status_update.status_type or "on_track",
         "author": author_obj,
         "created_at": status_update.created_at,
-        "created_by": author_obj
+        "created_by": author_obj,
+        "reaction_summary": summaries[status_update.id]
     }
     
     return StatusUpdateResponseWrapper(data=StatusUpdateResponse(**status_data))
@@ -130,6 +133,7 @@ def delete_status_update(
         )
     
     try:
+        delete_reactions(db, "status_update", [status_update.id])
         db.delete(status_update)
         db.commit()
     except IntegrityError as e:
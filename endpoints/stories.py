@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Body, Request
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from typing import Optional
 from database import get_db
-from utils import generate_gid
+from utils import generate_gid, decode_cursor, encode_cursor, next_page_link
+from partitioning import workspace_filter
 from models.story import Story
 from models.task import Task
 from models.user import User
@@ -11,12 +13,15 @@ from schemas.story import (
     StoryResponse, StoryResponseWrapper, StoryListResponse,
     StoryCompact, StoryRequest, EmptyResponse
 )
+from schemas.base import NextPage
+from services.reactions import DEFAULT_USER_ID, reaction_summaries, delete_reactions
 
 router = APIRouter()
 
 
 @router.get("/tasks/{task_gid}/stories", response_model=StoryListResponse)
 def get_stories(
+    request: Request,
     task_gid: str = Path(..., description="Globally unique identifier for the task"),
     opt_pretty: Optional[bool] = Query(False, description="Pretty output format"),
     opt_fields: Optional[str] = Query(None, description="Comma-separated list of fields to include"),
@@ -25,42 +30,67 @@ def get_stories(
     db: Session = Depends(get_db)
 ):
     """
-    Get Stories (GET request): Returns compact story records.
+    Get Stories (GET request): Returns the compact story records of a task, oldest first.
+    Pages are keyset cursors over (created_at, id), so every page of a long
+    activity stream is one range scan of ix_stories_task_created.
     """
-    try:
-        task_id = int(task_gid)
-    except ValueError:
+    task = db.query(Task.id, Task.workspace_id).filter(Task.gid == task_gid).first()
+    if not task:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid task GID format"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
         )
     
-    stories = db.query(Story).filter(Story.task_id == task_id).limit(limit).all()
+    # workspace_id lets a partitioned stories table prune to one partition
+    query = db.query(Story).filter(Story.task_id == task.id, workspace_filter(Story.workspace_id, task.workspace_id))
+    if offset:
+        position = decode_cursor(offset)
+        if position is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="offset: Your pagination token is invalid."
+            )
+        created_at, story_id = position
+        query = query.filter(
+            Story.created_at >= created_at, tuple_(Story.created_at, Story.id) > tuple_(created_at, story_id)
+        )
+    stories = query.order_by(Story.created_at, Story.id).limit(limit + 1).all()
+    
+    next_page = None
+    if len(stories) > limit:
+        stories = stories[:limit]
+        next_page = NextPage(**next_page_link(request, encode_cursor(stories[-1].created_at, stories[-1].id)))
+    
+    # Authors of the page in one query
+    author_ids = {story.created_by_id for story in stories if story.created_by_id}
+    authors = {user.id: user for user in db.query(User).filter(User.id.in_(author_ids)).all()} if author_ids else {}
+    # Reaction counts of the page in one query
+    summaries = reaction_summaries(db, "story", [story.id for story in stories], viewer_id=DEFAULT_USER_ID)
     
     story_compacts = []
     for story in stories:
         created_by_obj = None
-        if story.created_by_id:
-            user = db.query(User).filter(User.id == story.created_by_id).first()
-            if user:
-                created_by_obj = {
-                    "gid": user.gid,
-                    "resource_type": "user",
-                    "name": user.name or "",
-                    "email": user.email
-                }
+        user = authors.get(story.created_by_id)
+        if user:
+            created_by_obj = {
+                "gid": user.gid,
+                "resource_type": "user",
+                "name": user.name or "",
+                "email": user.email
+            }
         
         story_data = {
             "gid": story.gid,
             "resource_type": story.resource_type,
             "created_at": story.created_at,
-            "resource_subtype": story.type or "comment_added",
+            "resource_subtype": story.resource_subtype or "comment_added",
             "text": story.text,
-            "created_by": created_by_obj
+            "created_by": created_by_obj,
+            "reaction_summary": summaries[story.id]
         }
         story_compacts.append(StoryCompact(**story_data))
     
-    return StoryListResponse(data=story_compacts)
+    return StoryListResponse(data=story_compacts, next_page=next_page)
 
 
 @router.get("/stories/{story_gid}", response_model=StoryResponseWrapper)
@@ -73,15 +103,7 @@ def get_story(
     """
     Get a Story (GET request): Returns the complete story record.
     """
-    try:
-        story_id = int(story_gid)
-    except ValueError:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid story GID format"
-        )
-    
-    story = db.query(Story).filter(Story.id == story_id).first()
+    story = db.query(Story).filter(Story.gid == story_gid).first()
     if not story:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -92,10 +114,12 @@ def get_story(
         "gid": story.gid,
         "resource_type": story.resource_type,
         "created_at": story.created_at,
-        "resource_subtype": story.type or "comment_added",
+        "resource_subtype": story.resource_subtype or "comment_added",
+        "type": story.type,
         "text": story.text,
         "html_text": story.html_text,
-        "is_pinned": story.is_pinned
+        "is_pinned": story.is_pinned,
+        "reaction_summary": reaction_summaries(db, "story", [story.id], viewer_id=DEFAULT_USER_ID)[story.id]
     }
     
     return StoryResponseWrapper(data=StoryResponse(**story_data))
@@ -112,15 +136,7 @@ def create_story(
     """
     Create a Story (POST request): Creates a new story on a task.
     """
-    try:
-        task_id = int(task_gid)
-    except ValueError:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid task GID format"
-        )
-    
-    task = db.query(Task).filter(Task.id == task_id).first()
+    task = db.query(Task).filter(Task.gid == task_gid).first()
     if not task:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -130,10 +146,12 @@ def create_story(
     story = Story(
         gid=generate_gid(),
         resource_type="story",
-        task_id=task_id,
+        task_id=task.id,
+        workspace_id=task.workspace_id,
         text=story_data.text or "",
         html_text=story_data.html_text,
-        type="comment_added",
+        type="comment",
+        resource_subtype="comment_added",
         is_pinned=story_data.is_pinned or False,
         created_by_id=1  # Default user
     )
@@ -146,7 +164,8 @@ def create_story(
         gid=story.gid,
         resource_type=story.resource_type,
         created_at=story.created_at,
-        resource_subtype=story.type or "comment_added",
+        resource_subtype=story.resource_subtype,
+        type=story.type,
         text=story.text,
         html_text=story.html_text,
         is_pinned=story.is_pinned
@@ -172,6 +191,7 @@ def delete_story(
         )
     
     try:
+        delete_reactions(db, "story", [story.id])
         db.delete(story)
         db.commit()
     except IntegrityError as e:
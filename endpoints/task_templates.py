@@ -1,20 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Body, BackgroundTasks
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from typing import Optional
+from typing import Optional, Union
 from database import get_db
 from models.task_template import TaskTemplate
 from models.project import Project
 from models.user import User
-from models.task import Task
 from schemas.task_template import (
     TaskTemplateResponse, TaskTemplateListResponse, TaskTemplateResponseWrapper,
     TaskTemplateRequest, TaskTemplateInstantiateRequest
 )
 from schemas.project_membership import EmptyResponse
-from schemas.task import TaskResponse, TaskResponseWrapper
+from schemas.task import TaskResponse, TaskResponseWrapper, TaskListResponse, TaskCompact
+from schemas.job import JobResponseWrapper
+from services.jobs import create_job, run_job, job_response
+from services.task_templates import (
+    instantiate, instantiate_job, validate_template, TemplateError, JOB_THRESHOLD_ROWS, MAX_COUNT
+)
 from utils import generate_gid
-import json
 
 router = APIRouter()
 
@@ -86,43 +89,68 @@ def get_task_template(
     return TaskTemplateResponseWrapper(data=TaskTemplateResponse.from_orm(task_template))
 
 
-@router.post("/task_templates/{task_template_gid}/instantiate", response_model=TaskResponseWrapper)
+@router.post("/task_templates/{task_template_gid}/instantiate",
+             response_model=Union[TaskResponseWrapper, TaskListResponse, JobResponseWrapper])
 def instantiate_task_template(
+    background_tasks: BackgroundTasks,
     task_template_gid: str = Path(..., description="Globally unique identifier for the task template."),
     instantiate_data: TaskTemplateInstantiateRequest = Body(..., alias="data"),
     opt_pretty: Optional[bool] = Query(False, description="Pretty output format"),
     opt_fields: Optional[str] = Query(None, description="Comma-separated list of fields to include"),
     db: Session = Depends(get_db)
 ):
-    """Instantiate a task template"""
+    """
+    Instantiate a task template: Creates `count` copies of the template's task tree.
+    Small instantiations return the new task (every copy's top-level task when count > 1);
+    instantiations above the size threshold return a job that creates the tasks in the
+    background, whose new_task is the first copy.
+    """
     task_template = db.query(TaskTemplate).filter(TaskTemplate.gid == task_template_gid).first()
     if not task_template:
         raise HTTPException(status_code=404, detail="Task template not found")
 
+    count = 1 if instantiate_data.count is None else instantiate_data.count
+    if count < 1 or count > MAX_COUNT:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"count must be between 1 and {MAX_COUNT}"
+        )
+
     project_id = task_template.project_id
     if instantiate_data.project:
         project = db.query(Project).filter(Project.gid == instantiate_data.project).first()
-        if project:
-            project_id = project.id
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found")
+        project_id = project.id
 
-    user = db.query(User).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    try:
+        # References are checked up front so a background job cannot fail on them
+        total_rows = validate_template(db, task_template.template or {"name": task_template.name}, count)
+    except TemplateError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-    # Create task from template
-    task_name = instantiate_data.name if instantiate_data.name else task_template.name
-    task = Task(
-        gid=generate_gid(),
-        name=task_name,
-        project_id=project_id,
-        created_by_id=user.id
-    )
+    if total_rows > JOB_THRESHOLD_ROWS:
+        job = create_job(db, "instantiate_task_template")
+        db.commit()
+        db.refresh(job)
+        background_tasks.add_task(
+            run_job, job.id, instantiate_job, task_template.id, instantiate_data.name,
+            project_id, count, task_template.created_by_id
+        )
+        return JobResponseWrapper(data=job_response(job))
 
-    db.add(task)
+    try:
+        created = instantiate(
+            db, task_template.id, instantiate_data.name, project_id, count, task_template.created_by_id
+        )
+    except TemplateError as e:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     db.commit()
-    db.refresh(task)
 
-    return TaskResponseWrapper(data=TaskResponse.from_orm(task))
+    if count > 1:
+        return TaskListResponse(data=[TaskCompact(**task) for task in created])
+    return TaskResponseWrapper(data=TaskResponse(**created[0]))
 
 
 @router.delete("/task_templates/{task_template_gid}", response_model=EmptyResponse)
@@ -1,23 +1,99 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Body, BackgroundTasks, Request
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql import func
 from typing import Optional, List
 from database import get_db
-from utils import generate_gid
+from utils import generate_gid, next_page_link
 from models.task import Task
 from models.user import User
 from models.workspace import Workspace
+from models.project import Project
+from models.section import Section
+from models.task_membership import TaskMembership
+from models.task_dependency import TaskDependency
+from services.jobs import create_job, run_job, job_response
+from services.duplication import duplicate_task, parse_include, TASK_INCLUDE_OPTIONS
+from schemas.job import JobResponseWrapper
+from services.task_counts import (
+    task_count_vector, apply_task_count_delta, project_ids_for_task, record_task_state_change
+)
+from services.subtasks import fetch_subtasks, adjust_subtask_count, set_parent, encode_path, decode_path
+from services.time_rollups import delete_task_time, task_actual_time_minutes
+from services.system_stories import delete_task_stories
+from services.goal_progress import record_supporting_change, remove_supporting_resources
+from services.bulk_tasks import execute_bulk, MAX_BULK_ACTIONS
 from schemas.task import (
     TaskResponse, TaskResponseWrapper, TaskListResponse, TaskCompact,
     TaskRequest, TaskUpdateRequest, TaskAddFollowersRequest, TaskRemoveFollowersRequest,
     TaskAddProjectRequest, TaskRemoveProjectRequest, TaskAddTagRequest, TaskRemoveTagRequest,
     TaskSetParentRequest, ModifyDependenciesRequest, ModifyDependentsRequest,
-    TaskDuplicateRequest, TaskCountResponse, TaskCountResponseWrapper, EmptyResponse
+    TaskDuplicateRequest, TaskCountResponse, TaskCountResponseWrapper, EmptyResponse,
+    SubtaskCompact, SubtaskListResponse, TaskBulkRequest, TaskBulkResponse, TaskBulkResult
 )
+from schemas.base import NextPage
 
 router = APIRouter()
 
 
+def _build_task(task_data: TaskRequest, db: Session) -> Task:
+    """Build an unsaved Task from a create request"""
+    task = Task(
+        gid=generate_gid(),
+        resource_type="task",
+        name=task_data.name or "New Task"
+    )
+    
+    if task_data.workspace:
+        try:
+            workspace_id = int(task_data.workspace)
+            task.workspace_id = workspace_id
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid workspace GID format"
+            )
+    
+    if task_data.assignee:
+        assignee_obj = db.query(User).filter(User.gid == task_data.assignee).first()
+        if not assignee_obj:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Assignee not found"
+            )
+        task.assignee_id = assignee_obj.id
+    
+    if task_data.resource_subtype:
+        task.resource_subtype = task_data.resource_subtype
+    if task_data.completed is not None:
+        task.completed = task_data.completed
+        if task_data.completed:
+            task.completed_at = func.now()
+    if task_data.notes:
+        task.notes = task_data.notes
+    if task_data.due_on:
+        task.due_on = task_data.due_on
+    
+    return task
+
+
+def _add_task_to_projects(db: Session, task: Task, project_gids: List[str]):
+    """Add a newly flushed task to projects and count it in their task counters"""
+    projects = db.query(Project).filter(Project.gid.in_(project_gids)).all()
+    if len(projects) != len(set(project_gids)):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found"
+        )
+    
+    for project in projects:
+        db.add(TaskMembership(task_id=task.id, project_id=project.id))
+    apply_task_count_delta(
+        db, [project.id for project in projects],
+        task_count_vector(task.completed, task.resource_subtype)
+    )
+
+
 @router.get("/tasks", response_model=TaskListResponse)
 def get_tasks(
     workspace: Optional[str] = Query(None, description="The workspace to filter results on"),
@@ -63,13 +139,47 @@ def get_tasks(
             "gid": task.gid,
             "resource_type": task.resource_type,
             "name": task.name,
-            "resource_subtype": "default_task"
+            "resource_subtype": task.resource_subtype or "default_task"
         }
         task_compacts.append(TaskCompact(**task_data))
     
     return TaskListResponse(data=task_compacts)
 
 
+@router.post("/tasks/bulk", response_model=TaskBulkResponse)
+def bulk_tasks(
+    bulk_data: TaskBulkRequest = Body(..., alias="data"),
+    opt_pretty: Optional[bool] = Query(False, description="Pretty output format"),
+    db: Session = Depends(get_db)
+):
+    """
+    Bulk task actions (POST request): Create, update, move and delete many tasks in one request.
+    Each action gets its own result; failed actions do not prevent the others from applying.
+    """
+    if not bulk_data.actions:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At least one action is required"
+        )
+    if len(bulk_data.actions) > MAX_BULK_ACTIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many actions: at most {MAX_BULK_ACTIONS} are allowed per request"
+        )
+    
+    try:
+        results = execute_bulk(db, bulk_data.actions)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error running bulk task actions: {str(e)}"
+        )
+    
+    return TaskBulkResponse(data=[TaskBulkResult(**result) for result in results])
+
+
 @router.get("/tasks/{task_gid}", response_model=TaskResponseWrapper)
 def get_task(
     task_gid: str = Path(..., description="Globally unique identifier for the task"),
@@ -91,7 +201,7 @@ def get_task(
         "gid": task.gid,
         "resource_type": task.resource_type,
         "name": task.name,
-        "resource_subtype": "default_task",
+        "resource_subtype": task.resource_subtype or "default_task",
         "completed": task.completed,
         "completed_at": task.completed_at,
         "due_on": task.due_on,
@@ -100,6 +210,7 @@ def get_task(
         "notes": task.notes,
         "num_likes": task.num_likes,
         "num_subtasks": task.num_subtasks,
+        "actual_time_minutes": task_actual_time_minutes(db, task.id),
         "created_at": task.created_at,
         "modified_at": task.updated_at
     }
@@ -117,39 +228,22 @@ def create_task(
     """
     Create a Task (POST request): Creates a new task.
     """
-    task = Task(
-        gid=generate_gid(),
-        resource_type="task",
-        name=task_data.name or "New Task"
-    )
-    
-    if task_data.workspace:
-        try:
-            workspace_id = int(task_data.workspace)
-            task.workspace_id = workspace_id
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid workspace GID format"
-            )
-    
-    if task_data.assignee:
-        assignee_obj = db.query(User).filter(User.gid == task_data.assignee).first()
-        if not assignee_obj:
+    task = _build_task(task_data, db)
+
+    if task_data.parent:
+        parent = db.query(Task).filter(Task.gid == task_data.parent).first()
+        if not parent:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
-                detail="Assignee not found"
+                detail="Parent task not found"
             )
-        task.assignee_id = assignee_obj.id
-    
-    if task_data.completed is not None:
-        task.completed = task_data.completed
-    if task_data.notes:
-        task.notes = task_data.notes
-    if task_data.due_on:
-        task.due_on = task_data.due_on
+        task.parent_id = parent.id
+        adjust_subtask_count(db, parent.id, 1)
     
     db.add(task)
+    if task_data.projects:
+        db.flush()
+        _add_task_to_projects(db, task, task_data.projects)
     db.commit()
     db.refresh(task)
     
@@ -157,7 +251,7 @@ def create_task(
         gid=task.gid,
         resource_type=task.resource_type,
         name=task.name,
-        resource_subtype="default_task",
+        resource_subtype=task.resource_subtype or "default_task",
         completed=task.completed,
         notes=task.notes,
         due_on=task.due_on
@@ -177,24 +271,36 @@ def update_task(
     """
     Update a Task (PUT request): An existing task can be updated.
     """
-    task = db.query(Task).filter(Task.gid == task_gid).first()
+    # Locked so concurrent updates see each other's completion and subtype before applying counter deltas
+    task = db.query(Task).filter(Task.gid == task_gid).with_for_update().first()
     if not task:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Task not found"
         )
     
+    old_completed, old_subtype = task.completed, task.resource_subtype
+    
     if task_data.name is not None:
         task.name = task_data.name
+    if task_data.resource_subtype is not None:
+        task.resource_subtype = task_data.resource_subtype
     if task_data.notes is not None:
         task.notes = task_data.notes
-    if task_data.completed is not None:
+    if task_data.completed is not None and task_data.completed != bool(task.completed):
         task.completed = task_data.completed
+        task.completed_at = func.now() if task_data.completed else None
     if task_data.due_on is not None:
         task.due_on = task_data.due_on
     if task_data.start_on is not None:
         task.start_on = task_data.start_on
     
+    record_task_state_change(
+        db, task.id, old_completed, old_subtype, task.completed, task.resource_subtype
+    )
+    if bool(task.completed) != bool(old_completed):
+        db.flush()
+        record_supporting_change(db, "task", [task.id])
     db.commit()
     db.refresh(task)
     
@@ -202,7 +308,7 @@ def update_task(
         gid=task.gid,
         resource_type=task.resource_type,
         name=task.name,
-        resource_subtype="default_task",
+        resource_subtype=task.resource_subtype or "default_task",
         completed=task.completed,
         notes=task.notes,
         due_on=task.due_on
@@ -220,7 +326,8 @@ def delete_task(
     """
     Delete a Task (DELETE request): A specific, existing task can be deleted.
     """
-    task = db.query(Task).filter(Task.gid == task_gid).first()
+    # Locked so the counters lose the completion and subtype the task has when it is deleted
+    task = db.query(Task).filter(Task.gid == task_gid).with_for_update().first()
     if not task:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -228,6 +335,18 @@ def delete_task(
         )
     
     try:
+        adjust_subtask_count(db, task.parent_id, -1)
+        apply_task_count_delta(
+            db, project_ids_for_task(db, task.id),
+            task_count_vector(task.completed, task.resource_subtype), sign=-1
+        )
+        db.query(TaskMembership).filter(TaskMembership.task_id == task.id).delete(synchronize_session=False)
+        db.query(TaskDependency).filter(
+            (TaskDependency.task_id == task.id) | (TaskDependency.dependency_id == task.id)
+        ).delete(synchronize_session=False)
+        delete_task_time(db, [task.id])
+        delete_task_stories(db, [task.id])
+        remove_supporting_resources(db, "task", [task.id])
         db.delete(task)
         db.commit()
     except IntegrityError as e:
@@ -245,3 +364,380 @@ def delete_task(
     
     return EmptyResponse()
 
+
+
+@router.get("/tasks/{task_gid}/subtasks", response_model=SubtaskListResponse)
+def get_subtasks(
+    request: Request,
+    task_gid: str = Path(..., description="Globally unique identifier for the task"),
+    depth: Optional[int] = Query(1, ge=1, le=100, description="How many levels of subtasks to return (1 = direct subtasks only)"),
+    opt_pretty: Optional[bool] = Query(False, description="Pretty output format"),
+    opt_fields: Optional[str] = Query(None, description="Comma-separated list of fields to include"),
+    limit: Optional[int] = Query(None, ge=1, description="Maximum number of subtasks to return"),
+    offset: Optional[str] = Query(None, description="Offset token"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get Subtasks (GET request): Returns the subtasks of a task down to the requested depth,
+    in depth-first order. The whole subtree is loaded with a single recursive query; with a
+    limit, pages continue after the id path of the last subtask returned.
+    """
+    task = db.query(Task).filter(Task.gid == task_gid).first()
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+    
+    after = None
+    if offset:
+        after = decode_path(offset)
+        if after is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="offset: Your pagination token is invalid."
+            )
+    rows = fetch_subtasks(db, task.id, max_depth=depth, limit=limit + 1 if limit else None, after=after)
+    next_page = None
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        next_page = NextPage(**next_page_link(request, encode_path(rows[-1][3])))
+
+    subtask_compacts = []
+    for subtask, _, parent, _ in rows:
+        subtask_data = {
+            "gid": subtask.gid,
+            "resource_type": subtask.resource_type,
+            "name": subtask.name,
+            "resource_subtype": subtask.resource_subtype or "default_task",
+            "completed": subtask.completed,
+            "num_subtasks": subtask.num_subtasks,
+            "parent": TaskCompact(
+                gid=parent.gid,
+                resource_type=parent.resource_type,
+                name=parent.name,
+                resource_subtype=parent.resource_subtype or "default_task"
+            )
+        }
+        subtask_compacts.append(SubtaskCompact(**subtask_data))
+    
+    return SubtaskListResponse(data=subtask_compacts, next_page=next_page)
+
+
+@router.post("/tasks/{task_gid}/subtasks", response_model=TaskResponseWrapper, status_code=status.HTTP_201_CREATED)
+def create_subtask(
+    task_gid: str = Path(..., description="Globally unique identifier for the parent task"),
+    task_data: TaskRequest = Body(..., alias="data"),
+    opt_pretty: Optional[bool] = Query(False, description="Pretty output format"),
+    opt_fields: Optional[str] = Query(None, description="Comma-separated list of fields to include"),
+    db: Session = Depends(get_db)
+):
+    """
+    Create a Subtask (POST request): Creates a new subtask and adds it to the parent task.
+    """
+    parent = db.query(Task).filter(Task.gid == task_gid).first()
+    if not parent:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+    
+    task = _build_task(task_data, db)
+    task.parent_id = parent.id
+    if task.workspace_id is None:
+        task.workspace_id = parent.workspace_id
+    
+    adjust_subtask_count(db, parent.id, 1)
+    db.add(task)
+    if task_data.projects:
+        db.flush()
+        _add_task_to_projects(db, task, task_data.projects)
+    db.commit()
+    db.refresh(task)
+    
+    task_response = TaskResponse(
+        gid=task.gid,
+        resource_type=task.resource_type,
+        name=task.name,
+        resource_subtype=task.resource_subtype or "default_task",
+        completed=task.completed,
+        notes=task.notes,
+        due_on=task.due_on,
+        parent=TaskCompact(
+            gid=parent.gid,
+            resource_type=parent.resource_type,
+            name=parent.name,
+            resource_subtype=parent.resource_subtype or "default_task"
+        )
+    )
+    
+    return TaskResponseWrapper(data=task_response)
+
+
+@router.post("/tasks/{task_gid}/setParent", response_model=TaskResponseWrapper)
+def set_parent_for_task(
+    task_gid: str = Path(..., description="Globally unique identifier for the task"),
+    parent_data: TaskSetParentRequest = Body(..., alias="data"),
+    opt_pretty: Optional[bool] = Query(False, description="Pretty output format"),
+    opt_fields: Optional[str] = Query(None, description="Comma-separated list of fields to include"),
+    db: Session = Depends(get_db)
+):
+    """
+    Set the parent of a task (POST request): Makes the task a subtask of the given parent,
+    or a top-level task when parent is null. Rejects moves that would create a cycle.
+    """
+    task = db.query(Task).filter(Task.gid == task_gid).first()
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+    
+    parent = None
+    if parent_data.parent:
+        parent = db.query(Task).filter(Task.gid == parent_data.parent).first()
+        if not parent:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Parent task not found"
+            )
+    
+    try:
+        set_parent(db, task, parent)
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    db.commit()
+    db.refresh(task)
+    
+    parent_obj = None
+    if parent:
+        parent_obj = TaskCompact(
+            gid=parent.gid,
+            resource_type=parent.resource_type,
+            name=parent.name,
+            resource_subtype=parent.resource_subtype or "default_task"
+        )
+    
+    task_response = TaskResponse(
+        gid=task.gid,
+        resource_type=task.resource_type,
+        name=task.name,
+        resource_subtype=task.resource_subtype or "default_task",
+        completed=task.completed,
+        notes=task.notes,
+        due_on=task.due_on,
+        num_subtasks=task.num_subtasks,
+        parent=parent_obj
+    )
+    
+    return TaskResponseWrapper(data=task_response)
+
+
+@router.post("/tasks/{task_gid}/addProject", response_model=EmptyResponse)
+def add_project_for_task(
+    task_gid: str = Path(..., description="Globally unique identifier for the task"),
+    project_data: TaskAddProjectRequest = Body(..., alias="data"),
+    opt_pretty: Optional[bool] = Query(False, description="Pretty output format"),
+    db: Session = Depends(get_db)
+):
+    """
+    Add a project to a task (POST request): Adds the task to the project, optionally in a section.
+    Adding a task to a project it already belongs to moves it to the given section.
+    """
+    # Locked so the counter delta uses the completion state concurrent updates leave behind
+    task = db.query(Task).filter(Task.gid == task_gid).with_for_update().first()
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+    
+    project = db.query(Project).filter(Project.gid == project_data.project).first()
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found"
+        )
+    
+    section_id = None
+    if project_data.section:
+        section = db.query(Section).filter(Section.gid == project_data.section).first()
+        if not section or section.project_id != project.id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Section not found in project"
+            )
+        section_id = section.id
+    
+    membership = db.query(TaskMembership).filter(
+        TaskMembership.task_id == task.id,
+        TaskMembership.project_id == project.id
+    ).with_for_update().first()
+    if not membership:
+        try:
+            with db.begin_nested():
+                db.add(TaskMembership(task_id=task.id, project_id=project.id, section_id=section_id))
+        except IntegrityError:
+            # Added concurrently: the task is already in the project
+            membership = db.query(TaskMembership).filter(
+                TaskMembership.task_id == task.id,
+                TaskMembership.project_id == project.id
+            ).with_for_update().first()
+        else:
+            apply_task_count_delta(db, [project.id], task_count_vector(task.completed, task.resource_subtype))
+    if membership:
+        membership.section_id = section_id
+    
+    db.commit()
+    
+    return EmptyResponse()
+
+
+@router.post("/tasks/{task_gid}/removeProject", response_model=EmptyResponse)
+def remove_project_for_task(
+    task_gid: str = Path(..., description="Globally unique identifier for the task"),
+    project_data: TaskRemoveProjectRequest = Body(..., alias="data"),
+    opt_pretty: Optional[bool] = Query(False, description="Pretty output format"),
+    db: Session = Depends(get_db)
+):
+    """
+    Remove a project from a task (POST request): Removes the task from the project.
+    """
+    task = db.query(Task).filter(Task.gid == task_gid).with_for_update().first()
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+    
+    project = db.query(Project).filter(Project.gid == project_data.project).first()
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found"
+        )
+    
+    membership = db.query(TaskMembership).filter(
+        TaskMembership.task_id == task.id,
+        TaskMembership.project_id == project.id
+    ).first()
+    if membership:
+        # Deleted through the session so the removed_from_project story is written
+        db.delete(membership)
+        apply_task_count_delta(
+            db, [project.id], task_count_vector(task.completed, task.resource_subtype), sign=-1
+        )
+    
+    db.commit()
+    
+    return EmptyResponse()
+
+
+@router.post("/tasks/{task_gid}/duplicate", response_model=JobResponseWrapper, status_code=status.HTTP_201_CREATED)
+def duplicate_task_endpoint(
+    background_tasks: BackgroundTasks,
+    task_gid: str = Path(..., description="Globally unique identifier for the task"),
+    duplicate_data: TaskDuplicateRequest = Body(..., alias="data"),
+    opt_pretty: Optional[bool] = Query(False, description="Pretty output format"),
+    opt_fields: Optional[str] = Query(None, description="Comma-separated list of fields to include"),
+    db: Session = Depends(get_db)
+):
+    """
+    Duplicate a task (POST request): Creates and returns a job that will asynchronously handle the duplication.
+    """
+    task = db.query(Task).filter(Task.gid == task_gid).first()
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+    
+    try:
+        include = parse_include(duplicate_data.include, TASK_INCLUDE_OPTIONS)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    job = create_job(db, "duplicate_task")
+    db.commit()
+    db.refresh(job)
+    
+    background_tasks.add_task(run_job, job.id, duplicate_task, task.id, duplicate_data.name, include)
+    
+    return JobResponseWrapper(data=job_response(job))
+
+
+@router.post("/tasks/{task_gid}/addDependencies", response_model=EmptyResponse)
+def add_dependencies_for_task(
+    task_gid: str = Path(..., description="Globally unique identifier for the task"),
+    dependencies_data: ModifyDependenciesRequest = Body(..., alias="data"),
+    opt_pretty: Optional[bool] = Query(False, description="Pretty output format"),
+    db: Session = Depends(get_db)
+):
+    """
+    Set dependencies for a task (POST request): Marks a set of tasks as dependencies of this task.
+    """
+    task = db.query(Task).filter(Task.gid == task_gid).first()
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+    
+    dependency_gids = set(dependencies_data.dependencies or [])
+    dependencies = db.query(Task).filter(Task.gid.in_(dependency_gids)).all()
+    if len(dependencies) != len(dependency_gids):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dependency task not found"
+        )
+    if any(dependency.id == task.id for dependency in dependencies):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A task cannot depend on itself"
+        )
+    
+    existing = {
+        row[0] for row in db.query(TaskDependency.dependency_id).filter(TaskDependency.task_id == task.id).all()
+    }
+    for dependency in dependencies:
+        if dependency.id not in existing:
+            db.add(TaskDependency(task_id=task.id, dependency_id=dependency.id))
+    
+    db.commit()
+    
+    return EmptyResponse()
+
+
+@router.post("/tasks/{task_gid}/removeDependencies", response_model=EmptyResponse)
+def remove_dependencies_for_task(
+    task_gid: str = Path(..., description="Globally unique identifier for the task"),
+    dependencies_data: ModifyDependenciesRequest = Body(..., alias="data"),
+    opt_pretty: Optional[bool] = Query(False, description="Pretty output format"),
+    db: Session = Depends(get_db)
+):
+    """
+    Unlink dependencies from a task (POST request): Unlinks a set of dependencies from this task.
+    """
+    task = db.query(Task).filter(Task.gid == task_gid).first()
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+    
+    dependency_ids = db.query(Task.id).filter(Task.gid.in_(dependencies_data.dependencies or []))
+    db.query(TaskDependency).filter(
+        TaskDependency.task_id == task.id,
+        TaskDependency.dependency_id.in_(dependency_ids.scalar_subquery())
+    ).delete(synchronize_session=False)
+    db.commit()
+    
+    return EmptyResponse()
@@ -1,3 +1,4 @@
+from datetime import date
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Body
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
@@ -5,18 +6,33 @@ from typing import Optional
 from database import get_db
 from models.time_tracking_entry import TimeTrackingEntry
 from models.task import Task
+from models.task_membership import TaskMembership
 from models.project import Project
 from models.user import User
+from models.workspace import Workspace
 from schemas.time_tracking_entry import (
     TimeTrackingEntryResponse, TimeTrackingEntryListResponse,
-    TimeTrackingEntryResponseWrapper, TimeTrackingEntryRequest
+    TimeTrackingEntryResponseWrapper, TimeTrackingEntryRequest,
+    TimeTrackingReport, TimeTrackingReportSeries, TimeTrackingReportDataPoint, TimeTrackingReportResponse
 )
 from schemas.project_membership import EmptyResponse
+from services.time_rollups import (
+    GRANULARITIES, MAX_REPORT_PERIODS, entry_state, record_entry_change, periods, time_report
+)
+from services.budgets import BILLABLE_STATUSES, DEFAULT_BILLABLE_STATUS, record_entry_budget_change
 from utils import generate_gid
 
 router = APIRouter()
 
 
+def _check_billable_status(billable_status: Optional[str]):
+    if billable_status is not None and billable_status not in BILLABLE_STATUSES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"billable_status: must be one of {', '.join(BILLABLE_STATUSES)}"
+        )
+
+
 @router.get("/tasks/{task_gid}/time_tracking_entries", response_model=TimeTrackingEntryListResponse)
 def get_time_tracking_entries_for_task(
     task_gid: str = Path(..., description="The task to operate on."),
@@ -47,6 +63,7 @@ def create_time_tracking_entry(
     db: Session = Depends(get_db)
 ):
     """Create a time tracking entry"""
+    _check_billable_status(entry_data.billable_status)
     task = db.query(Task).filter(Task.gid == task_gid).first()
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
@@ -60,18 +77,28 @@ def create_time_tracking_entry(
         project = db.query(Project).filter(Project.gid == entry_data.attributable_to).first()
         if project:
             attributable_to_id = project.id
+    else:
+        # Time counts towards the task's first project unless attributed elsewhere
+        attributable_to_id = db.query(TaskMembership.project_id).filter(
+            TaskMembership.task_id == task.id
+        ).order_by(TaskMembership.project_id).limit(1).scalar()
 
     entry = TimeTrackingEntry(
         gid=generate_gid(),
         duration_minutes=entry_data.duration_minutes,
         entered_on=entry_data.entered_on,
+        billable_status=entry_data.billable_status or DEFAULT_BILLABLE_STATUS,
         task_id=task.id,
         attributable_to_id=attributable_to_id,
         user_id=user.id,
+        workspace_id=task.workspace_id,
         created_by_id=user.id
     )
 
     db.add(entry)
+    db.flush()
+    record_entry_change(db, None, entry_state(entry))
+    record_entry_budget_change(db, None, entry_state(entry))
     db.commit()
     db.refresh(entry)
 
@@ -102,17 +129,25 @@ def update_time_tracking_entry(
     db: Session = Depends(get_db)
 ):
     """Update a time tracking entry"""
-    entry = db.query(TimeTrackingEntry).filter(TimeTrackingEntry.gid == time_tracking_entry_gid).first()
+    _check_billable_status(entry_data.billable_status)
+    # Locked so concurrent updates each move the minutes from the state the other left
+    entry = db.query(TimeTrackingEntry).filter(TimeTrackingEntry.gid == time_tracking_entry_gid) \
+        .with_for_update().first()
     if not entry:
         raise HTTPException(status_code=404, detail="Time tracking entry not found")
 
+    old_state = entry_state(entry)
     if entry_data.duration_minutes is not None:
         entry.duration_minutes = entry_data.duration_minutes
     if entry_data.entered_on is not None:
         entry.entered_on = entry_data.entered_on
+    if entry_data.billable_status is not None:
+        entry.billable_status = entry_data.billable_status
     if entry_data.description is not None:
         entry.description = entry_data.description
 
+    record_entry_change(db, old_state, entry_state(entry))
+    record_entry_budget_change(db, old_state, entry_state(entry))
     db.commit()
     db.refresh(entry)
 
@@ -126,11 +161,14 @@ def delete_time_tracking_entry(
     db: Session = Depends(get_db)
 ):
     """Delete a time tracking entry"""
-    entry = db.query(TimeTrackingEntry).filter(TimeTrackingEntry.gid == time_tracking_entry_gid).first()
+    entry = db.query(TimeTrackingEntry).filter(TimeTrackingEntry.gid == time_tracking_entry_gid) \
+        .with_for_update().first()
     if not entry:
         raise HTTPException(status_code=404, detail="Time tracking entry not found")
 
     try:
+        record_entry_change(db, entry_state(entry), None)
+        record_entry_budget_change(db, entry_state(entry), None)
         db.delete(entry)
         db.commit()
     except IntegrityError as e:
@@ -148,3 +186,67 @@ def delete_time_tracking_entry(
 
     return EmptyResponse()
 
+
+
+@router.get("/workspaces/{workspace_gid}/time_tracking_report", response_model=TimeTrackingReportResponse)
+def get_time_tracking_report(
+    workspace_gid: str = Path(..., description="Globally unique identifier for the workspace or organization"),
+    start_on: date = Query(..., description="First day of the report"),
+    end_on: date = Query(..., description="Last day of the report (inclusive)"),
+    granularity: str = Query("day", description="Period of each data point: day, week or month"),
+    user: Optional[str] = Query(None, description="Only count time entered by this user"),
+    group_by: Optional[str] = Query(None, description="user: one series per user (a timesheet)"),
+    opt_pretty: Optional[bool] = Query(False, description="Pretty output format"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get a time tracking report: minutes tracked in a workspace per day, week or month.
+    Read from the daily rollups maintained by entry writes, never from the entries.
+    """
+    if granularity not in GRANULARITIES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"granularity: must be one of {', '.join(GRANULARITIES)}"
+        )
+    if group_by not in (None, "user"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="group_by: must be user")
+    if end_on < start_on:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="end_on: must not be before start_on")
+    starts = periods(start_on, end_on, granularity)
+    if len(starts) > MAX_REPORT_PERIODS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A report covers at most {MAX_REPORT_PERIODS} periods; use a coarser granularity"
+        )
+
+    workspace_id = db.query(Workspace.id).filter(Workspace.gid == workspace_gid).scalar()
+    if workspace_id is None:
+        raise HTTPException(status_code=404, detail="Workspace not found")
+    user_id = None
+    if user:
+        user_id = db.query(User.id).filter(User.gid == user).scalar()
+        if user_id is None:
+            raise HTTPException(status_code=404, detail="User not found")
+
+    report = time_report(db, workspace_id, start_on, end_on, granularity, user_id, by_user=group_by == "user")
+
+    # Users of the report in one query
+    user_ids = {key for key in report if key is not None}
+    users = {row.id: row for row in db.query(User).filter(User.id.in_(user_ids)).all()} if user_ids else {}
+
+    series = []
+    for key in sorted(report, key=lambda key: (key is not None, key or 0)):
+        minutes = report[key]
+        member = users.get(key)
+        series.append(TimeTrackingReportSeries(
+            user={"gid": member.gid, "resource_type": "user", "name": member.name or ""} if member else None,
+            actual_time_minutes=sum(minutes.values()),
+            data_points=[
+                TimeTrackingReportDataPoint(start_on=start, actual_time_minutes=minutes.get(start, 0))
+                for start in starts
+            ]
+        ))
+
+    return TimeTrackingReportResponse(data=TimeTrackingReport(
+        start_on=start_on, end_on=end_on, granularity=granularity, series=series
+    ))
@@ -4,6 +4,7 @@ from sqlalchemy.exc import IntegrityError
 from typing import Optional
 from database import get_db
 from utils import generate_gid
+from tracing import span
 from models.webhook import Webhook
 from schemas.webhook import (
     WebhookResponse, WebhookResponseWrapper, WebhookListResponse,
@@ -110,18 +111,19 @@ def create_webhook(
             detail="Invalid resource GID format"
         )
     
-    webhook = Webhook(
-        gid=generate_gid(),
-        resource_type="webhook",
-        resource_id=resource_id,
-        target=webhook_data.target,
-        active=True,
-        filters=[f.dict() for f in webhook_data.filters] if webhook_data.filters else []
-    )
-    
-    db.add(webhook)
-    db.commit()
-    db.refresh(webhook)
+    with span("webhook.register", {"webhook.resource": webhook_data.resource, "webhook.target": webhook_data.target}):
+        webhook = Webhook(
+            gid=generate_gid(),
+            resource_type="webhook",
+            resource_id=resource_id,
+            target=webhook_data.target,
+            active=True,
+            filters=[f.dict() for f in webhook_data.filters] if webhook_data.filters else []
+        )
+
+        db.add(webhook)
+        db.commit()
+        db.refresh(webhook)
     
     webhook_response = WebhookResponse(
         gid=webhook.gid,
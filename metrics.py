@@ -0,0 +1,229 @@
+"""
+Built-in Prometheus instrumentation, served on GET /metrics.
+
+    http_requests_total{method,route,status}            requests handled
+    http_request_duration_seconds{method,route}         latency histogram
+    http_requests_in_flight                             requests being handled now
+    db_statements_per_request{method,route}             SQL statements per request (histogram)
+    db_time_per_request_seconds{method,route}           time spent in SQL per request (histogram)
+    db_statements_total / db_time_seconds_total         SQL totals across requests
+    db_pool_*                                           connection pool size, checked-out, overflow, wait time
+    db_replica_lag_seconds{replica}                     replay lag of each read replica (+Inf if unreachable)
+    db_roundtrip_seconds                                last /health/ready database round trip
+
+Routes are labelled with their path template (e.g. /api/1.0/tasks/{task_gid}),
+so label cardinality is bounded by the number of routes. The middleware is a
+plain ASGI wrapper; set METRICS_ENABLED=0 to leave it out entirely.
+"""
+import bisect
+import os
+import threading
+import time
+from typing import Dict, List, Sequence, Tuple
+from fastapi import APIRouter, Response
+from database import engine, replicas, start_query_stats, query_stats
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 250)
+DB_TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+UNMATCHED_ROUTE = "unmatched"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.labels = name, help_text, tuple(labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for label_values, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    def set(self, *label_values: str, value: float):
+        with self.lock:
+            self.values[label_values] = value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float], labels: Sequence[str] = ()):
+        self.name, self.help, self.labels = name, help_text, tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self.series: Dict[Tuple[str, ...], list] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labels + ("le",)
+        with self.lock:
+            for label_values, (counts, total) in sorted(self.series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{self.name}_bucket{_format_labels(names, label_values + (le,))} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, label_values)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, label_values)} {cumulative}")
+        return lines
+
+
+REQUESTS = Counter("http_requests_total", "HTTP requests handled", ("method", "route", "status"))
+LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency", LATENCY_BUCKETS, ("method", "route"))
+IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being handled")
+STATEMENTS = Histogram(
+    "db_statements_per_request", "SQL statements executed per request", STATEMENT_BUCKETS, ("method", "route")
+)
+DB_TIME = Histogram(
+    "db_time_per_request_seconds", "Time spent executing SQL per request", DB_TIME_BUCKETS, ("method", "route")
+)
+STATEMENTS_TOTAL = Counter("db_statements_total", "SQL statements executed by requests")
+DB_TIME_TOTAL = Counter("db_time_seconds_total", "Time spent executing SQL by requests")
+DB_ROUNDTRIP = Gauge("db_roundtrip_seconds", "Database round trip measured by the last /health/ready check")
+
+# Extra metric families rendered on /metrics (other modules register theirs here)
+COLLECTORS: List = [REQUESTS, LATENCY, IN_FLIGHT, STATEMENTS, DB_TIME, STATEMENTS_TOTAL, DB_TIME_TOTAL, DB_ROUNDTRIP]
+
+
+def pool_metrics() -> List[str]:
+    """Connection pool state, read from the pool at scrape time"""
+    pool = engine.pool
+    lines = []
+
+    def gauge(name: str, help_text: str, value):
+        lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value}"])
+
+    def counter(name: str, help_text: str, value):
+        lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} counter", f"{name} {value}"])
+
+    if hasattr(pool, "size"):
+        gauge("db_pool_size", "Configured number of persistent connections", pool.size())
+        gauge("db_pool_checked_out", "Connections currently checked out", pool.checkedout())
+        gauge("db_pool_overflow", "Connections open beyond pool_size (negative while the pool is filling)", pool.overflow())
+        gauge("db_pool_checked_in", "Idle connections in the pool", pool.checkedin())
+    if hasattr(pool, "wait_seconds_total"):
+        counter("db_pool_checkouts_total", "Connection checkouts", pool.checkouts)
+        counter("db_pool_wait_seconds_total", "Time spent waiting for a connection", pool.wait_seconds_total)
+        gauge("db_pool_wait_seconds_max", "Longest wait for a connection since startup", pool.wait_seconds_max)
+    if replicas.replicas:
+        lines.extend([
+            "# HELP db_replica_lag_seconds Replay lag of each read replica at its last check",
+            "# TYPE db_replica_lag_seconds gauge",
+        ])
+        for index, replica in enumerate(replicas.replicas):
+            lines.append(f'db_replica_lag_seconds{{replica="{index}"}} {replica.lag_seconds}')
+    return lines
+
+
+def render_metrics() -> str:
+    lines = []
+    for collector in COLLECTORS:
+        lines.extend(collector.render())
+    lines.extend(pool_metrics())
+    return "\n".join(lines) + "\n"
+
+
+_route_paths: Dict[object, str] = {}
+
+
+def route_template(scope) -> str:
+    """Path template of the route that handled the request, once the app has run"""
+    # Starlette's router stores the matched endpoint in the (shared) scope
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return UNMATCHED_ROUTE
+    path = _route_paths.get(endpoint)
+    if path is None:
+        app = scope.get("app")
+        for route in getattr(app, "routes", ()):
+            if getattr(route, "endpoint", None) is endpoint:
+                path = route.path
+                break
+        path = _route_paths[endpoint] = path or UNMATCHED_ROUTE
+    return path
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route request metrics"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def record_send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        stats, token = start_query_stats()
+        IN_FLIGHT.inc(amount=1)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, record_send)
+        finally:
+            elapsed = time.perf_counter() - started
+            IN_FLIGHT.inc(amount=-1)
+            if token is not None:
+                query_stats.reset(token)
+            method, route = scope["method"], route_template(scope)
+            REQUESTS.inc(method, route, str(status["code"]))
+            LATENCY.observe(elapsed, method, route)
+            STATEMENTS.observe(stats.count, method, route)
+            DB_TIME.observe(stats.seconds, method, route)
+            if stats.count:
+                STATEMENTS_TOTAL.inc(amount=stats.count)
+                DB_TIME_TOTAL.inc(amount=stats.seconds)
+
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus text exposition of the process's metrics"""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
+
+
+def install_metrics(app) -> bool:
+    """Add the metrics middleware and /metrics route unless METRICS_ENABLED=0"""
+    if os.getenv("METRICS_ENABLED", "1") == "0":
+        return False
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(router)
+    return True
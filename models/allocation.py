@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, JSON, Numeric
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, JSON, Numeric, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -6,6 +6,10 @@ from database import Base
 
 class Allocation(Base):
     __tablename__ = "allocations"
+    __table_args__ = (
+        # Workload windows: an assignee's allocations overlapping a date range
+        Index("ix_allocations_assignee_dates", "assignee_id", "start_date", "end_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     gid = Column(String(255), unique=True, nullable=False, index=True)
@@ -17,6 +17,8 @@ class Attachment(Base):
     host = Column(String(255))
     parent_id = Column(Integer)
     parent_type = Column(String(50))
+    # Copied from the parent: the partition key when attachments are partitioned (see partitioning.py)
+    workspace_id = Column(Integer, ForeignKey("workspaces.id"))
     permanent_url = Column(String(500))
     created_by_id = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
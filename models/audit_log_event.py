@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -6,16 +6,24 @@ from database import Base
 
 class AuditLogEvent(Base):
     __tablename__ = "audit_log_events"
+    # Keyset pagination of GET /workspaces/{gid}/audit_log_events, unfiltered and by each filter
+    __table_args__ = (
+        Index("ix_audit_log_events_workspace_created", "workspace_id", "created_at", "id"),
+        Index("ix_audit_log_events_workspace_event_type", "workspace_id", "event_type", "created_at", "id"),
+        Index("ix_audit_log_events_workspace_actor", "workspace_id", "actor_gid", "created_at", "id"),
+        Index("ix_audit_log_events_workspace_resource", "workspace_id", "resource_gid", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     gid = Column(String(255), unique=True, nullable=False, index=True)
     resource_type = Column(String(50), default="audit_log_event")
+    workspace_id = Column(Integer, ForeignKey("workspaces.id"))
     event_type = Column(String(100))
     actor_type = Column(String(50))
     actor_gid = Column(String(255))
     resource_type_name = Column(String(100))
     resource_gid = Column(String(255))
+    resource_name = Column(String(255))
     context = Column(JSON)
     details = Column(JSON)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
-
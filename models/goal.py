@@ -24,7 +24,7 @@ class Goal(Base):
     owner_id = Column(Integer, ForeignKey("users.id"))
     time_period_id = Column(Integer, ForeignKey("time_periods.id"))
     metric_id = Column(Integer)
-    parent_goal_id = Column(Integer, ForeignKey("goals.id"))
+    parent_goal_id = Column(Integer, ForeignKey("goals.id"), index=True)
     current_status_update_id = Column(Integer, ForeignKey("status_updates.id"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Numeric
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from database import Base
+
+
+class GoalMetric(Base):
+    """A goal's metric and its stored progress (rolled up by services/goal_progress.py)"""
+    __tablename__ = "goal_metrics"
+
+    id = Column(Integer, primary_key=True, index=True)
+    gid = Column(String(255), unique=True, nullable=False, index=True)
+    resource_type = Column(String(50), default="goal_metric")
+    resource_subtype = Column(String(50), default="number")
+    goal_id = Column(Integer, ForeignKey("goals.id"), unique=True, nullable=False, index=True)
+    precision = Column(Integer, default=0)
+    unit = Column(String(50), default="none")  # "none", "currency", "percentage"
+    currency_code = Column(String(10))
+    initial_number_value = Column(Numeric(20, 4), default=0)
+    target_number_value = Column(Numeric(20, 4))
+    current_number_value = Column(Numeric(20, 4))
+    progress_source = Column(String(50), default="manual")
+    is_custom_weight = Column(Boolean, default=False)
+    # Fraction of the way from initial to target, 0 to 1
+    progress = Column(Numeric(7, 6), nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    goal = relationship("Goal")
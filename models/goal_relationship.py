@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -6,14 +6,21 @@ from database import Base
 
 class GoalRelationship(Base):
     __tablename__ = "goal_relationships"
+    __table_args__ = (
+        # Goals supported by a goal, project or task (progress rollups walk these upwards)
+        Index("ix_goal_relationships_supporting_resource", "supporting_resource_type", "supporting_resource_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     gid = Column(String(255), unique=True, nullable=False, index=True)
     resource_type = Column(String(50), default="goal_relationship")
     resource_subtype = Column(String(50))
     supporting_goal_id = Column(Integer, ForeignKey("goals.id"))
-    supported_goal_id = Column(Integer, ForeignKey("goals.id"))
-    contribution_weight = Column(Integer)
+    # "goal", "project" or "task"; for goals supporting_resource_id equals supporting_goal_id
+    supporting_resource_type = Column(String(50))
+    supporting_resource_id = Column(Integer)
+    supported_goal_id = Column(Integer, ForeignKey("goals.id"), index=True)
+    contribution_weight = Column(Numeric(10, 4))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, ForeignKey, Index
+from database import Base
+
+
+class PortfolioClosure(Base):
+    """
+    Transitive closure of portfolio nesting (see services/portfolio_rollups.py): one row per
+    portfolio and each portfolio nested in it at any depth, including itself. path_count is
+    the number of distinct nesting paths, so removing one of several paths keeps the row.
+    """
+    __tablename__ = "portfolio_closure"
+    __table_args__ = (
+        Index("ix_portfolio_closure_descendant", "descendant_id", "ancestor_id"),
+    )
+
+    ancestor_id = Column(Integer, ForeignKey("portfolios.id"), primary_key=True)
+    descendant_id = Column(Integer, ForeignKey("portfolios.id"), primary_key=True)
+    path_count = Column(Integer, nullable=False, default=1)
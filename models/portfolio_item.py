@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from database import Base
+
+
+class PortfolioItem(Base):
+    """A project or (nested) portfolio in a portfolio; exactly one of project_id and item_portfolio_id is set"""
+    __tablename__ = "portfolio_items"
+    __table_args__ = (
+        UniqueConstraint("portfolio_id", "project_id", name="uq_portfolio_items_portfolio_project"),
+        UniqueConstraint("portfolio_id", "item_portfolio_id", name="uq_portfolio_items_portfolio_item_portfolio"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    portfolio_id = Column(Integer, ForeignKey("portfolios.id"), nullable=False, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), index=True)
+    item_portfolio_id = Column(Integer, ForeignKey("portfolios.id"), index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    portfolio = relationship("Portfolio", foreign_keys=[portfolio_id])
+    project = relationship("Project")
+    item_portfolio = relationship("Portfolio", foreign_keys=[item_portfolio_id])
@@ -0,0 +1,37 @@
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, ForeignKey, Numeric
+from sqlalchemy.sql import func
+from database import Base
+
+
+class PortfolioRollup(Base):
+    """
+    Cached aggregates over the distinct projects of a portfolio and the portfolios nested in it
+    (see services/portfolio_rollups.py); recomputed on read once marked stale.
+    """
+    __tablename__ = "portfolio_rollups"
+
+    portfolio_id = Column(Integer, ForeignKey("portfolios.id"), primary_key=True)
+    stale = Column(Boolean, nullable=False, default=True)
+    # Bumped whenever the rollup is marked stale; a refresh only writes if it is unchanged since its read
+    version = Column(Integer, nullable=False, default=0)
+    num_projects = Column(Integer, nullable=False, default=0)
+    # Projects by the color of their current status update
+    num_on_track = Column(Integer, nullable=False, default=0)
+    num_at_risk = Column(Integer, nullable=False, default=0)
+    num_off_track = Column(Integer, nullable=False, default=0)
+    num_on_hold = Column(Integer, nullable=False, default=0)
+    num_complete = Column(Integer, nullable=False, default=0)
+    num_no_status = Column(Integer, nullable=False, default=0)
+    num_tasks = Column(Integer, nullable=False, default=0)
+    num_completed_tasks = Column(Integer, nullable=False, default=0)
+    num_milestones = Column(Integer, nullable=False, default=0)
+    num_completed_milestones = Column(Integer, nullable=False, default=0)
+    start_on = Column(Date)
+    due_on = Column(Date)
+    time_estimate_minutes = Column(Numeric(15, 2))
+    time_actual_minutes = Column(Numeric(15, 2))
+    # Cost budgets are only summed while they share one currency (cost_units)
+    cost_estimate = Column(Numeric(15, 2))
+    cost_actual = Column(Numeric(15, 2))
+    cost_units = Column(String(10))
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
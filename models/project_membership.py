@@ -13,6 +13,8 @@ class ProjectMembership(Base):
     user_id = Column(Integer, ForeignKey("users.id"))
     team_id = Column(Integer, ForeignKey("teams.id"))
     project_id = Column(Integer, ForeignKey("projects.id"))
+    # Copied from the project: the partition key when memberships are partitioned (see partitioning.py)
+    workspace_id = Column(Integer, ForeignKey("workspaces.id"))
     write_access = Column(String(50))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
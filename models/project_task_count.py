@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from database import Base
+
+
+class ProjectTaskCount(Base):
+    """Incrementally maintained task counters per project (see services/task_counts.py)"""
+    __tablename__ = "project_task_counts"
+
+    project_id = Column(Integer, ForeignKey("projects.id"), primary_key=True)
+    num_tasks = Column(Integer, nullable=False, default=0)
+    num_completed_tasks = Column(Integer, nullable=False, default=0)
+    num_milestones = Column(Integer, nullable=False, default=0)
+    num_completed_milestones = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
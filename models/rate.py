@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Numeric, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -6,6 +6,10 @@ from database import Base
 
 class Rate(Base):
     __tablename__ = "rates"
+    # Rate lookups for a user on a project on a day (services/budgets.py)
+    __table_args__ = (
+        Index("ix_rates_parent_resource_effective", "parent_id", "resource_id", "effective_from"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     gid = Column(String(255), unique=True, nullable=False, index=True)
@@ -15,6 +19,7 @@ class Rate(Base):
     parent_id = Column(Integer, ForeignKey("projects.id"))
     resource_id = Column(Integer, ForeignKey("users.id"))  # Can be user or placeholder
     resource_type_field = Column(String(50))  # "user" or "placeholder"
+    effective_from = Column(Date, nullable=True)  # In effect until the next rate of the resource; NULL: from the start
     created_by_id = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -6,6 +6,10 @@ from database import Base
 
 class Reaction(Base):
     __tablename__ = "reactions"
+    # One reaction per user and emoji on a target; also serves per-target lookups
+    __table_args__ = (
+        Index("ux_reactions_target_user_emoji", "target_type", "target_id", "user_id", "emoji_base", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     gid = Column(String(255), unique=True, nullable=False, index=True)
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from database import Base
+
+
+class ReactionSummary(Base):
+    """Incrementally maintained reaction counts per target and emoji (see services/reactions.py)"""
+    __tablename__ = "reaction_summaries"
+
+    target_type = Column(String(50), primary_key=True)  # "status_update" or "story"
+    target_id = Column(Integer, primary_key=True)
+    emoji_base = Column(String(10), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -6,16 +6,23 @@ from database import Base
 
 class Story(Base):
     __tablename__ = "stories"
+    # A task's activity stream, in order, for keyset pagination
+    __table_args__ = (
+        Index("ix_stories_task_created", "task_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     gid = Column(String(255), unique=True, nullable=False, index=True)
     resource_type = Column(String(50), default="story")
     text = Column(Text)
     html_text = Column(Text)
-    type = Column(String(50))
+    type = Column(String(50))  # "comment", "system"
+    resource_subtype = Column(String(50))  # "comment_added", "assigned", "marked_complete", ... (services/system_stories.py)
     is_pinned = Column(Boolean, default=False)
     created_by_id = Column(Integer, ForeignKey("users.id"))
     task_id = Column(Integer, ForeignKey("tasks.id"))
+    # Copied from the task: the partition key when stories are partitioned (see partitioning.py)
+    workspace_id = Column(Integer, ForeignKey("workspaces.id"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     created_by = relationship("User", foreign_keys=[created_by_id])
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Date, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Date, ForeignKey, Text, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -10,6 +10,7 @@ class Task(Base):
     id = Column(Integer, primary_key=True, index=True)
     gid = Column(String(255), unique=True, nullable=False, index=True)
     resource_type = Column(String(50), default="task")
+    resource_subtype = Column(String(50), default="default_task")  # "default_task", "milestone", "section", "approval"
     name = Column(String(255), nullable=False)
     notes = Column(Text)
     completed = Column(Boolean, default=False)
@@ -20,13 +21,16 @@ class Task(Base):
     assignee_id = Column(Integer, ForeignKey("users.id"))
     assignee_status = Column(String(50))
     workspace_id = Column(Integer, ForeignKey("workspaces.id"))
-    parent_id = Column(Integer, ForeignKey("tasks.id"))
+    parent_id = Column(Integer, ForeignKey("tasks.id"), index=True)
     num_subtasks = Column(Integer, default=0)
     num_likes = Column(Integer, default=0)
+    custom_field_values = Column(JSON)  # custom field gid -> value
+    created_by_id = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     assignee = relationship("User", foreign_keys=[assignee_id])
+    created_by = relationship("User", foreign_keys=[created_by_id])
     workspace = relationship("Workspace")
     parent = relationship("Task", remote_side=[id])
 
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from database import Base
+
+
+class TaskDependency(Base):
+    """task_id cannot be completed before dependency_id (Asana dependencies/dependents)"""
+    __tablename__ = "task_dependencies"
+    __table_args__ = (
+        UniqueConstraint("task_id", "dependency_id", name="uq_task_dependencies_task_dependency"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False, index=True)
+    dependency_id = Column(Integer, ForeignKey("tasks.id"), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    task = relationship("Task", foreign_keys=[task_id])
+    dependency = relationship("Task", foreign_keys=[dependency_id])
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from database import Base
+
+
+class TaskMembership(Base):
+    __tablename__ = "task_memberships"
+    __table_args__ = (
+        UniqueConstraint("task_id", "project_id", name="uq_task_memberships_task_project"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
+    section_id = Column(Integer, ForeignKey("sections.id"))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    task = relationship("Task")
+    project = relationship("Project")
+    section = relationship("Section")
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from database import Base
+
+
+class TaskTimeTotal(Base):
+    """Incrementally maintained tracked time per task (see services/time_rollups.py)"""
+    __tablename__ = "task_time_totals"
+
+    task_id = Column(Integer, ForeignKey("tasks.id"), primary_key=True)
+    actual_time_minutes = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -12,6 +12,7 @@ class TimeTrackingEntry(Base):
     resource_type = Column(String(50), default="time_tracking_entry")
     duration_minutes = Column(Integer)
     entered_on = Column(Date)
+    billable_status = Column(String(50), default="billable")  # "billable" or "non_billable"
     task_id = Column(Integer, ForeignKey("tasks.id"))
     attributable_to_id = Column(Integer, ForeignKey("projects.id"))
     portfolio_id = Column(Integer, ForeignKey("portfolios.id"))
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, Date, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from database import Base
+
+
+class UserDailyTime(Base):
+    """Incrementally maintained time per user and day, within a workspace (see services/time_rollups.py)"""
+    __tablename__ = "user_daily_time"
+    # The primary key serves workspace timesheets (one range per date range); this one a user's own series
+    __table_args__ = (
+        Index("ix_user_daily_time_user_day", "user_id", "entered_on"),
+    )
+
+    workspace_id = Column(Integer, ForeignKey("workspaces.id"), primary_key=True)
+    entered_on = Column(Date, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    actual_time_minutes = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, Date, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from database import Base
+
+
+class WorkspaceDailyTime(Base):
+    """Incrementally maintained time per workspace and day (see services/time_rollups.py)"""
+    __tablename__ = "workspace_daily_time"
+
+    workspace_id = Column(Integer, ForeignKey("workspaces.id"), primary_key=True)
+    entered_on = Column(Date, primary_key=True)
+    actual_time_minutes = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,150 @@
+"""
+Hash partitioning of the high-volume tables by workspace_id.
+
+Converts tasks, stories, project_memberships and attachments into
+PARTITION BY HASH (workspace_id) tables, so one tenant's vacuum, index bloat
+and lock traffic stay within its own partitions:
+
+    python partitioning.py --partitions 16
+
+Each table is converted in its own transaction: the table is renamed, a
+partitioned copy is created with the same columns, defaults and sequence, the
+rows are copied and the old table is dropped. Already partitioned tables are
+skipped, so the command can be re-run.
+
+Postgres requires every unique constraint on a partitioned table to include
+the partition key, which changes some constraints:
+  - ids stay unique (they come from the table's sequence) and are enforced as
+    UNIQUE (id, workspace_id); unique indexes such as gid gain workspace_id too
+  - foreign keys between partitioned tables become (x_id, workspace_id)
+    references, which is why the child tables carry their parent's workspace_id
+  - foreign keys from other tables into a partitioned table cannot be kept;
+    they are dropped and listed in the output
+
+A query prunes to one partition only when it filters on workspace_id, so the
+hot list endpoints add workspace_filter() to their queries.
+test_partition_pruning.py checks that they do.
+"""
+import argparse
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from database import Base, engine, import_models
+
+# In conversion order: a table's partitioned parents must be converted before it
+PARTITIONED_TABLES = ["tasks", "stories", "project_memberships", "attachments"]
+PARTITION_KEY = "workspace_id"
+DEFAULT_PARTITIONS = 16
+
+
+def workspace_filter(column, workspace_id: Optional[int]):
+    """column = workspace_id, which lets Postgres prune to one partition; IS NULL for workspace-less rows"""
+    return column == workspace_id if workspace_id is not None else column.is_(None)
+
+
+def partition_name(table_name: str, remainder: int) -> str:
+    return f"{table_name}_p{remainder}"
+
+
+def is_partitioned(connection: Connection, table_name: str) -> bool:
+    return connection.execute(
+        text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:name)"), {"name": table_name}
+    ).scalar() or False
+
+
+def _drop_incoming_foreign_keys(connection: Connection, table_name: str) -> List[str]:
+    rows = connection.execute(text("""
+        SELECT conrelid::regclass::text, conname FROM pg_constraint
+        WHERE contype = 'f' AND confrelid = to_regclass(:name) AND conrelid <> confrelid
+    """), {"name": table_name}).all()
+    dropped = []
+    for referencing_table, constraint in rows:
+        connection.execute(text(f'ALTER TABLE {referencing_table} DROP CONSTRAINT "{constraint}"'))
+        dropped.append(f"{referencing_table}.{constraint}")
+    return dropped
+
+
+def convert_table(connection: Connection, table_name: str, key: str, partition_by: str,
+                  partitions: List[Tuple[str, str]]) -> List[str]:
+    """
+    Replace a table with a partitioned copy holding the same rows.
+    partition_by is e.g. "HASH (workspace_id)"; partitions are (name, bound) pairs.
+    Returns the foreign keys into the table that had to be dropped.
+    """
+    table = Base.metadata.tables[table_name]
+    old_name = f"{table_name}_unpartitioned"
+
+    dropped = _drop_incoming_foreign_keys(connection, table_name)
+    connection.execute(text(f"ALTER TABLE {table_name} RENAME TO {old_name}"))
+    sequence = connection.execute(text("SELECT pg_get_serial_sequence(:name, 'id')"), {"name": old_name}).scalar()
+
+    connection.execute(text(
+        f"CREATE TABLE {table_name} (LIKE {old_name} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+        f"PARTITION BY {partition_by}"
+    ))
+    for name, bound in partitions:
+        connection.execute(text(f"CREATE TABLE {name} PARTITION OF {table_name} {bound}"))
+    connection.execute(text(f"INSERT INTO {table_name} SELECT * FROM {old_name}"))
+    if sequence:
+        # Keep the sequence when the old table (its owner) is dropped
+        connection.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {table_name}.id"))
+    connection.execute(text(f"DROP TABLE {old_name}"))
+
+    connection.execute(text(f"ALTER TABLE {table_name} ADD CONSTRAINT {table_name}_id_{key}_key UNIQUE (id, {key})"))
+    for index in table.indexes:
+        columns = [column.name for column in index.columns]
+        if columns == ["id"]:
+            # Served by the (id, key) constraint
+            continue
+        if index.unique and key not in columns:
+            columns.append(key)
+        connection.execute(text(
+            f"CREATE {'UNIQUE ' if index.unique else ''}INDEX {index.name} ON {table_name} ({', '.join(columns)})"
+        ))
+    for foreign_key in table.foreign_keys:
+        column, referred = foreign_key.parent.name, foreign_key.column
+        if referred.table.name in PARTITIONED_TABLES and is_partitioned(connection, referred.table.name):
+            connection.execute(text(
+                f"ALTER TABLE {table_name} ADD FOREIGN KEY ({column}, {PARTITION_KEY}) "
+                f"REFERENCES {referred.table.name} ({referred.name}, {PARTITION_KEY})"
+            ))
+        else:
+            connection.execute(text(
+                f"ALTER TABLE {table_name} ADD FOREIGN KEY ({column}) REFERENCES {referred.table.name} ({referred.name})"
+            ))
+    connection.execute(text(f"ANALYZE {table_name}"))
+    return dropped
+
+
+def partition_table(connection: Connection, table_name: str, partitions: int) -> List[str]:
+    """Hash-partition one table by workspace_id; returns the foreign keys into it that had to be dropped"""
+    return convert_table(connection, table_name, PARTITION_KEY, f"HASH ({PARTITION_KEY})", [
+        (partition_name(table_name, remainder), f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})")
+        for remainder in range(partitions)
+    ])
+
+
+def partition_all(partitions: int = DEFAULT_PARTITIONS):
+    import_models()
+    for table_name in PARTITIONED_TABLES:
+        with engine.begin() as connection:
+            if is_partitioned(connection, table_name):
+                print(f"{table_name}: already partitioned")
+                continue
+            dropped = partition_table(connection, table_name, partitions)
+        print(f"{table_name}: {partitions} hash partitions on {PARTITION_KEY}")
+        for constraint in dropped:
+            print(f"  dropped foreign key {constraint}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hash-partition the high-volume tables by workspace_id")
+    parser.add_argument("--partitions", type=int, default=DEFAULT_PARTITIONS)
+    args = parser.parse_args()
+    partition_all(args.partitions)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+"""
+On-demand request profiling and the slow-request log.
+
+Profiling one request
+    Set PROFILE_TOKEN and send the request with `X-Asana-Profile: <token>`.
+    The request is run under a stdlib sampling profiler and every SQL statement
+    is captured with its duration and row count. The report is kept in an
+    in-memory LRU and its id is returned in the X-Asana-Profile-Id header;
+    fetch it with GET /admin/profiles/{id} (same header required).
+
+Admin toggle
+    POST /admin/profiling {"requests": 20, "path_prefix": "/api/1.0/tasks"}
+    profiles the next N matching requests without client cooperation.
+
+Slow-request log
+    SLOW_REQUEST_LOG_MS=500 logs a JSON line (route, timing, SQL count and time)
+    for a sample (SLOW_REQUEST_SAMPLE_RATE, default 1.0) of requests slower than
+    the threshold, to SLOW_REQUEST_LOG_FILE or stderr, from a background thread.
+
+Nothing is installed unless PROFILE_TOKEN or SLOW_REQUEST_LOG_MS is set, so a
+disabled deployment runs no extra middleware, engine events or patches.
+
+Sampling covers the event loop thread and the threadpool workers running this
+request's sync dependencies and endpoint; other requests sharing the event loop
+at the same moment can show up in that thread's samples.
+"""
+import hmac
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter as Tally, OrderedDict
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Body, Header, HTTPException, status
+from sqlalchemy import event
+from database import engines, start_query_stats, query_stats
+
+PROFILE_HEADER = "X-Asana-Profile"
+PROFILE_ID_HEADER = "X-Asana-Profile-Id"
+SAMPLE_INTERVAL_SECONDS = 0.001
+MAX_STORED_PROFILES = 100
+MAX_CAPTURED_STATEMENTS = 1000
+TOP_FUNCTIONS = 30
+TOP_STACKS = 50
+
+slow_logger = logging.getLogger("slow_requests")
+
+
+class ProfileSession:
+    """State of one profiled request"""
+
+    def __init__(self, method: str, path: str):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.threads = set()
+        self.statements: List[Dict[str, Any]] = []
+        self.statement_count = 0
+        self.stacks = Tally()
+        self.samples = 0
+        self.stopped = threading.Event()
+
+    def sample_forever(self):
+        frames_of = sys._current_frames
+        while not self.stopped.wait(SAMPLE_INTERVAL_SECONDS):
+            frames = frames_of()
+            for ident in list(self.threads):
+                frame = frames.get(ident)
+                # Skip the event loop while it is idle waiting for I/O
+                if frame is None or frame.f_code.co_filename.endswith("selectors.py"):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_filename}:{code.co_name}:{code.co_firstlineno}")
+                    frame = frame.f_back
+                self.stacks[tuple(reversed(stack))] += 1
+                self.samples += 1
+
+    def report(self, status_code: int, duration: float) -> Dict[str, Any]:
+        own, cumulative = Tally(), Tally()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for function in set(stack):
+                cumulative[function] += count
+        sql_seconds = sum(statement["ms"] for statement in self.statements) / 1000
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": status_code,
+            "duration_ms": round(duration * 1000, 3),
+            "sql": {
+                "count": self.statement_count,
+                "total_ms": round(sql_seconds * 1000, 3),
+                "statements": self.statements,
+            },
+            "non_sql_ms": round((duration - sql_seconds) * 1000, 3),
+            "profile": {
+                "interval_ms": SAMPLE_INTERVAL_SECONDS * 1000,
+                "samples": self.samples,
+                "top_self": [{"function": f, "samples": n} for f, n in own.most_common(TOP_FUNCTIONS)],
+                "top_cumulative": [{"function": f, "samples": n} for f, n in cumulative.most_common(TOP_FUNCTIONS)],
+                # Collapsed stacks, ready for flamegraph.pl / speedscope
+                "stacks": [";".join(stack) + f" {count}" for stack, count in self.stacks.most_common(TOP_STACKS)],
+            },
+        }
+
+
+_session: ContextVar[Optional[ProfileSession]] = ContextVar("profile_session", default=None)
+
+
+class ProfileStore:
+    """Most recent profile reports, bounded LRU"""
+
+    def __init__(self, capacity: int = MAX_STORED_PROFILES):
+        self.capacity = capacity
+        self.reports: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.lock = threading.Lock()
+        # Admin toggle: profile the next N requests whose path starts with prefix
+        self.armed = 0
+        self.armed_prefix: Optional[str] = None
+
+    def add(self, report: Dict[str, Any]):
+        with self.lock:
+            self.reports[report["id"]] = report
+            while len(self.reports) > self.capacity:
+                self.reports.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            report = self.reports.get(profile_id)
+            if report is not None:
+                self.reports.move_to_end(profile_id)
+            return report
+
+    def arm(self, requests: int, prefix: Optional[str]):
+        with self.lock:
+            self.armed, self.armed_prefix = requests, prefix
+
+    def take_armed(self, path: str) -> bool:
+        if not self.armed:
+            return False
+        with self.lock:
+            if self.armed and (not self.armed_prefix or path.startswith(self.armed_prefix)):
+                self.armed -= 1
+                return True
+        return False
+
+
+store = ProfileStore()
+
+
+def _authorized(token: Optional[str]) -> bool:
+    expected = os.getenv("PROFILE_TOKEN")
+    return bool(expected and token and hmac.compare_digest(token, expected))
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if _session.get() is not None:
+        conn.info.setdefault("profile_started", []).append(time.perf_counter())
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    session = _session.get()
+    if session is None or not conn.info.get("profile_started"):
+        return
+    elapsed = time.perf_counter() - conn.info["profile_started"].pop()
+    session.statement_count += 1
+    if len(session.statements) < MAX_CAPTURED_STATEMENTS:
+        session.statements.append({
+            "sql": statement,
+            "ms": round(elapsed * 1000, 3),
+            "rows": cursor.rowcount,
+            "executemany": executemany,
+        })
+
+
+def _failed_execute(exception_context):
+    connection = exception_context.connection
+    if _session.get() is not None and connection is not None and connection.info.get("profile_started"):
+        connection.info["profile_started"].pop()
+
+
+def _patch_threadpool():
+    """
+    Track which threadpool workers run a profiled request's sync code, so the
+    sampler knows which threads to look at. FastAPI imports run_in_threadpool
+    by name, so the references in its modules are replaced.
+    """
+    import fastapi.routing
+    import fastapi.dependencies.utils
+    original = fastapi.routing.run_in_threadpool
+
+    async def run_in_threadpool(func, *args, **kwargs):
+        session = _session.get()
+        if session is None:
+            return await original(func, *args, **kwargs)
+
+        def tracked(*call_args, **call_kwargs):
+            ident = threading.get_ident()
+            session.threads.add(ident)
+            try:
+                return func(*call_args, **call_kwargs)
+            finally:
+                session.threads.discard(ident)
+
+        return await original(tracked, *args, **kwargs)
+
+    fastapi.routing.run_in_threadpool = run_in_threadpool
+    fastapi.dependencies.utils.run_in_threadpool = run_in_threadpool
+
+
+class ProfilingMiddleware:
+    """ASGI middleware for header/toggle-triggered profiling and the slow-request log"""
+
+    def __init__(self, app, profiling: bool, slow_threshold: Optional[float], slow_sample_rate: float):
+        self.app = app
+        self.profiling = profiling
+        self.slow_threshold = slow_threshold
+        self.slow_sample_rate = slow_sample_rate
+
+    def _wants_profile(self, scope) -> bool:
+        if not self.profiling:
+            return False
+        header = PROFILE_HEADER.lower().encode()
+        for name, value in scope.get("headers", ()):
+            if name == header:
+                return _authorized(value.decode("latin-1"))
+        return store.take_armed(scope["path"])
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        session = ProfileSession(scope["method"], scope["path"]) if self._wants_profile(scope) else None
+        if session is None and self.slow_threshold is None:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = {"code": 500}
+
+        async def profiled_send(message):
+            if message["type"] == "http.response.start":
+                status_code["code"] = message["status"]
+                if session is not None:
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [
+                        (PROFILE_ID_HEADER.lower().encode(), session.id.encode())
+                    ]
+            await send(message)
+
+        stats, stats_token = start_query_stats()
+        session_token = None
+        sampler = None
+        if session is not None:
+            session.threads.add(threading.get_ident())
+            session_token = _session.set(session)
+            sampler = threading.Thread(target=session.sample_forever, name="profile-sampler", daemon=True)
+            sampler.start()
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, profiled_send)
+        finally:
+            duration = time.perf_counter() - started
+            if session is not None:
+                session.stopped.set()
+                sampler.join()
+                _session.reset(session_token)
+                store.add(session.report(status_code["code"], duration))
+            if stats_token is not None:
+                query_stats.reset(stats_token)
+            if (self.slow_threshold is not None and duration >= self.slow_threshold
+                    and random.random() < self.slow_sample_rate):
+                slow_logger.warning(json.dumps({
+                    "ts": time.time(),
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "query": scope.get("query_string", b"").decode("latin-1"),
+                    "status": status_code["code"],
+                    "duration_ms": round(duration * 1000, 3),
+                    "sql_count": stats.count,
+                    "sql_ms": round(stats.seconds * 1000, 3),
+                    "profile_id": session.id if session is not None else None,
+                }, separators=(",", ":")))
+
+
+router = APIRouter()
+
+
+def _require_token(token: Optional[str]):
+    if not _authorized(token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"A valid {PROFILE_HEADER} header is required"
+        )
+
+
+@router.post("/admin/profiling", include_in_schema=False)
+def arm_profiling(
+    requests: int = Body(1, ge=0, le=1000, embed=True),
+    path_prefix: Optional[str] = Body(None, embed=True),
+    x_asana_profile: Optional[str] = Header(None)
+):
+    """Profile the next `requests` requests whose path starts with path_prefix (0 disarms)"""
+    _require_token(x_asana_profile)
+    store.arm(requests, path_prefix)
+    return {"data": {"armed": requests, "path_prefix": path_prefix}}
+
+
+@router.get("/admin/profiles", include_in_schema=False)
+def list_profiles(x_asana_profile: Optional[str] = Header(None)):
+    _require_token(x_asana_profile)
+    with store.lock:
+        reports = list(store.reports.values())
+    return {"data": [
+        {"id": r["id"], "method": r["method"], "path": r["path"], "status": r["status"], "duration_ms": r["duration_ms"]}
+        for r in reversed(reports)
+    ]}
+
+
+@router.get("/admin/profiles/{profile_id}", include_in_schema=False)
+def get_profile(profile_id: str, x_asana_profile: Optional[str] = Header(None)):
+    _require_token(x_asana_profile)
+    report = store.get(profile_id)
+    if report is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return {"data": report}
+
+
+def _start_slow_log() -> QueueListener:
+    path = os.getenv("SLOW_REQUEST_LOG_FILE")
+    handler = logging.FileHandler(path) if path else logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    records = SimpleQueue()
+    slow_logger.addHandler(QueueHandler(records))
+    slow_logger.setLevel(logging.WARNING)
+    slow_logger.propagate = False
+    listener = QueueListener(records, handler)
+    listener.start()
+    return listener
+
+
+def install_profiling(app) -> bool:
+    """Install profiling and/or the slow-request log when configured; otherwise do nothing"""
+    profiling = bool(os.getenv("PROFILE_TOKEN"))
+    slow_ms = os.getenv("SLOW_REQUEST_LOG_MS")
+    if not profiling and not slow_ms:
+        return False
+
+    if profiling:
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", _before_execute)
+            event.listen(engine, "after_cursor_execute", _after_execute)
+            event.listen(engine, "handle_error", _failed_execute)
+        _patch_threadpool()
+        app.include_router(router)
+    if slow_ms:
+        app.add_event_handler("shutdown", _start_slow_log().stop)
+
+    app.add_middleware(
+        ProfilingMiddleware,
+        profiling=profiling,
+        slow_threshold=float(slow_ms) / 1000 if slow_ms else None,
+        slow_sample_rate=float(os.getenv("SLOW_REQUEST_SAMPLE_RATE", "1.0"))
+    )
+    return True
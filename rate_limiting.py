@@ -0,0 +1,243 @@
+"""
+Rate limiting and adaptive load shedding for /api requests.
+
+Rate limits (token buckets, refilled continuously)
+    RATE_LIMIT_PER_MINUTE=1500              per access token (the Authorization
+                                            header; the client address if absent)
+    WORKSPACE_RATE_LIMIT_PER_MINUTE=15000   per workspace, for requests naming one
+                                            in the path or ?workspace=
+A request over either limit gets Asana's 429 with a Retry-After header giving
+the seconds until a token is available.
+
+Concurrency limits (AIMD)
+    Requests run in lanes with separate limits, so /batch, bulk task writes and
+    export creation (the "bulk" lane) cannot take the capacity interactive
+    requests need. Each lane's limit grows by one per limit's-worth of requests
+    that finish within the lane's target latency, and is multiplied by
+    CONCURRENCY_BACKOFF when one takes longer or fails. A request arriving at a
+    full lane is shed at once with a 429 rather than queued behind the others.
+
+        CONCURRENCY_TARGET_MS=250 / BULK_CONCURRENCY_TARGET_MS=2000
+        CONCURRENCY_BACKOFF=0.9
+
+Limiter state is exposed on /metrics. Nothing is installed unless
+RATE_LIMITS_ENABLED=1.
+"""
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs
+
+from metrics import COLLECTORS, Counter, Gauge
+
+API_PREFIX = "/api/1.0"
+# Idle buckets beyond this many are evicted, oldest first (an evicted bucket restarts full)
+MAX_BUCKETS = 100_000
+RATE_LIMITED_MESSAGE = "You have made too many requests recently. Please, be chill."
+OVERLOADED_MESSAGE = "The server is handling too many concurrent requests. Please retry shortly."
+
+# Requests placed in the bulk lane: (method, path pattern under API_PREFIX)
+BULK_ROUTES = [
+    ("POST", re.compile(r"^/batch$")),
+    ("POST", re.compile(r"^/tasks/bulk$")),
+    ("POST", re.compile(r"^/(organization_exports|resource_exports|graph_exports)$")),
+]
+WORKSPACE_PATH = re.compile(r"^/workspaces/([^/]+)")
+
+LIMITED = Counter("rate_limited_requests_total", "Requests rejected with 429", ("reason",))
+LANE_LIMIT = Gauge("concurrency_limit", "Current adaptive concurrency limit", ("lane",))
+LANE_IN_FLIGHT = Gauge("concurrency_in_flight", "Requests running in the lane", ("lane",))
+
+
+class TokenBuckets:
+    """Token buckets keyed by client or workspace, refilled at rate tokens per second up to burst"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        # key -> (tokens, updated at)
+        self.buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def take(self, key: str) -> float:
+        """Take a token; returns 0 on success, else the seconds until one is available"""
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated = self.buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate
+            self.buckets[key] = (tokens, now)
+            if len(self.buckets) > MAX_BUCKETS:
+                self.buckets.popitem(last=False)
+            return wait
+
+    def refund(self, key: str):
+        """Return a token taken for a request that a later limit rejected"""
+        with self.lock:
+            if key in self.buckets:
+                tokens, updated = self.buckets[key]
+                self.buckets[key] = (min(self.burst, tokens + 1), updated)
+
+
+class Lane:
+    """AIMD concurrency limit for one class of requests"""
+
+    def __init__(self, name: str, initial: int, minimum: int, maximum: int, target_seconds: float, backoff: float):
+        self.name = name
+        self.limit = float(initial)
+        self.minimum, self.maximum = minimum, maximum
+        self.target_seconds = target_seconds
+        self.backoff = backoff
+        self.in_flight = 0
+        self.decreased_at = 0.0
+        self.lock = threading.Lock()
+        LANE_LIMIT.set(name, value=self.limit)
+
+    def try_acquire(self) -> bool:
+        with self.lock:
+            if self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            LANE_IN_FLIGHT.set(self.name, value=self.in_flight)
+            return True
+
+    def release(self, seconds: float, failed: bool):
+        with self.lock:
+            self.in_flight -= 1
+            if failed or seconds > self.target_seconds:
+                # Back off at most once per target interval, not once per slow request in flight
+                now = time.monotonic()
+                if now - self.decreased_at >= self.target_seconds:
+                    self.limit = max(self.minimum, self.limit * self.backoff)
+                    self.decreased_at = now
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            LANE_IN_FLIGHT.set(self.name, value=self.in_flight)
+            LANE_LIMIT.set(self.name, value=round(self.limit, 2))
+
+
+def _too_many(message: str, retry_after: float):
+    body = json.dumps({"errors": [{"message": message}]}).encode()
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+        (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+    ]
+    return {"type": "http.response.start", "status": 429, "headers": headers}, {"type": "http.response.body", "body": body}
+
+
+class RateLimitMiddleware:
+    """ASGI middleware applying the rate limits and concurrency lanes to /api requests"""
+
+    def __init__(self, app, token_buckets: TokenBuckets, workspace_buckets: TokenBuckets, lanes: Dict[str, Lane]):
+        self.app = app
+        self.token_buckets = token_buckets
+        self.workspace_buckets = workspace_buckets
+        self.lanes = lanes
+
+    @staticmethod
+    def _client_key(scope) -> str:
+        for name, value in scope.get("headers", ()):
+            if name == b"authorization":
+                # Keys are digests so tokens are not kept in memory longer than the request
+                return "token:" + hashlib.sha256(value).hexdigest()[:32]
+        client = scope.get("client")
+        return "client:" + (client[0] if client else "unknown")
+
+    @staticmethod
+    def _workspace(scope, path: str) -> Optional[str]:
+        match = WORKSPACE_PATH.match(path)
+        if match:
+            return match.group(1)
+        query = scope.get("query_string", b"")
+        if b"workspace=" in query:
+            values = parse_qs(query.decode("latin-1")).get("workspace")
+            if values:
+                return values[0]
+        return None
+
+    def _lane(self, method: str, path: str) -> Lane:
+        for bulk_method, pattern in BULK_ROUTES:
+            if method == bulk_method and pattern.match(path):
+                return self.lanes["bulk"]
+        return self.lanes["interactive"]
+
+    async def _reject(self, send, reason: str, message: str, retry_after: float):
+        LIMITED.inc(reason)
+        start, body = _too_many(message, retry_after)
+        await send(start)
+        await send(body)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(API_PREFIX):
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"][len(API_PREFIX):]
+        # A request rejected by a later limit refunds the tokens it took, so it
+        # is not charged against the limits that let it through
+        client_key = self._client_key(scope)
+        wait = self.token_buckets.take(client_key)
+        if wait:
+            await self._reject(send, "token", RATE_LIMITED_MESSAGE, wait)
+            return
+        workspace = self._workspace(scope, path)
+        if workspace is not None:
+            wait = self.workspace_buckets.take(workspace)
+            if wait:
+                self.token_buckets.refund(client_key)
+                await self._reject(send, "workspace", RATE_LIMITED_MESSAGE, wait)
+                return
+
+        lane = self._lane(scope["method"], path)
+        if not lane.try_acquire():
+            self.token_buckets.refund(client_key)
+            if workspace is not None:
+                self.workspace_buckets.refund(workspace)
+            await self._reject(send, f"concurrency_{lane.name}", OVERLOADED_MESSAGE, 1)
+            return
+
+        status = {"code": 500}
+
+        async def lane_send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, lane_send)
+        finally:
+            lane.release(time.perf_counter() - started, status["code"] >= 500)
+
+
+def install_rate_limits(app) -> bool:
+    """Add the rate limiting middleware when RATE_LIMITS_ENABLED=1"""
+    if os.getenv("RATE_LIMITS_ENABLED") != "1":
+        return False
+    per_minute = float(os.getenv("RATE_LIMIT_PER_MINUTE", "1500"))
+    workspace_per_minute = float(os.getenv("WORKSPACE_RATE_LIMIT_PER_MINUTE", "15000"))
+    backoff = float(os.getenv("CONCURRENCY_BACKOFF", "0.9"))
+    lanes = {
+        "interactive": Lane("interactive", 20, 4, 64, float(os.getenv("CONCURRENCY_TARGET_MS", "250")) / 1000, backoff),
+        "bulk": Lane("bulk", 2, 1, 8, float(os.getenv("BULK_CONCURRENCY_TARGET_MS", "2000")) / 1000, backoff),
+    }
+    app.add_middleware(
+        RateLimitMiddleware,
+        # A full minute's allowance may be spent in a burst, as with Asana's per-minute limits
+        token_buckets=TokenBuckets(per_minute / 60, per_minute),
+        workspace_buckets=TokenBuckets(workspace_per_minute / 60, workspace_per_minute),
+        lanes=lanes
+    )
+    COLLECTORS.extend([LIMITED, LANE_LIMIT, LANE_IN_FLIGHT])
+    return True
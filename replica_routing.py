@@ -0,0 +1,86 @@
+"""
+Read-replica routing with read-your-writes.
+
+With REPLICA_URLS set, GET and HEAD requests read from a replica chosen by
+database.replicas (skipping replicas more than REPLICA_MAX_LAG_SECONDS
+behind); other requests, and any write a GET handler makes, use the primary.
+
+After a write request commits, the response carries the primary's WAL
+position (LSN) in the X-Asana-LSN header and an asana_lsn cookie lasting
+READ_YOUR_WRITES_SECONDS. A request presenting either is only served by a
+replica that has replayed that position, or by the primary otherwise, so
+clients see their own writes.
+
+Nothing is installed unless REPLICA_URLS is set.
+"""
+import os
+from typing import Optional
+
+from starlette.requests import cookie_parser
+
+from database import RequestRouting, parse_lsn, replicas, request_routing
+
+LSN_HEADER = "X-Asana-LSN"
+LSN_COOKIE = "asana_lsn"
+READ_ONLY_METHODS = {"GET", "HEAD"}
+
+
+def _required_lsn(scope) -> Optional[int]:
+    """The newest LSN the client presented (header or cookie), if any"""
+    values = []
+    for name, value in scope.get("headers", ()):
+        if name == LSN_HEADER.lower().encode():
+            values.append(value.decode("latin-1"))
+        elif name == b"cookie":
+            cookie = cookie_parser(value.decode("latin-1")).get(LSN_COOKIE)
+            if cookie:
+                values.append(cookie)
+    lsns = []
+    for value in values:
+        try:
+            lsns.append(parse_lsn(value.strip()))
+        except ValueError:
+            continue
+    return max(lsns) if lsns else None
+
+
+class ReadYourWritesMiddleware:
+    """ASGI middleware that marks read-only requests and hands out commit LSNs after writes"""
+
+    def __init__(self, app, sticky_seconds: int):
+        self.app = app
+        self.sticky_seconds = sticky_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        read_only = scope["method"] in READ_ONLY_METHODS
+        routing = RequestRouting(read_only, _required_lsn(scope) if read_only else None)
+
+        async def routed_send(message):
+            if message["type"] == "http.response.start" and routing.commit_lsn:
+                message["headers"] = list(message.get("headers", [])) + [
+                    (LSN_HEADER.lower().encode(), routing.commit_lsn.encode()),
+                    (b"set-cookie", (
+                        f"{LSN_COOKIE}={routing.commit_lsn}; Max-Age={self.sticky_seconds}; "
+                        "Path=/; HttpOnly; SameSite=Lax"
+                    ).encode()),
+                ]
+            await send(message)
+
+        token = request_routing.set(routing)
+        try:
+            await self.app(scope, receive, routed_send)
+        finally:
+            request_routing.reset(token)
+
+
+def install_read_replicas(app) -> bool:
+    """Route reads to replicas and start the lag monitor when REPLICA_URLS is set"""
+    if not replicas.replicas:
+        return False
+    app.add_middleware(ReadYourWritesMiddleware, sticky_seconds=int(os.getenv("READ_YOUR_WRITES_SECONDS", "10")))
+    app.add_event_handler("startup", replicas.start)
+    return True
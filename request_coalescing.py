@@ -0,0 +1,169 @@
+"""
+Single-flight coalescing of identical concurrent GET requests.
+
+When a GET /api request arrives while an identical one is already running,
+it waits for that one and is answered with a copy of its response instead of
+running the handler and its queries again. Requests are identical when they
+have the same path, the same query parameters (in any order) and the same
+credentials (Authorization and Cookie headers, compared by digest) and
+read-your-writes position (X-Asana-LSN).
+
+A request never joins one that may have read the database before a write the
+client could already have seen. Every write request (any method but GET, HEAD
+and OPTIONS) handled by this process bumps a write generation when its response
+starts, which is part of the key, so a GET sent after a write's response runs
+again instead of joining a request that started before it. Writes handled by
+other processes are not seen; for those a request only joins one that started
+at most COALESCE_JOIN_WINDOW_MS earlier, which bounds how stale a shared
+response can be. A shorter window collapses fewer requests.
+
+    COALESCE_GET_REQUESTS=1       enable
+    COALESCE_JOIN_WINDOW_MS=100   only join requests that started at most this long ago
+    COALESCE_MAX_WAIT_MS=2000     a waiting request gives up and runs itself after this long
+    COALESCE_MAX_BYTES=1048576    larger responses are not shared (waiters run themselves)
+
+Responses with a 5xx status, and any Set-Cookie headers, are never shared.
+The layer sits inside the metrics, tracing and profiling middleware, so a
+collapsed request is still counted, traced and timed as its own request.
+Collapsed requests and wait timeouts are counted on /metrics.
+"""
+import asyncio
+import hashlib
+import os
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from metrics import COLLECTORS, Counter
+
+API_PREFIX = "/api/1.0"
+# Request headers that change who is asking, or what they are allowed to see
+KEY_HEADERS = (b"authorization", b"cookie", b"x-asana-lsn")
+UNSHARED_RESPONSE_HEADERS = {b"set-cookie"}
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+COALESCED = Counter("http_requests_coalesced_total", "GET requests answered from an identical in-flight request")
+COALESCE_TIMEOUTS = Counter(
+    "http_requests_coalesce_timeouts_total", "GET requests that stopped waiting for an identical request and ran"
+)
+
+
+class _Flight:
+    """An executing request that identical requests can wait on"""
+    __slots__ = ("started", "done", "response")
+
+    def __init__(self, started: float):
+        self.started = started
+        self.done = asyncio.Event()
+        # (status, headers, body) once finished, if it can be shared
+        self.response: Optional[Tuple[int, List[Tuple[bytes, bytes]], bytes]] = None
+
+
+class CoalescingMiddleware:
+    """ASGI middleware collapsing identical concurrent GET requests into one execution"""
+
+    def __init__(self, app, max_wait_seconds: float, max_bytes: int, join_window_seconds: float):
+        self.app = app
+        self.max_wait_seconds = max_wait_seconds
+        self.max_bytes = max_bytes
+        self.join_window_seconds = join_window_seconds
+        self.in_flight: Dict[Tuple, _Flight] = {}
+        # Bumped when a write request's response starts; part of every key
+        self.write_generation = 0
+
+    def _key(self, scope) -> Tuple:
+        query = scope.get("query_string", b"").decode("latin-1")
+        identity = hashlib.sha256()
+        for name, value in sorted(scope.get("headers", ())):
+            if name in KEY_HEADERS:
+                identity.update(name + b":" + value + b"\n")
+        return (self.write_generation, scope["path"], urlencode(sorted(parse_qsl(query, keep_blank_values=True))),
+                identity.hexdigest())
+
+    async def _write(self, scope, receive, send):
+        async def counting_send(message):
+            if message["type"] == "http.response.start":
+                # The handler has committed; requests from now on must not join earlier reads
+                self.write_generation += 1
+            await send(message)
+
+        await self.app(scope, receive, counting_send)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(API_PREFIX):
+            await self.app(scope, receive, send)
+            return
+        if scope["method"] not in READ_METHODS:
+            await self._write(scope, receive, send)
+            return
+        if scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        key = self._key(scope)
+        now = asyncio.get_running_loop().time()
+        flight = self.in_flight.get(key)
+        if flight is not None and now - flight.started <= self.join_window_seconds:
+            await self._follow(flight, scope, receive, send)
+            return
+
+        # A flight outside the window keeps answering its own followers; later requests join this one
+        flight = self.in_flight[key] = _Flight(now)
+        response = {"status": None, "headers": None, "complete": False}
+        chunks: List[bytes] = []
+        size = 0
+
+        async def recording_send(message):
+            nonlocal size
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = [
+                    (name, value) for name, value in message.get("headers", [])
+                    if name.lower() not in UNSHARED_RESPONSE_HEADERS
+                ]
+            elif message["type"] == "http.response.body":
+                body = message.get("body", b"")
+                size += len(body)
+                if size <= self.max_bytes:
+                    chunks.append(body)
+                if not message.get("more_body", False):
+                    response["complete"] = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, recording_send)
+        finally:
+            if self.in_flight.get(key) is flight:
+                del self.in_flight[key]
+            if response["complete"] and response["status"] < 500 and size <= self.max_bytes:
+                flight.response = (response["status"], response["headers"], b"".join(chunks))
+            flight.done.set()
+
+    async def _follow(self, flight: _Flight, scope, receive, send):
+        try:
+            await asyncio.wait_for(flight.done.wait(), self.max_wait_seconds)
+        except asyncio.TimeoutError:
+            COALESCE_TIMEOUTS.inc()
+            await self.app(scope, receive, send)
+            return
+        if flight.response is None:
+            # The leader failed or its response was not shareable
+            await self.app(scope, receive, send)
+            return
+        COALESCED.inc()
+        status, headers, body = flight.response
+        await send({"type": "http.response.start", "status": status, "headers": list(headers)})
+        await send({"type": "http.response.body", "body": body})
+
+
+def install_request_coalescing(app) -> bool:
+    """Add the coalescing middleware when COALESCE_GET_REQUESTS=1"""
+    if os.getenv("COALESCE_GET_REQUESTS") != "1":
+        return False
+    app.add_middleware(
+        CoalescingMiddleware,
+        max_wait_seconds=float(os.getenv("COALESCE_MAX_WAIT_MS", "2000")) / 1000,
+        max_bytes=int(os.getenv("COALESCE_MAX_BYTES", str(1024 * 1024))),
+        join_window_seconds=float(os.getenv("COALESCE_JOIN_WINDOW_MS", "100")) / 1000
+    )
+    COLLECTORS.extend([COALESCED, COALESCE_TIMEOUTS])
+    return True
@@ -0,0 +1,214 @@
+"""
+Time partitioning and retention for the append-only event tables.
+
+events and audit_log_events are range-partitioned on created_at (daily and
+monthly partitions). Maintenance creates partitions ahead of time and drops
+whole partitions once all their rows are older than the retention period, so
+expiry never runs a DELETE and the tables stay the same size over time:
+
+    EVENT_RETENTION_DAYS=30          events kept (sync tokens older than this are rejected)
+    AUDIT_LOG_RETENTION_DAYS=365     audit log events kept
+
+Convert the tables once, then run maintenance from cron or in the app:
+
+    python retention.py --convert     # partition the tables, then maintain them
+    python retention.py               # create upcoming partitions, drop expired ones
+    PARTITION_MAINTENANCE=1           # run maintenance every PARTITION_MAINTENANCE_INTERVAL_SECONDS
+                                      # (default 3600) in a background thread of the app
+
+Conversion puts rows older than the retention period into one
+{table}_before_{date} partition, which the first maintenance run drops.
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from database import engine, import_models
+from partitioning import convert_table, is_partitioned
+
+logger = logging.getLogger(__name__)
+
+TIME_KEY = "created_at"
+# Serializes maintenance between app instances (pg_advisory_xact_lock key)
+MAINTENANCE_LOCK = 4201
+
+
+class TimePartitioning:
+    """Daily or monthly created_at partitions of one table, kept for retention_days"""
+
+    def __init__(self, table: str, interval: str, retention_days: int, ahead: int):
+        self.table = table
+        self.interval = interval
+        self.retention_days = retention_days
+        # Partitions created beyond the current one
+        self.ahead = ahead
+
+    def floor(self, moment: datetime) -> datetime:
+        moment = moment.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        return moment.replace(day=1) if self.interval == "month" else moment
+
+    def next(self, start: datetime) -> datetime:
+        if self.interval == "month":
+            return (start + timedelta(days=32)).replace(day=1)
+        return start + timedelta(days=1)
+
+    def _format(self, start: datetime) -> str:
+        return start.strftime("%Y%m" if self.interval == "month" else "%Y%m%d")
+
+    def name(self, start: datetime) -> str:
+        return f"{self.table}_p{self._format(start)}"
+
+    def archive_name(self, end: datetime) -> str:
+        return f"{self.table}_before_{end.strftime('%Y%m%d')}"
+
+    def upper_bound(self, partition: str) -> Optional[datetime]:
+        """Exclusive upper bound of a partition created by this policy, from its name"""
+        try:
+            if partition.startswith(f"{self.table}_before_"):
+                return datetime.strptime(partition.rsplit("_", 1)[1], "%Y%m%d").replace(tzinfo=timezone.utc)
+            if partition.startswith(f"{self.table}_p"):
+                suffix = partition[len(self.table) + 2:]
+                start = datetime.strptime(suffix, "%Y%m" if self.interval == "month" else "%Y%m%d")
+                return self.next(start.replace(tzinfo=timezone.utc))
+        except ValueError:
+            pass
+        return None
+
+    def cutoff(self, now: Optional[datetime] = None) -> datetime:
+        """Rows created before this are past retention"""
+        return (now or datetime.now(timezone.utc)) - timedelta(days=self.retention_days)
+
+    def periods(self, start: datetime, end: datetime) -> List[Tuple[str, str]]:
+        """(name, bound) of the partitions covering [floor(start), end]"""
+        partitions = []
+        current = self.floor(start)
+        while current <= end:
+            following = self.next(current)
+            bound = f"FOR VALUES FROM ('{current.isoformat()}') TO ('{following.isoformat()}')"
+            partitions.append((self.name(current), bound))
+            current = following
+        return partitions
+
+    def horizon(self, now: datetime) -> datetime:
+        end = self.floor(now)
+        for _ in range(self.ahead):
+            end = self.next(end)
+        return end
+
+
+POLICIES: Dict[str, TimePartitioning] = {
+    "events": TimePartitioning("events", "day", int(os.getenv("EVENT_RETENTION_DAYS", "30")), ahead=7),
+    "audit_log_events": TimePartitioning(
+        "audit_log_events", "month", int(os.getenv("AUDIT_LOG_RETENTION_DAYS", "365")), ahead=2
+    ),
+}
+
+
+def partitions_of(connection: Connection, table_name: str) -> List[str]:
+    return list(connection.execute(text("""
+        SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(:name) ORDER BY c.relname
+    """), {"name": table_name}).scalars())
+
+
+def convert(connection: Connection, policy: TimePartitioning, now: datetime) -> List[str]:
+    """Range-partition one table on created_at; returns the foreign keys into it that had to be dropped"""
+    connection.execute(text(f"UPDATE {policy.table} SET {TIME_KEY} = now() WHERE {TIME_KEY} IS NULL"))
+    connection.execute(text(f"ALTER TABLE {policy.table} ALTER COLUMN {TIME_KEY} SET NOT NULL"))
+    newest = connection.execute(text(f"SELECT max({TIME_KEY}) FROM {policy.table}")).scalar()
+
+    first = policy.floor(policy.cutoff(now))
+    partitions = [(policy.archive_name(first), f"FOR VALUES FROM (MINVALUE) TO ('{first.isoformat()}')")]
+    partitions += policy.periods(first, max(policy.horizon(now), newest or now))
+    return convert_table(connection, policy.table, TIME_KEY, f"RANGE ({TIME_KEY})", partitions)
+
+
+def maintain(connection: Connection, policy: TimePartitioning, now: datetime) -> Tuple[List[str], List[str]]:
+    """Create the partitions up to the horizon and drop expired ones; returns (created, dropped)"""
+    existing = set(partitions_of(connection, policy.table))
+    created = []
+    for name, bound in policy.periods(now, policy.horizon(now)):
+        if name not in existing:
+            connection.execute(text(f"CREATE TABLE {name} PARTITION OF {policy.table} {bound}"))
+            created.append(name)
+    cutoff = policy.cutoff(now)
+    dropped = []
+    for name in sorted(existing):
+        upper = policy.upper_bound(name)
+        if upper is not None and upper <= cutoff:
+            connection.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    return created, dropped
+
+
+def maintain_all(now: Optional[datetime] = None) -> Dict[str, Tuple[List[str], List[str]]]:
+    """Maintain every partitioned table in POLICIES; unpartitioned tables are skipped"""
+    now = now or datetime.now(timezone.utc)
+    results = {}
+    with engine.begin() as connection:
+        connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MAINTENANCE_LOCK})
+        for table_name, policy in POLICIES.items():
+            if is_partitioned(connection, table_name):
+                results[table_name] = maintain(connection, policy, now)
+    return results
+
+
+def convert_all():
+    import_models()
+    now = datetime.now(timezone.utc)
+    for table_name, policy in POLICIES.items():
+        with engine.begin() as connection:
+            if is_partitioned(connection, table_name):
+                print(f"{table_name}: already partitioned")
+                continue
+            dropped = convert(connection, policy, now)
+        print(f"{table_name}: {policy.interval} partitions on {TIME_KEY}, {policy.retention_days} days retention")
+        for constraint in dropped:
+            print(f"  dropped foreign key {constraint}")
+
+
+def _maintenance_loop(interval: float):
+    while True:
+        try:
+            for table_name, (created, dropped) in maintain_all().items():
+                if created or dropped:
+                    logger.info("%s: created %s, dropped %s", table_name, created, dropped)
+        except Exception:
+            logger.exception("Partition maintenance failed")
+        time.sleep(interval)
+
+
+def install_retention(app) -> bool:
+    """Run partition maintenance in a background thread when PARTITION_MAINTENANCE=1"""
+    if os.getenv("PARTITION_MAINTENANCE") != "1":
+        return False
+    interval = float(os.getenv("PARTITION_MAINTENANCE_INTERVAL_SECONDS", "3600"))
+
+    def start():
+        threading.Thread(target=_maintenance_loop, args=(interval,), name="partition-maintenance", daemon=True).start()
+
+    app.add_event_handler("startup", start)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the time-partitioned event tables")
+    parser.add_argument("--convert", action="store_true", help="partition the tables first (once)")
+    args = parser.parse_args()
+    if args.convert:
+        convert_all()
+    for table_name, (created, dropped) in maintain_all().items():
+        print(f"{table_name}: created {len(created)} partitions, dropped {len(dropped)}")
+        for name in dropped:
+            print(f"  dropped {name}")
+
+
+if __name__ == "__main__":
+    main()
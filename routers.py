@@ -0,0 +1,126 @@
+"""
+Registry of the API routers, and their lazy loading.
+
+Importing the 43 endpoint modules (and the schemas and models they pull in)
+and registering their routes dominates import time, so by default main.py
+does not import them. The routers are loaded on a background
+thread once the server has started, so it can begin accepting connections
+(and answer /health) straight away. A request that needs an API route
+before loading has finished waits for it; without a startup event (e.g. an
+in-process test client) the first such request loads them.
+
+Set LAZY_ROUTERS=0 to include every router at import time instead.
+"""
+import importlib
+import os
+import threading
+from typing import List, Set, Tuple
+
+import anyio
+
+API_PREFIX = "/api/1.0"
+
+# (module in endpoints/, OpenAPI tag), in registration order
+ROUTERS: List[Tuple[str, str]] = [
+    ("events", "Events"),
+    ("audit_log_events", "Audit Log API"),
+    ("goals", "Goals"),
+    ("goal_relationships", "Goal Relationships"),
+    ("jobs", "Jobs"),
+    ("portfolios", "Portfolios"),
+    ("portfolio_memberships", "Portfolio Memberships"),
+    ("projects", "Projects"),
+    ("tasks", "Tasks"),
+    ("sections", "Sections"),
+    ("stories", "Stories"),
+    ("tags", "Tags"),
+    ("teams", "Teams"),
+    ("users", "Users"),
+    ("workspaces", "Workspaces"),
+    ("project_briefs", "Project Briefs"),
+    ("project_statuses", "Project Statuses"),
+    ("project_memberships", "Project Memberships"),
+    ("team_memberships", "Team Memberships"),
+    ("workspace_memberships", "Workspace Memberships"),
+    ("webhooks", "Webhooks"),
+    ("status_updates", "Status Updates"),
+    ("time_periods", "Time Periods"),
+    ("user_task_lists", "User Task Lists"),
+    ("goal_memberships", "Goal Memberships"),
+    ("custom_field_memberships", "Custom Field Memberships"),
+    ("resource_exports", "Resource Exports"),
+    ("graph_exports", "Graph Exports"),
+    ("access_requests", "Access Requests"),
+    ("allocations", "Allocations"),
+    ("attachments", "Attachments"),
+    ("budgets", "Budgets"),
+    ("custom_fields", "Custom Fields"),
+    ("custom_types", "Custom Types"),
+    ("rates", "Rates"),
+    ("reactions", "Reactions"),
+    ("task_templates", "Task Templates"),
+    ("time_tracking_entries", "Time Tracking Entries"),
+    ("batch", "Batch API"),
+    ("organization_exports", "Organization Exports"),
+    ("custom_field_settings", "Custom Field Settings"),
+    ("rules", "Rules"),
+    ("typeahead", "Typeahead"),
+]
+
+# Paths outside API_PREFIX that need every route registered
+DOCS_PATHS = ("/docs", "/docs/oauth2-redirect", "/redoc", "/openapi.json")
+
+
+class RouterLoader:
+    """Includes the registry's routers into the app exactly once"""
+
+    def __init__(self, app):
+        self.app = app
+        self.loaded = threading.Event()
+        self.lock = threading.Lock()
+        self.included: Set[str] = set()
+
+    def load(self):
+        with self.lock:
+            if self.loaded.is_set():
+                return
+            for module, tag in ROUTERS:
+                # A failed load is retried by the next request; skip what is already registered
+                if module in self.included:
+                    continue
+                router = importlib.import_module(f"endpoints.{module}").router
+                self.app.include_router(router, prefix=API_PREFIX, tags=[tag])
+                self.included.add(module)
+            self.loaded.set()
+
+    def load_in_background(self):
+        threading.Thread(target=self.load, name="router-loader", daemon=True).start()
+
+
+class LazyRoutersMiddleware:
+    """ASGI middleware holding back requests for API routes until the routers are loaded"""
+
+    def __init__(self, app, loader: RouterLoader):
+        self.app = app
+        self.loader = loader
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] == "http" and not self.loader.loaded.is_set()
+                and (scope["path"].startswith(API_PREFIX) or scope["path"] in DOCS_PATHS)):
+            # Blocks on the loader's lock if the background load is under way
+            await anyio.to_thread.run_sync(self.loader.load)
+        await self.app(scope, receive, send)
+
+
+def install_routers(app) -> RouterLoader:
+    """
+    Include the API routers, lazily unless LAZY_ROUTERS=0. The loader is kept on
+    app.state.router_loader; tools that inspect app.routes call its load() first.
+    """
+    loader = app.state.router_loader = RouterLoader(app)
+    if os.getenv("LAZY_ROUTERS", "1") == "0":
+        loader.load()
+        return loader
+    app.add_middleware(LazyRoutersMiddleware, loader=loader)
+    app.add_event_handler("startup", loader.load_in_background)
+    return loader
@@ -64,6 +64,47 @@ class AllocationResponseWrapper(BaseModel):
         from_attributes = True
 
 
+class WorkloadDataPoint(BaseModel):
+    """Hours allocated in one period, against capacity"""
+    start_on: date
+    allocated_hours: float = 0
+    capacity_hours: float = 0
+    utilization: Optional[float] = None
+
+
+class WorkloadSeries(BaseModel):
+    """Workload per period of one user or (user empty) the whole team"""
+    user: Optional[UserCompact] = None
+    allocated_hours: float = 0
+    capacity_hours: float = 0
+    over_allocated_days: int = 0
+    data_points: List[WorkloadDataPoint]
+
+
+class WorkloadConflict(BaseModel):
+    """Consecutive days on which a user is allocated beyond capacity"""
+    user: Optional[UserCompact] = None
+    start_on: date
+    end_on: date
+    peak_hours: float
+    excess_hours: float
+
+
+class Workload(BaseModel):
+    """Workload heatmap over a date range"""
+    start_on: date
+    end_on: date
+    granularity: str
+    hours_per_day: float
+    series: List[WorkloadSeries]
+    conflicts: List[WorkloadConflict]
+
+
+class WorkloadResponse(BaseModel):
+    """Workload response wrapper"""
+    data: Workload
+
+
 class EmptyResponse(BaseModel):
     """Empty response"""
     data: Dict = {}
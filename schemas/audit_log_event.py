@@ -0,0 +1,58 @@
+from pydantic import BaseModel
+from typing import Optional, Dict, Any, List
+from datetime import datetime
+from schemas.base import NextPage
+
+
+class AuditLogEventActor(BaseModel):
+    """The entity that triggered the event"""
+    actor_type: str  # "user", "asana", "asana_support", "anonymous", "external_administrator"
+    gid: Optional[str] = None
+    name: Optional[str] = None
+    email: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class AuditLogEventResource(BaseModel):
+    """The primary object the event was triggered for"""
+    resource_type: Optional[str] = None
+    gid: Optional[str] = None
+    name: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class AuditLogEventContext(BaseModel):
+    """Where the event was triggered from"""
+    context_type: str  # "web", "desktop", "mobile", "asana_support", "asana", "email", "api"
+    client_ip_address: Optional[str] = None
+    user_agent: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class AuditLogEventResponse(BaseModel):
+    """Audit log event response schema"""
+    gid: str
+    created_at: datetime
+    event_type: str
+    actor: AuditLogEventActor
+    resource: AuditLogEventResource
+    details: Optional[Dict[str, Any]] = None
+    context: Optional[AuditLogEventContext] = None
+
+    class Config:
+        from_attributes = True
+
+
+class AuditLogEventListResponse(BaseModel):
+    """List of audit log events response"""
+    data: List[AuditLogEventResponse]
+    next_page: Optional[NextPage] = None
+
+    class Config:
+        from_attributes = True
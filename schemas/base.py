@@ -158,3 +158,12 @@ class TagCompact(AsanaNamedResource):
     class Config:
         from_attributes = True
 
+
+class NextPage(BaseModel):
+    """Pagination token for the next page of results"""
+    offset: str
+    path: str
+    uri: str
+
+    class Config:
+        from_attributes = True
@@ -33,6 +33,8 @@ class EventResponse(BaseModel):
 class EventListResponse(BaseModel):
     """List of events response"""
     data: list[EventResponse]
+    sync: Optional[str] = None
+    has_more: Optional[bool] = None
 
     class Config:
         from_attributes = True
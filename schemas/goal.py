@@ -23,6 +23,7 @@ class GoalMetricBase(BaseModel):
     current_display_value: Optional[str] = None
     progress_source: Optional[str] = None  # "manual", "subgoal_progress", etc.
     is_custom_weight: Optional[bool] = None
+    progress: Optional[float] = None  # 0 to 1, rolled up from supporting resources unless manual
 
     class Config:
         from_attributes = True
@@ -4,7 +4,7 @@ from datetime import date, datetime
 from datetime import date, datetime
 from schemas.base import (
     UserCompact, WorkspaceCompact, StatusUpdateCompact,
-    CustomFieldCompact, CustomFieldSettingCompact, ProjectTemplateCompact
+    CustomFieldCompact, CustomFieldSettingCompact, ProjectTemplateCompact, NextPage
 )
 
 
@@ -30,6 +30,31 @@ class PortfolioBase(PortfolioCompact):
         from_attributes = True
 
 
+class PortfolioAggregates(BaseModel):
+    """Rolled up over the distinct projects of a portfolio and its nested portfolios (or of one project)"""
+    num_projects: int = 0
+    num_on_track: int = 0
+    num_at_risk: int = 0
+    num_off_track: int = 0
+    num_on_hold: int = 0
+    num_complete: int = 0
+    num_no_status: int = 0
+    num_tasks: int = 0
+    num_completed_tasks: int = 0
+    num_milestones: int = 0
+    num_completed_milestones: int = 0
+    start_on: Optional[date] = None
+    due_on: Optional[date] = None
+    time_estimate_minutes: Optional[float] = None
+    time_actual_minutes: Optional[float] = None
+    cost_estimate: Optional[float] = None
+    cost_actual: Optional[float] = None
+    cost_units: Optional[str] = None  # currency code, None when cost budgets use several
+
+    class Config:
+        from_attributes = True
+
+
 class PortfolioResponse(PortfolioBase):
     """Full portfolio response"""
     created_at: Optional[datetime] = None
@@ -44,6 +69,18 @@ class PortfolioResponse(PortfolioBase):
     public: Optional[bool] = None
     privacy_setting: Optional[str] = None  # "public_to_domain", "members_only"
     project_templates: Optional[List[ProjectTemplateCompact]] = None
+    aggregates: Optional[PortfolioAggregates] = None
+
+    class Config:
+        from_attributes = True
+
+
+class PortfolioItemResponse(BaseModel):
+    """A project or portfolio in a portfolio, with its aggregates"""
+    gid: str
+    resource_type: str  # "project" or "portfolio"
+    name: str
+    aggregates: PortfolioAggregates
 
     class Config:
         from_attributes = True
@@ -113,6 +150,15 @@ class PortfolioListResponse(BaseModel):
         from_attributes = True
 
 
+class PortfolioItemListResponse(BaseModel):
+    """Portfolio item list response"""
+    data: List[PortfolioItemResponse]
+    next_page: Optional[NextPage] = None
+
+    class Config:
+        from_attributes = True
+
+
 class EmptyResponse(BaseModel):
     """Empty response"""
     data: Dict = {}
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from typing import Optional, List
+from datetime import date
 from decimal import Decimal
 from schemas.base import AsanaResource, UserCompact, ProjectCompact
 
@@ -8,6 +9,7 @@ class RateCompact(AsanaResource):
     """Compact rate representation"""
     rate: Optional[Decimal] = None
     currency_code: Optional[str] = None
+    effective_from: Optional[date] = None
 
     class Config:
         from_attributes = True
@@ -28,6 +30,7 @@ class RateRequest(BaseModel):
     currency_code: Optional[str] = None
     parent: str
     resource: Optional[str] = None
+    effective_from: Optional[date] = None
 
 
 class RateListResponse(BaseModel):
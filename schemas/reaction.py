@@ -25,3 +25,31 @@ class ReactionListResponse(BaseModel):
     data: List[ReactionResponse]
     next_page: Optional[dict] = None
 
+
+
+class ReactionSummaryItem(BaseModel):
+    """Reaction count of one emoji on a target, and whether the viewer is among them"""
+    emoji_base: str
+    variant: Optional[str] = None
+    count: int
+    reacted: bool = False
+
+    class Config:
+        from_attributes = True
+
+
+class ReactionRequest(BaseModel):
+    """Add or remove reaction request"""
+    emoji_base: str
+    emoji_skin_tone: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class ReactionSummaryResponse(BaseModel):
+    """Reaction summary of a target after adding or removing a reaction"""
+    data: List[ReactionSummaryItem]
+
+    class Config:
+        from_attributes = True
@@ -2,6 +2,7 @@ from pydantic import BaseModel
 from typing import Optional, List, Any, Dict
 from datetime import datetime
 from schemas.base import UserCompact, ProjectCompact, Like, StatusUpdateCompact
+from schemas.reaction import ReactionSummaryItem
 
 
 class StatusUpdateBase(StatusUpdateCompact):
@@ -23,7 +24,7 @@ class StatusUpdateResponse(StatusUpdateBase):
     hearts: Optional[List[Like]] = None
     liked: Optional[bool] = None
     likes: Optional[List[Like]] = None
-    reaction_summary: Optional[List[Any]] = None
+    reaction_summary: Optional[List[ReactionSummaryItem]] = None
     modified_at: Optional[datetime] = None
     num_hearts: Optional[int] = None
     num_likes: Optional[int] = None
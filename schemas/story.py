@@ -4,8 +4,9 @@ from datetime import datetime
 from datetime import datetime
 from schemas.base import (
     UserCompact, TaskCompact, ProjectCompact, TagCompact,
-    CustomFieldCompact, SectionCompact, Like
+    CustomFieldCompact, SectionCompact, Like, NextPage
 )
+from schemas.reaction import ReactionSummaryItem
 
 
 class Preview(BaseModel):
@@ -51,6 +52,7 @@ class StoryBase(BaseModel):
 class StoryCompact(StoryBase):
     """Compact story representation"""
     created_by: Optional[UserCompact] = None
+    reaction_summary: Optional[List[ReactionSummaryItem]] = None
 
     class Config:
         from_attributes = True
@@ -68,7 +70,7 @@ class StoryResponse(StoryBase):
     liked: Optional[bool] = None
     likes: Optional[List[Like]] = None
     num_likes: Optional[int] = None
-    reaction_summary: Optional[List[Any]] = None
+    reaction_summary: Optional[List[ReactionSummaryItem]] = None
     previews: Optional[List[Preview]] = None
     old_name: Optional[str] = None
     new_name: Optional[str] = None
@@ -132,6 +134,7 @@ class StoryResponseWrapper(BaseModel):
 class StoryListResponse(BaseModel):
     """Story list response"""
     data: List[StoryCompact]
+    next_page: Optional[NextPage] = None
 
     class Config:
         from_attributes = True
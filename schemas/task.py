@@ -3,7 +3,7 @@ from typing import Optional, List, Dict, Any
 from datetime import date, datetime
 from schemas.base import (
     UserCompact, WorkspaceCompact, ProjectCompact, SectionCompact,
-    TagCompact, CustomFieldCompact, TaskCompact, AsanaResource
+    TagCompact, CustomFieldCompact, TaskCompact, AsanaResource, NextPage
 )
 
 
@@ -59,9 +59,20 @@ class TaskResponse(TaskBase):
         from_attributes = True
 
 
+class SubtaskCompact(TaskCompact):
+    """Subtask entry in a subtree listing"""
+    completed: Optional[bool] = None
+    num_subtasks: Optional[int] = None
+    parent: Optional[TaskCompact] = None
+
+    class Config:
+        from_attributes = True
+
+
 class TaskRequest(BaseModel):
     """Task create request"""
     name: Optional[str] = None
+    resource_subtype: Optional[str] = None
     notes: Optional[str] = None
     html_notes: Optional[str] = None
     completed: Optional[bool] = None
@@ -87,6 +98,7 @@ class TaskRequest(BaseModel):
 class TaskUpdateRequest(BaseModel):
     """Task update request"""
     name: Optional[str] = None
+    resource_subtype: Optional[str] = None
     notes: Optional[str] = None
     html_notes: Optional[str] = None
     completed: Optional[bool] = None
@@ -157,7 +169,7 @@ class TaskRemoveTagRequest(BaseModel):
 
 class TaskSetParentRequest(BaseModel):
     """Set task parent request"""
-    parent: str
+    parent: Optional[str] = None
     insert_after: Optional[str] = None
     insert_before: Optional[str] = None
 
@@ -203,6 +215,43 @@ class TaskCountResponse(BaseModel):
         from_attributes = True
 
 
+class TaskBulkAction(BaseModel):
+    """One action of a bulk task request"""
+    action: str  # "create", "update", "move", "delete"
+    task: Optional[str] = None  # gid of the task to update, move or delete
+    data: Optional[Dict[str, Any]] = None  # TaskRequest, TaskUpdateRequest or TaskBulkMoveRequest fields
+
+    class Config:
+        from_attributes = True
+
+
+class TaskBulkMoveRequest(BaseModel):
+    """Bulk move action data: put the task in a project/section, optionally leaving another project"""
+    project: Optional[str] = None
+    section: Optional[str] = None
+    from_project: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class TaskBulkRequest(BaseModel):
+    """Bulk task request"""
+    actions: List[TaskBulkAction]
+
+    class Config:
+        from_attributes = True
+
+
+class TaskBulkResult(BaseModel):
+    """Result of one bulk action, shaped like a batch API response"""
+    status_code: int
+    body: Optional[Dict[str, Any]] = None
+
+    class Config:
+        from_attributes = True
+
+
 # Response wrappers
 class TaskResponseWrapper(BaseModel):
     """Task response wrapper"""
@@ -220,6 +269,15 @@ class TaskListResponse(BaseModel):
         from_attributes = True
 
 
+class SubtaskListResponse(BaseModel):
+    """Subtask list response"""
+    data: List[SubtaskCompact]
+    next_page: Optional[NextPage] = None
+
+    class Config:
+        from_attributes = True
+
+
 class TaskCountResponseWrapper(BaseModel):
     """Task count response wrapper"""
     data: TaskCountResponse
@@ -228,6 +286,14 @@ class TaskCountResponseWrapper(BaseModel):
         from_attributes = True
 
 
+class TaskBulkResponse(BaseModel):
+    """Bulk task response, one result per action in request order"""
+    data: List[TaskBulkResult]
+
+    class Config:
+        from_attributes = True
+
+
 class EmptyResponse(BaseModel):
     """Empty response"""
     data: Dict = {}
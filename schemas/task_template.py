@@ -41,4 +41,5 @@ class TaskTemplateInstantiateRequest(BaseModel):
     """Task template instantiate request"""
     name: Optional[str] = None
     project: Optional[str] = None
+    count: Optional[int] = 1
 
@@ -32,6 +32,7 @@ class TimeTrackingEntryRequest(BaseModel):
     entered_on: date
     task: str
     attributable_to: Optional[str] = None
+    billable_status: Optional[str] = None
     description: Optional[str] = None
 
 
@@ -45,3 +46,28 @@ class TimeTrackingEntryResponseWrapper(BaseModel):
     """Single time tracking entry response wrapper"""
     data: TimeTrackingEntryResponse
 
+
+class TimeTrackingReportDataPoint(BaseModel):
+    """Minutes tracked in one period"""
+    start_on: date
+    actual_time_minutes: int = 0
+
+
+class TimeTrackingReportSeries(BaseModel):
+    """Minutes tracked per period, by one user or (user empty) the whole workspace"""
+    user: Optional[UserCompact] = None
+    actual_time_minutes: int = 0
+    data_points: List[TimeTrackingReportDataPoint]
+
+
+class TimeTrackingReport(BaseModel):
+    """Time tracking report over a date range"""
+    start_on: date
+    end_on: date
+    granularity: str
+    series: List[TimeTrackingReportSeries]
+
+
+class TimeTrackingReportResponse(BaseModel):
+    """Time tracking report response wrapper"""
+    data: TimeTrackingReport
@@ -12,6 +12,8 @@ from models.task import Task
 from models.section import Section
 from models.tag import Tag
 from models.goal import Goal
+from models.goal_metric import GoalMetric
+from models.goal_relationship import GoalRelationship
 from models.portfolio import Portfolio
 from models.custom_field import CustomField
 from models.enum_option import EnumOption
@@ -35,6 +37,22 @@ from models.project_membership import ProjectMembership
 from models.portfolio_membership import PortfolioMembership
 from models.custom_field_setting import CustomFieldSetting
 from models.job import Job
+from models.task_membership import TaskMembership
+from models.project_task_count import ProjectTaskCount
+from models.reaction_summary import ReactionSummary
+from models.task_dependency import TaskDependency
+from services.reactions import add_grouped_reaction_counts
+from services.time_rollups import add_grouped_time_totals
+from services.budgets import recompute_budgets
+from services.goal_progress import recompute_goal_progress
+from services.portfolio_rollups import add_nesting, ensure_closure, refresh_rollups
+from models.portfolio_item import PortfolioItem
+from models.portfolio_closure import PortfolioClosure
+from models.portfolio_rollup import PortfolioRollup
+from models.task_time_total import TaskTimeTotal
+from models.project_time_total import ProjectTimeTotal
+from models.user_daily_time import UserDailyTime
+from models.workspace_daily_time import WorkspaceDailyTime
 
 
 def generate_gid():
@@ -48,10 +66,16 @@ def clear_database(db):
     try:
         # Delete in reverse order of dependencies
         db.query(Job).delete()
+        db.query(TaskTimeTotal).delete()
+        db.query(ProjectTimeTotal).delete()
+        db.query(UserDailyTime).delete()
+        db.query(WorkspaceDailyTime).delete()
         db.query(TimeTrackingEntry).delete()
+        db.query(ReactionSummary).delete()
         db.query(Reaction).delete()
         db.query(Story).delete()
         db.query(ProjectBrief).delete()
+        db.query(Project).update({Project.current_status_update_id: None})
         db.query(ProjectStatus).delete()
         db.query(Attachment).delete()
         db.query(AccessRequest).delete()
@@ -66,11 +90,19 @@ def clear_database(db):
         db.query(CustomField).delete()
         db.query(ProjectMembership).delete()
         db.query(PortfolioMembership).delete()
+        db.query(PortfolioRollup).delete()
+        db.query(PortfolioClosure).delete()
+        db.query(PortfolioItem).delete()
         db.query(TeamMembership).delete()
         db.query(WorkspaceMembership).delete()
+        db.query(TaskMembership).delete()
+        db.query(TaskDependency).delete()
+        db.query(ProjectTaskCount).delete()
         db.query(Task).delete()
         db.query(Section).delete()
         db.query(Tag).delete()
+        db.query(GoalRelationship).delete()
+        db.query(GoalMetric).delete()
         db.query(Goal).delete()
         db.query(Portfolio).delete()
         db.query(Project).delete()
@@ -535,6 +567,8 @@ def seed_database():
             )
             db.add(entry)
             time_entries.append(entry)
+        db.flush()
+        add_grouped_time_totals(db)
         db.commit()
         for entry in time_entries:
             db.refresh(entry)
@@ -566,6 +600,8 @@ def seed_database():
         )
         db.add(budget1)
         db.add(budget2)
+        db.flush()
+        recompute_budgets(db)
         db.commit()
         db.refresh(budget1)
         db.refresh(budget2)
@@ -593,6 +629,33 @@ def seed_database():
             db.refresh(allocation)
         print(f"Created {len(allocations)} allocations")
         
+        # Create Goal Metrics: a manual goal, and a goal rolled up from its subgoal's project completion
+        print("Creating goal metrics...")
+        metric_data = [
+            (goals[0], {"progress_source": "subgoal_progress", "unit": "percentage", "target_number_value": 100}),
+            (goals[1], {"progress_source": "project_task_completion", "unit": "percentage", "target_number_value": 100}),
+            (goals[2], {"progress_source": "manual", "unit": "none", "target_number_value": 10, "current_number_value": 4}),
+        ]
+        for goal, m_data in metric_data:
+            metric = GoalMetric(gid=generate_gid(), goal_id=goal.id, initial_number_value=0, progress=0, **m_data)
+            db.add(metric)
+            db.flush()
+            goal.metric_id = metric.id
+        supporting = [("goal", goals[1].id, goals[0])] + [("project", project.id, goals[1]) for project in projects[:2]]
+        for kind, resource_id, supported in supporting:
+            db.add(GoalRelationship(
+                gid=generate_gid(),
+                resource_subtype="subgoal" if kind == "goal" else "supporting_work",
+                supporting_goal_id=resource_id if kind == "goal" else None,
+                supporting_resource_type=kind,
+                supporting_resource_id=resource_id,
+                supported_goal_id=supported.id
+            ))
+        db.flush()
+        recompute_goal_progress(db, [goal.id for goal in goals])
+        db.commit()
+        print(f"Created {len(metric_data)} goal metrics and {len(supporting)} supporting relationships")
+        
         # Create Access Requests
         print("Creating access requests...")
         access_request1 = AccessRequest(
@@ -636,6 +699,7 @@ def seed_database():
                 host="example.com",
                 parent_id=att_data["task"].id,
                 parent_type="task",
+                workspace_id=att_data["task"].workspace_id,
                 created_by_id=users[0].id
             )
             db.add(attachment)
@@ -668,8 +732,27 @@ def seed_database():
         db.commit()
         db.refresh(project_status1)
         db.refresh(project_status2)
+        projects[0].current_status_update_id = project_status1.id
+        projects[1].current_status_update_id = project_status2.id
+        db.commit()
         print("Created project statuses")
         
+        # Create Portfolio Items: Strategic Initiatives is nested in the Q1 portfolio
+        print("Creating portfolio items...")
+        ensure_closure(db, [portfolio1.id, portfolio2.id])
+        db.add_all([
+            PortfolioItem(portfolio_id=portfolio1.id, project_id=projects[0].id),
+            PortfolioItem(portfolio_id=portfolio1.id, project_id=projects[1].id),
+            PortfolioItem(portfolio_id=portfolio1.id, item_portfolio_id=portfolio2.id),
+            PortfolioItem(portfolio_id=portfolio2.id, project_id=projects[1].id),
+            PortfolioItem(portfolio_id=portfolio2.id, project_id=projects[2].id),
+            PortfolioItem(portfolio_id=portfolio2.id, project_id=projects[3].id),
+        ])
+        add_nesting(db, portfolio1.id, portfolio2.id)
+        db.commit()
+        refresh_rollups(db, [portfolio1.id, portfolio2.id])
+        print("Created portfolio items")
+        
         # Create Project Briefs
         print("Creating project briefs...")
         brief1 = ProjectBrief(
@@ -697,7 +780,9 @@ def seed_database():
                 gid=generate_gid(),
                 text=f"Updated {task.name}",
                 type="comment",
+                resource_subtype="comment_added",
                 task_id=task.id,
+                workspace_id=task.workspace_id,
                 created_by_id=users[0].id
             )
             db.add(story)
@@ -728,6 +813,8 @@ def seed_database():
             )
             db.add(reaction1)
             db.add(reaction2)
+            db.flush()
+            add_grouped_reaction_counts(db)
             db.commit()
             print("Created reactions")
         
@@ -766,6 +853,7 @@ def seed_database():
                 membership = ProjectMembership(
                     gid=generate_gid(),
                     project_id=project.id,
+                    workspace_id=project.workspace_id,
                     user_id=user.id,
                     write_access=True
                 )
@@ -0,0 +1,250 @@
+"""
+Budget actuals computed from tracked time and effective rates.
+
+A time budget's actual is the minutes tracked against its project; a cost
+budget's actual is the cost of those minutes, each entry priced at the rate in
+effect for its user, project and day. Rates apply from their effective_from
+(no date: from the beginning) until the next rate for the same user and
+project; a rate without a resource is the project's default for users without
+one. Entries are costed in whole cents, rounding half up, and only count
+towards budgets whose actual_billable_status_filter matches.
+
+actual_value is kept current as entries change (a delta per affected budget,
+in the same transaction), and recomputed for a project when its rates or
+budgets change. Full recomputations resolve rates for every entry at once
+with numpy; run one after loading data or to repair drift with
+python -m services.maintenance budgets.
+"""
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select, update, bindparam, func, or_
+from sqlalchemy.orm import Session
+
+from models.budget import Budget
+from models.rate import Rate
+from models.time_tracking_entry import TimeTrackingEntry
+from services.counters import reconcile_in_batches
+from services.portfolio_rollups import invalidate_projects
+
+# Index order of the per-status totals in recompute_budgets
+BILLABLE_STATUSES = ("billable", "non_billable")
+DEFAULT_BILLABLE_STATUS = "billable"
+TIME_UNITS = "minutes"
+
+# Bits of a rate lookup key taken by the day (date ordinals are below 2 ** 21)
+DAY_BITS = 21
+
+
+def counts_towards(billable_status_filter: Optional[str], billable_status: Optional[str]) -> bool:
+    """Whether an entry with billable_status counts towards a budget with this filter"""
+    if billable_status_filter in (None, "any"):
+        return True
+    return billable_status_filter == (billable_status or DEFAULT_BILLABLE_STATUS)
+
+
+def to_cents(value) -> int:
+    return int((Decimal(value) * 100).to_integral_value(ROUND_HALF_UP))
+
+
+def entry_cost_cents(minutes: int, rate_cents: int) -> int:
+    """Cost of minutes at an hourly rate, in cents rounded half up"""
+    return (minutes * rate_cents + 30) // 60
+
+
+def resolve_rate_cents(db: Session, project_id: int, user_id: Optional[int], day: Optional[date]) -> int:
+    """Hourly rate in cents in effect for a user on a project on a day (0 if none)"""
+    in_effect = Rate.effective_from.is_(None) if day is None else or_(
+        Rate.effective_from.is_(None), Rate.effective_from <= day
+    )
+    rate = db.execute(
+        select(Rate.rate)
+        .where(Rate.parent_id == project_id, or_(Rate.resource_id == user_id, Rate.resource_id.is_(None)), in_effect)
+        # The user's own rate before the project default; the latest start, then the latest rate, wins
+        .order_by(Rate.resource_id.is_(None), Rate.effective_from.desc().nullslast(), Rate.id.desc())
+        .limit(1)
+    ).scalar()
+    return to_cents(rate) if rate is not None else 0
+
+
+def _apply_budget_deltas(db: Session, deltas: Dict[int, Decimal]):
+    """Add to actual_value in budget id order, so concurrent writers lock in the same order"""
+    for budget_id in sorted(deltas):
+        if deltas[budget_id]:
+            db.execute(
+                update(Budget)
+                .where(Budget.id == budget_id)
+                .values(actual_value=func.coalesce(Budget.actual_value, 0) + deltas[budget_id])
+            )
+
+
+def record_entry_budget_change(db: Session, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]):
+    """Move an entry's time and cost between the budgets it counts towards (None: created or deleted)"""
+    deltas: Dict[int, Decimal] = {}
+    budgets: Dict[int, List[Tuple[int, Optional[str], Optional[str]]]] = {}
+    for state, sign in ((old, -1), (new, 1)):
+        if not state or not state["duration_minutes"] or state["attributable_to_id"] is None:
+            continue
+        project_id = state["attributable_to_id"]
+        if project_id not in budgets:
+            budgets[project_id] = db.execute(
+                select(Budget.id, Budget.budget_type, Budget.actual_billable_status_filter)
+                .where(Budget.parent_id == project_id)
+            ).all()
+        rate_cents = None
+        for budget_id, budget_type, billable_status_filter in budgets[project_id]:
+            if not counts_towards(billable_status_filter, state["billable_status"]):
+                continue
+            if budget_type == "time":
+                value = Decimal(state["duration_minutes"])
+            else:
+                if rate_cents is None:
+                    rate_cents = resolve_rate_cents(db, project_id, state["user_id"], state["entered_on"])
+                value = Decimal(entry_cost_cents(state["duration_minutes"], rate_cents)) / 100
+            deltas[budget_id] = deltas.get(budget_id, Decimal(0)) + sign * value
+    _apply_budget_deltas(db, deltas)
+    if any(deltas.values()):
+        invalidate_projects(db, [project_id for project_id, rows in budgets.items() if rows])
+
+
+def _lookup(entry_pairs: np.ndarray, entry_days: np.ndarray,
+            rate_pairs: np.ndarray, rate_days: np.ndarray, rate_values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    For each entry, the value of the latest rate of the same (project, resource) pair starting
+    on or before its day: an interval index built by sorting (pair, start) keys once and
+    binary searching every entry in it. Returns (found, values).
+    """
+    found = np.zeros(len(entry_days), dtype=bool)
+    values = np.zeros(len(entry_days), dtype=np.int64)
+    if not len(rate_days) or not len(entry_days):
+        return found, values
+
+    # Dense ids for the (project, resource) pairs, so a pair and a day fit in one int64 key
+    _, groups = np.unique(np.concatenate([rate_pairs, entry_pairs]), axis=0, return_inverse=True)
+    groups = groups.reshape(-1).astype(np.int64)
+    rate_groups, entry_groups = groups[:len(rate_days)], groups[len(rate_days):]
+
+    rate_keys = (rate_groups << DAY_BITS) | rate_days
+    # Stable, so of two rates with the same start the later one (rates come in id order) wins
+    order = np.argsort(rate_keys, kind="stable")
+    sorted_keys = rate_keys[order]
+    position = np.searchsorted(sorted_keys, (entry_groups << DAY_BITS) | entry_days, side="right") - 1
+    clipped = np.clip(position, 0, None)
+    found = (position >= 0) & ((sorted_keys[clipped] >> DAY_BITS) == entry_groups)
+    values = np.where(found, rate_values[order][clipped], 0)
+    return found, values
+
+
+def entry_costs_cents(projects: np.ndarray, users: np.ndarray, days: np.ndarray, minutes: np.ndarray,
+                      rate_projects: np.ndarray, rate_users: np.ndarray, rate_days: np.ndarray,
+                      rate_cents: np.ndarray) -> np.ndarray:
+    """
+    Vectorized cost of every entry in cents. users and rate_users use 0 for no user
+    (a rate's 0 is the project default); days are date ordinals, 0 for no date.
+    """
+    specific = rate_users != 0
+    found, own = _lookup(
+        np.column_stack([projects, users]), days,
+        np.column_stack([rate_projects[specific], rate_users[specific]]), rate_days[specific], rate_cents[specific]
+    )
+    _, default = _lookup(
+        np.column_stack([projects, np.zeros_like(users)]), days,
+        np.column_stack([rate_projects[~specific], rate_users[~specific]]), rate_days[~specific],
+        rate_cents[~specific]
+    )
+    rates = np.where(found, own, default)
+    return (minutes * rates + 30) // 60
+
+
+def _ordinal(day: Optional[date]) -> int:
+    return day.toordinal() if day else 0
+
+
+def recompute_budgets(db: Session, project_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Recompute actual_value of the budgets of the given projects (all budgets if None),
+    locking them first like the counter reconcilers (services/counters.py).
+    Returns the number of budgets whose actual_value changed.
+    """
+    query = select(Budget.id, Budget.parent_id, Budget.budget_type, Budget.actual_billable_status_filter,
+                   Budget.actual_value, Budget.actual_units).order_by(Budget.id).with_for_update()
+    if project_ids is not None:
+        project_ids = sorted(set(project_ids))
+        if not project_ids:
+            return 0
+        query = query.where(Budget.parent_id.in_(project_ids))
+    budgets = db.execute(query).all()
+    budget_projects = sorted({budget.parent_id for budget in budgets if budget.parent_id is not None})
+    if not budget_projects:
+        return 0
+
+    entries = db.execute(
+        select(TimeTrackingEntry.attributable_to_id, TimeTrackingEntry.user_id, TimeTrackingEntry.entered_on,
+               TimeTrackingEntry.billable_status, TimeTrackingEntry.duration_minutes)
+        .where(TimeTrackingEntry.attributable_to_id.in_(budget_projects),
+               TimeTrackingEntry.duration_minutes.isnot(None))
+    ).all()
+    rates = db.execute(
+        select(Rate.parent_id, Rate.resource_id, Rate.effective_from, Rate.rate)
+        .where(Rate.parent_id.in_(budget_projects), Rate.rate.isnot(None))
+        .order_by(Rate.id)
+    ).all()
+
+    projects = np.array([entry[0] for entry in entries], dtype=np.int64)
+    minutes = np.array([entry[4] for entry in entries], dtype=np.int64)
+    costs = entry_costs_cents(
+        projects,
+        np.array([entry[1] or 0 for entry in entries], dtype=np.int64),
+        np.array([_ordinal(entry[2]) for entry in entries], dtype=np.int64),
+        minutes,
+        np.array([rate[0] for rate in rates], dtype=np.int64),
+        np.array([rate[1] or 0 for rate in rates], dtype=np.int64),
+        np.array([_ordinal(rate[2]) for rate in rates], dtype=np.int64),
+        np.array([to_cents(rate[3]) for rate in rates], dtype=np.int64),
+    )
+
+    # Minutes and cents per (project, billable status), summed with one bincount each
+    project_index = {project_id: index for index, project_id in enumerate(budget_projects)}
+    statuses = np.array([entry[3] or DEFAULT_BILLABLE_STATUS for entry in entries], dtype=object)
+    billable = (statuses == "non_billable").astype(np.int64)
+    cells = np.searchsorted(np.array(budget_projects, dtype=np.int64), projects) * len(BILLABLE_STATUSES) + billable
+    size = len(budget_projects) * len(BILLABLE_STATUSES)
+    minute_totals = np.bincount(cells, weights=minutes, minlength=size).astype(np.int64)
+    cent_totals = np.bincount(cells, weights=costs, minlength=size).astype(np.int64)
+
+    changes = []
+    for budget in budgets:
+        if budget.parent_id is None:
+            continue
+        base = project_index[budget.parent_id] * len(BILLABLE_STATUSES)
+        totals = minute_totals if budget.budget_type == "time" else cent_totals
+        total = sum(
+            int(totals[base + index]) for index, status in enumerate(BILLABLE_STATUSES)
+            if counts_towards(budget.actual_billable_status_filter, status)
+        )
+        value = Decimal(total) if budget.budget_type == "time" else Decimal(total) / 100
+        units = TIME_UNITS if budget.budget_type == "time" else budget.actual_units
+        if budget.actual_value is None or Decimal(budget.actual_value) != value or units != budget.actual_units:
+            changes.append({"budget_id": budget.id, "actual_value": value, "actual_units": units})
+
+    if changes:
+        db.execute(
+            update(Budget.__table__)
+            .where(Budget.__table__.c.id == bindparam("budget_id"))
+            .values(actual_value=bindparam("actual_value"), actual_units=bindparam("actual_units")),
+            changes
+        )
+        changed = {change["budget_id"] for change in changes}
+        invalidate_projects(db, [budget.parent_id for budget in budgets if budget.id in changed])
+    return len(changes)
+
+
+def recompute_all_budgets(db: Session, batch_size: int = 500) -> int:
+    """Recompute every project's budgets; returns the number changed"""
+    project_ids = [row[0] for row in db.execute(
+        select(Budget.parent_id).where(Budget.parent_id.isnot(None)).distinct().order_by(Budget.parent_id)
+    ).all()]
+    return reconcile_in_batches(db, project_ids, batch_size, recompute_budgets)
+
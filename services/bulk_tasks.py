@@ -0,0 +1,577 @@
+"""
+Bulk task mutations behind POST /tasks/bulk.
+
+A batch of create/update/move/delete actions is validated up front, every
+referenced gid is resolved with one IN query per table, and each phase is
+written with a handful of set-based statements:
+
+    create  ids pre-allocated from the tasks sequence, multi-row INSERT ... RETURNING
+    update  one UPDATE tasks ... FROM (VALUES ...) per distinct set of changed columns
+    move    multi-row membership INSERT, UPDATE ... FROM (VALUES ...) for sections, DELETE
+    delete  DELETE ... WHERE id IN (...)
+
+Referenced tasks are locked in id order when they are resolved, so the
+deltas below are computed from values no concurrent request can change.
+num_subtasks and project task counters are folded into one statement each,
+and the system stories for updates and moves into multi-row INSERTs.
+Phases run in the order create, update, move, delete, and an action cannot
+refer to a task created in the same batch. Results are reported per action,
+in request order, shaped like /batch responses; the caller commits once.
+"""
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy import (
+    select, insert, update, delete, func, values, column, cast, case, or_,
+    Integer, String, Text, Boolean, Date, DateTime
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from audit_log import audit_core_writes
+from models.task import Task
+from models.user import User
+from models.project import Project
+from models.section import Section
+from models.story import Story
+from models.task_membership import TaskMembership
+from models.task_dependency import TaskDependency
+from schemas.task import TaskBulkAction, TaskRequest, TaskUpdateRequest, TaskBulkMoveRequest
+from services.subtasks import adjust_subtask_counts
+from services.system_stories import SystemStories, TRACKED_FIELDS, delete_task_stories
+from services.goal_progress import record_supporting_change, remove_supporting_resources
+from services.time_rollups import delete_task_time
+from services.task_counts import (
+    COUNTER_COLUMNS, task_count_vector, vector_difference, apply_task_count_deltas
+)
+from utils import generate_gid
+
+MAX_BULK_ACTIONS = 5000
+# Upper bound on rows per INSERT / VALUES list, to keep statement size reasonable
+STATEMENT_CHUNK_ROWS = 1000
+
+ACTIONS = ("create", "update", "move", "delete")
+
+# Updatable task columns and their SQL types, for casting VALUES columns
+UPDATE_COLUMNS = {
+    "name": String(255),
+    "resource_subtype": String(50),
+    "notes": Text(),
+    "completed": Boolean(),
+    "due_on": Date(),
+    "due_at": DateTime(timezone=True),
+    "start_on": Date(),
+    "assignee_id": Integer(),
+    "assignee_status": String(50),
+}
+
+
+class BulkActionError(Exception):
+    """A single action failed; the rest of the batch carries on"""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+def _error(status_code: int, message: str) -> Dict[str, Any]:
+    return {"status_code": status_code, "body": {"errors": [{"message": message}]}}
+
+
+def _ok(status_code: int, data: Dict[str, Any]) -> Dict[str, Any]:
+    return {"status_code": status_code, "body": {"data": data}}
+
+
+def _compact(gid: str, name: str, resource_subtype: Optional[str]) -> Dict[str, Any]:
+    return {
+        "gid": gid,
+        "resource_type": "task",
+        "name": name,
+        "resource_subtype": resource_subtype or "default_task"
+    }
+
+
+def _chunks(rows: List[Any]):
+    for start in range(0, len(rows), STATEMENT_CHUNK_ROWS):
+        yield rows[start:start + STATEMENT_CHUNK_ROWS]
+
+
+def _insert_stories(db: Session, stories: SystemStories):
+    for chunk in _chunks(stories.rows(db)):
+        db.execute(insert(Story.__table__).values(chunk))
+
+
+def _add_vector(deltas: Dict[int, Dict[str, int]], project_id: int, vector: Dict[str, int], sign: int = 1):
+    delta = deltas.setdefault(project_id, dict.fromkeys(COUNTER_COLUMNS, 0))
+    for counter in COUNTER_COLUMNS:
+        delta[counter] += sign * vector[counter]
+
+
+def _parse(action: TaskBulkAction):
+    """Validate one action's data into its request model"""
+    if action.action not in ACTIONS:
+        raise BulkActionError(400, f"Unknown action: {action.action}. Expected one of {', '.join(ACTIONS)}")
+    if action.action != "create" and not action.task:
+        raise BulkActionError(400, f"The {action.action} action requires a task gid")
+    try:
+        if action.action == "create":
+            return TaskRequest.model_validate(action.data or {})
+        if action.action == "update":
+            return TaskUpdateRequest.model_validate(action.data or {})
+        if action.action == "move":
+            move = TaskBulkMoveRequest.model_validate(action.data or {})
+            if not (move.project or move.section or move.from_project):
+                raise BulkActionError(400, "The move action requires a project, section or from_project")
+            return move
+    except ValidationError as e:
+        error = e.errors()[0]
+        raise BulkActionError(400, f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}")
+    return None
+
+
+class _References:
+    """Every gid referenced by the batch, resolved with one query per table"""
+
+    def __init__(self, db: Session, parsed: List[Tuple[int, TaskBulkAction, Any]]):
+        task_gids, user_gids, project_gids, section_gids = set(), set(), set(), set()
+        for _, action, payload in parsed:
+            if action.task:
+                task_gids.add(action.task)
+            if action.action == "create":
+                if payload.parent:
+                    task_gids.add(payload.parent)
+                project_gids.update(payload.projects or [])
+            if action.action in ("create", "update") and payload.assignee:
+                user_gids.add(payload.assignee)
+            if action.action == "move":
+                project_gids.update(gid for gid in (payload.project, payload.from_project) if gid)
+                if payload.section:
+                    section_gids.add(payload.section)
+
+        self.tasks = {}
+        if task_gids:
+            # Mutable copies, so later phases see the effect of earlier updates; locked in id order
+            self.tasks = {
+                row.gid: SimpleNamespace(**row._asdict()) for row in db.execute(
+                    select(
+                        Task.id, Task.gid, Task.name, Task.parent_id, Task.completed, Task.resource_subtype,
+                        Task.workspace_id, Task.assignee_id, Task.due_on, Task.due_at
+                    ).where(Task.gid.in_(task_gids)).order_by(Task.id).with_for_update()
+                ).all()
+            }
+        self.users = dict(db.execute(select(User.gid, User.id).where(User.gid.in_(user_gids))).all()) if user_gids else {}
+        self.projects = dict(
+            db.execute(select(Project.gid, Project.id).where(Project.gid.in_(project_gids))).all()
+        ) if project_gids else {}
+        self.sections = {
+            row.gid: row for row in db.execute(
+                select(Section.gid, Section.id, Section.project_id).where(Section.gid.in_(section_gids))
+            ).all()
+        } if section_gids else {}
+
+    def task(self, gid: str, label: str = "Task"):
+        row = self.tasks.get(gid)
+        if row is None:
+            raise BulkActionError(404, f"{label} not found: {gid}")
+        return row
+
+    def user(self, gid: str) -> int:
+        if gid not in self.users:
+            raise BulkActionError(404, f"Assignee not found: {gid}")
+        return self.users[gid]
+
+    def project(self, gid: str) -> int:
+        if gid not in self.projects:
+            raise BulkActionError(404, f"Project not found: {gid}")
+        return self.projects[gid]
+
+    def section(self, gid: str):
+        if gid not in self.sections:
+            raise BulkActionError(404, f"Section not found: {gid}")
+        return self.sections[gid]
+
+
+def _create_tasks(db: Session, refs: _References, items, results: List[Optional[Dict[str, Any]]]):
+    rows, memberships, parent_deltas, counter_deltas, index_by_id = [], [], defaultdict(int), {}, {}
+    planned = []
+    for index, _, payload in items:
+        try:
+            workspace_id = None
+            if payload.workspace:
+                try:
+                    workspace_id = int(payload.workspace)
+                except ValueError:
+                    raise BulkActionError(400, "Invalid workspace GID format")
+            assignee_id = refs.user(payload.assignee) if payload.assignee else None
+            parent_id = refs.task(payload.parent, "Parent task").id if payload.parent else None
+            project_ids = sorted({refs.project(gid) for gid in payload.projects or []})
+        except BulkActionError as e:
+            results[index] = _error(e.status_code, e.message)
+            continue
+        planned.append((index, payload, workspace_id, assignee_id, parent_id, project_ids))
+
+    if not planned:
+        return
+    new_ids = db.scalars(
+        select(func.nextval(func.pg_get_serial_sequence("tasks", "id"))).select_from(func.generate_series(1, len(planned)))
+    ).all()
+
+    for task_id, (index, payload, workspace_id, assignee_id, parent_id, project_ids) in zip(new_ids, planned):
+        completed = bool(payload.completed)
+        subtype = payload.resource_subtype or "default_task"
+        rows.append({
+            "id": task_id,
+            "gid": generate_gid(),
+            "resource_type": "task",
+            "resource_subtype": subtype,
+            "name": payload.name or "New Task",
+            "notes": payload.notes,
+            "completed": completed,
+            "completed_at": func.now() if completed else None,
+            "due_on": payload.due_on,
+            "due_at": payload.due_at,
+            "start_on": payload.start_on,
+            "assignee_id": assignee_id,
+            "assignee_status": None,
+            "workspace_id": workspace_id,
+            "parent_id": parent_id,
+            "num_subtasks": 0,
+            "num_likes": 0,
+            "custom_field_values": payload.custom_fields or None,
+        })
+        index_by_id[task_id] = index
+        if parent_id is not None:
+            parent_deltas[parent_id] += 1
+        vector = task_count_vector(completed, subtype)
+        for project_id in project_ids:
+            memberships.append({"task_id": task_id, "project_id": project_id})
+            _add_vector(counter_deltas, project_id, vector)
+
+    tasks = Task.__table__
+    for chunk in _chunks(rows):
+        created = db.execute(
+            insert(tasks).values(chunk).returning(
+                tasks.c.id, tasks.c.gid, tasks.c.name, tasks.c.resource_subtype, tasks.c.workspace_id
+            )
+        ).all()
+        for row in created:
+            results[index_by_id[row.id]] = _ok(201, _compact(row.gid, row.name, row.resource_subtype))
+        audit_core_writes(db, "tasks", "created", created)
+    for chunk in _chunks(memberships):
+        db.execute(insert(TaskMembership.__table__).values(chunk))
+    adjust_subtask_counts(db, parent_deltas)
+    apply_task_count_deltas(db, counter_deltas)
+
+
+def _update_tasks(db: Session, refs: _References, items, results: List[Optional[Dict[str, Any]]]):
+    # Later actions on the same task override earlier ones, as if applied in order
+    changes: Dict[int, Dict[str, Any]] = {}
+    current: Dict[int, Any] = {}
+    owners: Dict[int, List[int]] = defaultdict(list)
+    for index, action, payload in items:
+        try:
+            task = refs.task(action.task)
+            assignee_id = refs.user(payload.assignee) if payload.assignee else None
+        except BulkActionError as e:
+            results[index] = _error(e.status_code, e.message)
+            continue
+        fields = changes.setdefault(task.id, {})
+        for name in ("name", "resource_subtype", "notes", "completed", "due_on", "due_at", "start_on", "assignee_status"):
+            value = getattr(payload, name)
+            if value is not None:
+                fields[name] = value
+        if assignee_id is not None:
+            fields["assignee_id"] = assignee_id
+        current[task.id] = task
+        owners[task.id].append(index)
+
+    groups: Dict[Tuple[str, ...], List[Tuple[int, Dict[str, Any]]]] = defaultdict(list)
+    counter_changes = {}
+    completion_changes = []
+    stories = SystemStories()
+    for task_id, fields in changes.items():
+        task = current[task_id]
+        if "completed" in fields and fields["completed"] == bool(task.completed):
+            del fields["completed"]
+        for name in TRACKED_FIELDS:
+            if name in fields and fields[name] != getattr(task, name):
+                stories.task_changed(task_id, task.workspace_id, name, getattr(task, name), fields[name])
+        new_completed = fields.get("completed", task.completed)
+        new_subtype = fields.get("resource_subtype", task.resource_subtype)
+        delta = vector_difference(
+            task_count_vector(new_completed, new_subtype),
+            task_count_vector(task.completed, task.resource_subtype)
+        )
+        if any(delta.values()):
+            counter_changes[task_id] = delta
+        if "completed" in fields:
+            completion_changes.append(task_id)
+        if fields:
+            groups[tuple(sorted(fields))].append((task_id, fields))
+
+    tasks = Task.__table__
+    for names, group in groups.items():
+        for chunk in _chunks(sorted(group, key=lambda item: item[0])):
+            # Typed columns keep NULL-only and literal-only VALUES columns castable
+            changed = values(
+                column("id", Integer), *[column(name, UPDATE_COLUMNS[name]) for name in names],
+                name="task_changes"
+            ).data([(task_id, *[fields[name] for name in names]) for task_id, fields in chunk])
+            assignments = {name: cast(changed.c[name], UPDATE_COLUMNS[name]) for name in names}
+            if "completed" in names:
+                assignments["completed_at"] = case(
+                    (cast(changed.c.completed, Boolean), func.now()), else_=None
+                )
+            assignments["updated_at"] = func.now()
+            db.execute(update(tasks).where(tasks.c.id == changed.c.id).values(assignments))
+    _insert_stories(db, stories)
+
+    if counter_changes:
+        counter_deltas = {}
+        for task_id, project_id in db.execute(
+            select(TaskMembership.task_id, TaskMembership.project_id).where(
+                TaskMembership.task_id.in_(list(counter_changes))
+            )
+        ).all():
+            _add_vector(counter_deltas, project_id, counter_changes[task_id])
+        apply_task_count_deltas(db, counter_deltas)
+    record_supporting_change(db, "task", completion_changes)
+
+    audited = []
+    for task_id, indexes in owners.items():
+        task = current[task_id]
+        for name, value in changes[task_id].items():
+            setattr(task, name, value)
+        if changes[task_id]:
+            changed_fields = set(changes[task_id])
+            if "completed" in changed_fields:
+                changed_fields.add("completed_at")
+            audited.append(SimpleNamespace(
+                gid=task.gid, name=task.name, workspace_id=task.workspace_id, changed_fields=changed_fields
+            ))
+        compact = _compact(task.gid, task.name, task.resource_subtype)
+        for index in indexes:
+            results[index] = _ok(200, compact)
+    audit_core_writes(db, "tasks", "changed", audited)
+
+
+def _move_tasks(db: Session, refs: _References, items, results: List[Optional[Dict[str, Any]]]):
+    resolved = []
+    for index, action, payload in items:
+        try:
+            task = refs.task(action.task)
+            section = refs.section(payload.section) if payload.section else None
+            project_id = refs.project(payload.project) if payload.project else None
+            if section is not None:
+                if project_id is not None and section.project_id != project_id:
+                    raise BulkActionError(400, "Section does not belong to the project")
+                project_id = section.project_id
+            from_project_id = refs.project(payload.from_project) if payload.from_project else None
+        except BulkActionError as e:
+            results[index] = _error(e.status_code, e.message)
+            continue
+        resolved.append((index, task, project_id, section.id if section else None, from_project_id))
+    if not resolved:
+        return
+
+    rows = db.execute(
+        select(TaskMembership.id, TaskMembership.task_id, TaskMembership.project_id, TaskMembership.section_id).where(
+            TaskMembership.task_id.in_({task.id for _, task, _, _, _ in resolved})
+        )
+    ).all()
+    # (task_id, project_id) -> membership id, or None for memberships this batch will insert
+    existing = {(row.task_id, row.project_id): row.id for row in rows}
+    state = dict(existing)
+    inserts: Dict[Tuple[int, int], Optional[int]] = {}
+    section_updates: Dict[int, Optional[int]] = {}
+    removals = set()
+    counter_deltas = {}
+
+    for index, task, project_id, section_id, from_project_id in resolved:
+        vector = task_count_vector(task.completed, task.resource_subtype)
+        if project_id is not None:
+            key = (task.id, project_id)
+            if key not in state:
+                state[key] = None
+                inserts[key] = section_id
+                _add_vector(counter_deltas, project_id, vector)
+            elif state[key] is None:
+                if section_id is not None:
+                    inserts[key] = section_id
+            elif section_id is not None:
+                section_updates[state[key]] = section_id
+        if from_project_id is not None and from_project_id != project_id:
+            key = (task.id, from_project_id)
+            if key in state:
+                if state[key] is None:
+                    inserts.pop(key, None)
+                else:
+                    removals.add(state[key])
+                    section_updates.pop(state[key], None)
+                del state[key]
+                _add_vector(counter_deltas, from_project_id, vector, sign=-1)
+        results[index] = _ok(200, _compact(task.gid, task.name, task.resource_subtype))
+
+    membership_rows = [
+        {"task_id": task_id, "project_id": project_id, "section_id": section_id}
+        for (task_id, project_id), section_id in sorted(inserts.items())
+    ]
+    for chunk in _chunks(membership_rows):
+        db.execute(insert(TaskMembership.__table__).values(chunk))
+
+    memberships = TaskMembership.__table__
+    for chunk in _chunks(sorted(section_updates.items())):
+        moved = values(
+            column("id", Integer), column("section_id", Integer), name="section_moves"
+        ).data(chunk)
+        db.execute(
+            update(memberships)
+            .where(memberships.c.id == moved.c.id)
+            .values(section_id=cast(moved.c.section_id, Integer))
+        )
+    if removals:
+        db.execute(delete(memberships).where(memberships.c.id.in_(sorted(removals))))
+    apply_task_count_deltas(db, counter_deltas)
+
+    workspaces = {task.id: task.workspace_id for _, task, _, _, _ in resolved}
+    by_id = {row.id: row for row in rows}
+    stories = SystemStories()
+    for task_id, project_id in sorted(inserts):
+        stories.added_to_project(task_id, workspaces[task_id], project_id)
+    for membership_id, section_id in sorted(section_updates.items()):
+        row = by_id[membership_id]
+        if row.section_id != section_id:
+            stories.section_changed(row.task_id, workspaces[row.task_id], row.project_id, row.section_id, section_id)
+    for membership_id in sorted(removals):
+        row = by_id[membership_id]
+        stories.removed_from_project(row.task_id, workspaces[row.task_id], row.project_id)
+    _insert_stories(db, stories)
+
+
+def _delete_tasks(db: Session, refs: _References, items, results: List[Optional[Dict[str, Any]]]):
+    targets: Dict[int, Any] = {}
+    owners: Dict[int, List[int]] = defaultdict(list)
+    for index, action, _ in items:
+        try:
+            task = refs.task(action.task)
+        except BulkActionError as e:
+            results[index] = _error(e.status_code, e.message)
+            continue
+        targets[task.id] = task
+        owners[task.id].append(index)
+    if not targets:
+        return
+
+    # Tasks with subtasks outside the batch would leave orphans behind
+    blocked = set(db.scalars(
+        select(Task.parent_id).where(Task.parent_id.in_(list(targets)), Task.id.notin_(list(targets))).distinct()
+    ).all())
+    while blocked:
+        for task_id in blocked:
+            for index in owners.pop(task_id):
+                results[index] = _error(400, "Cannot delete task: it has subtasks. Delete its subtasks first.")
+        # A kept task in turn keeps its parent, if that parent was in the batch
+        blocked = {targets.pop(task_id).parent_id for task_id in blocked} & set(targets)
+    if not targets:
+        return
+
+    deleted = _delete_rows(db, sorted(targets))
+    audit_core_writes(db, "tasks", "deleted", [targets[task_id] for task_id in sorted(deleted)])
+    for task_id in targets:
+        if task_id not in deleted:
+            for index in owners[task_id]:
+                results[index] = _error(
+                    400,
+                    "Cannot delete task: it has dependent records (e.g., stories, attachments). "
+                    "Please delete dependent records first."
+                )
+            continue
+        for index in owners[task_id]:
+            results[index] = _ok(200, {})
+
+
+def _delete_rows(db: Session, task_ids: List[int]) -> set:
+    """
+    Delete tasks with their memberships and dependencies, keeping counters in step.
+    Runs as one set of statements; if a foreign key blocks it, falls back to one
+    savepoint per task so the deletable tasks still go through. Returns the deleted ids.
+    """
+    try:
+        with db.begin_nested():
+            _delete_statements(db, task_ids)
+        return set(task_ids)
+    except IntegrityError:
+        pass
+
+    deleted = set()
+    for task_id in task_ids:
+        try:
+            with db.begin_nested():
+                _delete_statements(db, [task_id])
+            deleted.add(task_id)
+        except IntegrityError:
+            continue
+    return deleted
+
+
+def _delete_statements(db: Session, task_ids: List[int]):
+    doomed = set(task_ids)
+    rows = db.execute(
+        select(Task.id, Task.parent_id, Task.completed, Task.resource_subtype)
+        .where(Task.id.in_(task_ids)).order_by(Task.id).with_for_update()
+    ).all()
+    parent_deltas = defaultdict(int)
+    vectors = {}
+    for row in rows:
+        if row.parent_id is not None and row.parent_id not in doomed:
+            parent_deltas[row.parent_id] -= 1
+        vectors[row.id] = task_count_vector(row.completed, row.resource_subtype)
+
+    counter_deltas = {}
+    for task_id, project_id in db.execute(
+        select(TaskMembership.task_id, TaskMembership.project_id).where(TaskMembership.task_id.in_(task_ids))
+    ).all():
+        _add_vector(counter_deltas, project_id, vectors[task_id], sign=-1)
+
+    adjust_subtask_counts(db, parent_deltas)
+    apply_task_count_deltas(db, counter_deltas)
+    remove_supporting_resources(db, "task", task_ids)
+    delete_task_time(db, task_ids)
+    delete_task_stories(db, task_ids)
+    db.execute(delete(TaskMembership.__table__).where(TaskMembership.__table__.c.task_id.in_(task_ids)))
+    db.execute(
+        delete(TaskDependency.__table__).where(or_(
+            TaskDependency.__table__.c.task_id.in_(task_ids),
+            TaskDependency.__table__.c.dependency_id.in_(task_ids)
+        ))
+    )
+    # A single statement, so parent/child pairs deleted together satisfy the self-referencing key
+    db.execute(delete(Task.__table__).where(Task.__table__.c.id.in_(task_ids)))
+
+
+def execute_bulk(db: Session, actions: List[TaskBulkAction]) -> List[Dict[str, Any]]:
+    """
+    Run a batch of task actions and return one result per action, in request order.
+    Actions that fail validation or reference missing objects get an error result
+    without affecting the others. Does not commit.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(actions)
+    parsed = []
+    for index, action in enumerate(actions):
+        try:
+            parsed.append((index, action, _parse(action)))
+        except BulkActionError as e:
+            results[index] = _error(e.status_code, e.message)
+
+    refs = _References(db, parsed)
+    by_action = defaultdict(list)
+    for item in parsed:
+        by_action[item[1].action].append(item)
+
+    _create_tasks(db, refs, by_action["create"], results)
+    _update_tasks(db, refs, by_action["update"], results)
+    _move_tasks(db, refs, by_action["move"], results)
+    _delete_tasks(db, refs, by_action["delete"], results)
+    db.flush()
+    return results
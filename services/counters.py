@@ -0,0 +1,67 @@
+"""
+Shared mechanics of the incrementally maintained counter tables (project task
+counts, reaction summaries, time rollups).
+
+Writers add deltas with add_to_counters() in the same transaction as the
+change. Rows are written in key order, so concurrent writers lock in the same
+order and cannot deadlock on each other.
+
+Reconcilers lock the stored rows of a batch first, so writers that have applied
+a delta but not yet committed are waited for instead of being overwritten; they
+then recompute the values from the source table and add the differences as one
+more delta. reconcile_in_batches() walks every key, committing after each batch.
+"""
+from typing import Any, Callable, Dict, Hashable, List, Sequence, TypeVar, Union
+
+from sqlalchemy import Select, Table, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+Key = TypeVar("Key", bound=Hashable)
+
+
+def add_to_counters(db: Session, table: Table, keys: Sequence[str], counters: Sequence[str],
+                    source: Union[List[Dict[str, Any]], Select]) -> List[Dict[str, Any]]:
+    """
+    Add to the counters of the rows identified by keys, creating missing rows, with one
+    upsert. source is a list of row dicts (rows whose counters are all zero are skipped)
+    or a SELECT of the key and counter columns, for INSERT ... SELECT after bulk loads.
+    Returns the row dicts written (none for a SELECT).
+    """
+    rows: List[Dict[str, Any]] = []
+    if isinstance(source, Select):
+        stmt = insert(table).from_select([*keys, *counters], source)
+    else:
+        rows = sorted(
+            (row for row in source if any(row[counter] for counter in counters)),
+            key=lambda row: tuple(row[key] for key in keys)
+        )
+        if not rows:
+            return rows
+        stmt = insert(table).values(rows)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c[key] for key in keys],
+        set_={**{counter: table.c[counter] + stmt.excluded[counter] for counter in counters},
+              "updated_at": func.now()}
+    ))
+    return rows
+
+
+def differences(stored: Dict[Key, int], actual: Dict[Key, int]) -> Dict[Key, int]:
+    """Delta that brings each stored value to its actual value (missing keys count as 0)"""
+    changed = {}
+    for key in stored.keys() | actual.keys():
+        difference = actual.get(key, 0) - stored.get(key, 0)
+        if difference:
+            changed[key] = difference
+    return changed
+
+
+def reconcile_in_batches(db: Session, keys: List[Key], batch_size: int,
+                         reconcile: Callable[[Session, List[Key]], int]) -> int:
+    """Run reconcile over keys in batches, committing after each; returns the sum of its results"""
+    total = 0
+    for start in range(0, len(keys), batch_size):
+        total += reconcile(db, keys[start:start + batch_size])
+        db.commit()
+    return total
@@ -0,0 +1,293 @@
+"""
+Set-based task and project duplication.
+
+A copy takes a fixed handful of INSERT ... SELECT statements however large the
+subtree is. New ids are pre-allocated from the table sequences into temporary
+old_id -> new_id maps, so parent links, section memberships, dependencies and
+stories are remapped in SQL rather than row by row through the ORM.
+"""
+from typing import Any, Dict, Optional, Set
+from sqlalchemy import (
+    Table, Column, Integer, String, MetaData, select, insert, update, func, literal, cast, false
+)
+from sqlalchemy.orm import Session, aliased
+from models.task import Task
+from models.project import Project
+from models.section import Section
+from models.story import Story
+from models.task_membership import TaskMembership
+from models.task_dependency import TaskDependency
+from models.project_membership import ProjectMembership
+from services.subtasks import subtree_cte, adjust_subtask_count
+from services.task_counts import add_grouped_task_counts
+from utils import generate_gid
+
+TASK_INCLUDE_OPTIONS = {
+    "assignee", "dates", "dependencies", "notes", "parent", "projects", "stories", "subtasks"
+}
+PROJECT_INCLUDE_OPTIONS = {
+    "members", "notes", "task_assignee", "task_dates", "task_dependencies",
+    "task_notes", "task_stories", "task_subtasks"
+}
+
+
+def parse_include(include: Optional[str], allowed: Set[str]) -> Set[str]:
+    """Parse a comma-separated include list, rejecting unknown options"""
+    options = {option.strip() for option in include.split(",") if option.strip()} if include else set()
+    unknown = options - allowed
+    if unknown:
+        raise ValueError(f"Unknown include option(s): {', '.join(sorted(unknown))}")
+    return options
+
+
+def _new_gid():
+    """Server-side equivalent of utils.generate_gid() for INSERT ... SELECT"""
+    return cast(func.gen_random_uuid(), String)
+
+
+def _create_id_map(db: Session, name: str) -> Table:
+    """Temporary old_id -> new_id table, dropped when the job's transaction commits"""
+    id_map = Table(
+        name, MetaData(),
+        Column("old_id", Integer, primary_key=True),
+        Column("new_id", Integer, nullable=False),
+        prefixes=["TEMPORARY"],
+        postgresql_on_commit="DROP"
+    )
+    id_map.create(db.connection())
+    return id_map
+
+
+def _fill_id_map(db: Session, id_map: Table, source_ids, table_name: str):
+    """Reserve one new id from table_name's sequence for every id in source_ids"""
+    source = source_ids.subquery()
+    db.execute(
+        insert(id_map).from_select(
+            ["old_id", "new_id"],
+            select(source.c.id, func.nextval(func.pg_get_serial_sequence(table_name, "id")))
+        )
+    )
+
+
+def _copy_tasks(db: Session, task_map: Table, include_notes: bool, include_assignee: bool,
+                include_dates: bool, day_offset: int = 0):
+    """
+    Copy every task in task_map in one INSERT ... SELECT. Parents inside the map are
+    remapped; parents outside it are dropped. Copies start incomplete.
+    """
+    parent_map = task_map.alias("parent_map")
+    shift = literal(day_offset, Integer)
+    columns = {
+        "id": task_map.c.new_id,
+        "gid": _new_gid(),
+        "resource_type": Task.resource_type,
+        "resource_subtype": Task.resource_subtype,
+        "name": Task.name,
+        "completed": false(),
+        "workspace_id": Task.workspace_id,
+        "parent_id": parent_map.c.new_id,
+        "num_subtasks": literal(0, Integer),
+        "num_likes": literal(0, Integer),
+        "custom_field_values": Task.custom_field_values,
+    }
+    if include_notes:
+        columns["notes"] = Task.notes
+    if include_assignee:
+        columns["assignee_id"] = Task.assignee_id
+        columns["assignee_status"] = Task.assignee_status
+    if include_dates:
+        columns["due_on"] = Task.due_on + shift if day_offset else Task.due_on
+        columns["start_on"] = Task.start_on + shift if day_offset else Task.start_on
+        columns["due_at"] = Task.due_at + func.make_interval(0, 0, 0, day_offset) if day_offset else Task.due_at
+
+    db.execute(
+        insert(Task.__table__).from_select(
+            list(columns),
+            select(*columns.values())
+            .select_from(Task)
+            .join(task_map, task_map.c.old_id == Task.id)
+            .outerjoin(parent_map, parent_map.c.old_id == Task.parent_id)
+        )
+    )
+
+    # num_subtasks from what was actually copied, in one grouped UPDATE
+    copied = select(Task.parent_id.label("parent_id"), func.count().label("num_subtasks")).where(
+        Task.id.in_(select(task_map.c.new_id)), Task.parent_id.isnot(None)
+    ).group_by(Task.parent_id).subquery()
+    db.execute(
+        update(Task.__table__)
+        .where(Task.__table__.c.id == copied.c.parent_id)
+        .values(num_subtasks=copied.c.num_subtasks)
+    )
+
+
+def _copy_dependencies(db: Session, task_map: Table):
+    """Copy dependencies of mapped tasks; dependencies inside the copy point at the new tasks"""
+    dependency_map = task_map.alias("dependency_map")
+    db.execute(
+        insert(TaskDependency.__table__).from_select(
+            ["task_id", "dependency_id"],
+            select(task_map.c.new_id, func.coalesce(dependency_map.c.new_id, TaskDependency.dependency_id))
+            .select_from(TaskDependency)
+            .join(task_map, task_map.c.old_id == TaskDependency.task_id)
+            .outerjoin(dependency_map, dependency_map.c.old_id == TaskDependency.dependency_id)
+        )
+    )
+
+
+def _copy_stories(db: Session, task_map: Table):
+    db.execute(
+        insert(Story.__table__).from_select(
+            ["gid", "resource_type", "text", "html_text", "type", "resource_subtype", "is_pinned", "created_by_id",
+             "task_id", "workspace_id", "created_at"],
+            select(
+                _new_gid(), Story.resource_type, Story.text, Story.html_text, Story.type, Story.resource_subtype,
+                Story.is_pinned, Story.created_by_id, task_map.c.new_id, Story.workspace_id, Story.created_at
+            )
+            .select_from(Story)
+            .join(task_map, task_map.c.old_id == Story.task_id)
+        )
+    )
+
+
+def _task_compact(task: Task) -> Dict[str, Any]:
+    return {
+        "gid": task.gid,
+        "resource_type": task.resource_type,
+        "name": task.name,
+        "resource_subtype": task.resource_subtype or "default_task"
+    }
+
+
+def duplicate_task(db: Session, task_id: int, name: Optional[str], include: Set[str]) -> Dict[str, Any]:
+    """Duplicate a task (and optionally its whole subtree). Returns the new task's compact record."""
+    original = db.get(Task, task_id)
+    task_map = _create_id_map(db, "task_id_map")
+
+    source_ids = select(literal(task_id, Integer).label("id"))
+    if "subtasks" in include:
+        tree = subtree_cte(task_id)
+        source_ids = source_ids.union_all(select(tree.c.id))
+    _fill_id_map(db, task_map, source_ids, "tasks")
+
+    _copy_tasks(
+        db, task_map,
+        include_notes="notes" in include,
+        include_assignee="assignee" in include,
+        include_dates="dates" in include
+    )
+
+    if "projects" in include:
+        db.execute(
+            insert(TaskMembership.__table__).from_select(
+                ["task_id", "project_id", "section_id"],
+                select(task_map.c.new_id, TaskMembership.project_id, TaskMembership.section_id)
+                .select_from(TaskMembership)
+                .join(task_map, task_map.c.old_id == TaskMembership.task_id)
+            )
+        )
+        add_grouped_task_counts(db, TaskMembership.task_id.in_(select(task_map.c.new_id)))
+    if "dependencies" in include:
+        _copy_dependencies(db, task_map)
+    if "stories" in include:
+        _copy_stories(db, task_map)
+
+    new_task = db.get(Task, db.scalar(select(task_map.c.new_id).where(task_map.c.old_id == task_id)))
+    new_task.name = name or f"Duplicate of {original.name}"
+    if "parent" in include and original.parent_id:
+        new_task.parent_id = original.parent_id
+        adjust_subtask_count(db, original.parent_id, 1)
+    db.flush()
+
+    return _task_compact(new_task)
+
+
+def _project_task_ids(project_id: int, include_subtasks: bool):
+    """Ids of the project's tasks, plus every level of their subtasks when requested"""
+    member_ids = select(TaskMembership.task_id.label("id")).where(TaskMembership.project_id == project_id)
+    if not include_subtasks:
+        return member_ids
+
+    tree = member_ids.cte("project_task_tree", recursive=True)
+    child = aliased(Task)
+    # UNION so member tasks that are also subtasks of other members appear once
+    tree = tree.union(select(child.id).join(tree, child.parent_id == tree.c.id))
+    return select(tree.c.id)
+
+
+def duplicate_project(db: Session, project_id: int, name: str, include: Set[str],
+                      team_id: Optional[int] = None, day_offset: int = 0) -> Dict[str, Any]:
+    """Duplicate a project with its sections and tasks. Returns the new project's compact record."""
+    original = db.get(Project, project_id)
+    new_project = Project(
+        gid=generate_gid(),
+        resource_type="project",
+        name=name,
+        notes=original.notes if "notes" in include else None,
+        color=original.color,
+        default_view=original.default_view,
+        due_date=original.due_date,
+        start_on=original.start_on,
+        workspace_id=original.workspace_id,
+        team_id=team_id or original.team_id,
+        owner_id=original.owner_id,
+        public=original.public
+    )
+    db.add(new_project)
+    db.flush()
+
+    section_map = _create_id_map(db, "section_id_map")
+    _fill_id_map(db, section_map, select(Section.id.label("id")).where(Section.project_id == project_id), "sections")
+    db.execute(
+        insert(Section.__table__).from_select(
+            ["id", "gid", "resource_type", "name", "project_id"],
+            select(section_map.c.new_id, _new_gid(), Section.resource_type, Section.name, literal(new_project.id, Integer))
+            .select_from(Section)
+            .join(section_map, section_map.c.old_id == Section.id)
+        )
+    )
+
+    task_map = _create_id_map(db, "task_id_map")
+    _fill_id_map(db, task_map, _project_task_ids(project_id, "task_subtasks" in include), "tasks")
+    _copy_tasks(
+        db, task_map,
+        include_notes="task_notes" in include,
+        include_assignee="task_assignee" in include,
+        include_dates="task_dates" in include,
+        day_offset=day_offset
+    )
+
+    db.execute(
+        insert(TaskMembership.__table__).from_select(
+            ["task_id", "project_id", "section_id"],
+            select(task_map.c.new_id, literal(new_project.id, Integer), section_map.c.new_id)
+            .select_from(TaskMembership)
+            .join(task_map, task_map.c.old_id == TaskMembership.task_id)
+            .outerjoin(section_map, section_map.c.old_id == TaskMembership.section_id)
+            .where(TaskMembership.project_id == project_id)
+        )
+    )
+    add_grouped_task_counts(db, TaskMembership.project_id == new_project.id)
+
+    if "task_dependencies" in include:
+        _copy_dependencies(db, task_map)
+    if "task_stories" in include:
+        _copy_stories(db, task_map)
+    if "members" in include:
+        db.execute(
+            insert(ProjectMembership.__table__).from_select(
+                ["gid", "resource_type", "user_id", "team_id", "project_id", "workspace_id", "write_access"],
+                select(
+                    _new_gid(), ProjectMembership.resource_type, ProjectMembership.user_id,
+                    ProjectMembership.team_id, literal(new_project.id, Integer),
+                    literal(new_project.workspace_id, Integer), ProjectMembership.write_access
+                ).where(ProjectMembership.project_id == project_id)
+            )
+        )
+
+    return {
+        "gid": new_project.gid,
+        "resource_type": new_project.resource_type,
+        "name": new_project.name,
+        "resource_subtype": None
+    }
@@ -0,0 +1,279 @@
+"""
+Goal progress rolled up the goal graph.
+
+A goal's progress (0 to 1) is stored on its goal_metrics row. Manual goals
+take it from their metric's current value; other goals average, weighted by
+contribution_weight when is_custom_weight is set and equally otherwise, the
+progress of their supporting resources of the progress_source's type:
+
+    subgoal_progress               supporting goals (and subgoals by parent_goal_id)
+    project_task_completion        share of the supporting projects' tasks completed
+    project_milestone_completion   share of the supporting projects' milestones completed
+    task_completion                supporting tasks completed
+
+Supporting goals without a metric, and projects without tasks (or milestones),
+are left out of the average. When an input changes - a metric, a relationship,
+a task's completion or a project's task counters - the goals it supports and
+their ancestors are recomputed in topological order in the same transaction,
+so reads serve the stored progress without traversing the graph.
+recompute_all_goal_progress() (python -m services.maintenance goal_progress)
+recomputes every goal to repair any drift.
+"""
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import select, update, bindparam, delete, true
+from sqlalchemy.orm import Session
+from models.goal import Goal
+from models.goal_metric import GoalMetric
+from models.goal_relationship import GoalRelationship
+from models.project import Project
+from models.project_task_count import ProjectTaskCount
+from models.task import Task
+
+SUPPORTING_TYPES = ("goal", "project", "task")
+# progress_source -> type of the supporting resources it averages (None: set by hand)
+PROGRESS_SOURCES = {
+    "manual": None,
+    "subgoal_progress": "goal",
+    "project_task_completion": "project",
+    "project_milestone_completion": "project",
+    "task_completion": "task",
+}
+
+PROGRESS_PLACES = 6
+VALUE_PLACES = 4
+
+SUPPORTING_MODELS = {"goal": Goal, "project": Project, "task": Task}
+
+# (supporting resource type, id, contribution weight)
+Supporter = Tuple[str, int, Optional[Decimal]]
+
+
+def _clamp(value: float) -> float:
+    return min(1.0, max(0.0, value))
+
+
+def manual_progress(initial: Optional[Decimal], target: Optional[Decimal], current: Optional[Decimal]) -> float:
+    """How far current is from initial towards target"""
+    if target is None or current is None:
+        return 0.0
+    initial = initial or Decimal(0)
+    if target == initial:
+        return 1.0 if current == target else 0.0
+    return _clamp(float((current - initial) / (target - initial)))
+
+
+def rolled_up_value(initial: Optional[Decimal], target: Optional[Decimal], progress: float) -> Optional[Decimal]:
+    """The current value a rolled up goal's progress stands for"""
+    if target is None:
+        return None
+    initial = initial or Decimal(0)
+    return round(initial + (target - initial) * Decimal(str(progress)), VALUE_PLACES)
+
+
+def display_value(value: Optional[Decimal], unit: Optional[str], precision: Optional[int]) -> Optional[str]:
+    if value is None:
+        return None
+    text = f"{value:,.{precision or 0}f}"
+    return f"{text}%" if unit == "percentage" else text
+
+
+def supported_goals(db: Session, resource_type: str, resource_ids: Iterable[int]) -> Set[int]:
+    """Goals the resources directly support"""
+    resource_ids = sorted(set(resource_ids))
+    if not resource_ids:
+        return set()
+    goal_ids = {row[0] for row in db.execute(
+        select(GoalRelationship.supported_goal_id).where(
+            GoalRelationship.supporting_resource_type == resource_type,
+            GoalRelationship.supporting_resource_id.in_(resource_ids),
+            GoalRelationship.supported_goal_id.isnot(None)
+        )
+    ).all()}
+    if resource_type == "goal":
+        goal_ids |= {row[0] for row in db.execute(
+            select(Goal.parent_goal_id).where(Goal.id.in_(resource_ids), Goal.parent_goal_id.isnot(None))
+        ).all()}
+    return goal_ids
+
+
+def ancestors(db: Session, goal_ids: Iterable[int]) -> Set[int]:
+    """The goals and every goal they support transitively, one query per level"""
+    found = set(goal_ids)
+    frontier = set(found)
+    while frontier:
+        frontier = supported_goals(db, "goal", frontier) - found
+        found |= frontier
+    return found
+
+
+def creates_cycle(db: Session, supporting_goal_id: int, supported_goal_id: int) -> bool:
+    """Whether a goal supporting another would make the goal graph cyclic"""
+    return supporting_goal_id in ancestors(db, [supported_goal_id])
+
+
+def supporting_resources(db: Session, keys: Iterable[Tuple[str, int]]) -> Dict[Tuple[str, int], Dict[str, str]]:
+    """Compact records of (type, id) supporting resources, one query per type"""
+    ids: Dict[str, Set[int]] = {}
+    for kind, resource_id in keys:
+        if kind in SUPPORTING_MODELS and resource_id is not None:
+            ids.setdefault(kind, set()).add(resource_id)
+    found = {}
+    for kind, resource_ids in ids.items():
+        model = SUPPORTING_MODELS[kind]
+        for row in db.execute(select(model.id, model.gid, model.name).where(model.id.in_(sorted(resource_ids)))).all():
+            found[(kind, row.id)] = {"gid": row.gid, "resource_type": kind, "name": row.name or ""}
+    return found
+
+
+def _in(column, ids: Optional[Iterable[int]]):
+    return true() if ids is None else column.in_(sorted(ids))
+
+
+def _recompute(db: Session, goal_ids: Optional[Set[int]]) -> int:
+    """Recompute the progress of the given goals (every goal if None); returns the number changed"""
+    if goal_ids is not None and not goal_ids:
+        return 0
+    # Locked in goal order, so a concurrent change to another input of these goals waits and then sees this one
+    metrics = {row.goal_id: row for row in db.execute(
+        select(GoalMetric.goal_id, GoalMetric.initial_number_value, GoalMetric.target_number_value,
+               GoalMetric.current_number_value, GoalMetric.progress_source, GoalMetric.is_custom_weight,
+               GoalMetric.progress)
+        .where(_in(GoalMetric.goal_id, goal_ids)).order_by(GoalMetric.goal_id).with_for_update()
+    ).all()}
+    rolled = {goal_id for goal_id, metric in metrics.items() if PROGRESS_SOURCES.get(metric.progress_source)}
+
+    supporters: Dict[int, List[Supporter]] = {}
+    if rolled:
+        for row in db.execute(
+            select(GoalRelationship.supported_goal_id, GoalRelationship.supporting_resource_type,
+                   GoalRelationship.supporting_resource_id, GoalRelationship.contribution_weight)
+            .where(_in(GoalRelationship.supported_goal_id, None if goal_ids is None else rolled),
+                   GoalRelationship.supported_goal_id.isnot(None), GoalRelationship.supporting_resource_id.isnot(None))
+            .order_by(GoalRelationship.id)
+        ).all():
+            supporters.setdefault(row[0], []).append((row[1], row[2], row[3]))
+        for parent_id, child_id in db.execute(
+            select(Goal.parent_goal_id, Goal.id)
+            .where(_in(Goal.parent_goal_id, None if goal_ids is None else rolled), Goal.parent_goal_id.isnot(None))
+            .order_by(Goal.id)
+        ).all():
+            listed = supporters.setdefault(parent_id, [])
+            if not any(kind == "goal" and resource_id == child_id for kind, resource_id, _ in listed):
+                listed.append(("goal", child_id, None))
+
+    needed: Dict[str, Set[int]] = {kind: set() for kind in SUPPORTING_TYPES}
+    for goal_id in rolled:
+        for kind, resource_id, _ in supporters.get(goal_id, []):
+            if kind in needed:
+                needed[kind].add(resource_id)
+    stored = {goal_id: float(metric.progress or 0) for goal_id, metric in metrics.items()}
+    outside = needed["goal"] - metrics.keys()
+    if outside:
+        stored.update({row[0]: float(row[1] or 0) for row in db.execute(
+            select(GoalMetric.goal_id, GoalMetric.progress).where(GoalMetric.goal_id.in_(sorted(outside)))
+        ).all()})
+    counts = {row.project_id: row for row in db.execute(
+        select(ProjectTaskCount).where(ProjectTaskCount.project_id.in_(sorted(needed["project"])))
+    ).scalars().all()} if needed["project"] else {}
+    completed = {row[0]: bool(row[1]) for row in db.execute(
+        select(Task.id, Task.completed).where(Task.id.in_(sorted(needed["task"])))
+    ).all()} if needed["task"] else {}
+
+    # Supporting goals before the goals they support (goals left in a cycle go last, on stored inputs)
+    waiting = {
+        goal_id: {resource_id for kind, resource_id, _ in supporters.get(goal_id, [])
+                  if kind == "goal" and resource_id in metrics and resource_id != goal_id}
+        for goal_id in metrics
+    }
+    dependents: Dict[int, List[int]] = {}
+    for goal_id, inputs in waiting.items():
+        for input_id in inputs:
+            dependents.setdefault(input_id, []).append(goal_id)
+    order = sorted(goal_id for goal_id, inputs in waiting.items() if not inputs)
+    for goal_id in order:
+        for dependent in dependents.get(goal_id, []):
+            waiting[dependent].discard(goal_id)
+            if not waiting[dependent]:
+                order.append(dependent)
+    order += sorted(goal_id for goal_id, inputs in waiting.items() if inputs)
+
+    def input_progress(source: str, kind: str, resource_id: int) -> Optional[float]:
+        if kind == "goal":
+            return stored.get(resource_id)
+        if kind == "task":
+            return None if resource_id not in completed else float(completed[resource_id])
+        count = counts.get(resource_id)
+        if source == "project_milestone_completion":
+            total, done = (count.num_milestones, count.num_completed_milestones) if count else (0, 0)
+        else:
+            total, done = (count.num_tasks, count.num_completed_tasks) if count else (0, 0)
+        return done / total if total else None
+
+    changes = []
+    for goal_id in order:
+        metric = metrics[goal_id]
+        kind = PROGRESS_SOURCES.get(metric.progress_source)
+        current = metric.current_number_value
+        if kind is None:
+            progress = manual_progress(metric.initial_number_value, metric.target_number_value, current)
+        else:
+            weighted = weights = 0.0
+            for supporter_kind, resource_id, weight in supporters.get(goal_id, []):
+                if supporter_kind != kind or (kind == "goal" and resource_id == goal_id):
+                    continue
+                value = input_progress(metric.progress_source, supporter_kind, resource_id)
+                if value is None:
+                    continue
+                share = float(weight or 0) if metric.is_custom_weight else 1.0
+                weighted += share * value
+                weights += share
+            progress = _clamp(weighted / weights) if weights else 0.0
+            current = rolled_up_value(metric.initial_number_value, metric.target_number_value, progress)
+        progress = round(progress, PROGRESS_PLACES)
+        stored[goal_id] = progress
+        if Decimal(str(progress)) != (metric.progress or Decimal(0)) or current != metric.current_number_value:
+            changes.append({"metric_goal_id": goal_id, "progress": progress, "current_number_value": current})
+
+    if changes:
+        table = GoalMetric.__table__
+        db.execute(
+            update(table).where(table.c.goal_id == bindparam("metric_goal_id"))
+            .values(progress=bindparam("progress"), current_number_value=bindparam("current_number_value")),
+            changes
+        )
+    return len(changes)
+
+
+def recompute_goal_progress(db: Session, goal_ids: Iterable[int]) -> int:
+    """Recompute the goals whose own inputs changed, and every goal they support; returns the number changed"""
+    goal_ids = {goal_id for goal_id in goal_ids if goal_id is not None}
+    if not goal_ids:
+        return 0
+    return _recompute(db, ancestors(db, goal_ids))
+
+
+def record_supporting_change(db: Session, resource_type: str, resource_ids: Iterable[int]) -> int:
+    """Recompute the goals supported by goals, projects or tasks whose progress changed"""
+    return recompute_goal_progress(db, supported_goals(db, resource_type, resource_ids))
+
+
+def remove_supporting_resources(db: Session, resource_type: str, resource_ids: Iterable[int]):
+    """Drop the relationships of projects or tasks that are being deleted, and recompute the goals they supported"""
+    resource_ids = sorted(set(resource_ids))
+    goal_ids = supported_goals(db, resource_type, resource_ids)
+    if not goal_ids:
+        return
+    db.execute(delete(GoalRelationship.__table__).where(
+        GoalRelationship.supporting_resource_type == resource_type,
+        GoalRelationship.supporting_resource_id.in_(resource_ids)
+    ))
+    recompute_goal_progress(db, goal_ids)
+
+
+def recompute_all_goal_progress(db: Session) -> int:
+    """Recompute every goal's progress in one topological pass"""
+    changed = _recompute(db, None)
+    db.commit()
+    return changed
+
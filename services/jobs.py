@@ -0,0 +1,86 @@
+"""
+Background job lifecycle for long-running operations (duplication, template instantiation).
+
+Endpoints create a Job row, schedule run_job() with FastAPI's BackgroundTasks and
+return the job immediately; clients poll GET /jobs/{gid} until it succeeds or fails.
+"""
+import logging
+from typing import Any, Callable, Dict, Optional
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from tracing import span
+from models.job import Job
+from schemas.job import JobResponse
+from utils import generate_gid
+
+logger = logging.getLogger(__name__)
+
+# Which Job JSON column receives the work function's result, per job subtype
+RESULT_COLUMNS = {
+    "duplicate_task": "new_task",
+    "duplicate_project": "new_project",
+    "instantiate_task_template": "new_task",
+}
+
+
+def create_job(db: Session, resource_subtype: str) -> Job:
+    """Create a not-yet-started job; the caller commits it together with its own changes"""
+    job = Job(
+        gid=generate_gid(),
+        resource_type="job",
+        resource_subtype=resource_subtype,
+        status="not_started"
+    )
+    db.add(job)
+    db.flush()
+    return job
+
+
+def _set_status(job_id: int, status: str, result: Optional[Dict[str, Any]] = None):
+    db = SessionLocal()
+    try:
+        job = db.get(Job, job_id)
+        job.status = status
+        if result is not None:
+            setattr(job, RESULT_COLUMNS.get(job.resource_subtype, "new_task"), result)
+        db.commit()
+    finally:
+        db.close()
+
+
+def run_job(job_id: int, work: Callable[..., Optional[Dict[str, Any]]], *args, **kwargs):
+    """
+    Run work(db, *args, **kwargs) in its own session and transaction.
+    The work function returns the compact record of the created resource.
+    """
+    with span("job.run", {"job.id": job_id, "job.work": getattr(work, "__name__", None)}) as job_span:
+        _set_status(job_id, "in_progress")
+
+        db = SessionLocal()
+        try:
+            result = work(db, *args, **kwargs)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.exception("Job %s failed", job_id)
+            job_span.record_exception(e)
+            _set_status(job_id, "failed")
+            return
+        finally:
+            db.close()
+
+        _set_status(job_id, "succeeded", result)
+
+
+def job_response(job: Job) -> JobResponse:
+    return JobResponse(
+        gid=job.gid,
+        resource_type=job.resource_type,
+        resource_subtype=job.resource_subtype,
+        status=job.status,
+        new_project=job.new_project,
+        new_task=job.new_task,
+        new_project_template=None,
+        new_graph_export=None,
+        new_resource_export=None
+    )
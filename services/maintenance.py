@@ -0,0 +1,92 @@
+"""
+Periodic repair of the incrementally maintained tables, as one CLI:
+
+    python -m services.maintenance task_counts --interval 600
+    python -m services.maintenance reactions --interval 600
+    python -m services.maintenance time_rollups --interval 600
+    python -m services.maintenance budgets --interval 3600
+    python -m services.maintenance goal_progress --interval 600
+    python -m services.maintenance portfolio_rollups --interval 60 [--all]
+
+Without --interval the job runs once. Every run uses a fresh session.
+"""
+import argparse
+import time
+from typing import Callable, Dict
+
+from sqlalchemy.orm import Session
+
+from services.budgets import recompute_all_budgets
+from services.goal_progress import recompute_all_goal_progress
+from services.portfolio_rollups import rebuild_closure, refresh_stale_rollups
+from services.reactions import reconcile_all_reaction_summaries
+from services.task_counts import reconcile_all_task_counts
+from services.time_rollups import reconcile_all_time_rollups
+
+
+def _task_counts(db: Session, args) -> str:
+    return f"Reconciled project task counts: {reconcile_all_task_counts(db, args.batch_size)} project(s) corrected"
+
+
+def _reactions(db: Session, args) -> str:
+    return f"Reconciled reaction summaries: {reconcile_all_reaction_summaries(db, args.batch_size)} target(s) corrected"
+
+
+def _time_rollups(db: Session, args) -> str:
+    return f"Reconciled time tracking rollups: {reconcile_all_time_rollups(db, args.batch_size)} row(s) corrected"
+
+
+def _budgets(db: Session, args) -> str:
+    return f"Recomputed budgets: {recompute_all_budgets(db, args.batch_size)} budget(s) changed"
+
+
+def _goal_progress(db: Session, args) -> str:
+    return f"Recomputed goal progress: {recompute_all_goal_progress(db)} goal(s) changed"
+
+
+def _portfolio_rollups(db: Session, args) -> str:
+    lines = []
+    if args.all:
+        lines.append(f"Rebuilt portfolio closure: {rebuild_closure(db)} row(s)")
+    refreshed = refresh_stale_rollups(db, args.batch_size, everything=args.all)
+    lines.append(f"Refreshed portfolio rollups: {refreshed} portfolio(s)")
+    return "\n".join(lines)
+
+
+JOBS: Dict[str, Callable[[Session, argparse.Namespace], str]] = {
+    "task_counts": _task_counts,
+    "reactions": _reactions,
+    "time_rollups": _time_rollups,
+    "budgets": _budgets,
+    "goal_progress": _goal_progress,
+    "portfolio_rollups": _portfolio_rollups,
+}
+
+
+def main():
+    from database import SessionLocal, import_models
+
+    import_models()
+
+    parser = argparse.ArgumentParser(description="Repair the incrementally maintained tables")
+    parser.add_argument("job", choices=list(JOBS))
+    parser.add_argument("--interval", type=int, default=0, help="Seconds between runs (0 = run once)")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--all", action="store_true",
+                        help="portfolio_rollups: rebuild the closure and refresh every portfolio")
+    args = parser.parse_args()
+    run = JOBS[args.job]
+
+    while True:
+        db = SessionLocal()
+        try:
+            print(run(db, args))
+        finally:
+            db.close()
+        if not args.interval:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
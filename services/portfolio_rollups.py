@@ -0,0 +1,394 @@
+"""
+Portfolio nesting and cached portfolio rollups.
+
+Portfolios hold projects and other portfolios (portfolio_items). Nesting is kept
+as a closure table (portfolio_closure): adding or removing one item updates the
+path counts of every (ancestor, descendant) pair it connects, so "all portfolios
+nested in P" and "all portfolios P is nested in" are single index lookups.
+
+A portfolio's rollup (portfolio_rollups) aggregates the distinct projects of the
+portfolio and everything nested in it: projects per status color, task and
+milestone counters, earliest start and latest due date, and budget totals. It is
+computed by one grouped query over the closure, the items, the projects and their
+counters, and served from the table until marked stale.
+
+Changes to projects are recorded on the session with invalidate_projects() (and
+nesting changes with invalidate_portfolios()); after the transaction commits, the
+rollups of every portfolio containing them are marked stale in a short separate
+transaction. Marking after commit is what keeps refreshes correct without locks:
+a refresh first clears the stale flag and then reads, so a change committed after
+its read marks the rollup stale again. Marking also bumps the rollup's version,
+and a refresh only stores its result if the version is still the one it saw when
+clearing the flag, so a refresh that read before a change cannot overwrite the
+result of one that read after it. Rollups that are already stale are not written,
+so busy projects do not contend on their portfolios' rows.
+
+A rollup read refreshes the stale rollups it needs, in a session of its own on
+the primary, so GET handlers never commit their caller's transaction; to keep executive views from
+ever refreshing on read, or to repair a mark lost to a crash between commit and
+marking, refresh in the background with:
+
+    python -m services.maintenance portfolio_rollups --interval 60
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, bindparam, case, delete, event, func, select, union, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, aliased
+
+from models.budget import Budget
+from models.portfolio import Portfolio
+from models.portfolio_closure import PortfolioClosure
+from models.portfolio_item import PortfolioItem
+from models.portfolio_rollup import PortfolioRollup
+from models.project import Project
+from models.project_status import ProjectStatus
+from models.project_task_count import ProjectTaskCount
+from services.counters import reconcile_in_batches
+
+# Project status colors and the rollup column counting each
+STATUS_COLUMNS = {
+    "green": "num_on_track",
+    "yellow": "num_at_risk",
+    "red": "num_off_track",
+    "blue": "num_on_hold",
+    "complete": "num_complete",
+}
+COUNTER_COLUMNS = ("num_tasks", "num_completed_tasks", "num_milestones", "num_completed_milestones")
+ROLLUP_COLUMNS = (
+    "num_projects", *STATUS_COLUMNS.values(), "num_no_status", *COUNTER_COLUMNS, "start_on", "due_on",
+    "time_estimate_minutes", "time_actual_minutes", "cost_estimate", "cost_actual", "cost_units",
+)
+
+# Session.info keys of the projects and portfolios to mark stale once the session commits
+PENDING_PROJECTS = "portfolio_rollups_projects"
+PENDING_PORTFOLIOS = "portfolio_rollups_portfolios"
+
+
+# ---------------------------------------------------------------------------
+# Nesting
+# ---------------------------------------------------------------------------
+
+def ensure_closure(db: Session, portfolio_ids: Iterable[int]):
+    """Every portfolio is nested in itself"""
+    rows = [{"ancestor_id": portfolio_id, "descendant_id": portfolio_id, "path_count": 1}
+            for portfolio_id in sorted(set(portfolio_ids))]
+    if rows:
+        db.execute(insert(PortfolioClosure.__table__).values(rows).on_conflict_do_nothing())
+
+
+def is_nested_in(db: Session, descendant_id: int, ancestor_id: int) -> bool:
+    """Whether descendant_id is ancestor_id or nested in it at any depth"""
+    return db.execute(
+        select(PortfolioClosure.path_count)
+        .where(PortfolioClosure.ancestor_id == ancestor_id, PortfolioClosure.descendant_id == descendant_id)
+    ).first() is not None
+
+
+def _new_paths(parent_id: int, child_id: int):
+    """(ancestor, descendant, paths) of every path through the item parent_id -> child_id"""
+    above = aliased(PortfolioClosure)
+    below = aliased(PortfolioClosure)
+    return select(
+        above.ancestor_id.label("ancestor_id"),
+        below.descendant_id.label("descendant_id"),
+        (above.path_count * below.path_count).label("path_count"),
+    ).select_from(above).join(below, below.ancestor_id == child_id).where(above.descendant_id == parent_id)
+
+
+def add_nesting(db: Session, parent_id: int, child_id: int):
+    """Record child_id as an item of parent_id in the closure (callers reject cycles first)"""
+    ensure_closure(db, [parent_id, child_id])
+    table = PortfolioClosure.__table__
+    stmt = insert(table).from_select(["ancestor_id", "descendant_id", "path_count"], _new_paths(parent_id, child_id))
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.ancestor_id, table.c.descendant_id],
+        set_={"path_count": table.c.path_count + stmt.excluded.path_count},
+    ))
+
+
+def remove_nesting(db: Session, parent_id: int, child_id: int):
+    """Remove the paths through the item parent_id -> child_id from the closure"""
+    table = PortfolioClosure.__table__
+    paths = _new_paths(parent_id, child_id).subquery()
+    db.execute(
+        update(table)
+        .where(table.c.ancestor_id == paths.c.ancestor_id, table.c.descendant_id == paths.c.descendant_id)
+        .values(path_count=table.c.path_count - paths.c.path_count)
+    )
+    db.execute(delete(table).where(table.c.path_count <= 0))
+
+
+def remove_portfolio(db: Session, portfolio_id: int):
+    """Remove a portfolio's items, its own membership in other portfolios, its closure and rollup"""
+    edges = db.execute(
+        select(PortfolioItem.portfolio_id, PortfolioItem.item_portfolio_id)
+        .where(PortfolioItem.item_portfolio_id.isnot(None),
+               (PortfolioItem.portfolio_id == portfolio_id) | (PortfolioItem.item_portfolio_id == portfolio_id))
+    ).all()
+    invalidate_portfolios(db, [parent_id for parent_id, _ in edges if parent_id != portfolio_id])
+    for parent_id, child_id in edges:
+        remove_nesting(db, parent_id, child_id)
+    db.execute(delete(PortfolioItem).where(
+        (PortfolioItem.portfolio_id == portfolio_id) | (PortfolioItem.item_portfolio_id == portfolio_id)
+    ))
+    db.execute(delete(PortfolioClosure).where(
+        (PortfolioClosure.ancestor_id == portfolio_id) | (PortfolioClosure.descendant_id == portfolio_id)
+    ))
+    db.execute(delete(PortfolioRollup).where(PortfolioRollup.portfolio_id == portfolio_id))
+
+
+def remove_projects(db: Session, project_ids: Iterable[int]):
+    """Take deleted projects out of every portfolio"""
+    project_ids = sorted(set(project_ids))
+    if not project_ids:
+        return
+    # Marked through the portfolios that held them, as the items are gone by commit
+    invalidate_portfolios(db, [row[0] for row in db.execute(
+        select(PortfolioItem.portfolio_id).where(PortfolioItem.project_id.in_(project_ids))
+    ).all()])
+    db.execute(delete(PortfolioItem).where(PortfolioItem.project_id.in_(project_ids)))
+
+
+# ---------------------------------------------------------------------------
+# Invalidation
+# ---------------------------------------------------------------------------
+
+def invalidate_projects(db: Session, project_ids: Iterable[Optional[int]]):
+    """Mark the rollups of every portfolio containing these projects stale once db commits"""
+    db.info.setdefault(PENDING_PROJECTS, set()).update(
+        project_id for project_id in project_ids if project_id is not None
+    )
+
+
+def invalidate_portfolios(db: Session, portfolio_ids: Iterable[int]):
+    """Mark the rollups of these portfolios and every portfolio they are nested in stale once db commits"""
+    db.info.setdefault(PENDING_PORTFOLIOS, set()).update(portfolio_ids)
+
+
+def mark_stale(connection, project_ids: Iterable[int] = (), portfolio_ids: Iterable[int] = ()) -> int:
+    """Mark the affected rollups stale now; returns the number marked"""
+    project_ids, portfolio_ids = sorted(set(project_ids)), sorted(set(portfolio_ids))
+    sources = []
+    if project_ids:
+        sources.append(select(PortfolioItem.portfolio_id).where(PortfolioItem.project_id.in_(project_ids)))
+    if portfolio_ids:
+        sources.append(select(Portfolio.id).where(Portfolio.id.in_(portfolio_ids)))
+    if not sources:
+        return 0
+    containing = union(*sources).subquery()
+    affected = select(PortfolioClosure.ancestor_id).where(PortfolioClosure.descendant_id.in_(select(containing)))
+    return connection.execute(
+        update(PortfolioRollup)
+        .where(PortfolioRollup.portfolio_id.in_(affected), PortfolioRollup.stale.is_(False))
+        .values(stale=True, version=PortfolioRollup.version + 1)
+    ).rowcount
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_stale_after_commit(session: Session):
+    project_ids = session.info.pop(PENDING_PROJECTS, None)
+    portfolio_ids = session.info.pop(PENDING_PORTFOLIOS, None)
+    if project_ids or portfolio_ids:
+        with session.get_bind().begin() as connection:
+            mark_stale(connection, project_ids or (), portfolio_ids or ())
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session):
+    session.info.pop(PENDING_PROJECTS, None)
+    session.info.pop(PENDING_PORTFOLIOS, None)
+
+
+# ---------------------------------------------------------------------------
+# Aggregation
+# ---------------------------------------------------------------------------
+
+def _aggregate_query(members):
+    """
+    One grouped query of rollup columns per key over a (key, project_id) selectable,
+    joining each distinct project to its task counters, current status and budget totals.
+    """
+    members = members.distinct().subquery()
+    is_time = Budget.budget_type == "time"
+    is_cost = Budget.budget_type == "cost"
+    budgets = select(
+        Budget.parent_id.label("project_id"),
+        func.sum(Budget.estimate_value).filter(is_time).label("time_estimate"),
+        func.sum(Budget.actual_value).filter(is_time).label("time_actual"),
+        func.sum(Budget.estimate_value).filter(is_cost).label("cost_estimate"),
+        func.sum(Budget.actual_value).filter(is_cost).label("cost_actual"),
+        func.min(Budget.actual_units).filter(is_cost).label("min_units"),
+        func.max(Budget.actual_units).filter(is_cost).label("max_units"),
+    ).where(Budget.parent_id.in_(select(members.c.project_id))).group_by(Budget.parent_id).subquery()
+
+    # Costs in several currencies cannot be added up
+    one_currency = func.min(budgets.c.min_units) == func.max(budgets.c.max_units)
+    color = ProjectStatus.color
+    return select(
+        members.c.key,
+        func.count().label("num_projects"),
+        *[func.count().filter(color == status_color).label(column) for status_color, column in STATUS_COLUMNS.items()],
+        func.count().filter(color.is_(None) | color.notin_(list(STATUS_COLUMNS))).label("num_no_status"),
+        *[func.coalesce(func.sum(getattr(ProjectTaskCount, column)), 0).label(column) for column in COUNTER_COLUMNS],
+        func.min(Project.start_on).label("start_on"),
+        func.max(Project.due_date).label("due_on"),
+        func.sum(budgets.c.time_estimate).label("time_estimate_minutes"),
+        func.sum(budgets.c.time_actual).label("time_actual_minutes"),
+        case((one_currency, func.sum(budgets.c.cost_estimate))).label("cost_estimate"),
+        case((one_currency, func.sum(budgets.c.cost_actual))).label("cost_actual"),
+        case((one_currency, func.min(budgets.c.min_units))).label("cost_units"),
+    ).select_from(
+        members
+        .join(Project, Project.id == members.c.project_id)
+        .outerjoin(ProjectTaskCount, ProjectTaskCount.project_id == Project.id)
+        .outerjoin(ProjectStatus, ProjectStatus.id == Project.current_status_update_id)
+        .outerjoin(budgets, budgets.c.project_id == Project.id)
+    ).group_by(members.c.key)
+
+
+def _empty_rollup() -> Dict[str, Any]:
+    return {column: None if column in ("start_on", "due_on") or column.startswith(("time_", "cost_")) else 0
+            for column in ROLLUP_COLUMNS}
+
+
+def project_aggregates(db: Session, project_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """Rollup columns of each project on its own, in one grouped query"""
+    project_ids = sorted(set(project_ids))
+    if not project_ids:
+        return {}
+    members = select(Project.id.label("key"), Project.id.label("project_id")).where(Project.id.in_(project_ids))
+    found = {row.key: dict(row._mapping) for row in db.execute(_aggregate_query(members)).all()}
+    return {project_id: found.get(project_id, _empty_rollup()) for project_id in project_ids}
+
+
+def compute_rollups(db: Session, portfolio_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """Rollup columns of the portfolios from their current projects, in one grouped query"""
+    portfolio_ids = sorted(set(portfolio_ids))
+    if not portfolio_ids:
+        return {}
+    members = select(
+        PortfolioClosure.ancestor_id.label("key"), PortfolioItem.project_id.label("project_id")
+    ).join(
+        PortfolioItem, and_(PortfolioItem.portfolio_id == PortfolioClosure.descendant_id,
+                            PortfolioItem.project_id.isnot(None))
+    ).where(PortfolioClosure.ancestor_id.in_(portfolio_ids))
+    found = {row.key: dict(row._mapping) for row in db.execute(_aggregate_query(members)).all()}
+    return {portfolio_id: found.get(portfolio_id, _empty_rollup()) for portfolio_id in portfolio_ids}
+
+
+def _refresh(db: Session, portfolio_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Recompute the rollups of the portfolios and store those no change has marked since,
+    committing. Returns the computed rollups.
+    """
+    ensure_closure(db, portfolio_ids)
+    table = PortfolioRollup.__table__
+    db.execute(insert(table).values(
+        [{"portfolio_id": portfolio_id, "stale": False} for portfolio_id in portfolio_ids]
+    ).on_conflict_do_nothing())
+    # Cleared and committed before the read, so changes committed after it mark the rollups again
+    claimed = dict(db.execute(
+        update(table).where(table.c.portfolio_id.in_(portfolio_ids)).values(stale=False)
+        .returning(table.c.portfolio_id, table.c.version)
+    ).all())
+    db.commit()
+
+    rollups = compute_rollups(db, portfolio_ids)
+    db.execute(
+        update(table)
+        .where(table.c.portfolio_id == bindparam("rollup_portfolio_id"),
+               table.c.version == bindparam("claimed_version"))
+        .values({**{column: bindparam(f"new_{column}") for column in ROLLUP_COLUMNS}, "updated_at": func.now()}),
+        [{"rollup_portfolio_id": portfolio_id, "claimed_version": claimed[portfolio_id],
+          **{f"new_{column}": rollup[column] for column in ROLLUP_COLUMNS}}
+         for portfolio_id, rollup in rollups.items() if portfolio_id in claimed]
+    )
+    db.commit()
+    return rollups
+
+
+def refresh_rollups(db: Session, portfolio_ids: Iterable[int]) -> int:
+    """Recompute and store the rollups of the portfolios, committing; returns the number refreshed"""
+    portfolio_ids = sorted(set(portfolio_ids))
+    if not portfolio_ids:
+        return 0
+    return len(_refresh(db, portfolio_ids))
+
+
+def get_rollups(db: Session, portfolio_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Rollups of the portfolios, refreshing only the stale or missing ones. The refresh runs
+    in a session of its own on the primary, so db's transaction is left uncommitted.
+    """
+    portfolio_ids = sorted(set(portfolio_ids))
+    if not portfolio_ids:
+        return {}
+    stored = {rollup.portfolio_id: rollup for rollup in db.execute(
+        select(PortfolioRollup).where(PortfolioRollup.portfolio_id.in_(portfolio_ids))
+    ).scalars().all()}
+    rollups = {
+        portfolio_id: {column: getattr(rollup, column) for column in ROLLUP_COLUMNS}
+        for portfolio_id, rollup in stored.items() if not rollup.stale
+    }
+    outdated = [portfolio_id for portfolio_id in portfolio_ids if portfolio_id not in rollups]
+    if outdated:
+        # db.bind is the primary even when db reads from a replica
+        with Session(bind=db.bind, autoflush=False) as refresh_db:
+            for portfolio_id, rollup in _refresh(refresh_db, outdated).items():
+                rollups[portfolio_id] = {column: rollup[column] for column in ROLLUP_COLUMNS}
+    return {portfolio_id: rollups[portfolio_id] for portfolio_id in portfolio_ids}
+
+
+def refresh_stale_rollups(db: Session, batch_size: int = 500, everything: bool = False) -> int:
+    """Refresh stale rollups (or every portfolio's), in batches; returns the number refreshed"""
+    if everything:
+        query = select(Portfolio.id).order_by(Portfolio.id)
+    else:
+        query = select(PortfolioRollup.portfolio_id).where(PortfolioRollup.stale.is_(True)) \
+            .order_by(PortfolioRollup.portfolio_id)
+    portfolio_ids: List[int] = [row[0] for row in db.execute(query).all()]
+    return reconcile_in_batches(db, portfolio_ids, batch_size, refresh_rollups)
+
+
+def rebuild_closure(db: Session) -> int:
+    """Recompute portfolio_closure from portfolio_items (acyclic nesting assumed); returns its rows"""
+    edges = db.execute(
+        select(PortfolioItem.portfolio_id, PortfolioItem.item_portfolio_id)
+        .where(PortfolioItem.item_portfolio_id.isnot(None))
+    ).all()
+    children: Dict[int, List[int]] = {}
+    for parent_id, child_id in edges:
+        children.setdefault(parent_id, []).append(child_id)
+    portfolio_ids = [row[0] for row in db.execute(select(Portfolio.id)).all()]
+
+    # Paths from every portfolio, memoized bottom-up
+    paths: Dict[int, Dict[int, int]] = {}
+
+    def descendants(portfolio_id: int) -> Dict[int, int]:
+        stack = [(portfolio_id, False)]
+        while stack:
+            current, expanded = stack.pop()
+            if current in paths:
+                continue
+            pending = [child_id for child_id in children.get(current, ()) if child_id not in paths]
+            if expanded or not pending:
+                counts = {current: 1}
+                for child_id in children.get(current, ()):
+                    for descendant_id, count in paths[child_id].items():
+                        counts[descendant_id] = counts.get(descendant_id, 0) + count
+                paths[current] = counts
+            else:
+                stack.append((current, True))
+                stack.extend((child_id, False) for child_id in pending)
+        return paths[portfolio_id]
+
+    rows = [{"ancestor_id": ancestor_id, "descendant_id": descendant_id, "path_count": count}
+            for ancestor_id in portfolio_ids for descendant_id, count in descendants(ancestor_id).items()]
+    db.execute(delete(PortfolioClosure))
+    if rows:
+        db.execute(insert(PortfolioClosure.__table__), rows)
+    db.execute(update(PortfolioRollup).values(stale=True, version=PortfolioRollup.version + 1))
+    db.commit()
+    return len(rows)
+
@@ -0,0 +1,186 @@
+"""
+Reactions and their incrementally maintained per-emoji counters.
+
+Adding or removing a reaction applies a +1/-1 to its reaction_summaries row
+in the same transaction, so a feed embeds the reaction summary of a whole
+page of stories or status updates with one IN query instead of reading every
+reaction. Drift is repaired by reconcile_all_reaction_summaries()
+(python -m services.maintenance reactions); see services/counters.py.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select, func, and_, delete, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from models.reaction import Reaction
+from models.reaction_summary import ReactionSummary
+from services.counters import add_to_counters, differences, reconcile_in_batches
+from utils import generate_gid
+
+TARGET_TYPES = ("status_update", "story")
+# The API has no authentication: reactions are made and viewed as the default user
+DEFAULT_USER_ID = 1
+
+# (target_type, target_id, emoji_base)
+SummaryKey = Tuple[str, int, str]
+SUMMARY_KEYS = ("target_type", "target_id", "emoji_base")
+
+
+def apply_reaction_deltas(db: Session, deltas: Dict[SummaryKey, int]):
+    """Apply per-emoji counter deltas with one multi-row upsert, then drop counters that reached zero"""
+    table = ReactionSummary.__table__
+    rows = add_to_counters(db, table, SUMMARY_KEYS, ["count"], [
+        {**dict(zip(SUMMARY_KEYS, key)), "count": count} for key, count in deltas.items()
+    ])
+    if any(row["count"] < 0 for row in rows):
+        db.execute(delete(table).where(
+            tuple_(table.c.target_type, table.c.target_id, table.c.emoji_base).in_(
+                [(row["target_type"], row["target_id"], row["emoji_base"]) for row in rows if row["count"] < 0]
+            ),
+            table.c.count <= 0
+        ))
+
+
+def add_reaction(db: Session, target_type: str, target_id: int, user_id: int, emoji_base: str,
+                 emoji_skin_tone: Optional[str] = None) -> bool:
+    """React to a target; returns False if the user had already reacted with this emoji"""
+    stmt = insert(Reaction.__table__).values(
+        gid=generate_gid(),
+        resource_type="reaction",
+        emoji_base=emoji_base,
+        emoji_skin_tone=emoji_skin_tone,
+        target_id=target_id,
+        target_type=target_type,
+        user_id=user_id
+    ).on_conflict_do_nothing().returning(Reaction.__table__.c.id)
+    if db.execute(stmt).scalar() is None:
+        return False
+    apply_reaction_deltas(db, {(target_type, target_id, emoji_base): 1})
+    return True
+
+
+def remove_reaction(db: Session, target_type: str, target_id: int, user_id: int, emoji_base: str) -> bool:
+    """Remove a user's reaction; returns False if there was none"""
+    removed = db.execute(
+        delete(Reaction.__table__).where(
+            Reaction.target_type == target_type,
+            Reaction.target_id == target_id,
+            Reaction.user_id == user_id,
+            Reaction.emoji_base == emoji_base
+        ).returning(Reaction.__table__.c.id)
+    ).scalar()
+    if removed is None:
+        return False
+    apply_reaction_deltas(db, {(target_type, target_id, emoji_base): -1})
+    return True
+
+
+def delete_reactions(db: Session, target_type: str, target_ids: Iterable[int]):
+    """Remove every reaction and counter of targets that are being deleted"""
+    target_ids = sorted(set(target_ids))
+    if not target_ids:
+        return
+    db.execute(delete(Reaction.__table__).where(
+        Reaction.target_type == target_type, Reaction.target_id.in_(target_ids)
+    ))
+    db.execute(delete(ReactionSummary.__table__).where(
+        ReactionSummary.target_type == target_type, ReactionSummary.target_id.in_(target_ids)
+    ))
+
+
+def reaction_summaries(db: Session, target_type: str, target_ids: Iterable[int],
+                       viewer_id: Optional[int] = None) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Reaction summary of each target, most used emoji first, with one query for the whole page.
+    reacted (and the viewer's skin tone variant) comes from an outer join on the viewer's reactions.
+    """
+    target_ids = {target_id for target_id in target_ids if target_id is not None}
+    summaries: Dict[int, List[Dict[str, Any]]] = {target_id: [] for target_id in target_ids}
+    if not target_ids:
+        return summaries
+
+    rows = db.execute(
+        select(
+            ReactionSummary.target_id, ReactionSummary.emoji_base, ReactionSummary.count,
+            Reaction.id.label("reaction_id"), Reaction.emoji_skin_tone
+        )
+        .outerjoin(Reaction, and_(
+            Reaction.target_type == ReactionSummary.target_type,
+            Reaction.target_id == ReactionSummary.target_id,
+            Reaction.user_id == viewer_id,
+            Reaction.emoji_base == ReactionSummary.emoji_base
+        ))
+        .where(ReactionSummary.target_type == target_type, ReactionSummary.target_id.in_(target_ids),
+               ReactionSummary.count > 0)
+        .order_by(ReactionSummary.target_id, ReactionSummary.count.desc(), ReactionSummary.emoji_base)
+    ).all()
+    for row in rows:
+        reacted = row.reaction_id is not None
+        summaries[row.target_id].append({
+            "emoji_base": row.emoji_base,
+            "variant": f"{row.emoji_base}_{row.emoji_skin_tone}" if reacted and row.emoji_skin_tone else row.emoji_base,
+            "count": row.count,
+            "reacted": reacted,
+        })
+    return summaries
+
+
+def grouped_reaction_counts(*criteria):
+    """One grouped SELECT of per-emoji counter values over the reactions matching criteria"""
+    return (
+        select(Reaction.target_type, Reaction.target_id, Reaction.emoji_base, func.count().label("count"))
+        .where(Reaction.target_type.isnot(None), Reaction.target_id.isnot(None), Reaction.emoji_base.isnot(None),
+               *criteria)
+        .group_by(Reaction.target_type, Reaction.target_id, Reaction.emoji_base)
+    )
+
+
+def add_grouped_reaction_counts(db: Session, *criteria):
+    """Count the reactions matching criteria into their counters with one INSERT ... SELECT (used after bulk loads)"""
+    add_to_counters(db, ReactionSummary.__table__, SUMMARY_KEYS, ["count"], grouped_reaction_counts(*criteria))
+
+
+def reconcile_reaction_summaries(db: Session, target_type: str, target_ids: List[int]) -> int:
+    """
+    Recompute the counters of the given targets from the reactions table and fix drifted rows.
+    Returns the number of targets whose counters were corrected.
+    """
+    if not target_ids:
+        return 0
+    target_ids = sorted(target_ids)
+    stored = {
+        (row.target_type, row.target_id, row.emoji_base): row.count for row in db.execute(
+            select(ReactionSummary)
+            .where(ReactionSummary.target_type == target_type, ReactionSummary.target_id.in_(target_ids))
+            .order_by(ReactionSummary.target_id, ReactionSummary.emoji_base)
+            .with_for_update()
+        ).scalars().all()
+    }
+    actual = {
+        (row.target_type, row.target_id, row.emoji_base): row.count for row in db.execute(
+            grouped_reaction_counts(Reaction.target_type == target_type, Reaction.target_id.in_(target_ids))
+        ).all()
+    }
+
+    corrections = differences(stored, actual)
+    apply_reaction_deltas(db, corrections)
+    return len({key[1] for key in corrections})
+
+
+def reconcile_all_reaction_summaries(db: Session, batch_size: int = 500) -> int:
+    """Reconcile every target that has reactions or a counter row; returns the number corrected"""
+    corrected = 0
+    for target_type in TARGET_TYPES:
+        candidates = (
+            select(Reaction.target_id.label("target_id")).where(Reaction.target_type == target_type)
+            .union(select(ReactionSummary.target_id).where(ReactionSummary.target_type == target_type))
+            .subquery()
+        )
+        target_ids = [row[0] for row in db.execute(
+            select(candidates.c.target_id).where(candidates.c.target_id.isnot(None)).order_by(candidates.c.target_id)
+        ).all()]
+        corrected += reconcile_in_batches(
+            db, target_ids, batch_size,
+            lambda session, batch: reconcile_reaction_summaries(session, target_type, batch)
+        )
+    return corrected
+
@@ -0,0 +1,159 @@
+"""
+Subtask tree helpers: recursive CTE fetches, cycle checks and num_subtasks maintenance
+"""
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select, update, literal, func, values, column, text, Integer
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.orm import Session, aliased
+from models.task import Task
+from utils import MAX_ROW_ID
+
+# Serializes reparenting within a workspace (pg_advisory_xact_lock class, with the workspace id as key)
+REPARENT_LOCK = 4202
+# Deepest path an offset token may hold (the subtasks endpoint's maximum depth)
+MAX_PATH_LENGTH = 100
+
+
+def subtree_cte(root_id: int, max_depth: Optional[int] = None, name: str = "subtask_tree"):
+    """
+    Recursive CTE of every task below root_id (the root itself is excluded).
+    Each row carries its depth (1 = direct subtask) and the id path from the
+    root, so ordering by path gives a depth-first listing.
+    """
+    tree = select(
+        Task.id.label("id"),
+        Task.parent_id.label("parent_id"),
+        literal(1).label("depth"),
+        array([Task.id]).label("path")
+    ).where(Task.parent_id == root_id).cte(name, recursive=True)
+
+    child = aliased(Task)
+    step = select(
+        child.id,
+        child.parent_id,
+        tree.c.depth + 1,
+        tree.c.path.op("||")(child.id)
+    ).join(tree, child.parent_id == tree.c.id)
+    if max_depth is not None:
+        step = step.where(tree.c.depth < max_depth)
+
+    return tree.union_all(step)
+
+
+def fetch_subtasks(db: Session, root_id: int, max_depth: Optional[int] = 1, limit: Optional[int] = None,
+                   after: Optional[List[int]] = None) -> List[Tuple[Task, int, Optional[Task], List[int]]]:
+    """
+    Load the subtree below root_id in a single statement, optionally only the part
+    after the task at path `after`. Returns (task, depth, parent, path) tuples in
+    depth-first order.
+    """
+    tree = subtree_cte(root_id, max_depth)
+    parent = aliased(Task)
+    query = (
+        select(Task, tree.c.depth, parent, tree.c.path)
+        .join(tree, Task.id == tree.c.id)
+        .join(parent, parent.id == tree.c.parent_id)
+        .order_by(tree.c.path)
+    )
+    if after:
+        # Arrays compare element by element, so this is "later in depth-first order"
+        query = query.where(tree.c.path > array(after))
+    if limit is not None:
+        query = query.limit(limit)
+    return [(row[0], row[1], row[2], list(row[3])) for row in db.execute(query).all()]
+
+
+def encode_path(path: List[int]) -> str:
+    """Offset token of a position in a depth-first subtask listing: the id path, in hex"""
+    return ".".join(f"{task_id:x}" for task_id in path)
+
+
+def decode_path(token: str) -> Optional[List[int]]:
+    """The id path of an encode_path() token, or None if it is malformed or out of range"""
+    try:
+        path = [int(part, 16) for part in token.split(".")]
+    except ValueError:
+        return None
+    if len(path) > MAX_PATH_LENGTH or not all(0 < task_id <= MAX_ROW_ID for task_id in path):
+        return None
+    return path
+
+
+def ancestor_ids(db: Session, task_id: int) -> List[int]:
+    """Ids of task_id and all of its ancestors, walking parent_id upwards."""
+    chain = select(Task.id.label("id"), Task.parent_id.label("parent_id")).where(
+        Task.id == task_id
+    ).cte("ancestors", recursive=True)
+    parent = aliased(Task)
+    # UNION (not UNION ALL) so that corrupted data containing a loop still terminates
+    chain = chain.union(
+        select(parent.id, parent.parent_id).join(chain, parent.id == chain.c.parent_id)
+    )
+    return [row[0] for row in db.execute(select(chain.c.id)).all()]
+
+
+def would_create_cycle(db: Session, task_id: int, new_parent_id: int) -> bool:
+    """True when making new_parent_id the parent of task_id would form a loop."""
+    return task_id in ancestor_ids(db, new_parent_id)
+
+
+def adjust_subtask_count(db: Session, parent_id: Optional[int], delta: int):
+    """
+    Apply a delta to a parent's num_subtasks in the current transaction.
+    Uses an in-place UPDATE so concurrent writers never lose increments.
+    """
+    if parent_id is None or not delta:
+        return
+    db.execute(
+        update(Task)
+        .where(Task.id == parent_id)
+        .values(num_subtasks=func.coalesce(Task.num_subtasks, 0) + delta)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def adjust_subtask_counts(db: Session, deltas: Dict[int, int]):
+    """Apply many parents' num_subtasks deltas with one UPDATE ... FROM (VALUES ...)"""
+    rows = [(parent_id, delta) for parent_id, delta in sorted(deltas.items()) if parent_id is not None and delta]
+    if not rows:
+        return
+    delta_values = values(
+        column("parent_id", Integer), column("delta", Integer), name="subtask_deltas"
+    ).data(rows)
+    tasks = Task.__table__
+    db.execute(
+        update(tasks)
+        .where(tasks.c.id == delta_values.c.parent_id)
+        .values(num_subtasks=func.coalesce(tasks.c.num_subtasks, 0) + delta_values.c.delta)
+    )
+
+
+def set_parent(db: Session, task: Task, new_parent: Optional[Task]):
+    """
+    Move task under new_parent (or to the top level when None), keeping both
+    parents' num_subtasks counters in step. Raises ValueError on a cycle.
+    """
+    new_parent_id = new_parent.id if new_parent is not None else None
+    if new_parent_id is not None and db.get_bind().dialect.name == "postgresql":
+        # Two reparents on disjoint rows can still close a loop through the rest of the tree
+        # (a under b while b's ancestor goes under a), so moves in the same workspaces take
+        # turns, and the cycle check below sees every move committed before this one
+        for workspace_id in sorted({task.workspace_id or 0, new_parent.workspace_id or 0}):
+            db.execute(text("SELECT pg_advisory_xact_lock(:lock_class, :workspace_id)"),
+                       {"lock_class": REPARENT_LOCK, "workspace_id": workspace_id})
+    db.execute(
+        select(Task.id).where(Task.id.in_([task.id] if new_parent_id is None else [task.id, new_parent_id]))
+        .order_by(Task.id).with_for_update()
+    ).all()
+    # Re-read once locked: a move committed since the task was loaded changes the old parent
+    db.refresh(task, ["parent_id"])
+    old_parent_id = task.parent_id
+    if old_parent_id == new_parent_id:
+        return
+
+    if new_parent_id is not None and would_create_cycle(db, task.id, new_parent_id):
+        raise ValueError("Cannot set parent: the new parent is the task itself or one of its subtasks")
+
+    task.parent_id = new_parent_id
+    adjust_subtask_count(db, old_parent_id, -1)
+    adjust_subtask_count(db, new_parent_id, 1)
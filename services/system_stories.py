@@ -0,0 +1,201 @@
+"""
+System stories: the task activity entries ("assigned to Ann", "marked this
+task complete", "moved this task from "To do" to "Doing" in Launch") that
+Asana clients render alongside comments.
+
+Changes are collected in a SystemStories, whose rows() resolves the user,
+project and section names they mention with one IN query per table. ORM
+changes to tasks and task memberships are picked up by a before_flush
+listener, which adds the stories to the session so they are inserted in the
+same flush as the change (adding a task created in the same transaction to
+a project is part of its creation and gets no story); services/bulk_tasks.py feeds its set-based writes
+in directly and inserts the rows with multi-row INSERTs. Deleting a task
+deletes its stories first (delete_task_stories), as they reference it.
+"""
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, event, inspect, select
+from sqlalchemy.orm import Session
+
+from database import RoutingSession
+from models.project import Project
+from models.section import Section
+from models.story import Story
+from models.task import Task
+from models.task_membership import TaskMembership
+from models.user import User
+from services.reactions import delete_reactions
+from utils import generate_gid
+
+# Task columns whose changes produce a story
+TRACKED_FIELDS = ("assignee_id", "completed", "due_on", "due_at", "name")
+
+
+def _format_date(value) -> str:
+    if isinstance(value, datetime):
+        value = value.date()
+    return f"{value:%b} {value.day}" if isinstance(value, date) else str(value)
+
+
+class SystemStories:
+    """Task changes waiting to be written as system stories"""
+
+    def __init__(self):
+        # (task_id, workspace_id, resource_subtype, references) in the order the changes were made
+        self.changes: List[Tuple[int, Optional[int], str, Dict[str, Any]]] = []
+
+    def __bool__(self):
+        return bool(self.changes)
+
+    def task_changed(self, task_id: int, workspace_id: Optional[int], field: str, old, new):
+        if field == "assignee_id":
+            if new is not None:
+                self.changes.append((task_id, workspace_id, "assigned", {"user": new}))
+            elif old is not None:
+                self.changes.append((task_id, workspace_id, "unassigned", {"user": old}))
+        elif field == "completed":
+            self.changes.append((task_id, workspace_id, "marked_complete" if new else "marked_incomplete", {}))
+        elif field in ("due_on", "due_at"):
+            # due_on and due_at changed together are one due date change, to whichever is set
+            for index, (other_task, _, subtype, refs) in enumerate(self.changes):
+                if other_task == task_id and subtype == "due_date_changed":
+                    del self.changes[index]
+                    new = new if new is not None else refs["due"]
+                    break
+            self.changes.append((task_id, workspace_id, "due_date_changed", {"due": new}))
+        elif field == "name":
+            self.changes.append((task_id, workspace_id, "name_changed", {"name": new}))
+
+    def added_to_project(self, task_id: int, workspace_id: Optional[int], project_id: int):
+        self.changes.append((task_id, workspace_id, "added_to_project", {"project": project_id}))
+
+    def removed_from_project(self, task_id: int, workspace_id: Optional[int], project_id: int):
+        self.changes.append((task_id, workspace_id, "removed_from_project", {"project": project_id}))
+
+    def section_changed(self, task_id: int, workspace_id: Optional[int], project_id: int,
+                        old_section_id: Optional[int], new_section_id: Optional[int]):
+        self.changes.append((task_id, workspace_id, "section_changed", {
+            "project": project_id, "old_section": old_section_id, "new_section": new_section_id
+        }))
+
+    @staticmethod
+    def _names(db: Session, model, ids) -> Dict[int, str]:
+        ids = {id_ for id_ in ids if id_ is not None}
+        if not ids:
+            return {}
+        return dict(db.execute(select(model.id, model.name).where(model.id.in_(ids))).all())
+
+    def rows(self, db: Session) -> List[Dict[str, Any]]:
+        """Story table rows for the collected changes"""
+        users = self._names(db, User, (refs.get("user") for _, _, _, refs in self.changes))
+        projects = self._names(db, Project, (refs.get("project") for _, _, _, refs in self.changes))
+        sections = self._names(db, Section, (
+            id_ for _, _, _, refs in self.changes for id_ in (refs.get("old_section"), refs.get("new_section"))
+        ))
+        rows = []
+        for task_id, workspace_id, subtype, refs in self.changes:
+            if subtype == "assigned":
+                text = f"assigned to {users.get(refs['user'], 'a user')}"
+            elif subtype == "unassigned":
+                text = f"unassigned from {users.get(refs['user'], 'a user')}"
+            elif subtype == "marked_complete":
+                text = "marked this task complete"
+            elif subtype == "marked_incomplete":
+                text = "marked this task incomplete"
+            elif subtype == "due_date_changed":
+                text = f"changed the due date to {_format_date(refs['due'])}" if refs["due"] else "removed the due date"
+            elif subtype == "name_changed":
+                text = f'changed the name to "{refs["name"]}"'
+            elif subtype == "added_to_project":
+                text = f"added this task to {projects.get(refs['project'], 'a project')}"
+            elif subtype == "removed_from_project":
+                text = f"removed this task from {projects.get(refs['project'], 'a project')}"
+            else:
+                old = sections.get(refs["old_section"], "Untitled section")
+                new = sections.get(refs["new_section"], "Untitled section")
+                text = f'moved this task from "{old}" to "{new}" in {projects.get(refs["project"], "a project")}'
+            rows.append({
+                "gid": generate_gid(),
+                "resource_type": "story",
+                "type": "system",
+                "resource_subtype": subtype,
+                "text": text,
+                "task_id": task_id,
+                "workspace_id": workspace_id,
+                "created_by_id": None,
+                "is_pinned": False,
+            })
+        return rows
+
+
+def delete_task_stories(db: Session, task_ids: List[int]):
+    """Delete every story of tasks that are being deleted, comments included, with their reactions"""
+    stories = Story.__table__
+    delete_reactions(db, "story", db.scalars(select(stories.c.id).where(stories.c.task_id.in_(task_ids))).all())
+    db.execute(delete(stories).where(stories.c.task_id.in_(task_ids)))
+
+
+def _old_and_new(obj, field: str):
+    history = inspect(obj).attrs[field].history
+    if not history.has_changes():
+        return None
+    return (history.deleted[0] if history.deleted else None, history.added[0] if history.added else None)
+
+
+def _before_flush(session: Session, flush_context, instances):
+    stories = SystemStories()
+    memberships = []
+    for obj in session.dirty:
+        if isinstance(obj, Task):
+            for field in TRACKED_FIELDS:
+                change = _old_and_new(obj, field)
+                if change is not None:
+                    stories.task_changed(obj.id, obj.workspace_id, field, *change)
+        elif isinstance(obj, TaskMembership):
+            change = _old_and_new(obj, "section_id")
+            if change is not None:
+                memberships.append(("section_changed", obj, change))
+    created = session.info.get("created_task_ids", ())
+    for obj in session.new:
+        # Memberships of tasks created in this transaction are part of the creation, not a change.
+        # A task flushed together with its membership has no id yet, hence the task_id check.
+        if isinstance(obj, TaskMembership) and obj.task_id is not None and obj.task_id not in created:
+            memberships.append(("added_to_project", obj, None))
+    for obj in session.deleted:
+        if isinstance(obj, TaskMembership):
+            memberships.append(("removed_from_project", obj, None))
+
+    if not stories and not memberships:
+        return
+    with session.no_autoflush:
+        if memberships:
+            workspaces = dict(session.execute(
+                select(Task.id, Task.workspace_id).where(Task.id.in_({obj.task_id for _, obj, _ in memberships}))
+            ).all())
+            for kind, obj, change in memberships:
+                workspace_id = workspaces.get(obj.task_id)
+                if kind == "section_changed":
+                    stories.section_changed(obj.task_id, workspace_id, obj.project_id, *change)
+                elif kind == "added_to_project":
+                    stories.added_to_project(obj.task_id, workspace_id, obj.project_id)
+                else:
+                    stories.removed_from_project(obj.task_id, workspace_id, obj.project_id)
+        session.add_all([Story(**row) for row in stories.rows(session)])
+
+
+def _after_flush(session: Session, flush_context):
+    # session.new still lists what this flush inserted, now with ids assigned
+    created = [obj.id for obj in session.new if isinstance(obj, Task)]
+    if created:
+        session.info.setdefault("created_task_ids", set()).update(created)
+
+
+def _end_transaction(session: Session, *args):
+    session.info.pop("created_task_ids", None)
+
+
+event.listen(RoutingSession, "before_flush", _before_flush)
+event.listen(RoutingSession, "after_flush", _after_flush)
+event.listen(RoutingSession, "after_commit", _end_transaction)
+event.listen(RoutingSession, "after_rollback", _end_transaction)
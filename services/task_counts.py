@@ -0,0 +1,151 @@
+"""
+Incrementally maintained project task counters.
+
+Every task create, complete/uncomplete, project add/remove and delete applies
+a delta to project_task_counts in the same transaction as the change, so
+GET /projects/{gid}/task_counts is a primary-key read. Drift is repaired by
+reconcile_all_task_counts() (python -m services.maintenance task_counts);
+see services/counters.py for the locking.
+"""
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import select, func, and_
+from sqlalchemy.orm import Session
+from models.task import Task
+from models.task_membership import TaskMembership
+from models.project_task_count import ProjectTaskCount
+from services.counters import add_to_counters, reconcile_in_batches
+from services.goal_progress import record_supporting_change
+from services.portfolio_rollups import invalidate_projects
+
+COUNTER_COLUMNS = ("num_tasks", "num_completed_tasks", "num_milestones", "num_completed_milestones")
+
+
+def task_count_vector(completed: Optional[bool], resource_subtype: Optional[str]) -> Dict[str, int]:
+    """The contribution of one task to its projects' counters"""
+    is_milestone = resource_subtype == "milestone"
+    return {
+        "num_tasks": 1,
+        "num_completed_tasks": 1 if completed else 0,
+        "num_milestones": 1 if is_milestone else 0,
+        "num_completed_milestones": 1 if is_milestone and completed else 0,
+    }
+
+
+def vector_difference(new: Dict[str, int], old: Dict[str, int]) -> Dict[str, int]:
+    return {column: new[column] - old[column] for column in COUNTER_COLUMNS}
+
+
+def apply_task_count_deltas(db: Session, deltas: Dict[int, Dict[str, int]]):
+    """Apply per-project counter deltas with one multi-row upsert"""
+    rows = add_to_counters(db, ProjectTaskCount.__table__, ["project_id"], COUNTER_COLUMNS, [
+        {"project_id": project_id, **{column: delta.get(column, 0) for column in COUNTER_COLUMNS}}
+        for project_id, delta in deltas.items()
+    ])
+    if not rows:
+        return
+    # Goals measured by these projects' completion
+    record_supporting_change(db, "project", [row["project_id"] for row in rows])
+    invalidate_projects(db, [row["project_id"] for row in rows])
+
+
+def apply_task_count_delta(db: Session, project_ids: Iterable[int], delta: Dict[str, int], sign: int = 1):
+    """Apply the same delta (optionally negated) to several projects"""
+    signed = {column: sign * delta[column] for column in COUNTER_COLUMNS}
+    apply_task_count_deltas(db, {project_id: signed for project_id in project_ids})
+
+
+def project_ids_for_task(db: Session, task_id: int) -> List[int]:
+    return [row[0] for row in db.execute(
+        select(TaskMembership.project_id).where(TaskMembership.task_id == task_id)
+    ).all()]
+
+
+def record_task_state_change(db: Session, task_id: int, old_completed: Optional[bool], old_subtype: Optional[str],
+                             new_completed: Optional[bool], new_subtype: Optional[str]):
+    """Update counters of every project a task belongs to after completion/subtype changes"""
+    delta = vector_difference(
+        task_count_vector(new_completed, new_subtype),
+        task_count_vector(old_completed, old_subtype)
+    )
+    if not any(delta.values()):
+        return
+    apply_task_count_delta(db, project_ids_for_task(db, task_id), delta)
+
+
+def get_task_counts(db: Session, project_id: int) -> Dict[str, int]:
+    """Counter values for one project, including the derived incomplete counts"""
+    counts = db.get(ProjectTaskCount, project_id)
+    values = {column: (getattr(counts, column) if counts else 0) or 0 for column in COUNTER_COLUMNS}
+    values["num_incomplete_tasks"] = values["num_tasks"] - values["num_completed_tasks"]
+    values["num_incomplete_milestones"] = values["num_milestones"] - values["num_completed_milestones"]
+    return values
+
+
+def grouped_task_counts(*criteria):
+    """One grouped SELECT of per-project counter values over the memberships matching criteria"""
+    is_milestone = Task.resource_subtype == "milestone"
+    is_completed = Task.completed.is_(True)
+    return (
+        select(
+            TaskMembership.project_id,
+            func.count().label("num_tasks"),
+            func.count().filter(is_completed).label("num_completed_tasks"),
+            func.count().filter(is_milestone).label("num_milestones"),
+            func.count().filter(and_(is_milestone, is_completed)).label("num_completed_milestones"),
+        )
+        .join(Task, Task.id == TaskMembership.task_id)
+        .where(*criteria)
+        .group_by(TaskMembership.project_id)
+    )
+
+
+def add_grouped_task_counts(db: Session, *criteria):
+    """Count the memberships matching criteria into their projects' counters (used after bulk inserts)"""
+    deltas = {
+        row.project_id: {column: getattr(row, column) for column in COUNTER_COLUMNS}
+        for row in db.execute(grouped_task_counts(*criteria)).all()
+    }
+    apply_task_count_deltas(db, deltas)
+
+
+def reconcile_task_counts(db: Session, project_ids: List[int]) -> int:
+    """
+    Recompute counters for the given projects from the tasks table and fix drifted rows.
+    Returns the number of projects whose counters were corrected.
+    """
+    if not project_ids:
+        return 0
+    project_ids = sorted(project_ids)
+    stored = {
+        row.project_id: row for row in db.execute(
+            select(ProjectTaskCount)
+            .where(ProjectTaskCount.project_id.in_(project_ids))
+            .order_by(ProjectTaskCount.project_id)
+            .with_for_update()
+        ).scalars().all()
+    }
+    actual = {
+        row.project_id: row for row in db.execute(
+            grouped_task_counts(TaskMembership.project_id.in_(project_ids))
+        ).all()
+    }
+
+    corrections = {}
+    for project_id in project_ids:
+        row = actual.get(project_id)
+        expected = {column: (getattr(row, column) if row else 0) for column in COUNTER_COLUMNS}
+        current = stored.get(project_id)
+        found = {column: (getattr(current, column) if current else 0) or 0 for column in COUNTER_COLUMNS}
+        if expected != found:
+            corrections[project_id] = vector_difference(expected, found)
+
+    apply_task_count_deltas(db, corrections)
+    return len(corrections)
+
+
+def reconcile_all_task_counts(db: Session, batch_size: int = 500) -> int:
+    """Reconcile every project that has tasks or a counter row; returns the number corrected"""
+    candidates = select(TaskMembership.project_id).union(select(ProjectTaskCount.project_id)).subquery()
+    project_ids = [row[0] for row in db.execute(select(candidates.c[0]).order_by(candidates.c[0])).all()]
+    return reconcile_in_batches(db, project_ids, batch_size, reconcile_task_counts)
+
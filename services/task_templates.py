@@ -0,0 +1,196 @@
+"""
+Task template instantiation.
+
+A TaskTemplate.template is a JSON task tree:
+
+    {
+        "name": "Onboard new hire",
+        "task_resource_subtype": "default_task",   # or "milestone", ...
+        "description": "Plain-text notes",
+        "assignee": "<user gid>",
+        "relative_start_on": 0,                      # days after instantiation
+        "relative_due_on": 5,
+        "custom_fields": {"<custom field gid>": "value"},
+        "subtasks": [ { ...same shape... } ]
+    }
+
+Instantiation expands the tree `count` times into flat rows with ids
+pre-allocated from the tasks sequence, so parent links are known up front
+and the whole batch is written with multi-row INSERT ... RETURNING.
+"""
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import select, insert, func
+from sqlalchemy.orm import Session
+from audit_log import audit_core_writes
+from models.task import Task
+from models.task_template import TaskTemplate
+from models.task_membership import TaskMembership
+from models.project import Project
+from models.user import User
+from models.custom_field import CustomField
+from services.task_counts import task_count_vector, apply_task_count_delta
+from utils import generate_gid
+
+# Instantiations creating more task rows than this run as a background job
+JOB_THRESHOLD_ROWS = 500
+# Upper bound on rows per INSERT statement, to keep statement size reasonable
+INSERT_CHUNK_ROWS = 5000
+MAX_COUNT = 1000
+
+
+class TemplateError(ValueError):
+    """The template JSON cannot be instantiated"""
+
+
+def flatten_template(template: Dict[str, Any]) -> List[Tuple[Dict[str, Any], Optional[int]]]:
+    """Depth-first (node, parent index) list of a template tree"""
+    if not isinstance(template, dict):
+        raise TemplateError("Template must be a JSON object")
+    nodes = []
+    stack = [(template, None)]
+    while stack:
+        node, parent_index = stack.pop()
+        index = len(nodes)
+        nodes.append((node, parent_index))
+        subtasks = node.get("subtasks") or []
+        if not isinstance(subtasks, list):
+            raise TemplateError("subtasks must be a list")
+        for subtask in reversed(subtasks):
+            if not isinstance(subtask, dict):
+                raise TemplateError("Each subtask must be a JSON object")
+            stack.append((subtask, index))
+    return nodes
+
+
+def row_count(template: Dict[str, Any], count: int) -> int:
+    return len(flatten_template(template)) * count
+
+
+def validate_template(db: Session, template: Dict[str, Any], count: int) -> int:
+    """
+    Check a template's shape and that every assignee and custom field it names exists,
+    so a background instantiation cannot fail on them. Returns the rows count copies create.
+    """
+    nodes = flatten_template(template)
+    _resolve_references(db, nodes)
+    return len(nodes) * count
+
+
+def _resolve_references(db: Session, nodes) -> Tuple[Dict[str, int], set]:
+    """Resolve every assignee gid and check every custom field gid, one query each"""
+    assignee_gids = {node["assignee"] for node, _ in nodes if node.get("assignee")}
+    field_gids = set()
+    for node, _ in nodes:
+        field_gids.update((node.get("custom_fields") or {}).keys())
+
+    assignees = {}
+    if assignee_gids:
+        assignees = dict(db.execute(select(User.gid, User.id).where(User.gid.in_(assignee_gids))).all())
+        missing = assignee_gids - set(assignees)
+        if missing:
+            raise TemplateError(f"Assignee not found: {', '.join(sorted(missing))}")
+    if field_gids:
+        found = set(db.scalars(select(CustomField.gid).where(CustomField.gid.in_(field_gids))).all())
+        missing = field_gids - found
+        if missing:
+            raise TemplateError(f"Custom field not found: {', '.join(sorted(missing))}")
+    return assignees, field_gids
+
+
+def _relative_date(base: date, offset) -> Optional[date]:
+    if offset is None:
+        return None
+    try:
+        return base + timedelta(days=int(offset))
+    except (TypeError, ValueError):
+        raise TemplateError("relative_start_on/relative_due_on must be a number of days")
+
+
+def instantiate(db: Session, template_id: int, name: Optional[str], project_id: Optional[int],
+                count: int = 1, creator_id: Optional[int] = None,
+                start: Optional[date] = None) -> List[Dict[str, Any]]:
+    """
+    Materialize `count` copies of a task template (with all nested subtasks) and add the
+    top-level tasks to the project. Returns the compact records of the top-level tasks.
+    """
+    task_template = db.get(TaskTemplate, template_id)
+    nodes = flatten_template(task_template.template or {"name": task_template.name})
+    assignees, _ = _resolve_references(db, nodes)
+    start = start or date.today()
+
+    workspace_id = None
+    if project_id is not None:
+        workspace_id = db.scalar(select(Project.workspace_id).where(Project.id == project_id))
+
+    total = len(nodes) * count
+    new_ids = db.scalars(
+        select(func.nextval(func.pg_get_serial_sequence("tasks", "id"))).select_from(func.generate_series(1, total))
+    ).all()
+
+    child_counts = [0] * len(nodes)
+    for _, parent_index in nodes:
+        if parent_index is not None:
+            child_counts[parent_index] += 1
+
+    rows = []
+    for copy in range(count):
+        offset = copy * len(nodes)
+        for index, (node, parent_index) in enumerate(nodes):
+            is_root = parent_index is None
+            rows.append({
+                "id": new_ids[offset + index],
+                "gid": generate_gid(),
+                "resource_type": "task",
+                "resource_subtype": node.get("task_resource_subtype") or "default_task",
+                "name": (name if is_root and name else node.get("name")) or task_template.name or "New Task",
+                "notes": node.get("description"),
+                "completed": False,
+                "assignee_id": assignees.get(node.get("assignee")),
+                "start_on": _relative_date(start, node.get("relative_start_on")),
+                "due_on": _relative_date(start, node.get("relative_due_on")),
+                "workspace_id": workspace_id,
+                "parent_id": None if is_root else new_ids[offset + parent_index],
+                "num_subtasks": child_counts[index],
+                "num_likes": 0,
+                "custom_field_values": node.get("custom_fields") or None,
+                "created_by_id": creator_id,
+            })
+
+    created = {}
+    for start_row in range(0, len(rows), INSERT_CHUNK_ROWS):
+        chunk = rows[start_row:start_row + INSERT_CHUNK_ROWS]
+        created.update(
+            (row.id, row) for row in db.execute(
+                insert(Task.__table__).values(chunk).returning(
+                    Task.__table__.c.id, Task.__table__.c.gid, Task.__table__.c.name,
+                    Task.__table__.c.resource_subtype, Task.__table__.c.workspace_id
+                )
+            ).all()
+        )
+    audit_core_writes(db, "tasks", "created", created.values())
+
+    root_ids = [new_ids[copy * len(nodes)] for copy in range(count)]
+    if project_id is not None:
+        db.execute(insert(TaskMembership.__table__).values([
+            {"task_id": task_id, "project_id": project_id} for task_id in root_ids
+        ]))
+        root = nodes[0][0]
+        vector = task_count_vector(False, root.get("task_resource_subtype") or "default_task")
+        apply_task_count_delta(db, [project_id], {column: value * count for column, value in vector.items()})
+
+    return [
+        {
+            "gid": created[task_id].gid,
+            "resource_type": "task",
+            "name": created[task_id].name,
+            "resource_subtype": created[task_id].resource_subtype
+        }
+        for task_id in root_ids
+    ]
+
+
+def instantiate_job(db: Session, template_id: int, name: Optional[str], project_id: Optional[int],
+                    count: int, creator_id: Optional[int]) -> Dict[str, Any]:
+    """Job entry point: the job's new_task is the first created top-level task"""
+    return instantiate(db, template_id, name, project_id, count, creator_id)[0]
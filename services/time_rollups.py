@@ -0,0 +1,212 @@
+"""
+Incrementally maintained time tracking rollups.
+
+Creating, changing or deleting a time tracking entry applies its minutes as
+deltas to four rollup tables in the same transaction as the change:
+
+    task_time_totals       per task (the task's actual_time_minutes)
+    project_time_totals    per project the time is attributable to
+    user_daily_time        per workspace, day and user (timesheets)
+    workspace_daily_time   per workspace and day
+
+so task totals are primary-key reads and time reports over any date range
+read one rollup range instead of the raw entries. Drift is repaired by
+reconcile_all_time_rollups() (python -m services.maintenance time_rollups);
+see services/counters.py.
+"""
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import select, func, delete, tuple_, Date, cast
+from sqlalchemy.orm import Session
+from models.time_tracking_entry import TimeTrackingEntry
+from models.task_time_total import TaskTimeTotal
+from models.project_time_total import ProjectTimeTotal
+from models.user_daily_time import UserDailyTime
+from models.workspace_daily_time import WorkspaceDailyTime
+from services.budgets import recompute_budgets
+from services.counters import add_to_counters, differences, reconcile_in_batches
+
+# Rollup model -> its key columns and the entry columns they are read from
+ROLLUPS = {
+    TaskTimeTotal: {"task_id": "task_id"},
+    ProjectTimeTotal: {"project_id": "attributable_to_id"},
+    UserDailyTime: {"workspace_id": "workspace_id", "entered_on": "entered_on", "user_id": "user_id"},
+    WorkspaceDailyTime: {"workspace_id": "workspace_id", "entered_on": "entered_on"},
+}
+
+GRANULARITIES = ("day", "week", "month")
+# Periods a single report may cover
+MAX_REPORT_PERIODS = 400
+
+# Rollup model -> {key: minutes}
+TimeDeltas = Dict[Any, Dict[Tuple, int]]
+
+
+def entry_state(entry: TimeTrackingEntry) -> Dict[str, Any]:
+    """The entry columns the rollups and budgets depend on; take one before and one after a change"""
+    state = {column: getattr(entry, column) for keys in ROLLUPS.values() for column in keys.values()}
+    state["duration_minutes"] = entry.duration_minutes or 0
+    state["billable_status"] = entry.billable_status
+    return state
+
+
+def _add_entry(deltas: TimeDeltas, state: Optional[Dict[str, Any]], sign: int):
+    if not state or not state["duration_minutes"]:
+        return
+    for model, keys in ROLLUPS.items():
+        key = tuple(state[column] for column in keys.values())
+        if any(value is None for value in key):
+            continue
+        rows = deltas.setdefault(model, {})
+        rows[key] = rows.get(key, 0) + sign * state["duration_minutes"]
+
+
+def apply_time_deltas(db: Session, deltas: TimeDeltas):
+    """Apply rollup deltas with one multi-row upsert per rollup table"""
+    for model, keys in ROLLUPS.items():
+        add_to_counters(db, model.__table__, list(keys), ["actual_time_minutes"], [
+            {**dict(zip(keys, key)), "actual_time_minutes": minutes}
+            for key, minutes in deltas.get(model, {}).items()
+        ])
+
+
+def record_entry_change(db: Session, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]):
+    """Move an entry's minutes from its old rollup rows to its new ones (None: created or deleted)"""
+    deltas: TimeDeltas = {}
+    _add_entry(deltas, old, -1)
+    _add_entry(deltas, new, 1)
+    apply_time_deltas(db, deltas)
+
+
+def delete_task_time(db: Session, task_ids: List[int]):
+    """
+    Delete the time entries of tasks that are being deleted, taking their minutes out of
+    every rollup, and recompute the budgets of the projects the time was attributed to
+    """
+    entries = db.execute(
+        select(TimeTrackingEntry).where(TimeTrackingEntry.task_id.in_(task_ids))
+        .order_by(TimeTrackingEntry.id).with_for_update()
+    ).scalars().all()
+    deltas: TimeDeltas = {}
+    for entry in entries:
+        _add_entry(deltas, entry_state(entry), -1)
+    apply_time_deltas(db, deltas)
+    db.execute(delete(TimeTrackingEntry.__table__).where(TimeTrackingEntry.__table__.c.task_id.in_(task_ids)))
+    db.execute(delete(TaskTimeTotal.__table__).where(TaskTimeTotal.__table__.c.task_id.in_(task_ids)))
+    recompute_budgets(db, {entry.attributable_to_id for entry in entries if entry.attributable_to_id is not None})
+
+
+def task_actual_time_minutes(db: Session, task_id: int) -> int:
+    total = db.get(TaskTimeTotal, task_id)
+    return total.actual_time_minutes if total else 0
+
+
+def period_start(day: date, granularity: str) -> date:
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def periods(start_on: date, end_on: date, granularity: str) -> List[date]:
+    """Start of every period overlapping [start_on, end_on]"""
+    starts = []
+    current = period_start(start_on, granularity)
+    while current <= end_on:
+        starts.append(current)
+        if granularity == "month":
+            current = (current + timedelta(days=32)).replace(day=1)
+        else:
+            current += timedelta(days=7 if granularity == "week" else 1)
+    return starts
+
+
+def time_report(db: Session, workspace_id: int, start_on: date, end_on: date, granularity: str,
+                user_id: Optional[int] = None, by_user: bool = False) -> Dict[Optional[int], Dict[date, int]]:
+    """
+    Minutes per period in [start_on, end_on], from the daily rollups: the workspace
+    total (key None), one user's, or every user's. Periods are grouped in SQL, so
+    a month of a 1,000 person workspace is one index range and about 1,000 result rows.
+    """
+    if user_id is None and not by_user:
+        model, user_column = WorkspaceDailyTime, None
+    else:
+        model, user_column = UserDailyTime, UserDailyTime.user_id
+    period = cast(func.date_trunc(granularity, model.entered_on), Date).label("period")
+    columns = [period, func.sum(model.actual_time_minutes).label("minutes")]
+    if by_user:
+        columns.insert(0, user_column)
+    query = select(*columns).where(
+        model.workspace_id == workspace_id, model.entered_on >= start_on, model.entered_on <= end_on
+    )
+    if user_id is not None:
+        query = query.where(user_column == user_id)
+    query = query.group_by(*columns[:-1])
+
+    report: Dict[Optional[int], Dict[date, int]] = {} if by_user else {user_id: {}}
+    for row in db.execute(query).all():
+        series = report.setdefault(row.user_id if by_user else user_id, {})
+        series[row.period] = int(row.minutes or 0)
+    return report
+
+
+def _entry_key(keys: Dict[str, str]):
+    return [getattr(TimeTrackingEntry, column) for column in keys.values()]
+
+
+def grouped_time_totals(model, *criteria):
+    """One grouped SELECT of a rollup's values over the entries matching criteria"""
+    keys = ROLLUPS[model]
+    entry_key = _entry_key(keys)
+    return (
+        select(*[column.label(name) for name, column in zip(keys, entry_key)],
+               func.sum(TimeTrackingEntry.duration_minutes).label("actual_time_minutes"))
+        .where(*[column.isnot(None) for column in entry_key], TimeTrackingEntry.duration_minutes.isnot(None),
+               *criteria)
+        .group_by(*entry_key)
+    )
+
+
+def add_grouped_time_totals(db: Session, *criteria):
+    """Add the entries matching criteria to every rollup with one INSERT ... SELECT each (used after bulk loads)"""
+    for model, keys in ROLLUPS.items():
+        add_to_counters(db, model.__table__, list(keys), ["actual_time_minutes"], grouped_time_totals(model, *criteria))
+
+
+def reconcile_time_rollup(db: Session, model, keys: List[Tuple]) -> int:
+    """Recompute the given rows of one rollup from the entries and fix drifted rows; returns the number corrected"""
+    if not keys:
+        return 0
+    columns = ROLLUPS[model]
+    key_columns = [getattr(model, column) for column in columns]
+    stored = {
+        tuple(getattr(row, column) for column in columns): row.actual_time_minutes for row in db.execute(
+            select(model).where(tuple_(*key_columns).in_(keys)).order_by(*key_columns).with_for_update()
+        ).scalars().all()
+    }
+    actual = {
+        tuple(row[:-1]): int(row.actual_time_minutes) for row in db.execute(
+            grouped_time_totals(model, tuple_(*_entry_key(columns)).in_(keys))
+        ).all()
+    }
+
+    corrections = differences(stored, actual)
+    apply_time_deltas(db, {model: corrections})
+    return len(corrections)
+
+
+def reconcile_all_time_rollups(db: Session, batch_size: int = 500) -> int:
+    """Reconcile every rollup row that exists or should exist; returns the number corrected"""
+    corrected = 0
+    for model, columns in ROLLUPS.items():
+        entry_key = _entry_key(columns)
+        candidates = select(*entry_key).where(*[column.isnot(None) for column in entry_key]).union(
+            select(*[getattr(model, column) for column in columns])
+        ).subquery()
+        keys = [tuple(row) for row in db.execute(select(candidates).order_by(*candidates.c)).all()]
+        corrected += reconcile_in_batches(
+            db, keys, batch_size, lambda session, batch: reconcile_time_rollup(session, model, batch)
+        )
+    return corrected
+
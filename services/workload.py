@@ -0,0 +1,250 @@
+"""
+Workload and capacity from allocations.
+
+Every allocation is turned into hours per day for its assignee: a percent
+allocation books that share of a working day (WORKLOAD_HOURS_PER_DAY) on each
+working day it spans, an hours allocation spreads its hours evenly over its
+working days (over its calendar days if it has none). A window of users and
+days is computed in one pass: each allocation adds its daily rate at its first
+day and removes it after its last in a (user, day) difference array, and a
+cumulative sum along the days gives every user's load. Days loaded beyond
+capacity are over-allocated; runs of them are reported as conflicts.
+
+Users' daily loads are cached per (workspace, window) in this process and
+recomputed per affected user: an allocation write invalidates its old and new
+assignee, and the next read recomputes only them.
+
+    WORKLOAD_HOURS_PER_DAY=8               capacity of a working day (Monday to Friday)
+    WORKLOAD_MAX_DAYS=366                  longest window a request may cover
+    WORKLOAD_CACHE_TTL_SECONDS=60          bounds staleness from writes made by other processes
+    WORKLOAD_CACHE_MAX_CELLS=20000000      cached (user, day) values, evicting least recently used windows
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models.allocation import Allocation
+from models.project import Project
+
+EFFORT_TYPES = ("hours", "percent")
+HOURS_PER_DAY = float(os.getenv("WORKLOAD_HOURS_PER_DAY", "8"))
+MAX_DAYS = int(os.getenv("WORKLOAD_MAX_DAYS", "366"))
+CACHE_TTL_SECONDS = float(os.getenv("WORKLOAD_CACHE_TTL_SECONDS", "60"))
+CACHE_MAX_CELLS = int(os.getenv("WORKLOAD_CACHE_MAX_CELLS", "20000000"))
+
+# Loads within this many hours of capacity are not over-allocated (float sums)
+TOLERANCE = 1e-6
+
+# (workspace_id, start, end)
+WindowKey = Tuple[int, date, date]
+
+
+def working_days(start: date, end: date) -> np.ndarray:
+    """Whether each day of [start, end] is a working day"""
+    days = np.arange(np.datetime64(start), np.datetime64(end + timedelta(days=1)))
+    return np.is_busday(days)
+
+
+def daily_loads(user_ids: List[int], start: date, end: date, assignees: np.ndarray, starts: np.ndarray,
+                ends: np.ndarray, effort_types: np.ndarray, values: np.ndarray,
+                hours_per_day: float = HOURS_PER_DAY) -> np.ndarray:
+    """
+    Hours allocated to each user on each day of [start, end], as a (user, day) array.
+    assignees are user ids; starts and ends are numpy dates (allocations may extend
+    beyond the window); effort_types are "hours" or "percent".
+    """
+    days = (end - start).days + 1
+    loads = np.zeros((len(user_ids), days))
+    window_start, window_end = np.datetime64(start), np.datetime64(end)
+    known = np.isin(assignees, user_ids) & np.isin(effort_types, EFFORT_TYPES) & (starts <= ends) \
+        & (starts <= window_end) & (ends >= window_start)
+    if not known.any():
+        return loads
+    assignees, starts, ends = assignees[known], starts[known], ends[known]
+    effort_types, values = effort_types[known], values[known].astype(float)
+
+    # An allocation's working days; hours allocations without any are spread over calendar days
+    span_working = np.busday_count(starts, ends + np.timedelta64(1, "D"))
+    calendar = (effort_types == "hours") & (span_working == 0)
+    span_calendar = (ends - starts).astype(np.int64) + 1
+    rates = np.where(
+        effort_types == "percent",
+        values / 100 * hours_per_day,
+        values / np.where(calendar, span_calendar, np.maximum(span_working, 1))
+    )
+
+    rows = np.searchsorted(np.array(user_ids), assignees)
+    first = (np.maximum(starts, window_start) - window_start).astype(np.int64)
+    after = (np.minimum(ends, window_end) - window_start).astype(np.int64) + 1
+    # Working day rates (layer 0) are masked to working days after the sweep, calendar ones (layer 1) are not
+    layers = calendar.astype(np.int64)
+    steps = np.zeros((2, len(user_ids), days + 1))
+    np.add.at(steps, (layers, rows, first), rates)
+    np.add.at(steps, (layers, rows, after), -rates)
+    swept = np.cumsum(steps, axis=2)[:, :, :days]
+    return swept[0] * working_days(start, end) + swept[1]
+
+
+def capacities(start: date, end: date, hours_per_day: float = HOURS_PER_DAY) -> np.ndarray:
+    """Capacity of each day of [start, end] in hours"""
+    return working_days(start, end) * hours_per_day
+
+
+def conflicts(loads: np.ndarray, capacity: np.ndarray) -> List[Tuple[int, int, int]]:
+    """(row, first day, last day) of every run of consecutive over-allocated days, by row and day"""
+    over = loads > capacity + TOLERANCE
+    padded = np.zeros((over.shape[0], over.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = over
+    edges = np.diff(padded, axis=1)
+    run_rows, run_starts = np.nonzero(edges == 1)
+    _, run_afters = np.nonzero(edges == -1)
+    return [(int(row), int(first), int(after) - 1) for row, first, after in zip(run_rows, run_starts, run_afters)]
+
+
+def period_sums(values: np.ndarray, period_starts: List[int]) -> np.ndarray:
+    """Sums along the last axis over the periods beginning at the given day indexes"""
+    if not values.shape[-1]:
+        return np.zeros(values.shape[:-1] + (len(period_starts),))
+    return np.add.reduceat(values, period_starts, axis=-1)
+
+
+class WorkloadCache:
+    """
+    Users' daily loads by (workspace, window), bounded LRU. Per-user generations make
+    a computation that overlapped an invalidation of a user not cache that user.
+    """
+
+    def __init__(self, max_cells: int = CACHE_MAX_CELLS, ttl_seconds: float = CACHE_TTL_SECONDS):
+        self.max_cells = max_cells
+        self.ttl_seconds = ttl_seconds
+        # window -> (created at, {user_id: loads})
+        self.windows: "OrderedDict[WindowKey, Tuple[float, Dict[int, np.ndarray]]]" = OrderedDict()
+        self.cells = 0
+        self.generations: Dict[int, int] = {}
+        self.lock = threading.Lock()
+
+    def _drop(self, key: WindowKey):
+        _, loads = self.windows.pop(key)
+        self.cells -= sum(row.size for row in loads.values())
+
+    def get(self, key: WindowKey, user_ids: Iterable[int]) -> Tuple[Dict[int, np.ndarray], Dict[int, int]]:
+        """Cached loads of the users, and the generations of the missing ones (to pass to put)"""
+        with self.lock:
+            entry = self.windows.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl_seconds:
+                self._drop(key)
+                entry = None
+            cached = entry[1] if entry is not None else {}
+            if entry is not None:
+                self.windows.move_to_end(key)
+            found = {user_id: cached[user_id] for user_id in user_ids if user_id in cached}
+            missing = {user_id: self.generations.get(user_id, 0) for user_id in user_ids if user_id not in cached}
+            return found, missing
+
+    def put(self, key: WindowKey, loads: Dict[int, np.ndarray], generations: Dict[int, int]):
+        """Cache computed loads, except of users invalidated since their generation was read"""
+        with self.lock:
+            if key not in self.windows:
+                self.windows[key] = (time.monotonic(), {})
+            cached = self.windows[key][1]
+            for user_id, row in loads.items():
+                if self.generations.get(user_id, 0) == generations.get(user_id) and user_id not in cached:
+                    cached[user_id] = row
+                    self.cells += row.size
+            self.windows.move_to_end(key)
+            while self.cells > self.max_cells and self.windows:
+                self._drop(next(iter(self.windows)))
+
+    def invalidate(self, user_ids: Iterable[Optional[int]]):
+        """Forget the loads of users whose allocations changed, in every window"""
+        user_ids = {user_id for user_id in user_ids if user_id is not None}
+        if not user_ids:
+            return
+        with self.lock:
+            for user_id in user_ids:
+                self.generations[user_id] = self.generations.get(user_id, 0) + 1
+            for _, cached in self.windows.values():
+                for user_id in user_ids & cached.keys():
+                    self.cells -= cached.pop(user_id).size
+
+    def clear(self):
+        with self.lock:
+            self.windows.clear()
+            self.cells = 0
+
+
+cache = WorkloadCache()
+
+
+def _compute_loads(db: Session, workspace_id: int, user_ids: List[int], start: date, end: date) -> np.ndarray:
+    """Loads of the users from their allocations on the workspace's projects overlapping the window"""
+    rows = db.execute(
+        select(Allocation.assignee_id, Allocation.start_date, Allocation.end_date, Allocation.effort_type,
+               Allocation.effort_value)
+        .join(Project, Project.id == Allocation.parent_id)
+        .where(Project.workspace_id == workspace_id, Allocation.assignee_id.in_(user_ids),
+               Allocation.start_date <= end, Allocation.end_date >= start, Allocation.effort_value.isnot(None))
+    ).all()
+    return daily_loads(
+        user_ids, start, end,
+        np.array([row[0] for row in rows], dtype=np.int64),
+        np.array([row[1] for row in rows], dtype="datetime64[D]"),
+        np.array([row[2] for row in rows], dtype="datetime64[D]"),
+        np.array([row[3] for row in rows], dtype=object),
+        np.array([row[4] for row in rows], dtype=float),
+    )
+
+
+def user_loads(db: Session, workspace_id: int, user_ids: Iterable[int], start: date, end: date) -> np.ndarray:
+    """(user, day) loads of the users in sorted id order, computing only those not cached for the window"""
+    user_ids = sorted(set(user_ids))
+    key = (workspace_id, start, end)
+    found, missing = cache.get(key, user_ids)
+    if missing:
+        computed = _compute_loads(db, workspace_id, sorted(missing), start, end)
+        fresh = {user_id: computed[index] for index, user_id in enumerate(sorted(missing))}
+        cache.put(key, fresh, missing)
+        found.update(fresh)
+    days = (end - start).days + 1
+    return np.array([found[user_id] for user_id in user_ids]).reshape(len(user_ids), days)
+
+
+def workload(db: Session, workspace_id: int, user_ids: Iterable[int], start: date, end: date,
+             period_starts: List[date]) -> Dict[str, Any]:
+    """
+    Workload heatmap of the users over [start, end]: allocated and capacity hours per user
+    and period (and in total, key None), over-allocated days, and over-allocation conflicts.
+    """
+    user_ids = sorted(set(user_ids))
+    loads = user_loads(db, workspace_id, user_ids, start, end)
+    capacity = capacities(start, end)
+    offsets = [max((period - start).days, 0) for period in period_starts]
+
+    allocated = period_sums(loads, offsets)
+    period_capacity = period_sums(capacity, offsets)
+    over = (loads > capacity + TOLERANCE).sum(axis=1)
+
+    series = {None: {
+        "allocated": allocated.sum(axis=0), "capacity": period_capacity * len(user_ids), "over_days": int(over.sum()),
+    }}
+    for index, user_id in enumerate(user_ids):
+        series[user_id] = {"allocated": allocated[index], "capacity": period_capacity, "over_days": int(over[index])}
+
+    found = []
+    for row, first, last in conflicts(loads, capacity):
+        run = slice(first, last + 1)
+        found.append({
+            "user_id": user_ids[row],
+            "start_on": start + timedelta(days=first),
+            "end_on": start + timedelta(days=last),
+            "peak_hours": float(loads[row, run].max()),
+            "excess_hours": float((loads[row, run] - capacity[run]).sum()),
+        })
+    return {"series": series, "conflicts": found}
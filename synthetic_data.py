@@ -0,0 +1,718 @@
+"""
+Synthetic dataset generator for benchmarking.
+
+Unlike seed_data.py (a handful of hand-written rows for API testing), this
+produces a deterministic, production-shaped dataset of any size, from a few
+thousand to tens of millions of tasks, with realistic skew:
+
+    hot projects      task memberships follow a Zipf distribution over projects
+    long threads      stories follow a Zipf distribution over tasks
+    heavy assignees   task assignees and time entries follow a Zipf distribution over users
+
+Every table in Base.metadata is generated from its column types, foreign keys
+and unique constraints; TABLE_OVERRIDES shapes the columns that matter for
+realistic queries. Row ids are 1..N per table, so foreign keys are picked
+without reading anything back. Tables are loaded level by level in foreign
+key order with COPY FROM STDIN, split into fixed-size chunks that run in
+parallel worker processes. The same --seed and --tasks always produce the
+same rows, independent of --workers.
+
+    python synthetic_data.py --tasks 1000000 --seed 42 --workers 8
+
+Existing data is truncated first. Derived data (sequences, tasks.num_subtasks,
+project_task_counts, reaction_summaries, the time tracking rollups) is computed
+in SQL after loading, and budget actuals from the loaded entries and rates.
+"""
+import argparse
+import io
+import json
+import math
+import os
+import random
+import time
+import uuid
+from decimal import Decimal
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import Boolean, Date, DateTime, Integer, JSON, Numeric, String, Text, ARRAY, text, update, func, select
+from database import Base, engine, SessionLocal, import_models
+
+# Rows per COPY; chunk boundaries are part of the data definition (subtask
+# parents are picked within a chunk), so changing this changes the dataset
+CHUNK_ROWS = 100_000
+# Generated timestamps fall in the two years before this instant
+DATASET_END = datetime(2025, 1, 1, tzinfo=timezone.utc)
+DATASET_SPAN_SECONDS = 2 * 365 * 24 * 3600
+SECTIONS_PER_PROJECT = 5
+PROJECT_MEMBERS_PER_PROJECT = 5
+ENUM_OPTIONS_PER_FIELD = 5
+REACTIONS_PER_STORY = 8
+
+# Tables whose contents are computed from other tables after loading
+DERIVED_TABLES = {
+    "project_task_counts", "reaction_summaries",
+    "task_time_totals", "project_time_totals", "user_daily_time", "workspace_daily_time",
+    "portfolio_closure", "portfolio_rollups",
+}
+# Bookkeeping tables the generator never touches
+UNMANAGED_TABLES = {"schema_version"}
+# Foreign keys left NULL to break reference cycles (projects <-> project_statuses)
+NULL_REFERENCES = {("projects", "current_status_update_id")}
+
+COLORS = ["dark-pink", "dark-green", "dark-blue", "dark-red", "dark-teal", "dark-brown",
+          "dark-orange", "dark-purple", "dark-warm-gray", "light-pink", "light-green", "light-blue"]
+SENTENCES = [
+    "Follow up with the design team before the review.",
+    "Blocked on the API contract, see the linked task.",
+    "Updated the estimate after the planning meeting.",
+    "Looks good to me, shipping this today.",
+    "Can we move this to next sprint?",
+    "Added screenshots and reproduction steps.",
+    "Customer reported this again on Monday.",
+    "Waiting on legal sign-off.",
+    "Split the remaining work into subtasks.",
+    "Please review the attached draft.",
+    "The rollout is at fifty percent, metrics look healthy.",
+    "Closing this out, the fix is verified in production.",
+]
+# Reaction emoji names fit reactions.emoji_base (VARCHAR(10))
+EMOJIS = ["thumbsup", "heart", "tada", "eyes", "rocket", "clap"]
+EVENT_ACTIONS = ["added", "changed", "removed", "deleted", "undeleted"]
+SYSTEM_STORY_SUBTYPES = ["assigned", "marked_complete", "due_date_changed", "section_changed", "added_to_project"]
+
+
+def row_counts(tasks: int) -> Dict[str, int]:
+    """Rows per table for a dataset of the given number of tasks"""
+    projects = max(10, tasks // 1_000)
+    users = max(50, tasks // 100)
+    custom_fields = max(20, tasks // 50_000)
+    stories = tasks * 3
+    counts = {
+        "workspaces": max(1, tasks // 500_000),
+        "users": users,
+        "teams": max(5, tasks // 10_000),
+        "projects": projects,
+        "project_statuses": projects,
+        "project_briefs": projects // 2,
+        "sections": projects * SECTIONS_PER_PROJECT,
+        "project_memberships": projects * PROJECT_MEMBERS_PER_PROJECT,
+        "workspace_memberships": users,
+        "team_memberships": users,
+        "tasks": tasks,
+        "task_memberships": tasks,
+        "task_dependencies": max(0, tasks // 20 - 50),
+        "stories": stories,
+        "reactions": stories // 10,
+        "attachments": tasks // 20,
+        "events": tasks // 10,
+        "time_tracking_entries": tasks // 10,
+        "rates": projects * 3,
+        "budgets": projects // 2,
+        "allocations": users * 2,
+        "custom_fields": custom_fields,
+        "enum_options": custom_fields * ENUM_OPTIONS_PER_FIELD,
+        "tags": max(20, tasks // 10_000),
+        "goals": max(10, tasks // 20_000),
+        "goal_metrics": max(10, tasks // 20_000),
+        "goal_relationships": max(10, tasks // 20_000) * 3,
+        "portfolios": max(5, tasks // 50_000),
+        # A nesting tree over the portfolios, then every project in one portfolio
+        "portfolio_items": max(5, tasks // 50_000) - 1 + projects,
+    }
+    default = max(10, tasks // 100_000)
+    for table in Base.metadata.tables.values():
+        if table.name in UNMANAGED_TABLES:
+            continue
+        if table.name in DERIVED_TABLES:
+            counts[table.name] = 0
+        counts.setdefault(table.name, default)
+    return counts
+
+
+# ---------------------------------------------------------------------------
+# Deterministic randomness
+# ---------------------------------------------------------------------------
+
+def _mix(value: int) -> int:
+    """splitmix64 finalizer: a well-scrambled 64-bit hash of an integer"""
+    value = (value + 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return value ^ (value >> 31)
+
+
+def unit(seed: int, salt: int, i: int) -> float:
+    """Uniform [0, 1) value that depends only on (seed, salt, i), for cross-table consistency"""
+    return _mix(_mix(seed * 1_000_003 + salt) ^ i) / 2.0 ** 64
+
+
+def zipf_rank(u: float, n: int, s: float) -> int:
+    """
+    Map a uniform value to a rank in 1..n with P(rank) ~ 1 / rank^s, using the
+    inverse CDF of the continuous power law so no per-rank table is needed.
+    """
+    if n <= 1:
+        return 1
+    if abs(s - 1.0) < 1e-9:
+        rank = math.exp(u * math.log(n + 1))
+    else:
+        rank = ((math.pow(n + 1, 1 - s) - 1) * u + 1) ** (1 / (1 - s))
+    return min(n, max(1, int(rank)))
+
+
+def scatter(rank: int, n: int) -> int:
+    """Spread popular ranks across the id space so hot rows are not all the oldest ones"""
+    return (rank - 1) * 2_654_435_761 % n + 1 if n > 1 else 1
+
+
+class Dataset:
+    """Row counts and the cross-table functions that keep generated rows consistent"""
+
+    def __init__(self, seed: int, tasks: int):
+        self.seed = seed
+        self.tasks = tasks
+        self.counts = row_counts(tasks)
+
+    def count(self, table: str) -> int:
+        return self.counts[table]
+
+    def zipf_id(self, table: str, rng: random.Random, s: float = 1.1) -> int:
+        n = self.count(table)
+        return scatter(zipf_rank(rng.random(), n, s), n)
+
+    def home_project(self, task_id: int) -> int:
+        """The project a task belongs to; Zipf-skewed so a few projects are very large"""
+        n = self.count("projects")
+        return scatter(zipf_rank(unit(self.seed, 1, task_id), n, 1.1), n)
+
+    def project_workspace(self, project_id: int) -> int:
+        return (project_id - 1) % self.count("workspaces") + 1
+
+    def created_at(self, table: str, i: int, rng: random.Random) -> datetime:
+        """Creation times increase with id, as they do for real serial ids"""
+        n = max(1, self.count(table))
+        offset = DATASET_SPAN_SECONDS * (i - 1) / n + rng.random() * 60
+        return DATASET_END - timedelta(seconds=DATASET_SPAN_SECONDS - offset)
+
+
+# ---------------------------------------------------------------------------
+# Column generators: fn(dataset, rng, row id, row generated so far) -> value
+# ---------------------------------------------------------------------------
+
+Generator = Callable[[Dataset, random.Random, int, Dict[str, Any]], Any]
+
+
+def _label(table_name: str) -> str:
+    return table_name.rstrip("s").replace("_", " ").title()
+
+
+def _fit(name: str, suffix: str, length: Optional[int]) -> str:
+    """name + suffix, with name cut short so the whole fits a VARCHAR(length)"""
+    if length is None:
+        return name + suffix
+    return name[:max(0, length - len(suffix))] + suffix
+
+
+def _generic(table, column) -> Optional[Generator]:
+    """Generator for a column from its type, default, foreign key and unique flag"""
+    name = column.name
+    default = column.default.arg if column.default is not None and not callable(column.default.arg) else None
+
+    if column.primary_key and isinstance(column.type, Integer) and not column.foreign_keys:
+        return lambda ds, rng, i, row: i
+    if column.foreign_keys:
+        target = next(iter(column.foreign_keys)).column.table.name
+        if target == table.name:
+            return None  # self-references are left NULL unless overridden
+        if column.unique or column.primary_key:
+            return lambda ds, rng, i, row: i  # one row per referenced row
+        return lambda ds, rng, i, row: rng.randint(1, max(1, ds.count(target)))
+    if name == "gid":
+        return lambda ds, rng, i, row: str(uuid.UUID(int=rng.getrandbits(128), version=4))
+    if name == "created_at":
+        return lambda ds, rng, i, row: ds.created_at(table.name, i, rng)
+    if name == "updated_at":
+        return lambda ds, rng, i, row: row.get("created_at") or ds.created_at(table.name, i, rng)
+    if default is not None:
+        if isinstance(column.type, Boolean):
+            return lambda ds, rng, i, row: default if rng.random() < 0.9 else not default
+        return lambda ds, rng, i, row: default
+    if isinstance(column.type, Boolean):
+        return lambda ds, rng, i, row: rng.random() < 0.5
+    if isinstance(column.type, Numeric):
+        return lambda ds, rng, i, row: round(rng.uniform(0, 1000), 2)
+    if isinstance(column.type, Integer):
+        return lambda ds, rng, i, row: rng.randint(0, 100)
+    if isinstance(column.type, DateTime):
+        return lambda ds, rng, i, row: DATASET_END - timedelta(seconds=rng.randint(0, DATASET_SPAN_SECONDS))
+    if isinstance(column.type, Date):
+        return lambda ds, rng, i, row: (DATASET_END - timedelta(days=rng.randint(-90, 730))).date()
+    if isinstance(column.type, ARRAY):
+        return lambda ds, rng, i, row: []
+    if isinstance(column.type, JSON):
+        return None if column.nullable else (lambda ds, rng, i, row: {})
+    if isinstance(column.type, Text):
+        return lambda ds, rng, i, row: rng.choice(SENTENCES)
+    # Remaining strings
+    if name in ("name", "title", "display_name"):
+        label = _label(table.name)
+        return lambda ds, rng, i, row: f"{label} {i}"
+    if name == "color":
+        return lambda ds, rng, i, row: rng.choice(COLORS)
+    length = getattr(column.type, "length", None)
+    if column.unique:
+        return lambda ds, rng, i, row: _fit(name, f"-{i}", length)
+    return lambda ds, rng, i, row: _fit(name, f"_{rng.randint(1, 5)}", length)
+
+
+def _task_parent(ds: Dataset, rng: random.Random, i: int, row: Dict[str, Any]) -> Optional[int]:
+    """About one task in five is a subtask of a recent task from the same COPY chunk"""
+    chunk_start = (i - 1) // CHUNK_ROWS * CHUNK_ROWS + 1
+    if i == chunk_start or rng.random() >= 0.2:
+        return None
+    return i - rng.randint(1, min(50, i - chunk_start))
+
+
+def _task_completed_at(ds: Dataset, rng: random.Random, i: int, row: Dict[str, Any]) -> Optional[datetime]:
+    if not row["completed"]:
+        return None
+    return min(DATASET_END, row["created_at"] + timedelta(hours=rng.randint(1, 24 * 60)))
+
+
+def _due_on(ds: Dataset, rng: random.Random, i: int, row: Dict[str, Any]) -> Optional[date]:
+    if rng.random() < 0.3:
+        return None
+    return (row["created_at"] + timedelta(days=rng.randint(1, 60))).date()
+
+
+# Per-table column generators applied after the generic ones, in this order
+TABLE_OVERRIDES: Dict[str, Dict[str, Generator]] = {
+    "users": {
+        "email": lambda ds, rng, i, row: f"user{i}@example.com",
+        "name": lambda ds, rng, i, row: f"User {i}",
+    },
+    "projects": {
+        "workspace_id": lambda ds, rng, i, row: ds.project_workspace(i),
+        "owner_id": lambda ds, rng, i, row: ds.zipf_id("users", rng),
+    },
+    "sections": {
+        "project_id": lambda ds, rng, i, row: (i - 1) // SECTIONS_PER_PROJECT + 1,
+    },
+    "project_memberships": {
+        "project_id": lambda ds, rng, i, row: (i - 1) // PROJECT_MEMBERS_PER_PROJECT + 1,
+        "user_id": lambda ds, rng, i, row: ds.zipf_id("users", rng),
+        "workspace_id": lambda ds, rng, i, row: ds.project_workspace(row["project_id"]),
+    },
+    "workspace_memberships": {
+        "user_id": lambda ds, rng, i, row: i,
+        "workspace_id": lambda ds, rng, i, row: (i - 1) % ds.count("workspaces") + 1,
+    },
+    "team_memberships": {
+        "user_id": lambda ds, rng, i, row: i,
+    },
+    "enum_options": {
+        "custom_field_id": lambda ds, rng, i, row: (i - 1) // ENUM_OPTIONS_PER_FIELD + 1,
+    },
+    "tasks": {
+        "parent_id": _task_parent,
+        "workspace_id": lambda ds, rng, i, row: ds.project_workspace(ds.home_project(i)),
+        "assignee_id": lambda ds, rng, i, row: None if rng.random() < 0.15 else ds.zipf_id("users", rng, 1.2),
+        "created_by_id": lambda ds, rng, i, row: ds.zipf_id("users", rng),
+        "resource_subtype": lambda ds, rng, i, row: "milestone" if rng.random() < 0.03 else "default_task",
+        "completed": lambda ds, rng, i, row: rng.random() < 0.4,
+        "completed_at": _task_completed_at,
+        "due_on": _due_on,
+        "due_at": lambda ds, rng, i, row: None,
+        "start_on": lambda ds, rng, i, row: None,
+        "assignee_status": lambda ds, rng, i, row: None if row["assignee_id"] is None else rng.choice(["inbox", "today", "upcoming", "later"]),
+        "num_subtasks": lambda ds, rng, i, row: 0,
+        "num_likes": lambda ds, rng, i, row: 0 if rng.random() < 0.9 else rng.randint(1, 20),
+        "notes": lambda ds, rng, i, row: None if rng.random() < 0.5 else " ".join(rng.sample(SENTENCES, 3)),
+    },
+    "task_memberships": {
+        "task_id": lambda ds, rng, i, row: i,
+        "project_id": lambda ds, rng, i, row: ds.home_project(i),
+        "section_id": lambda ds, rng, i, row: (row["project_id"] - 1) * SECTIONS_PER_PROJECT + rng.randint(1, SECTIONS_PER_PROJECT),
+    },
+    "task_dependencies": {
+        # Row i makes task i + 50 depend on one of the 50 tasks before it: pairs stay unique
+        "task_id": lambda ds, rng, i, row: i + 50,
+        "dependency_id": lambda ds, rng, i, row: i + 50 - rng.randint(1, 50),
+    },
+    "stories": {
+        "task_id": lambda ds, rng, i, row: ds.zipf_id("tasks", rng, 1.05),
+        "workspace_id": lambda ds, rng, i, row: ds.project_workspace(ds.home_project(row["task_id"])),
+        "created_by_id": lambda ds, rng, i, row: ds.zipf_id("users", rng),
+        "type": lambda ds, rng, i, row: "comment" if rng.random() < 0.7 else "system",
+        "resource_subtype": lambda ds, rng, i, row: (
+            "comment_added" if row["type"] == "comment" else rng.choice(SYSTEM_STORY_SUBTYPES)
+        ),
+        "text": lambda ds, rng, i, row: rng.choice(SENTENCES),
+        "html_text": lambda ds, rng, i, row: None,
+    },
+    "reactions": {
+        # Rows come in runs of REACTIONS_PER_STORY on one story by consecutive (so distinct) users:
+        # (target, user, emoji) stays unique
+        "target_type": lambda ds, rng, i, row: "story",
+        "target_id": lambda ds, rng, i, row: scatter((i - 1) // REACTIONS_PER_STORY + 1, ds.count("stories")),
+        "user_id": lambda ds, rng, i, row: scatter(i, ds.count("users")),
+        "emoji_base": lambda ds, rng, i, row: rng.choice(EMOJIS),
+        "emoji_skin_tone": lambda ds, rng, i, row: None,
+    },
+    "attachments": {
+        "parent_type": lambda ds, rng, i, row: "task",
+        "parent_id": lambda ds, rng, i, row: rng.randint(1, ds.count("tasks")),
+        "workspace_id": lambda ds, rng, i, row: ds.project_workspace(ds.home_project(row["parent_id"])),
+        "name": lambda ds, rng, i, row: f"attachment-{i}.pdf",
+    },
+    "events": {
+        "resource_id": lambda ds, rng, i, row: rng.randint(1, ds.count("tasks")),
+        "action": lambda ds, rng, i, row: rng.choice(EVENT_ACTIONS),
+    },
+    "rates": {
+        # A default rate and a few per-user rates per project, some replacing earlier ones
+        "parent_id": lambda ds, rng, i, row: (i - 1) % ds.count("projects") + 1,
+        "resource_id": lambda ds, rng, i, row: None if i <= ds.count("projects") else ds.zipf_id("users", rng),
+        "resource_type_field": lambda ds, rng, i, row: None if row["resource_id"] is None else "user",
+        "effective_from": lambda ds, rng, i, row: (
+            None if row["resource_id"] is None else (DATASET_END - timedelta(days=rng.randint(0, 730))).date()
+        ),
+        "rate": lambda ds, rng, i, row: rng.choice([75, 100, 125, 150, 200]),
+        "currency_code": lambda ds, rng, i, row: "USD",
+    },
+    "project_statuses": {
+        # One status per project, made current by finalize()
+        "project_id": lambda ds, rng, i, row: i,
+        "color": lambda ds, rng, i, row: rng.choice(["green", "green", "green", "yellow", "red", "blue", "complete"]),
+    },
+    "portfolio_items": {
+        # Items below the portfolio count nest portfolio i + 1 in an earlier one, so nesting is a tree
+        "item_portfolio_id": lambda ds, rng, i, row: i + 1 if i < ds.count("portfolios") else None,
+        "portfolio_id": lambda ds, rng, i, row: (
+            rng.randint(1, i) if row["item_portfolio_id"] is not None else ds.zipf_id("portfolios", rng)
+        ),
+        "project_id": lambda ds, rng, i, row: (
+            i - ds.count("portfolios") + 1 if row["item_portfolio_id"] is None else None
+        ),
+    },
+    "budgets": {
+        "parent_id": lambda ds, rng, i, row: (i - 1) % ds.count("projects") + 1,
+        "budget_type": lambda ds, rng, i, row: "time" if i % 3 == 0 else "cost",
+        "actual_billable_status_filter": lambda ds, rng, i, row: rng.choice(["billable", "non_billable", "any"]),
+        "actual_units": lambda ds, rng, i, row: "minutes" if row["budget_type"] == "time" else "USD",
+        "actual_value": lambda ds, rng, i, row: None,
+    },
+    "allocations": {
+        # A couple of allocations per user, a few weeks long, some overlapping into over-allocation
+        "assignee_id": lambda ds, rng, i, row: (i - 1) % ds.count("users") + 1,
+        "parent_id": lambda ds, rng, i, row: ds.zipf_id("projects", rng),
+        "start_date": lambda ds, rng, i, row: (DATASET_END - timedelta(days=rng.randint(-90, 365))).date(),
+        "end_date": lambda ds, rng, i, row: row["start_date"] + timedelta(days=rng.randint(5, 90)),
+        "effort_type": lambda ds, rng, i, row: "percent" if rng.random() < 0.7 else "hours",
+        "effort_value": lambda ds, rng, i, row: (
+            rng.choice([25, 50, 50, 75, 100]) if row["effort_type"] == "percent" else rng.randint(8, 160)
+        ),
+    },
+    "goals": {
+        # A forest: one goal in ten is a root, the others are subgoals of an earlier goal in the same COPY chunk
+        "parent_goal_id": lambda ds, rng, i, row: (
+            None if i % 10 == 1 or (i - 1) % CHUNK_ROWS == 0 else rng.randint((i - 1) // CHUNK_ROWS * CHUNK_ROWS + 1, i - 1)
+        ),
+        "metric_id": lambda ds, rng, i, row: i,
+    },
+    "goal_metrics": {
+        "resource_subtype": lambda ds, rng, i, row: "number",
+        "unit": lambda ds, rng, i, row: "percentage",
+        "currency_code": lambda ds, rng, i, row: None,
+        "initial_number_value": lambda ds, rng, i, row: 0,
+        "target_number_value": lambda ds, rng, i, row: 100,
+        "progress_source": lambda ds, rng, i, row: rng.choice(
+            ["manual", "subgoal_progress", "subgoal_progress", "project_task_completion", "task_completion"]
+        ),
+        "current_number_value": lambda ds, rng, i, row: (
+            rng.randint(0, 100) if row["progress_source"] == "manual" else None
+        ),
+        "is_custom_weight": lambda ds, rng, i, row: rng.random() < 0.2,
+        # Rolled up by finalize()
+        "progress": lambda ds, rng, i, row: 0,
+    },
+    "goal_relationships": {
+        # Goals are only supported by later goals, so the graph stays acyclic
+        "supported_goal_id": lambda ds, rng, i, row: (i - 1) % ds.count("goals") + 1,
+        "supporting_resource_type": lambda ds, rng, i, row: (
+            rng.choice(["goal", "project", "task"]) if row["supported_goal_id"] < ds.count("goals")
+            else rng.choice(["project", "task"])
+        ),
+        "supporting_resource_id": lambda ds, rng, i, row: (
+            rng.randint(row["supported_goal_id"] + 1, ds.count("goals")) if row["supporting_resource_type"] == "goal"
+            else ds.zipf_id(row["supporting_resource_type"] + "s", rng)
+        ),
+        "supporting_goal_id": lambda ds, rng, i, row: (
+            row["supporting_resource_id"] if row["supporting_resource_type"] == "goal" else None
+        ),
+        "resource_subtype": lambda ds, rng, i, row: (
+            "subgoal" if row["supporting_resource_type"] == "goal" else "supporting_work"
+        ),
+        "contribution_weight": lambda ds, rng, i, row: rng.choice([0.25, 0.5, 1]),
+    },
+    "time_tracking_entries": {
+        "task_id": lambda ds, rng, i, row: ds.zipf_id("tasks", rng),
+        "attributable_to_id": lambda ds, rng, i, row: ds.home_project(row["task_id"]),
+        "workspace_id": lambda ds, rng, i, row: ds.project_workspace(row["attributable_to_id"]),
+        "user_id": lambda ds, rng, i, row: ds.zipf_id("users", rng, 1.2),
+        "duration_minutes": lambda ds, rng, i, row: rng.randint(15, 240),
+        "billable_status": lambda ds, rng, i, row: "billable" if rng.random() < 0.8 else "non_billable",
+    },
+}
+
+
+def table_generators(table, broken_columns=frozenset()) -> List[Tuple[str, Generator]]:
+    """Ordered (column, generator) pairs for a table; columns without one are loaded as NULL"""
+    generators = []
+    overrides = TABLE_OVERRIDES.get(table.name, {})
+    for column in table.columns:
+        if column.name in overrides:
+            continue
+        if (table.name, column.name) in broken_columns:
+            generators.append((column.name, None))
+            continue
+        generators.append((column.name, _generic(table, column)))
+    generators.extend(overrides.items())
+    return generators
+
+
+def load_levels() -> Tuple[List[List[str]], set]:
+    """
+    Group tables into levels that only reference earlier levels (or themselves).
+    Foreign key cycles are broken by leaving a nullable column NULL.
+    Returns the levels and the (table, column) pairs that were left NULL.
+    """
+    tables = {name: table for name, table in Base.metadata.tables.items() if name not in DERIVED_TABLES | UNMANAGED_TABLES}
+
+    def references(name):
+        return {
+            fk.column.table.name for fk in tables[name].foreign_keys
+            if fk.column.table.name in remaining and fk.column.table.name != name
+            and (name, fk.parent.name) not in broken
+        }
+
+    def reaches(start, goal):
+        seen, stack = set(), [start]
+        while stack:
+            current = stack.pop()
+            if current == goal:
+                return True
+            if current not in seen:
+                seen.add(current)
+                stack.extend(references(current))
+        return False
+
+    remaining = set(tables)
+    broken = set(NULL_REFERENCES)
+    levels = []
+    while remaining:
+        ready = sorted(name for name in remaining if not references(name))
+        if not ready:
+            # Cycle: leave one nullable reference that closes a loop NULL and retry
+            name, column = min(
+                (name, fk.parent.name) for name in remaining for fk in tables[name].foreign_keys
+                if fk.column.table.name in remaining and fk.column.table.name != name
+                and (name, fk.parent.name) not in broken and fk.parent.nullable
+                and reaches(fk.column.table.name, name)
+            )
+            broken.add((name, column))
+            continue
+        levels.append(ready)
+        remaining -= set(ready)
+    return levels, broken
+
+
+# ---------------------------------------------------------------------------
+# COPY loading
+# ---------------------------------------------------------------------------
+
+def _copy_text(value: str) -> str:
+    if "\\" in value or "\t" in value or "\n" in value or "\r" in value:
+        value = value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+    return value
+
+
+# COPY text rendering by Python type; dispatching on type() keeps the per-value cost low
+_COPY_FORMATS = {
+    type(None): lambda value: "\\N",
+    bool: lambda value: "t" if value else "f",
+    int: str,
+    float: str,
+    Decimal: str,
+    date: date.isoformat,
+    datetime: lambda value: value.isoformat(sep=" "),
+    str: _copy_text,
+    list: lambda value: "{" + ",".join(_copy_text(str(item)) for item in value) + "}",
+    dict: lambda value: _copy_text(json.dumps(value)),
+}
+
+
+def string_lengths(table) -> List[Tuple[str, int]]:
+    """(column, length) of the table's length-limited string columns, which COPY would reject overflowing"""
+    return [
+        (column.name, column.type.length) for column in table.columns
+        if isinstance(column.type, String) and not isinstance(column.type, Text) and column.type.length
+    ]
+
+
+def generate_chunk(dataset: Dataset, table, generators, chunk_index: int) -> Tuple[io.StringIO, int]:
+    """COPY text for one chunk of a table; depends only on (seed, table, chunk index)"""
+    rng = random.Random(f"{dataset.seed}:{table.name}:{chunk_index}")
+    first = chunk_index * CHUNK_ROWS + 1
+    last = min(dataset.count(table.name), first + CHUNK_ROWS - 1)
+    names = [column.name for column in table.columns]
+    limited = string_lengths(table)
+    formats = _COPY_FORMATS
+    lines = []
+    for i in range(first, last + 1):
+        row = {}
+        for name, generator in generators:
+            row[name] = generator(dataset, rng, i, row) if generator is not None else None
+        for name, length in limited:
+            if row[name] is not None and len(row[name]) > length:
+                raise ValueError(f"{table.name}.{name} row {i}: {row[name]!r} is longer than VARCHAR({length})")
+        values = [row[name] for name in names]
+        lines.append("\t".join([formats[type(value)](value) for value in values]))
+    lines.append("")
+    return io.StringIO("\n".join(lines)), last - first + 1
+
+
+def _init_worker():
+    import_models()
+    # Connections pooled before the fork belong to the parent process
+    engine.dispose(close=False)
+
+
+def _load_chunk(seed: int, tasks: int, table_name: str, chunk_index: int) -> Tuple[str, int]:
+    """Worker: generate one chunk and COPY it on a dedicated connection"""
+    dataset = Dataset(seed, tasks)
+    _, broken = load_levels()
+    table = Base.metadata.tables[table_name]
+    buffer, rows = generate_chunk(dataset, table, table_generators(table, broken), chunk_index)
+
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SET synchronous_commit TO OFF")
+        columns = ", ".join(f'"{column.name}"' for column in table.columns)
+        cursor.copy_expert(f'COPY "{table_name}" ({columns}) FROM STDIN', buffer)
+        connection.commit()
+    finally:
+        connection.close()
+    return table_name, rows
+
+
+def truncate_all():
+    names = ", ".join(f'"{name}"' for name in Base.metadata.tables if name not in UNMANAGED_TABLES)
+    with engine.begin() as connection:
+        connection.execute(text(f"TRUNCATE {names} RESTART IDENTITY CASCADE"))
+
+
+def finalize():
+    """Sequences, denormalized counters and planner statistics for the loaded data"""
+    from models.task import Task
+    from services.task_counts import add_grouped_task_counts
+    from services.reactions import add_grouped_reaction_counts
+    from services.time_rollups import add_grouped_time_totals
+    from services.budgets import recompute_all_budgets
+    from services.goal_progress import recompute_all_goal_progress
+    from services.portfolio_rollups import rebuild_closure, refresh_stale_rollups
+    from models.project import Project
+    from models.project_status import ProjectStatus
+
+    with engine.begin() as connection:
+        for table in Base.metadata.tables.values():
+            if "id" in table.columns and table.columns["id"].primary_key and table.columns["id"].autoincrement:
+                connection.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                    f"COALESCE((SELECT max(id) FROM \"{table.name}\"), 0) + 1, false)"
+                ))
+
+    db = SessionLocal()
+    try:
+        children = select(
+            Task.parent_id.label("parent_id"), func.count().label("num_subtasks")
+        ).where(Task.parent_id.isnot(None)).group_by(Task.parent_id).subquery()
+        db.execute(
+            update(Task.__table__)
+            .where(Task.__table__.c.id == children.c.parent_id)
+            .values(num_subtasks=children.c.num_subtasks)
+        )
+        latest_status = select(
+            ProjectStatus.project_id.label("project_id"), func.max(ProjectStatus.id).label("status_id")
+        ).group_by(ProjectStatus.project_id).subquery()
+        db.execute(
+            update(Project.__table__)
+            .where(Project.__table__.c.id == latest_status.c.project_id)
+            .values(current_status_update_id=latest_status.c.status_id)
+        )
+        add_grouped_task_counts(db)
+        add_grouped_reaction_counts(db)
+        add_grouped_time_totals(db)
+        db.commit()
+        recompute_all_budgets(db)
+        recompute_all_goal_progress(db)
+        rebuild_closure(db)
+        refresh_stale_rollups(db, everything=True)
+    finally:
+        db.close()
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("ANALYZE"))
+
+
+def generate(tasks: int, seed: int = 42, workers: Optional[int] = None):
+    """Truncate every table and load a synthetic dataset of the given size"""
+    import_models()
+    dataset = Dataset(seed, tasks)
+    levels, broken = load_levels()
+    workers = workers or os.cpu_count() or 4
+
+    print(f"Generating {tasks:,} tasks (seed {seed}) with {workers} worker(s)...")
+    if broken:
+        print("Left NULL to break foreign key cycles: " + ", ".join(f"{t}.{c}" for t, c in sorted(broken)))
+    started = time.perf_counter()
+    truncate_all()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        for level, names in enumerate(levels):
+            level_started = time.perf_counter()
+            futures = [
+                pool.submit(_load_chunk, seed, tasks, name, chunk_index)
+                for name in names
+                for chunk_index in range(math.ceil(dataset.count(name) / CHUNK_ROWS))
+            ]
+            loaded = {}
+            for future in as_completed(futures):
+                name, rows = future.result()
+                loaded[name] = loaded.get(name, 0) + rows
+            summary = ", ".join(f"{name}={loaded.get(name, 0):,}" for name in names)
+            print(f"  level {level}: {summary} ({time.perf_counter() - level_started:.1f}s)")
+
+    print("Computing sequences, counters and statistics...")
+    finalize()
+    print(f"Loaded {sum(dataset.counts.values()):,} rows in {time.perf_counter() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load a deterministic synthetic dataset for benchmarks")
+    parser.add_argument("--tasks", type=int, default=10_000, help="Number of tasks; other tables scale from it")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=None, help="Parallel COPY workers (default: CPU count)")
+    parser.add_argument("--init", action="store_true", help="Create tables before loading")
+    args = parser.parse_args()
+
+    if args.init:
+        from database import init_db
+        init_db()
+    generate(args.tasks, args.seed, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Test Audit Log
+Checks the audit records queued for tasks written with Core statements,
+which the flush hook cannot see
+"""
+from types import SimpleNamespace
+
+from sqlalchemy.orm import Session
+
+import audit_log
+from audit_log import audit_core_writes
+
+
+def _task(gid, name, **extra):
+    return SimpleNamespace(gid=gid, name=name, workspace_id=7, **extra)
+
+
+def test_core_writes_are_queued(monkeypatch):
+    monkeypatch.setattr(audit_log, "_installed", True)
+    session = Session()
+    audit_core_writes(session, "tasks", "created", [_task("t1", "One"), _task("t2", "Two")])
+    audit_core_writes(session, "tasks", "changed", [_task("t1", "Uno", changed_fields={"name", "completed"})])
+    audit_core_writes(session, "tasks", "deleted", [_task("t2", "Two")])
+
+    records = session.info["audit_records"]
+    assert [(r["event_type"], r["resource_gid"]) for r in records] == [
+        ("task_created", "t1"), ("task_created", "t2"), ("task_changed", "t1"), ("task_deleted", "t2")
+    ]
+    assert records[2]["details"] == {"changed_fields": ["completed", "name"]}
+    assert records[2]["resource_name"] == "Uno"
+    assert all(r["workspace_id"] == 7 for r in records)
+    # Outside a request there is no client, so the change is attributed to Asana itself
+    assert records[0]["actor_type"] == "asana"
+
+
+def test_nothing_queued_when_not_audited(monkeypatch):
+    session = Session()
+    monkeypatch.setattr(audit_log, "_installed", False)
+    audit_core_writes(session, "tasks", "created", [_task("t1", "One")])
+    monkeypatch.setattr(audit_log, "_installed", True)
+    audit_core_writes(session, "task_memberships", "deleted", [_task("m1", None)])
+    assert "audit_records" not in session.info
@@ -0,0 +1,100 @@
+"""
+Test Budgets
+Checks that the vectorized rate lookup of full recomputations prices entries
+like the single-entry lookup, and that budget actuals follow entry changes
+"""
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+
+from models.budget import Budget
+from models.rate import Rate
+from models.time_tracking_entry import TimeTrackingEntry
+from services.budgets import (
+    _ordinal, entry_cost_cents, entry_costs_cents, record_entry_budget_change, recompute_budgets,
+    resolve_rate_cents, to_cents
+)
+from services.time_rollups import entry_state
+
+JANUARY = date(2026, 1, 1)
+MARCH = date(2026, 3, 1)
+
+# (project, user or None for the project default, effective_from, rate)
+RATES = [
+    (1, None, None, "50.00"),
+    (1, 10, None, "80.00"),
+    (1, 10, MARCH, "90.00"),
+    # Same start: the later rate wins
+    (1, 10, MARCH, "95.50"),
+    (1, 11, MARCH, "70.00"),
+    (2, 10, JANUARY, "120.00"),
+]
+
+
+def _rates(db):
+    db.add_all([
+        Rate(id=i, gid=f"rate-{i}", parent_id=project_id, resource_id=user_id, effective_from=day, rate=Decimal(rate))
+        for i, (project_id, user_id, day, rate) in enumerate(RATES, start=1)
+    ])
+    db.flush()
+
+
+def test_vectorized_costs_match_single_lookups(db):
+    _rates(db)
+    entries = [
+        (project_id, user_id, day, 45)
+        for project_id in (1, 2, 3)
+        for user_id in (10, 11, 12, None)
+        for day in (None, date(2025, 12, 31), JANUARY, date(2026, 2, 28), MARCH, date(2026, 6, 1))
+    ]
+
+    costs = entry_costs_cents(
+        np.array([entry[0] for entry in entries], dtype=np.int64),
+        np.array([entry[1] or 0 for entry in entries], dtype=np.int64),
+        np.array([_ordinal(entry[2]) for entry in entries], dtype=np.int64),
+        np.array([entry[3] for entry in entries], dtype=np.int64),
+        np.array([rate[0] for rate in RATES], dtype=np.int64),
+        np.array([rate[1] or 0 for rate in RATES], dtype=np.int64),
+        np.array([_ordinal(rate[2]) for rate in RATES], dtype=np.int64),
+        np.array([to_cents(rate[3]) for rate in RATES], dtype=np.int64),
+    )
+    expected = [
+        entry_cost_cents(minutes, resolve_rate_cents(db, project_id, user_id, day))
+        for project_id, user_id, day, minutes in entries
+    ]
+    assert costs.tolist() == expected
+    # Spot checks: the later of two same-day rates, the default before a user's first rate, no rate at all
+    assert resolve_rate_cents(db, 1, 10, MARCH) == 9550
+    assert resolve_rate_cents(db, 1, 11, JANUARY) == 5000
+    assert resolve_rate_cents(db, 2, 11, MARCH) == 0
+
+
+def test_actuals_follow_entries_and_match_recompute(db):
+    _rates(db)
+    db.add_all([
+        Budget(id=1, gid="budget-1", budget_type="time", parent_id=1, actual_billable_status_filter="any"),
+        Budget(id=2, gid="budget-2", budget_type="cost", parent_id=1, actual_billable_status_filter="billable",
+               actual_units="USD"),
+    ])
+    db.flush()
+    recompute_budgets(db, [1])
+
+    entry = TimeTrackingEntry(id=1, gid="entry-1", duration_minutes=90, entered_on=MARCH, user_id=10,
+                              attributable_to_id=1, billable_status="billable")
+    db.add(entry)
+    db.flush()
+    record_entry_budget_change(db, None, entry_state(entry))
+    old = entry_state(entry)
+    entry.billable_status = "non_billable"
+    db.flush()
+    record_entry_budget_change(db, old, entry_state(entry))
+    db.add(TimeTrackingEntry(id=2, gid="entry-2", duration_minutes=20, entered_on=JANUARY, user_id=11,
+                             attributable_to_id=1, billable_status="billable"))
+    db.flush()
+    record_entry_budget_change(db, None, entry_state(db.get(TimeTrackingEntry, 2)))
+    db.flush()
+
+    db.expire_all()
+    assert (db.get(Budget, 1).actual_value, db.get(Budget, 2).actual_value) == (110, Decimal("16.67"))
+    assert recompute_budgets(db, [1]) == 0
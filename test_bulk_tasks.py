@@ -0,0 +1,144 @@
+"""
+Test Bulk Tasks
+Checks per-action results of execute_bulk and that its set-based creates,
+updates, moves and deletes keep task counters, subtask counts and stories in
+step (Postgres only: ids come from the tasks sequence, updates use VALUES lists)
+"""
+from sqlalchemy import select
+
+from models.project import Project
+from models.section import Section
+from models.story import Story
+from models.task import Task
+from models.task_membership import TaskMembership
+from models.workspace import Workspace
+from schemas.task import TaskBulkAction
+from services.bulk_tasks import execute_bulk
+from services.task_counts import get_task_counts, reconcile_task_counts
+from utils import generate_gid
+
+
+def _setup(db):
+    """Two projects, a section of the second, and a parent with two subtasks and a loose task in the first"""
+    workspace = Workspace(gid=generate_gid(), name="Bulk")
+    db.add(workspace)
+    db.flush()
+    projects = [Project(gid=generate_gid(), name=f"Project {i}", workspace_id=workspace.id) for i in (1, 2)]
+    db.add_all(projects)
+    db.flush()
+    section = Section(gid=generate_gid(), name="Doing", project_id=projects[1].id)
+    parent = Task(gid=generate_gid(), name="Parent", workspace_id=workspace.id, num_subtasks=2, completed=False)
+    db.add_all([section, parent])
+    db.flush()
+    children = [Task(gid=generate_gid(), name=f"Child {i}", workspace_id=workspace.id, parent_id=parent.id,
+                     num_subtasks=0, completed=False) for i in (1, 2)]
+    loose = Task(gid=generate_gid(), name="Loose", workspace_id=workspace.id, num_subtasks=0, completed=False)
+    db.add_all([*children, loose])
+    db.flush()
+    tasks = [parent, *children, loose]
+    db.add_all([TaskMembership(task_id=task.id, project_id=projects[0].id) for task in tasks])
+    db.flush()
+    reconcile_task_counts(db, [project.id for project in projects])
+    db.commit()
+    return workspace, projects, section, tasks
+
+
+def _bulk(db, *actions):
+    results = execute_bulk(db, [TaskBulkAction(**action) for action in actions])
+    db.commit()
+    db.expire_all()
+    return results
+
+
+def _codes(results):
+    return [result["status_code"] for result in results]
+
+
+def _memberships(db, tasks):
+    return sorted(tuple(row) for row in db.execute(
+        select(TaskMembership.task_id, TaskMembership.project_id, TaskMembership.section_id)
+        .where(TaskMembership.task_id.in_([task.id for task in tasks]))
+    ).all())
+
+
+def test_invalid_actions_fail_alone(pg_db):
+    _, _, _, (parent, _, _, loose) = _setup(pg_db)
+    results = _bulk(
+        pg_db,
+        {"action": "archive", "task": loose.gid},
+        {"action": "update"},
+        {"action": "move", "task": loose.gid, "data": {}},
+        {"action": "update", "task": "missing", "data": {"name": "x"}},
+        {"action": "update", "task": loose.gid, "data": {"assignee": "nobody"}},
+        {"action": "create", "data": {"name": "Orphan", "parent": "missing"}},
+        {"action": "update", "task": loose.gid, "data": {"name": "Renamed"}},
+    )
+    assert _codes(results) == [400, 400, 400, 404, 404, 404, 200]
+    assert pg_db.get(Task, loose.id).name == "Renamed"
+
+
+def test_creates_count_into_projects_and_parents(pg_db):
+    workspace, (first, second), _, (parent, _, _, _) = _setup(pg_db)
+    results = _bulk(
+        pg_db,
+        {"action": "create", "data": {"name": "New", "workspace": str(workspace.id),
+                                      "projects": [first.gid, second.gid]}},
+        {"action": "create", "data": {"name": "Sub", "workspace": str(workspace.id), "parent": parent.gid,
+                                      "resource_subtype": "milestone", "completed": True, "projects": [second.gid]}},
+    )
+    assert _codes(results) == [201, 201]
+    created = {task.name: task for task in pg_db.query(Task).filter(Task.gid.in_(
+        [result["body"]["data"]["gid"] for result in results]
+    ))}
+    assert (created["Sub"].parent_id, created["Sub"].completed) == (parent.id, True)
+    assert pg_db.get(Task, parent.id).num_subtasks == 3
+    assert get_task_counts(pg_db, first.id)["num_tasks"] == 5
+    counts = get_task_counts(pg_db, second.id)
+    assert (counts["num_tasks"], counts["num_completed_milestones"]) == (2, 1)
+    assert reconcile_task_counts(pg_db, [first.id, second.id]) == 0
+
+
+def test_updates_and_moves_keep_counters_and_stories(pg_db):
+    _, (first, second), section, tasks = _setup(pg_db)
+    parent, child, other, loose = tasks
+    results = _bulk(
+        pg_db,
+        {"action": "update", "task": loose.gid, "data": {"completed": True, "name": "Done"}},
+        {"action": "update", "task": other.gid, "data": {"resource_subtype": "milestone"}},
+        {"action": "move", "task": loose.gid, "data": {"section": section.gid, "from_project": first.gid}},
+        {"action": "move", "task": child.gid, "data": {"project": second.gid}},
+    )
+    assert _codes(results) == [200, 200, 200, 200]
+
+    task = pg_db.get(Task, loose.id)
+    assert (task.name, task.completed, task.completed_at is not None) == ("Done", True, True)
+    assert _memberships(pg_db, tasks) == sorted([
+        (parent.id, first.id, None), (child.id, first.id, None), (child.id, second.id, None),
+        (other.id, first.id, None), (loose.id, second.id, section.id),
+    ])
+    counts = get_task_counts(pg_db, first.id)
+    assert (counts["num_tasks"], counts["num_milestones"]) == (3, 1)
+    assert get_task_counts(pg_db, second.id)["num_completed_tasks"] == 1
+    assert reconcile_task_counts(pg_db, [first.id, second.id]) == 0
+    assert {story.resource_subtype for story in pg_db.query(Story).filter(Story.task_id == loose.id)} >= {
+        "marked_complete", "added_to_project", "removed_from_project"
+    }
+
+
+def test_deletes_keep_parents_of_subtasks_outside_the_batch(pg_db):
+    _, (first, _), _, tasks = _setup(pg_db)
+    parent, child, other, loose = tasks
+    # Stories reference their task; deleting must not trip over them
+    assert _codes(_bulk(pg_db, {"action": "update", "task": other.gid, "data": {"completed": True}})) == [200]
+    # Deleting the parent with only one of its subtasks leaves the parent in place
+    results = _bulk(pg_db, {"action": "delete", "task": parent.gid}, {"action": "delete", "task": child.gid})
+    assert _codes(results) == [400, 200]
+    assert (pg_db.get(Task, parent.id).num_subtasks, pg_db.get(Task, child.id)) == (1, None)
+
+    results = _bulk(pg_db, {"action": "delete", "task": parent.gid}, {"action": "delete", "task": other.gid})
+    assert _codes(results) == [200, 200]
+    remaining = pg_db.scalars(select(Task.id).where(Task.id.in_([task.id for task in tasks]))).all()
+    assert remaining == [loose.id]
+    assert pg_db.query(Story).filter(Story.task_id == other.id).count() == 0
+    assert get_task_counts(pg_db, first.id)["num_tasks"] == 1
+    assert reconcile_task_counts(pg_db, [first.id]) == 0
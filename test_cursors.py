@@ -0,0 +1,31 @@
+"""
+Test Cursors
+Checks that sync and offset tokens round-trip and that malformed or
+out-of-range tokens decode to None instead of raising
+"""
+from datetime import datetime, timezone
+
+import pytest
+
+from utils import MAX_ROW_ID, decode_cursor, encode_cursor
+
+
+def test_round_trip():
+    created_at = datetime(2024, 5, 17, 9, 30, 15, 123456, tzinfo=timezone.utc)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+    # Events hands out id 0 for a token taken before any row
+    assert decode_cursor(encode_cursor(created_at, 0)) == (created_at, 0)
+    assert decode_cursor(encode_cursor(created_at, MAX_ROW_ID))[1] == MAX_ROW_ID
+
+
+@pytest.mark.parametrize("token", [
+    "",
+    "zz-1",
+    "1-2-3",
+    "-1-1",
+    "ffffffffffffffffffff-1",
+    f"1-{MAX_ROW_ID + 1:x}",
+    f"1-{2**64:x}",
+])
+def test_rejects(token):
+    assert decode_cursor(token) is None
@@ -0,0 +1,154 @@
+"""
+Test Duplication
+Checks that task and project duplication copy the subtree with parent links and
+dependencies remapped onto the copies, sections, memberships, task counters and
+subtask counts (Postgres only: ids come from the table sequences)
+"""
+from sqlalchemy import select
+
+from models.project import Project
+from models.project_membership import ProjectMembership
+from models.section import Section
+from models.task import Task
+from models.task_dependency import TaskDependency
+from models.task_membership import TaskMembership
+from models.user import User
+from models.workspace import Workspace
+from services.duplication import duplicate_project, duplicate_task
+from services.task_counts import get_task_counts, reconcile_task_counts
+from utils import generate_gid
+
+
+def _setup(db):
+    """
+    A project with two sections holding a parent (with a child and a grandchild) and
+    an outside task; the child depends on the grandchild and on the outside task
+    """
+    workspace = Workspace(gid=generate_gid(), name="Duplication")
+    user = User(gid=generate_gid(), name="Ann")
+    db.add_all([workspace, user])
+    db.flush()
+    project = Project(gid=generate_gid(), name="Launch", workspace_id=workspace.id)
+    db.add(project)
+    db.flush()
+    sections = [Section(gid=generate_gid(), name=name, project_id=project.id) for name in ("Todo", "Doing")]
+    parent = Task(gid=generate_gid(), name="Parent", workspace_id=workspace.id, num_subtasks=1, completed=False)
+    outside = Task(gid=generate_gid(), name="Outside", workspace_id=workspace.id, num_subtasks=0,
+                   resource_subtype="milestone", completed=True)
+    db.add_all([*sections, parent, outside])
+    db.flush()
+    child = Task(gid=generate_gid(), name="Child", workspace_id=workspace.id, parent_id=parent.id,
+                 num_subtasks=1, completed=True)
+    db.add(child)
+    db.flush()
+    grandchild = Task(gid=generate_gid(), name="Grandchild", workspace_id=workspace.id, parent_id=child.id,
+                      num_subtasks=0, completed=False)
+    db.add(grandchild)
+    db.flush()
+    db.add_all([
+        TaskMembership(task_id=parent.id, project_id=project.id, section_id=sections[0].id),
+        TaskMembership(task_id=outside.id, project_id=project.id, section_id=sections[1].id),
+        TaskDependency(task_id=child.id, dependency_id=grandchild.id),
+        TaskDependency(task_id=child.id, dependency_id=outside.id),
+        ProjectMembership(gid=generate_gid(), user_id=user.id, project_id=project.id,
+                          workspace_id=workspace.id, write_access="full_write"),
+    ])
+    db.flush()
+    reconcile_task_counts(db, [project.id])
+    db.commit()
+    return workspace, project, sections, (parent, child, grandchild, outside)
+
+
+def _copy(db, gid):
+    return db.query(Task).filter(Task.gid == gid).one()
+
+
+def _child(db, task):
+    return db.query(Task).filter(Task.parent_id == task.id).one()
+
+
+def _dependencies(db, task):
+    return sorted(db.scalars(select(TaskDependency.dependency_id).where(TaskDependency.task_id == task.id)).all())
+
+
+def test_duplicate_task_copies_the_subtree(pg_db):
+    _, project, sections, (parent, child, grandchild, outside) = _setup(pg_db)
+
+    result = duplicate_task(pg_db, parent.id, None, {"subtasks", "dependencies", "projects"})
+    pg_db.commit()
+    pg_db.expire_all()
+
+    copy = _copy(pg_db, result["gid"])
+    assert (copy.name, copy.parent_id, copy.completed, copy.num_subtasks) == ("Duplicate of Parent", None, False, 1)
+    child_copy = _child(pg_db, copy)
+    grandchild_copy = _child(pg_db, child_copy)
+    assert (child_copy.name, child_copy.completed, child_copy.num_subtasks) == ("Child", False, 1)
+    assert (grandchild_copy.name, grandchild_copy.num_subtasks) == ("Grandchild", 0)
+    assert {child_copy.id, grandchild_copy.id}.isdisjoint({child.id, grandchild.id})
+    # The dependency inside the subtree follows the copy; the one outside it is kept
+    assert _dependencies(pg_db, child_copy) == sorted([grandchild_copy.id, outside.id])
+    assert _dependencies(pg_db, child) == sorted([grandchild.id, outside.id])
+
+    memberships = pg_db.execute(
+        select(TaskMembership.project_id, TaskMembership.section_id).where(TaskMembership.task_id == copy.id)
+    ).all()
+    assert [tuple(row) for row in memberships] == [(project.id, sections[0].id)]
+    assert get_task_counts(pg_db, project.id)["num_tasks"] == 3
+    assert reconcile_task_counts(pg_db, [project.id]) == 0
+
+
+def test_duplicate_task_alone_under_the_same_parent(pg_db):
+    _, project, _, (parent, child, _, _) = _setup(pg_db)
+
+    result = duplicate_task(pg_db, child.id, "Second child", {"parent"})
+    pg_db.commit()
+    pg_db.expire_all()
+
+    copy = _copy(pg_db, result["gid"])
+    assert (copy.name, copy.parent_id, copy.num_subtasks) == ("Second child", parent.id, 0)
+    assert pg_db.query(Task).filter(Task.parent_id == copy.id).count() == 0
+    assert pg_db.get(Task, parent.id).num_subtasks == 2
+    assert _dependencies(pg_db, copy) == []
+    assert get_task_counts(pg_db, project.id)["num_tasks"] == 2
+
+
+def test_duplicate_project_copies_sections_tasks_and_members(pg_db):
+    _, project, sections, _ = _setup(pg_db)
+
+    result = duplicate_project(pg_db, project.id, "Launch copy",
+                               {"members", "task_subtasks", "task_dependencies"})
+    pg_db.commit()
+    pg_db.expire_all()
+
+    copy = pg_db.query(Project).filter(Project.gid == result["gid"]).one()
+    section_copies = {section.name: section for section in pg_db.query(Section).filter(Section.project_id == copy.id)}
+    assert set(section_copies) == {"Todo", "Doing"}
+    assert {section.id for section in section_copies.values()}.isdisjoint({section.id for section in sections})
+
+    memberships = {
+        task.name: section_id for task, section_id in pg_db.query(Task, TaskMembership.section_id)
+        .join(TaskMembership, TaskMembership.task_id == Task.id).filter(TaskMembership.project_id == copy.id)
+    }
+    assert memberships == {"Parent": section_copies["Todo"].id, "Outside": section_copies["Doing"].id}
+    parent_copy = pg_db.query(Task).join(TaskMembership, TaskMembership.task_id == Task.id) \
+        .filter(TaskMembership.project_id == copy.id, Task.name == "Parent").one()
+    outside_copy = pg_db.query(Task).join(TaskMembership, TaskMembership.task_id == Task.id) \
+        .filter(TaskMembership.project_id == copy.id, Task.name == "Outside").one()
+    child_copy = _child(pg_db, parent_copy)
+    grandchild_copy = _child(pg_db, child_copy)
+    assert (parent_copy.num_subtasks, child_copy.num_subtasks, grandchild_copy.num_subtasks) == (1, 1, 0)
+    # Both dependencies are inside the copied project, so both point at copies
+    assert _dependencies(pg_db, child_copy) == sorted([grandchild_copy.id, outside_copy.id])
+
+    # Copies start incomplete; the milestone is still counted as one
+    counts = get_task_counts(pg_db, copy.id)
+    assert (counts["num_tasks"], counts["num_completed_tasks"], counts["num_milestones"]) == (2, 0, 1)
+    assert reconcile_task_counts(pg_db, [project.id, copy.id]) == 0
+    members = {
+        project_id: [tuple(row) for row in pg_db.execute(
+            select(ProjectMembership.user_id, ProjectMembership.write_access)
+            .where(ProjectMembership.project_id == project_id)
+        )]
+        for project_id in (project.id, copy.id)
+    }
+    assert members[copy.id] == members[project.id] and len(members[copy.id]) == 1
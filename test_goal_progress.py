@@ -0,0 +1,87 @@
+"""
+Test Goal Progress
+Checks manual progress, the topological recompute of rolled up goals and
+their updates when a supporting task changes or is removed
+"""
+from decimal import Decimal
+
+from models.goal import Goal
+from models.goal_metric import GoalMetric
+from models.goal_relationship import GoalRelationship
+from models.project import Project
+from models.project_task_count import ProjectTaskCount
+from models.task import Task
+from services.goal_progress import (
+    creates_cycle, manual_progress, record_supporting_change, recompute_all_goal_progress,
+    remove_supporting_resources
+)
+
+
+def _progress(db):
+    db.expire_all()
+    return {metric.goal_id: (float(metric.progress), metric.current_number_value)
+            for metric in db.query(GoalMetric).order_by(GoalMetric.goal_id)}
+
+
+def _metric(goal_id, source, **values):
+    return GoalMetric(gid=f"metric-{goal_id}", goal_id=goal_id, progress_source=source, progress=0, **values)
+
+
+def _relationship(relationship_id, goal_id, kind, resource_id, weight=None):
+    return GoalRelationship(gid=f"relationship-{relationship_id}", supported_goal_id=goal_id,
+                            supporting_resource_type=kind, supporting_resource_id=resource_id,
+                            contribution_weight=weight)
+
+
+def _goals(db):
+    # Goal 1 averages goal 2 (a relationship) and goal 3 (a subgoal); goal 2 weighs two tasks, goal 3 a project
+    db.add_all([
+        Goal(id=1, gid="g1", name="Company"),
+        Goal(id=2, gid="g2", name="Ship"),
+        Goal(id=3, gid="g3", name="Build", parent_goal_id=1),
+        Task(id=10, gid="t10", name="Done", completed=True),
+        Task(id=11, gid="t11", name="Open", completed=False),
+        Project(id=100, gid="p100", name="Project"),
+        ProjectTaskCount(project_id=100, num_tasks=4, num_completed_tasks=1, num_milestones=0,
+                         num_completed_milestones=0),
+        _metric(1, "subgoal_progress", initial_number_value=0, target_number_value=10),
+        _metric(2, "task_completion", is_custom_weight=True),
+        _metric(3, "project_task_completion"),
+        _relationship(1, 1, "goal", 2),
+        _relationship(2, 2, "task", 10, Decimal(3)),
+        _relationship(3, 2, "task", 11, Decimal(1)),
+        _relationship(4, 3, "project", 100),
+    ])
+    db.commit()
+
+
+def test_manual_progress():
+    assert manual_progress(Decimal(0), Decimal(200), Decimal(50)) == 0.25
+    # Decreasing targets, overshooting and missing values
+    assert manual_progress(Decimal(100), Decimal(60), Decimal(90)) == 0.25
+    assert manual_progress(None, Decimal(10), Decimal(15)) == 1.0
+    assert manual_progress(Decimal(0), None, Decimal(5)) == 0.0
+    assert manual_progress(Decimal(5), Decimal(5), Decimal(5)) == 1.0
+
+
+def test_rolled_up_goals_are_recomputed_after_their_inputs(db):
+    _goals(db)
+    # Goal 1 is recomputed after goals 2 and 3, although it comes first by id
+    assert recompute_all_goal_progress(db) == 3
+    assert _progress(db) == {1: (0.5, Decimal(5)), 2: (0.75, None), 3: (0.25, None)}
+    assert recompute_all_goal_progress(db) == 0
+
+    db.query(Task).filter(Task.id == 11).update({"completed": True})
+    assert record_supporting_change(db, "task", [11]) == 2
+    assert _progress(db)[1] == (0.625, Decimal("6.25"))
+
+    remove_supporting_resources(db, "task", [10, 11])
+    assert _progress(db) == {1: (0.125, Decimal("1.25")), 2: (0.0, None), 3: (0.25, None)}
+    assert db.query(GoalRelationship).filter(GoalRelationship.supporting_resource_type == "task").count() == 0
+
+
+def test_creates_cycle(db):
+    _goals(db)
+    assert creates_cycle(db, 1, 2)
+    assert creates_cycle(db, 1, 3)
+    assert not creates_cycle(db, 3, 2)
@@ -0,0 +1,77 @@
+"""
+Test Metrics
+Checks that requests are labelled with their route template rather than the
+raw path, so label cardinality stays bounded by the number of routes, and the
+Prometheus text rendering of counters and histograms
+"""
+import asyncio
+
+import httpx
+from fastapi import APIRouter, FastAPI
+
+from metrics import LATENCY, REQUESTS, UNMATCHED_ROUTE, Counter, Histogram, MetricsMiddleware
+
+PREFIX = "/metrics-test"
+
+
+def _app():
+    router = APIRouter()
+
+    @router.get("/tasks/{task_gid}")
+    def get_task(task_gid: str):
+        return {"data": {"gid": task_gid}}
+
+    @router.get("/fail")
+    def fail():
+        raise RuntimeError("boom")
+
+    app = FastAPI()
+    app.include_router(router, prefix=PREFIX)
+    return MetricsMiddleware(app)
+
+
+async def _get(app, *paths):
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return [(await client.get(path)).status_code for path in paths]
+
+
+def _requests():
+    return {labels: value for labels, value in REQUESTS.values.items()
+            if labels[1].startswith(PREFIX) or labels[1] == UNMATCHED_ROUTE}
+
+
+def test_routes_are_labelled_with_their_template():
+    before = _requests()
+    paths = [f"{PREFIX}/tasks/{gid}" for gid in range(50)] + [f"{PREFIX}/missing/{gid}" for gid in range(5)]
+    statuses = asyncio.run(_get(_app(), *paths, f"{PREFIX}/fail"))
+    assert statuses == [200] * 50 + [404] * 5 + [500]
+
+    counted = {labels: value - before.get(labels, 0) for labels, value in _requests().items()}
+    assert {labels: value for labels, value in counted.items() if value} == {
+        ("GET", f"{PREFIX}/tasks/{{task_gid}}", "200"): 50,
+        ("GET", UNMATCHED_ROUTE, "404"): 5,
+        ("GET", f"{PREFIX}/fail", "500"): 1,
+    }
+    assert {route for _, route in LATENCY.series if route.startswith(PREFIX)} == {
+        f"{PREFIX}/tasks/{{task_gid}}", f"{PREFIX}/fail"
+    }
+
+
+def test_rendering():
+    counter = Counter("things_total", "Things", ("name",))
+    counter.inc('a "quoted"\nname', amount=2)
+    assert counter.render() == [
+        "# HELP things_total Things", "# TYPE things_total counter", 'things_total{name="a \\"quoted\\"\\nname"} 2.0'
+    ]
+
+    histogram = Histogram("wait_seconds", "Waits", (0.1, 1.0), ("lane",))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, "bulk")
+    assert histogram.render()[2:] == [
+        'wait_seconds_bucket{lane="bulk",le="0.1"} 2',
+        'wait_seconds_bucket{lane="bulk",le="1.0"} 3',
+        'wait_seconds_bucket{lane="bulk",le="+Inf"} 4',
+        'wait_seconds_sum{lane="bulk"} 3.65',
+        'wait_seconds_count{lane="bulk"} 4',
+    ]
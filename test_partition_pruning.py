@@ -0,0 +1,117 @@
+"""
+Test Partition Pruning
+Checks that the hot list endpoints only scan one partition of each
+workspace-partitioned table (skipped without Postgres or before
+`python partitioning.py` has been run)
+"""
+import asyncio
+import re
+from typing import Dict, List, Set
+
+import httpx
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+
+from database import engine
+from main import app
+from partitioning import PARTITIONED_TABLES, is_partitioned
+
+PARTITION_RELATION = re.compile(r"^(%s)_p\d+$" % "|".join(PARTITIONED_TABLES))
+# Queries that filter on the partition key; gid lookups of the parent task or
+# project cannot know the workspace yet and probe every partition's index
+WORKSPACE_FILTERED = re.compile(r"\b(%s)\.workspace_id = %%\(" % "|".join(PARTITIONED_TABLES))
+
+
+def _scanned_partitions(plan: Dict, found: Dict[str, Set[str]]):
+    relation = plan.get("Relation Name", "")
+    match = PARTITION_RELATION.match(relation)
+    if match:
+        found.setdefault(match.group(1), set()).add(relation)
+    for child in plan.get("Plans", []):
+        _scanned_partitions(child, found)
+
+
+def _explain(statement: str, parameters) -> Dict[str, Set[str]]:
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+        plan = cursor.fetchone()[0][0]["Plan"]
+    finally:
+        connection.close()
+    found: Dict[str, Set[str]] = {}
+    _scanned_partitions(plan, found)
+    return found
+
+
+@pytest.fixture(scope="module")
+def gids() -> Dict[str, str]:
+    """Gids of a task with an assignee and stories and of a project with members"""
+    try:
+        connection = engine.connect()
+    except OperationalError:
+        pytest.skip("Postgres is not reachable at DATABASE_URL")
+    with connection:
+        unpartitioned = [name for name in PARTITIONED_TABLES if not is_partitioned(connection, name)]
+        if unpartitioned:
+            pytest.skip(f"Not partitioned yet: {', '.join(unpartitioned)} (run python partitioning.py)")
+        task = connection.execute(text("""
+            SELECT t.gid, w.gid, u.gid FROM tasks t
+            JOIN workspaces w ON w.id = t.workspace_id JOIN users u ON u.id = t.assignee_id
+            WHERE EXISTS (SELECT 1 FROM stories s WHERE s.task_id = t.id AND s.workspace_id = t.workspace_id)
+            LIMIT 1
+        """)).first()
+        project = connection.execute(text("""
+            SELECT p.gid FROM projects p
+            WHERE EXISTS (SELECT 1 FROM project_memberships m WHERE m.project_id = p.id)
+            LIMIT 1
+        """)).scalar()
+    if task is None or project is None:
+        pytest.skip("No sample task or project (run python seed_data.py)")
+    return {"task": task[0], "workspace": task[1], "assignee": task[2], "project": project}
+
+
+async def _get(path: str, params: Dict[str, str]) -> httpx.Response:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        return await client.get(path, params=params)
+
+
+ROUTES = {
+    "tasks by workspace and assignee": lambda gids: (
+        "/api/1.0/tasks", {"workspace": gids["workspace"], "assignee": gids["assignee"]}
+    ),
+    "task stories": lambda gids: (f"/api/1.0/tasks/{gids['task']}/stories", {}),
+    "project memberships": lambda gids: (f"/api/1.0/projects/{gids['project']}/project_memberships", {}),
+    "task attachments": lambda gids: ("/api/1.0/attachments", {"parent": gids["task"]}),
+}
+
+
+@pytest.mark.parametrize("route", list(ROUTES))
+def test_partition_pruning(gids, route):
+    """Every workspace-filtered query of a hot route scans at most one partition per table"""
+    path, params = ROUTES[route](gids)
+    statements: List = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        response = asyncio.run(_get(path, params))
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    assert response.status_code == 200, response.text
+
+    captured = [
+        (statement, parameters) for statement, parameters in statements
+        if statement.lstrip().upper().startswith("SELECT") and WORKSPACE_FILTERED.search(statement)
+    ]
+    assert captured, "no query filters on workspace_id"
+    scanned: Dict[str, Set[str]] = {}
+    for statement, parameters in captured:
+        for table, partitions in _explain(statement, parameters).items():
+            if len(partitions) > len(scanned.get(table, ())):
+                scanned[table] = partitions
+    wide = {table: sorted(partitions) for table, partitions in scanned.items() if len(partitions) > 1}
+    assert wide == {}
@@ -0,0 +1,125 @@
+"""
+Test Portfolio Rollups
+Checks the closure path counts kept by add_nesting/remove_nesting and that
+rollup refreshes neither lose updates nor commit the caller's session
+"""
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+import services.portfolio_rollups as portfolio_rollups
+from models.portfolio import Portfolio
+from models.portfolio_closure import PortfolioClosure
+from models.portfolio_item import PortfolioItem
+from models.portfolio_rollup import PortfolioRollup
+from models.project import Project
+from models.project_task_count import ProjectTaskCount
+from models.tag import Tag
+from services.portfolio_rollups import (
+    _new_paths, add_nesting, get_rollups, mark_stale, refresh_rollups, remove_nesting
+)
+
+
+def _portfolios(db, *names):
+    portfolios = [Portfolio(gid=f"pf-{name}", name=name, resource_type="portfolio") for name in names]
+    db.add_all(portfolios)
+    db.flush()
+    return [portfolio.id for portfolio in portfolios]
+
+
+def _closure(db):
+    return {(row.ancestor_id, row.descendant_id): row.path_count
+            for row in db.execute(select(PortfolioClosure)).scalars()}
+
+
+def test_diamond_path_counts(db):
+    a, b, c, d = _portfolios(db, "a", "b", "c", "d")
+    for parent, child in ((a, b), (a, c), (b, d), (c, d)):
+        add_nesting(db, parent, child)
+
+    closure = _closure(db)
+    assert closure[(a, d)] == 2
+    assert closure[(a, b)] == closure[(b, d)] == closure[(d, d)] == 1
+    assert (b, c) not in closure
+    # Every path through a -> b: a and b on top, b and d below
+    assert sorted(tuple(row) for row in db.execute(_new_paths(a, b)).all()) == [(a, b, 1), (a, d, 1)]
+
+    remove_nesting(db, a, b)
+    closure = _closure(db)
+    assert (a, b) not in closure
+    assert closure[(a, d)] == 1
+    assert closure[(b, d)] == 1
+
+    remove_nesting(db, a, c)
+    assert {pair for pair in _closure(db) if pair[0] == a} == {(a, a)}
+
+
+def _portfolio_with_project(db, num_tasks):
+    (portfolio_id,) = _portfolios(db, "x")
+    project = Project(gid="pr-1", name="Launch", resource_type="project")
+    db.add(project)
+    db.flush()
+    db.add_all([
+        PortfolioItem(portfolio_id=portfolio_id, project_id=project.id),
+        ProjectTaskCount(project_id=project.id, num_tasks=num_tasks),
+    ])
+    db.commit()
+    return portfolio_id, project.id
+
+
+def _stored(engine, portfolio_id):
+    with Session(engine) as session:
+        return session.get(PortfolioRollup, portfolio_id)
+
+
+def test_refresh_that_read_first_does_not_overwrite_a_later_one(db, engine, monkeypatch):
+    portfolio_id, project_id = _portfolio_with_project(db, num_tasks=1)
+    compute = portfolio_rollups.compute_rollups
+
+    def compute_then_race(session, portfolio_ids):
+        computed = compute(session, portfolio_ids)
+        monkeypatch.setattr(portfolio_rollups, "compute_rollups", compute)
+        # A change commits and a second refresh stores it before this one writes
+        with engine.begin() as connection:
+            connection.execute(update(ProjectTaskCount).values(num_tasks=5))
+            assert mark_stale(connection, project_ids=[project_id]) == 1
+        with Session(engine) as other:
+            refresh_rollups(other, [portfolio_id])
+        return computed
+
+    monkeypatch.setattr(portfolio_rollups, "compute_rollups", compute_then_race)
+    refresh_rollups(db, [portfolio_id])
+
+    rollup = _stored(engine, portfolio_id)
+    assert rollup.num_tasks == 5
+    assert rollup.stale is False
+
+
+def test_change_during_refresh_leaves_rollup_stale(db, engine, monkeypatch):
+    portfolio_id, project_id = _portfolio_with_project(db, num_tasks=1)
+    compute = portfolio_rollups.compute_rollups
+
+    def compute_then_change(session, portfolio_ids):
+        computed = compute(session, portfolio_ids)
+        with engine.begin() as connection:
+            connection.execute(update(ProjectTaskCount).values(num_tasks=3))
+            mark_stale(connection, project_ids=[project_id])
+        return computed
+
+    monkeypatch.setattr(portfolio_rollups, "compute_rollups", compute_then_change)
+    refresh_rollups(db, [portfolio_id])
+    assert _stored(engine, portfolio_id).stale is True
+
+    monkeypatch.setattr(portfolio_rollups, "compute_rollups", compute)
+    assert get_rollups(db, [portfolio_id])[portfolio_id]["num_tasks"] == 3
+
+
+def test_get_rollups_does_not_commit_the_callers_session(db, engine):
+    portfolio_id, _ = _portfolio_with_project(db, num_tasks=4)
+    db.add(Tag(gid="tag-1", name="pending", resource_type="tag"))
+
+    assert get_rollups(db, [portfolio_id])[portfolio_id]["num_tasks"] == 4
+    assert _stored(engine, portfolio_id).num_tasks == 4
+    db.rollback()
+    assert db.execute(select(Tag)).first() is None
+    # Served from the table once fresh
+    assert get_rollups(db, [portfolio_id])[portfolio_id]["num_projects"] == 1
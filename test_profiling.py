@@ -0,0 +1,117 @@
+"""
+Test Profiling
+Checks that only authorized or armed requests are profiled, that reports carry
+samples and the request's SQL, the LRU of stored reports, and the slow-request log
+"""
+import asyncio
+import json
+import logging
+import time
+
+import pytest
+from sqlalchemy import create_engine, event, text
+
+import profiling
+from profiling import PROFILE_ID_HEADER, ProfileStore, ProfilingMiddleware, slow_logger
+
+TOKEN = "profile-secret"
+
+
+@pytest.fixture
+def store(monkeypatch):
+    monkeypatch.setenv("PROFILE_TOKEN", TOKEN)
+    store = ProfileStore()
+    monkeypatch.setattr(profiling, "store", store)
+    return store
+
+
+@pytest.fixture
+def sqlite_engine():
+    engine = create_engine("sqlite://")
+    event.listen(engine, "before_cursor_execute", profiling._before_execute)
+    event.listen(engine, "after_cursor_execute", profiling._after_execute)
+    yield engine
+    engine.dispose()
+
+
+def _app(engine=None, busy_seconds=0.0):
+    async def app(scope, receive, send):
+        # Busy on the event loop thread, so the sampler has frames to record
+        until = time.perf_counter() + busy_seconds
+        while time.perf_counter() < until:
+            pass
+        if engine is not None:
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+    return app
+
+
+def _request(middleware, path="/api/1.0/tasks", token=None):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    headers = [(b"x-asana-profile", token.encode())] if token else []
+    scope = {"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": headers}
+    asyncio.run(middleware(scope, receive, send))
+    return dict(messages[0]["headers"]).get(PROFILE_ID_HEADER.lower().encode(), b"").decode() or None
+
+
+def test_authorized_request_is_profiled_with_its_sql(store, sqlite_engine):
+    middleware = ProfilingMiddleware(_app(sqlite_engine, busy_seconds=0.05), profiling=True,
+                                     slow_threshold=None, slow_sample_rate=1.0)
+
+    assert _request(middleware, token="wrong") is None
+    assert _request(middleware) is None
+    profile_id = _request(middleware, token=TOKEN)
+    assert list(store.reports) == [profile_id]
+
+    report = store.get(profile_id)
+    assert (report["method"], report["path"], report["status"]) == ("GET", "/api/1.0/tasks", 200)
+    assert report["sql"]["count"] == 1
+    assert report["sql"]["statements"][0]["sql"] == "SELECT 1"
+    assert report["profile"]["samples"] > 0
+    assert any("test_profiling.py:app:" in entry["function"] for entry in report["profile"]["top_self"])
+
+
+def test_armed_requests_matching_the_prefix_are_profiled(store):
+    middleware = ProfilingMiddleware(_app(), profiling=True, slow_threshold=None, slow_sample_rate=1.0)
+    store.arm(2, "/api/1.0/tasks")
+
+    profiled = [_request(middleware, path) is not None
+                for path in ("/api/1.0/users/me", "/api/1.0/tasks/1", "/api/1.0/tasks/2", "/api/1.0/tasks/3")]
+    assert profiled == [False, True, True, False]
+    assert store.armed == 0
+
+
+def test_store_keeps_the_most_recently_used_reports():
+    store = ProfileStore(capacity=2)
+    for profile_id in ("a", "b"):
+        store.add({"id": profile_id})
+    assert store.get("a") == {"id": "a"}
+    store.add({"id": "c"})
+    assert (list(store.reports), store.get("b")) == (["a", "c"], None)
+
+
+def test_slow_requests_are_logged():
+    lines = []
+    handler = logging.Handler()
+    handler.emit = lambda record: lines.append(json.loads(record.getMessage()))
+    slow_logger.addHandler(handler)
+    try:
+        middleware = ProfilingMiddleware(_app(busy_seconds=0.02), profiling=False,
+                                         slow_threshold=0.01, slow_sample_rate=1.0)
+        _request(middleware, token=TOKEN)
+        _request(ProfilingMiddleware(_app(), profiling=False, slow_threshold=10.0, slow_sample_rate=1.0))
+    finally:
+        slow_logger.removeHandler(handler)
+
+    [line] = lines
+    assert (line["path"], line["status"], line["sql_count"], line["profile_id"]) == ("/api/1.0/tasks", 200, 0, None)
+    assert line["duration_ms"] >= 10
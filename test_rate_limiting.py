@@ -0,0 +1,136 @@
+"""
+Test Rate Limiting
+Checks token bucket refill and waits, the AIMD lane limits, and that a request
+rejected by a later limit gives back the tokens it took from the earlier ones
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import rate_limiting
+from rate_limiting import Lane, RateLimitMiddleware, TokenBuckets
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(rate_limiting, "time", SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+class _App:
+    """ASGI app whose responses are held until release()"""
+
+    def __init__(self):
+        self.gate = asyncio.Event()
+
+    def release(self):
+        self.gate.set()
+
+    async def __call__(self, scope, receive, send):
+        await self.gate.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def _request(middleware, path):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    scope = {"type": "http", "method": "GET", "path": "/api/1.0" + path, "query_string": b"", "headers": []}
+    await middleware(scope, receive, send)
+    return messages[0]["status"]
+
+
+def _middleware(app, client_burst, workspace_burst, lane_limit=8):
+    # Buckets that effectively never refill during a test
+    return RateLimitMiddleware(
+        app, TokenBuckets(1e-6, client_burst), TokenBuckets(1e-6, workspace_burst),
+        {name: Lane(name, lane_limit, 1, lane_limit, 10.0, 0.5) for name in ("interactive", "bulk")}
+    )
+
+
+def test_token_buckets_refill_up_to_burst(clock):
+    buckets = TokenBuckets(rate=2, burst=3)
+    assert [buckets.take("a") for _ in range(3)] == [0, 0, 0]
+    assert buckets.take("a") == 0.5
+    # Buckets are independent, and a failed take does not go into debt
+    assert buckets.take("b") == 0
+    clock.now += 0.5
+    assert buckets.take("a") == 0
+    assert buckets.take("a") == 0.5
+    clock.now += 60
+    assert [buckets.take("a") for _ in range(4)] == [0, 0, 0, 0.5]
+
+
+def test_refund_returns_a_token_up_to_burst(clock):
+    buckets = TokenBuckets(rate=1, burst=1)
+    buckets.refund("missing")
+    assert "missing" not in buckets.buckets
+    assert buckets.take("a") == 0
+    buckets.refund("a")
+    buckets.refund("a")
+    assert buckets.take("a") == 0
+    assert buckets.take("a") == 1
+
+
+def test_lane_limit_is_additive_increase_multiplicative_decrease():
+    lane = Lane("test", initial=2, minimum=1, maximum=3, target_seconds=10.0, backoff=0.5)
+    assert [lane.try_acquire() for _ in range(3)] == [True, True, False]
+    # Two fast requests at a limit of two grow it by one
+    lane.release(0.1, failed=False)
+    lane.release(0.1, failed=False)
+    assert (lane.in_flight, round(lane.limit, 2)) == (0, 2.9)
+    assert lane.try_acquire()
+    lane.release(0.1, failed=False)
+    assert lane.limit == 3
+    assert [lane.try_acquire() for _ in range(4)] == [True, True, True, False]
+
+    # A slow request halves the limit; others finishing within the same interval do not again
+    lane.release(11.0, failed=False)
+    assert lane.limit == 1.5
+    lane.release(0.1, failed=True)
+    assert lane.limit == 1.5
+    lane.decreased_at -= 10.0
+    lane.release(11.0, failed=False)
+    assert (lane.in_flight, lane.limit) == (0, 1)
+
+
+def test_workspace_rejection_refunds_the_client_token():
+    async def scenario():
+        app = _App()
+        app.release()
+        middleware = _middleware(app, client_burst=2, workspace_burst=1)
+        paths = ["/workspaces/w1/projects"] * 3 + ["/users/me", "/users/me"]
+        return [await _request(middleware, path) for path in paths]
+
+    # Only the first workspace request and one more request are charged to the client
+    assert asyncio.run(scenario()) == [200, 429, 429, 200, 429]
+
+
+def test_shed_request_refunds_its_tokens():
+    async def scenario():
+        app = _App()
+        middleware = _middleware(app, client_burst=2, workspace_burst=2, lane_limit=1)
+        running = asyncio.create_task(_request(middleware, "/workspaces/w1/projects"))
+        await asyncio.sleep(0)
+        shed = await _request(middleware, "/workspaces/w1/projects")
+        app.release()
+        statuses = [await running, shed, await _request(middleware, "/workspaces/w1/projects")]
+        return statuses, middleware.lanes["interactive"].in_flight
+
+    assert asyncio.run(scenario()) == ([200, 429, 200], 0)
@@ -0,0 +1,62 @@
+"""
+Test Reactions
+Checks that reacting is idempotent, that reaction_summaries follows adds and
+removes, and that reconciliation repairs drifted counters
+"""
+from sqlalchemy import select, update
+
+from models.reaction_summary import ReactionSummary
+from models.story import Story
+from services.reactions import (
+    add_reaction, reaction_summaries, reconcile_all_reaction_summaries, remove_reaction
+)
+
+
+def _counts(db):
+    return {(row.target_id, row.emoji_base): row.count for row in db.execute(select(ReactionSummary)).scalars()}
+
+
+def test_add_and_remove_are_idempotent(db):
+    assert add_reaction(db, "story", 1, 10, "clap") is True
+    assert add_reaction(db, "story", 1, 10, "clap") is False
+    assert add_reaction(db, "story", 1, 11, "clap", "3") is True
+    assert add_reaction(db, "story", 1, 11, "heart") is True
+    assert _counts(db) == {(1, "clap"): 2, (1, "heart"): 1}
+
+    assert remove_reaction(db, "story", 1, 11, "heart") is True
+    assert remove_reaction(db, "story", 1, 11, "heart") is False
+    # A counter that reaches zero is dropped
+    assert _counts(db) == {(1, "clap"): 2}
+
+    summary = reaction_summaries(db, "story", [1, 2], viewer_id=11)
+    assert summary[2] == []
+    assert summary[1] == [{"emoji_base": "clap", "variant": "clap_3", "count": 2, "reacted": True}]
+
+
+def test_reconcile_repairs_drift(db):
+    add_reaction(db, "story", 1, 10, "clap")
+    add_reaction(db, "story", 2, 10, "tada")
+    add_reaction(db, "status_update", 1, 10, "clap")
+    db.commit()
+    db.execute(update(ReactionSummary).where(ReactionSummary.target_type == "story").values(count=7))
+    db.add(ReactionSummary(target_type="story", target_id=3, emoji_base="eyes", count=2))
+    db.commit()
+
+    assert reconcile_all_reaction_summaries(db, batch_size=2) == 3
+    assert _counts(db) == {(1, "clap"): 1, (2, "tada"): 1}
+    assert reconcile_all_reaction_summaries(db) == 0
+
+
+def test_emoji_longer_than_its_column_is_rejected(db, api):
+    db.add(Story(id=1, gid="story-1", type="comment", text="Nice"))
+    db.commit()
+
+    response = api("POST", "/stories/story-1/addReaction", json={"emoji_base": "white_check_mark"})
+    assert response.status_code == 400
+    assert "emoji_base" in response.text
+    assert api("POST", "/stories/story-1/addReaction", json={"emoji_base": "clap", "emoji_skin_tone": "x" * 11}) \
+        .status_code == 400
+
+    response = api("POST", "/stories/story-1/addReaction", json={"emoji_base": "clap"})
+    assert response.status_code == 200
+    assert response.json()["data"][0]["count"] == 1
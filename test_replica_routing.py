@@ -0,0 +1,126 @@
+"""
+Test Replica Routing
+Checks that writes hand out their commit LSN, that reads presenting one are only
+routed to replicas that have replayed it, that lagging or unreachable replicas
+fall back to the primary, and that a session leaves the replica once it writes
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, select, text, update
+
+import database
+from database import ReplicaSet, RequestRouting, RoutingSession, get_db, parse_lsn, request_routing
+from models.task import Task
+from replica_routing import LSN_COOKIE, ReadYourWritesMiddleware, _required_lsn
+
+COMMIT_LSN = "16/B374D848"
+
+
+@pytest.fixture
+def replica_set(tmp_path):
+    engines = [create_engine(f"sqlite:///{tmp_path}/replica.db"),
+               create_engine(f"sqlite:///{tmp_path}/missing/replica.db")]
+    replica_set = ReplicaSet(engines, max_lag_seconds=5, interval=1)
+    yield replica_set
+    for engine in engines:
+        engine.dispose()
+
+
+def _scope(method, headers=()):
+    return {"type": "http", "method": method, "path": "/api/1.0/tasks", "query_string": b"",
+            "headers": [(name.encode(), value.encode()) for name, value in headers]}
+
+
+def _request(method, headers=()):
+    """Runs a request; a write "commits" at COMMIT_LSN. Returns (response headers, routing seen by the app)"""
+    seen = {}
+    messages = []
+
+    async def app(scope, receive, send):
+        routing = seen["routing"] = request_routing.get()
+        if not routing.read_only:
+            routing.commit_lsn = COMMIT_LSN
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    async def send(message):
+        messages.append(message)
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    asyncio.run(ReadYourWritesMiddleware(app, sticky_seconds=10)(_scope(method, headers), receive, send))
+    return dict(messages[0]["headers"]), seen["routing"]
+
+
+def test_parse_lsn_orders_positions():
+    assert parse_lsn("0/16B3748") == 0x16B3748
+    assert parse_lsn("16/B374D848") == (0x16 << 32) | 0xB374D848
+    assert parse_lsn("1/0") > parse_lsn("0/FFFFFFFF")
+
+
+def test_required_lsn_is_the_newest_presented():
+    assert _required_lsn(_scope("GET")) is None
+    headers = [("x-asana-lsn", "1/0"), ("cookie", f"theme=dark; {LSN_COOKIE}=2/0"), ("x-asana-lsn", "garbage")]
+    assert _required_lsn(_scope("GET", headers)) == parse_lsn("2/0")
+
+
+def test_writes_hand_out_their_commit_lsn_and_reads_require_it():
+    headers, routing = _request("POST")
+    assert routing.read_only is False
+    assert headers[b"x-asana-lsn"] == COMMIT_LSN.encode()
+    assert headers[b"set-cookie"].decode().startswith(f"{LSN_COOKIE}={COMMIT_LSN}; Max-Age=10;")
+
+    headers, routing = _request("GET", [("cookie", f"{LSN_COOKIE}={COMMIT_LSN}")])
+    assert (routing.read_only, routing.min_lsn) == (True, parse_lsn(COMMIT_LSN))
+    assert b"x-asana-lsn" not in headers
+    # A write presenting an LSN always goes to the primary, so it is not recorded
+    _, routing = _request("PUT", [("x-asana-lsn", COMMIT_LSN)])
+    assert routing.min_lsn is None
+
+
+def test_lagging_and_unreachable_replicas_fall_back_to_the_primary(replica_set):
+    current, unreachable = replica_set.replicas
+    # Replicas start unknown, which keeps reads on the primary until the first check
+    assert replica_set.choose() is None
+    replica_set.refresh()
+    assert (current.lag_seconds, unreachable.lag_seconds) == (0.0, float("inf"))
+    assert replica_set.choose() is current.engine
+
+    current.lag_seconds = 6.0
+    assert replica_set.choose() is None
+    current.lag_seconds, current.replay_lsn = 1.0, parse_lsn(COMMIT_LSN) - 1
+    assert replica_set.choose(parse_lsn(COMMIT_LSN)) is None
+    current.replay_lsn = parse_lsn(COMMIT_LSN)
+    assert replica_set.choose(parse_lsn(COMMIT_LSN)) is current.engine
+
+
+def test_read_only_sessions_use_the_chosen_replica_until_they_write(replica_set, monkeypatch):
+    current, _ = replica_set.replicas
+    current.lag_seconds, current.replay_lsn = 0.0, parse_lsn("1/0")
+    monkeypatch.setattr(database, "replicas", replica_set)
+
+    def session(routing):
+        token = request_routing.set(routing)
+        try:
+            sessions = get_db()
+            return next(sessions), sessions
+        finally:
+            request_routing.reset(token)
+
+    db, sessions = session(RequestRouting(True, parse_lsn("0/1")))
+    assert db.get_bind(clause=select(Task.id)) is current.engine
+    assert db.get_bind(clause=update(Task).values(name="x")) is database.engine
+    assert db.get_bind(clause=select(Task.id)) is database.engine
+    sessions.close()
+
+    for routing in (RequestRouting(True, parse_lsn(COMMIT_LSN)), RequestRouting(False)):
+        db, sessions = session(routing)
+        assert db.info.get("replica") is None
+        assert db.get_bind(clause=text("SELECT 1")) is database.engine
+        sessions.close()
+
+    db = RoutingSession(bind=database.engine, info={"replica": current.engine})
+    assert db.get_bind(clause=select(Task.id).with_for_update()) is database.engine
+    db.close()
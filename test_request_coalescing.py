@@ -0,0 +1,96 @@
+"""
+Test Request Coalescing
+Checks that identical concurrent GET requests share one execution, and that a
+request never joins one started before a completed write or outside the join window
+"""
+import asyncio
+
+from request_coalescing import CoalescingMiddleware
+
+PATH = "/api/1.0/tasks/1"
+
+
+class _App:
+    """ASGI app whose GET responses are held until release() and numbered by execution"""
+
+    def __init__(self):
+        self.executions = 0
+        self.gate = asyncio.Event()
+
+    def release(self):
+        self.gate.set()
+
+    async def __call__(self, scope, receive, send):
+        if scope["method"] == "GET":
+            self.executions += 1
+            execution = self.executions
+            await self.gate.wait()
+            body = str(execution).encode()
+        else:
+            body = b"written"
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": body})
+
+
+async def _request(middleware, method="GET"):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    scope = {"type": "http", "method": method, "path": PATH, "query_string": b"", "headers": []}
+    await middleware(scope, receive, send)
+    return b"".join(message.get("body", b"") for message in messages)
+
+
+def _middleware(app, join_window_seconds=10.0):
+    return CoalescingMiddleware(app, max_wait_seconds=10.0, max_bytes=1024, join_window_seconds=join_window_seconds)
+
+
+async def _start(middleware, method="GET"):
+    task = asyncio.create_task(_request(middleware, method))
+    await asyncio.sleep(0)
+    return task
+
+
+def test_identical_requests_share_one_execution():
+    async def scenario():
+        app = _App()
+        middleware = _middleware(app)
+        first, second = await _start(middleware), await _start(middleware)
+        app.release()
+        return await asyncio.gather(first, second), app.executions
+
+    assert asyncio.run(scenario()) == ([b"1", b"1"], 1)
+
+
+def test_request_after_a_write_does_not_join_an_earlier_read():
+    async def scenario():
+        app = _App()
+        middleware = _middleware(app)
+        before = await _start(middleware)
+        assert await _request(middleware, "PUT") == b"written"
+        after = await _start(middleware)
+        app.release()
+        return await asyncio.gather(before, after), app.executions
+
+    assert asyncio.run(scenario()) == ([b"1", b"2"], 2)
+
+
+def test_request_outside_the_join_window_runs_again():
+    async def scenario():
+        app = _App()
+        middleware = _middleware(app, join_window_seconds=0.01)
+        old = await _start(middleware)
+        await asyncio.sleep(0.02)
+        late = await _start(middleware)
+        later = await _start(middleware)
+        app.release()
+        results = await asyncio.gather(old, late, later)
+        return results, app.executions, middleware.in_flight
+
+    # The late request leads a new flight, which the next one joins
+    assert asyncio.run(scenario()) == ([b"1", b"2", b"2"], 2, {})
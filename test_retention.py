@@ -0,0 +1,95 @@
+"""
+Test Retention
+Checks the partition names and bounds of the daily and monthly policies, and
+that maintenance creates partitions up to the horizon and drops only those
+whose rows are all past retention, the _before_ archive included
+"""
+from datetime import datetime, timezone
+
+import pytest
+
+import retention
+from retention import TimePartitioning
+
+DAILY = TimePartitioning("events", "day", retention_days=30, ahead=7)
+MONTHLY = TimePartitioning("audit_log_events", "month", retention_days=365, ahead=2)
+
+
+def _utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+class _Connection:
+    """Records the statements maintain() executes"""
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, statement):
+        self.statements.append(str(statement))
+
+
+def _maintain(monkeypatch, policy, existing, now):
+    monkeypatch.setattr(retention, "partitions_of", lambda connection, table_name: list(existing))
+    connection = _Connection()
+    created, dropped = retention.maintain(connection, policy, now)
+    return created, dropped, connection.statements
+
+
+def test_periods_cover_the_range_from_its_floor():
+    assert DAILY.periods(_utc(2026, 3, 30, 15), _utc(2026, 4, 1)) == [
+        ("events_p20260330", "FOR VALUES FROM ('2026-03-30T00:00:00+00:00') TO ('2026-03-31T00:00:00+00:00')"),
+        ("events_p20260331", "FOR VALUES FROM ('2026-03-31T00:00:00+00:00') TO ('2026-04-01T00:00:00+00:00')"),
+        ("events_p20260401", "FOR VALUES FROM ('2026-04-01T00:00:00+00:00') TO ('2026-04-02T00:00:00+00:00')"),
+    ]
+    periods = MONTHLY.periods(_utc(2025, 12, 31, 23), _utc(2026, 2, 1))
+    assert [name for name, _ in periods] == [
+        "audit_log_events_p202512", "audit_log_events_p202601", "audit_log_events_p202602"
+    ]
+    assert periods[0][1] == "FOR VALUES FROM ('2025-12-01T00:00:00+00:00') TO ('2026-01-01T00:00:00+00:00')"
+
+
+@pytest.mark.parametrize("policy, partition, upper", [
+    (DAILY, "events_p20260228", _utc(2026, 3, 1)),
+    (DAILY, "events_before_20260201", _utc(2026, 2, 1)),
+    (MONTHLY, "audit_log_events_p202512", _utc(2026, 1, 1)),
+    (MONTHLY, "audit_log_events_before_20250301", _utc(2025, 3, 1)),
+    # Partitions this policy did not name are never dropped
+    (DAILY, "events_default", None),
+    (DAILY, "events_p202602", None),
+    (DAILY, "audit_log_events_p20260228", None),
+])
+def test_upper_bound(policy, partition, upper):
+    assert policy.upper_bound(partition) == upper
+
+
+def test_daily_maintenance_drops_partitions_entirely_past_retention(monkeypatch):
+    # Retention ends at 2026-02-13 12:00
+    existing = ["events_before_20260201", "events_p20260212", "events_p20260213", "events_p20260315",
+                "events_default"]
+    created, dropped, statements = _maintain(monkeypatch, DAILY, existing, _utc(2026, 3, 15, 12))
+
+    assert created == [f"events_p202603{day}" for day in range(16, 23)]
+    # 2026-02-13 still holds rows from within retention
+    assert dropped == ["events_before_20260201", "events_p20260212"]
+    assert statements[0] == (
+        "CREATE TABLE events_p20260316 PARTITION OF events "
+        "FOR VALUES FROM ('2026-03-16T00:00:00+00:00') TO ('2026-03-17T00:00:00+00:00')"
+    )
+    assert statements[-2:] == ["DROP TABLE events_before_20260201", "DROP TABLE events_p20260212"]
+
+
+def test_monthly_maintenance_drops_partitions_entirely_past_retention(monkeypatch):
+    # Retention ends at 2025-03-15
+    existing = ["audit_log_events_before_20250301", "audit_log_events_p202502", "audit_log_events_p202503",
+                "audit_log_events_p202603"]
+    created, dropped, _ = _maintain(monkeypatch, MONTHLY, existing, _utc(2026, 3, 15))
+
+    assert created == ["audit_log_events_p202604", "audit_log_events_p202605"]
+    assert dropped == ["audit_log_events_before_20250301", "audit_log_events_p202502"]
+
+
+def test_maintenance_is_idempotent(monkeypatch):
+    now = _utc(2026, 3, 15, 12)
+    names = [name for name, _ in DAILY.periods(now, DAILY.horizon(now))]
+    assert _maintain(monkeypatch, DAILY, names, now) == ([], [], [])
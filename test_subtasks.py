@@ -0,0 +1,67 @@
+"""
+Test Subtasks
+Checks set_parent's cycle rejection and num_subtasks bookkeeping, and the
+offset tokens of the depth-first subtask listing
+"""
+import pytest
+
+from models.task import Task
+from services.subtasks import MAX_PATH_LENGTH, decode_path, encode_path, set_parent
+from utils import MAX_ROW_ID
+
+
+def _tasks(db, count):
+    tasks = [Task(id=i, gid=f"t{i}", name=f"Task {i}", resource_type="task", workspace_id=1, num_subtasks=0)
+             for i in range(1, count + 1)]
+    db.add_all(tasks)
+    db.commit()
+    return tasks
+
+
+def test_set_parent_keeps_counts(db):
+    a, b, c = _tasks(db, 3)
+    set_parent(db, c, a)
+    db.commit()
+    set_parent(db, c, b)
+    db.commit()
+    db.refresh(a), db.refresh(b)
+    assert (c.parent_id, a.num_subtasks, b.num_subtasks) == (b.id, 0, 1)
+
+    set_parent(db, c, None)
+    db.commit()
+    db.refresh(b)
+    assert (c.parent_id, b.num_subtasks) == (None, 0)
+
+
+def test_set_parent_rejects_cycles(db):
+    a, b, c = _tasks(db, 3)
+    set_parent(db, b, a)
+    set_parent(db, c, b)
+    db.commit()
+    with pytest.raises(ValueError):
+        set_parent(db, a, c)
+    with pytest.raises(ValueError):
+        set_parent(db, a, a)
+
+
+def test_set_parent_uses_the_committed_parent(db, engine):
+    from sqlalchemy.orm import Session
+
+    a, b, c = _tasks(db, 3)
+    stale = db.get(Task, c.id)
+    assert stale.parent_id is None
+    # Another request moves c under a after this session loaded it
+    with Session(engine) as other:
+        set_parent(other, other.get(Task, c.id), other.get(Task, a.id))
+        other.commit()
+
+    set_parent(db, stale, b)
+    db.commit()
+    db.refresh(a), db.refresh(b)
+    assert (a.num_subtasks, b.num_subtasks) == (0, 1)
+
+
+def test_path_tokens():
+    assert decode_path(encode_path([1, 26, MAX_ROW_ID])) == [1, 26, MAX_ROW_ID]
+    for token in ("", "zz", "1..2", "0", f"{MAX_ROW_ID + 1:x}", ".".join(["1"] * (MAX_PATH_LENGTH + 1))):
+        assert decode_path(token) is None
@@ -0,0 +1,54 @@
+"""
+Test Synthetic Data
+Checks that generated rows fit their columns, so COPY accepts every table
+(runs without a database)
+"""
+
+import pytest
+
+import synthetic_data
+from database import Base, import_models
+
+import_models()
+
+
+def _tables(dataset):
+    skipped = synthetic_data.DERIVED_TABLES | synthetic_data.UNMANAGED_TABLES
+    return [table for name, table in sorted(Base.metadata.tables.items())
+            if name not in skipped and dataset.count(name)]
+
+
+@pytest.mark.parametrize("tasks", [1_000, 200_000])
+def test_generated_strings_fit_their_columns(tasks):
+    dataset = synthetic_data.Dataset(42, tasks)
+    _, broken = synthetic_data.load_levels()
+    for table in _tables(dataset):
+        # generate_chunk raises ValueError on any value longer than its VARCHAR
+        _, rows = synthetic_data.generate_chunk(dataset, table, synthetic_data.table_generators(table, broken), 0)
+        assert rows == min(dataset.count(table.name), synthetic_data.CHUNK_ROWS)
+
+
+def test_generic_strings_are_cut_to_length():
+    assert synthetic_data._fit("estimate_units", "_4", 10) == "estimate_4"
+    assert synthetic_data._fit("total_units", "-123456", 10) == "tot-123456"
+    assert synthetic_data._fit("name", "_1", None) == "name_1"
+    assert all(len(emoji) <= 10 for emoji in synthetic_data.EMOJIS)
+
+
+def test_overflowing_override_is_rejected():
+    dataset = synthetic_data.Dataset(42, 1_000)
+    table = Base.metadata.tables["reactions"]
+    _, broken = synthetic_data.load_levels()
+    generators = synthetic_data.table_generators(table, broken)
+    generators.append(("emoji_base", lambda ds, rng, i, row: "white_check_mark"))
+    with pytest.raises(ValueError, match="reactions.emoji_base"):
+        synthetic_data.generate_chunk(dataset, table, generators, 0)
+
+
+def test_chunks_are_deterministic():
+    dataset = synthetic_data.Dataset(7, 1_000)
+    table = Base.metadata.tables["tasks"]
+    _, broken = synthetic_data.load_levels()
+    first, _ = synthetic_data.generate_chunk(dataset, table, synthetic_data.table_generators(table, broken), 0)
+    second, _ = synthetic_data.generate_chunk(dataset, table, synthetic_data.table_generators(table, broken), 0)
+    assert first.getvalue() == second.getvalue()
@@ -0,0 +1,42 @@
+"""
+Test System Stories
+Checks that task changes write system stories, and that a task with stories,
+comments and reactions can still be deleted with foreign keys enforced
+"""
+from sqlalchemy import select
+
+from models.project import Project
+from models.reaction import Reaction
+from models.reaction_summary import ReactionSummary
+from models.story import Story
+from models.user import User
+
+
+def _story_subtypes(db):
+    return sorted(db.scalars(select(Story.resource_subtype)).all())
+
+
+def test_edited_task_with_stories_can_be_deleted(db, api, foreign_keys):
+    # Comments and reactions are made as the default user
+    db.add_all([User(id=1, gid="u1", name="Ann"),
+                Project(id=1, gid="p1", name="Project 1"), Project(id=2, gid="p2", name="Project 2")])
+    db.commit()
+    response = api("POST", "/tasks", json={"name": "Plan", "projects": ["p1"]})
+    assert response.status_code == 201
+    task_gid = response.json()["data"]["gid"]
+
+    assert api("PUT", f"/tasks/{task_gid}", json={"completed": True, "name": "Planned"}).status_code == 200
+    assert api("POST", f"/tasks/{task_gid}/addProject", json={"project": "p2"}).status_code == 200
+    response = api("POST", f"/tasks/{task_gid}/stories", json={"text": "Looks good"})
+    assert response.status_code == 201
+    story_gid = response.json()["data"]["gid"]
+    assert api("POST", f"/stories/{story_gid}/addReaction", json={"emoji_base": "clap"}).status_code == 200
+    # Joining a project at creation is part of the creation and gets no story
+    assert _story_subtypes(db) == ["added_to_project", "comment_added", "marked_complete", "name_changed"]
+
+    response = api("DELETE", f"/tasks/{task_gid}")
+    assert response.status_code == 200, response.text
+    db.expire_all()
+    assert _story_subtypes(db) == []
+    assert db.scalars(select(Reaction.id)).all() == []
+    assert db.scalars(select(ReactionSummary.target_id)).all() == []
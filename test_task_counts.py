@@ -0,0 +1,59 @@
+"""
+Test Task Counts
+Checks that project task counters follow task creation, completion, project
+adds and removes and deletion, and that reconciliation repairs drifted counters
+"""
+from sqlalchemy import update
+
+from models.project import Project
+from models.project_task_count import ProjectTaskCount
+from services.task_counts import reconcile_all_task_counts
+
+
+def _projects(db, count):
+    db.add_all([Project(id=i, gid=f"p{i}", name=f"Project {i}") for i in range(1, count + 1)])
+    db.commit()
+
+
+def _counts(api, project_gid):
+    response = api("GET", f"/projects/{project_gid}/task_counts")
+    assert response.status_code == 200
+    counts = response.json()["data"]
+    return counts["num_tasks"], counts["num_completed_tasks"], counts["num_milestones"]
+
+
+def test_counters_follow_task_changes(db, api, foreign_keys):
+    _projects(db, 2)
+    response = api("POST", "/tasks", json={"name": "Launch", "resource_subtype": "milestone", "projects": ["p1"]})
+    assert response.status_code == 201
+    task_gid = response.json()["data"]["gid"]
+    assert api("POST", "/tasks", json={"name": "Plan", "projects": ["p1", "p2"]}).status_code == 201
+    assert (_counts(api, "p1"), _counts(api, "p2")) == ((2, 0, 1), (1, 0, 0))
+
+    assert api("PUT", f"/tasks/{task_gid}", json={"completed": True}).status_code == 200
+    assert _counts(api, "p1") == (2, 1, 1)
+
+    assert api("POST", f"/tasks/{task_gid}/addProject", json={"project": "p2"}).status_code == 200
+    # Adding it again is not counted twice
+    assert api("POST", f"/tasks/{task_gid}/addProject", json={"project": "p2"}).status_code == 200
+    assert _counts(api, "p2") == (2, 1, 1)
+
+    assert api("POST", f"/tasks/{task_gid}/removeProject", json={"project": "p1"}).status_code == 200
+    assert _counts(api, "p1") == (1, 0, 0)
+
+    assert api("DELETE", f"/tasks/{task_gid}").status_code == 200
+    assert (_counts(api, "p1"), _counts(api, "p2")) == ((1, 0, 0), (1, 0, 0))
+    assert reconcile_all_task_counts(db) == 0
+
+
+def test_reconcile_repairs_drift(db, api):
+    _projects(db, 3)
+    api("POST", "/tasks", json={"name": "Plan", "completed": True, "projects": ["p1", "p2"]})
+    db.execute(update(ProjectTaskCount).where(ProjectTaskCount.project_id == 1).values(num_tasks=5))
+    db.add(ProjectTaskCount(project_id=3, num_tasks=2, num_completed_tasks=0, num_milestones=0,
+                            num_completed_milestones=0))
+    db.commit()
+
+    assert reconcile_all_task_counts(db, batch_size=2) == 2
+    assert [_counts(api, gid) for gid in ("p1", "p2", "p3")] == [(1, 1, 0), (1, 1, 0), (0, 0, 0)]
+    assert reconcile_all_task_counts(db) == 0
@@ -0,0 +1,113 @@
+"""
+Test Task Templates
+Checks template flattening and validation, and that instantiation writes every
+copy of the tree with its parent links, dates and project counters (Postgres
+only: ids come from the tasks sequence)
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from models.job import Job
+from models.project import Project
+from models.task import Task
+from models.task_membership import TaskMembership
+from models.task_template import TaskTemplate
+from models.workspace import Workspace
+from services.task_counts import get_task_counts, reconcile_task_counts
+from services.task_templates import (
+    JOB_THRESHOLD_ROWS, TemplateError, _resolve_references, flatten_template, instantiate, row_count
+)
+from utils import generate_gid
+
+TEMPLATE = {
+    "name": "Onboard new hire",
+    "relative_due_on": 10,
+    "subtasks": [
+        {"name": "Accounts", "relative_start_on": 0, "relative_due_on": 2,
+         "subtasks": [{"name": "Laptop", "task_resource_subtype": "milestone"}]},
+        {"name": "Intro meetings", "description": "Team and manager"},
+    ],
+}
+
+
+def test_flatten_is_depth_first():
+    nodes = flatten_template(TEMPLATE)
+    assert [(node["name"], parent) for node, parent in nodes] == [
+        ("Onboard new hire", None), ("Accounts", 0), ("Laptop", 1), ("Intro meetings", 0)
+    ]
+    assert row_count(TEMPLATE, 25) == 100
+
+
+def test_invalid_templates_are_rejected(db):
+    for template in ([], {"subtasks": {"name": "x"}}, {"subtasks": ["x"]}):
+        with pytest.raises(TemplateError):
+            flatten_template(template)
+    with pytest.raises(TemplateError, match="Assignee not found: nobody"):
+        _resolve_references(db, flatten_template({"name": "x", "subtasks": [{"assignee": "nobody"}]}))
+
+
+def test_instantiate_rejects_bad_requests_up_front(db, api):
+    db.add(TaskTemplate(id=1, gid="template-1", name="Review",
+                        template={"name": "Review", "subtasks": [{"name": "Sign off", "assignee": "nobody"}]}))
+    db.commit()
+
+    response = api("POST", "/task_templates/template-1/instantiate", json={"count": 0})
+    assert response.status_code == 400
+    assert "count" in response.text
+    # Large enough for a background job, which would only fail later on the missing assignee
+    response = api("POST", "/task_templates/template-1/instantiate", json={"count": JOB_THRESHOLD_ROWS})
+    assert response.status_code == 400
+    assert "Assignee not found: nobody" in response.text
+    assert db.query(Job).count() == 0
+
+
+def test_instantiate_writes_every_copy(pg_db):
+    workspace = Workspace(gid=generate_gid(), name="Templates")
+    pg_db.add(workspace)
+    pg_db.flush()
+    project = Project(gid=generate_gid(), name="Onboarding", workspace_id=workspace.id)
+    template = TaskTemplate(gid=generate_gid(), name="Onboarding", template=TEMPLATE)
+    pg_db.add_all([project, template])
+    pg_db.flush()
+    reconcile_task_counts(pg_db, [project.id])
+    start = date(2026, 3, 2)
+
+    roots = instantiate(pg_db, template.id, "Onboard Ann", project.id, count=3, start=start)
+    pg_db.commit()
+
+    assert [root["name"] for root in roots] == ["Onboard Ann"] * 3
+    for root in roots:
+        task = pg_db.query(Task).filter(Task.gid == root["gid"]).one()
+        assert (task.workspace_id, task.due_on, task.num_subtasks) == (workspace.id, start + timedelta(days=10), 2)
+        children = {child.name: child for child in pg_db.query(Task).filter(Task.parent_id == task.id)}
+        assert set(children) == {"Accounts", "Intro meetings"}
+        assert (children["Accounts"].start_on, children["Accounts"].num_subtasks) == (start, 1)
+        assert children["Intro meetings"].notes == "Team and manager"
+        laptop = pg_db.query(Task).filter(Task.parent_id == children["Accounts"].id).one()
+        assert (laptop.name, laptop.resource_subtype, laptop.due_on) == ("Laptop", "milestone", None)
+
+    # Only the top-level tasks join the project
+    members = pg_db.query(Task.gid).join(TaskMembership, TaskMembership.task_id == Task.id) \
+        .filter(TaskMembership.project_id == project.id).all()
+    assert sorted(gid for gid, in members) == sorted(root["gid"] for root in roots)
+    assert get_task_counts(pg_db, project.id)["num_tasks"] == 3
+    assert reconcile_task_counts(pg_db, [project.id]) == 0
+
+
+def test_instantiating_several_copies_returns_each(pg_db):
+    from fastapi import BackgroundTasks
+
+    from endpoints.task_templates import instantiate_task_template
+    from schemas.task_template import TaskTemplateInstantiateRequest
+
+    template = TaskTemplate(gid=generate_gid(), name="Onboarding", template=TEMPLATE)
+    pg_db.add(template)
+    pg_db.commit()
+
+    response = instantiate_task_template(
+        BackgroundTasks(), template.gid, TaskTemplateInstantiateRequest(name="Onboard", count=2), db=pg_db
+    )
+    gids = [task.gid for task in response.data]
+    assert len(set(gids)) == 2
+    assert pg_db.query(Task).filter(Task.gid.in_(gids), Task.parent_id.is_(None)).count() == 2
@@ -0,0 +1,107 @@
+"""
+Test Time Rollups
+Checks that entry changes move minutes between the rollup rows, that deleting
+a task's time takes it out of every rollup and budget, and that reconciliation
+repairs drifted rollups
+"""
+from datetime import date
+
+from sqlalchemy import select, update
+
+from models.budget import Budget
+from models.project_time_total import ProjectTimeTotal
+from models.task_time_total import TaskTimeTotal
+from models.time_tracking_entry import TimeTrackingEntry
+from models.user_daily_time import UserDailyTime
+from models.workspace_daily_time import WorkspaceDailyTime
+from services.time_rollups import (
+    delete_task_time, entry_state, reconcile_all_time_rollups, record_entry_change
+)
+
+MONDAY = date(2026, 3, 2)
+TUESDAY = date(2026, 3, 3)
+
+
+def _rollups(db):
+    return {
+        "task": {row.task_id: row.actual_time_minutes for row in db.execute(select(TaskTimeTotal)).scalars()},
+        "project": {row.project_id: row.actual_time_minutes for row in db.execute(select(ProjectTimeTotal)).scalars()},
+        "user": {(row.entered_on, row.user_id): row.actual_time_minutes
+                 for row in db.execute(select(UserDailyTime)).scalars()},
+        "workspace": {row.entered_on: row.actual_time_minutes
+                      for row in db.execute(select(WorkspaceDailyTime)).scalars()},
+    }
+
+
+def _track(db, entry_id, task_id, minutes, user_id=10, day=MONDAY, project_id=100):
+    entry = TimeTrackingEntry(id=entry_id, gid=f"entry-{entry_id}", task_id=task_id, duration_minutes=minutes,
+                              entered_on=day, user_id=user_id, attributable_to_id=project_id, workspace_id=1)
+    db.add(entry)
+    db.flush()
+    record_entry_change(db, None, entry_state(entry))
+    return entry
+
+
+def test_entry_changes_move_minutes_between_rollups(db):
+    _track(db, 1, 1, 30)
+    entry = _track(db, 2, 1, 45, user_id=11)
+    assert _rollups(db) == {
+        "task": {1: 75},
+        "project": {100: 75},
+        "user": {(MONDAY, 10): 30, (MONDAY, 11): 45},
+        "workspace": {MONDAY: 75},
+    }
+
+    old = entry_state(entry)
+    entry.duration_minutes, entry.entered_on, entry.task_id = 60, TUESDAY, 2
+    db.flush()
+    record_entry_change(db, old, entry_state(entry))
+    assert _rollups(db) == {
+        "task": {1: 30, 2: 60},
+        "project": {100: 90},
+        "user": {(MONDAY, 10): 30, (MONDAY, 11): 0, (TUESDAY, 11): 60},
+        "workspace": {MONDAY: 30, TUESDAY: 60},
+    }
+
+    record_entry_change(db, entry_state(entry), None)
+    assert _rollups(db)["workspace"] == {MONDAY: 30, TUESDAY: 0}
+
+
+def test_deleting_task_time_updates_rollups_and_budgets(db):
+    db.add(Budget(id=1, gid="budget-1", budget_type="time", parent_id=100, actual_value=0))
+    _track(db, 1, 1, 30)
+    _track(db, 2, 1, 20, day=TUESDAY)
+    _track(db, 3, 2, 15)
+    db.execute(update(Budget).values(actual_value=65))
+
+    delete_task_time(db, [1])
+    db.flush()
+
+    assert db.execute(select(TimeTrackingEntry.id)).scalars().all() == [3]
+    assert _rollups(db) == {
+        "task": {2: 15},
+        "project": {100: 15},
+        "user": {(MONDAY, 10): 15, (TUESDAY, 10): 0},
+        "workspace": {MONDAY: 15, TUESDAY: 0},
+    }
+    assert db.get(Budget, 1).actual_value == 15
+    assert reconcile_all_time_rollups(db) == 0
+
+
+def test_reconcile_repairs_drift(db):
+    _track(db, 1, 1, 30)
+    _track(db, 2, 2, 15, day=TUESDAY)
+    db.commit()
+    db.execute(update(TaskTimeTotal).where(TaskTimeTotal.task_id == 1).values(actual_time_minutes=99))
+    db.execute(update(WorkspaceDailyTime).values(actual_time_minutes=0))
+    db.add(ProjectTimeTotal(project_id=200, actual_time_minutes=5))
+    db.commit()
+
+    assert reconcile_all_time_rollups(db, batch_size=1) == 4
+    assert _rollups(db) == {
+        "task": {1: 30, 2: 15},
+        "project": {100: 45, 200: 0},
+        "user": {(MONDAY, 10): 30, (TUESDAY, 10): 15},
+        "workspace": {MONDAY: 30, TUESDAY: 15},
+    }
+    assert reconcile_all_time_rollups(db) == 0
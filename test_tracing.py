@@ -0,0 +1,112 @@
+"""
+Test Tracing
+Checks W3C traceparent parsing, that the middleware joins an incoming trace
+and follows its sampled flag, propagates the server span in the response, and
+parents spans opened during the request to it
+"""
+import asyncio
+
+import pytest
+
+import tracing
+from tracing import (
+    KIND_SERVER, STATUS_ERROR, RatioSampler, TracingMiddleware, parse_traceparent, span
+)
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+class _Exporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, finished):
+        self.spans.append(finished)
+
+
+@pytest.fixture
+def exported(monkeypatch):
+    exporter = _Exporter()
+    monkeypatch.setattr(tracing, "_exporter", exporter)
+    return exporter.spans
+
+
+async def _app(scope, receive, send):
+    with span("work", {"step": 1}):
+        pass
+    if scope["path"] == "/fail":
+        raise RuntimeError("boom")
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def _request(ratio=0.0, traceparent=None, path="/api/1.0/tasks/1"):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    middleware = TracingMiddleware(_app, RatioSampler(ratio), lambda scope: "/api/1.0/tasks/{task_gid}")
+    headers = [(b"traceparent", traceparent.encode())] if traceparent else []
+    scope = {"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": headers}
+    asyncio.run(middleware(scope, receive, send))
+    return dict(messages[0]["headers"]).get(b"traceparent", b"").decode() or None
+
+
+@pytest.mark.parametrize("value, parsed", [
+    (f"00-{TRACE_ID}-{PARENT_ID}-01", (TRACE_ID, PARENT_ID, True)),
+    (f" 00-{TRACE_ID.upper()}-{PARENT_ID}-00 ", (TRACE_ID, PARENT_ID, False)),
+    # Later versions may append fields; version 00 may not
+    (f"01-{TRACE_ID}-{PARENT_ID}-03-extra", (TRACE_ID, PARENT_ID, True)),
+    (f"00-{TRACE_ID}-{PARENT_ID}-01-extra", None),
+    (f"ff-{TRACE_ID}-{PARENT_ID}-01", None),
+    (f"00-{'0' * 32}-{PARENT_ID}-01", None),
+    (f"00-{TRACE_ID}-{'0' * 16}-01", None),
+    (f"00-{TRACE_ID[:-1]}-{PARENT_ID}-01", None),
+    ("garbage", None),
+])
+def test_parse_traceparent(value, parsed):
+    assert parse_traceparent(value) == parsed
+
+
+def test_incoming_trace_is_joined_and_propagated(exported):
+    response = _request(traceparent=f"00-{TRACE_ID}-{PARENT_ID}-01")
+
+    work, server = exported
+    assert (server.name, server.kind, server.trace_id, server.parent_id) == (
+        "GET /api/1.0/tasks/{task_gid}", KIND_SERVER, TRACE_ID, PARENT_ID
+    )
+    assert server.attributes["http.response.status_code"] == 200
+    assert response == f"00-{TRACE_ID}-{server.span_id}-01"
+    assert (work.name, work.trace_id, work.parent_id, work.attributes) == ("work", TRACE_ID, server.span_id, {"step": 1})
+    otlp = server.to_otlp()
+    assert (otlp["traceId"], otlp["parentSpanId"], otlp["kind"]) == (TRACE_ID, PARENT_ID, KIND_SERVER)
+
+
+def test_incoming_sampled_flag_overrides_the_ratio(exported):
+    assert _request(ratio=1.0, traceparent=f"00-{TRACE_ID}-{PARENT_ID}-00") is None
+    assert exported == []
+    # An invalid traceparent starts a new trace, sampled by the ratio
+    response = _request(ratio=1.0, traceparent="00-invalid")
+    server = exported[-1]
+    assert server.trace_id != TRACE_ID and server.parent_id is None
+    assert response == server.traceparent
+
+
+def test_ratio_sampler_decides_new_traces(exported):
+    assert _request(ratio=0.0) is None
+    assert _request(ratio=1.0) is not None
+    assert RatioSampler(0.5).should_sample("0" * 16 + "7" + "f" * 15)
+    assert not RatioSampler(0.5).should_sample("f" * 16 + "8" + "0" * 15)
+
+
+def test_failed_request_marks_the_server_span(exported):
+    with pytest.raises(RuntimeError):
+        _request(ratio=1.0, path="/fail")
+    server = exported[-1]
+    assert (server.status, server.attributes["http.response.status_code"]) == (STATUS_ERROR, 500)
+    assert server.attributes["exception.message"] == "boom"
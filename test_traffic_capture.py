@@ -0,0 +1,98 @@
+"""
+Test Traffic Capture
+Checks that sampled requests are recorded with their body, status and timing but
+never their headers, that failed requests are recorded as 500s, and that
+unsampled requests are not recorded at all
+"""
+import asyncio
+import json
+import logging
+
+import pytest
+
+from traffic_capture import MAX_BODY_BYTES, TrafficCaptureMiddleware
+
+
+class _Records(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(json.loads(record.getMessage()))
+
+
+@pytest.fixture
+def records():
+    capture_logger = logging.getLogger("test_traffic_capture")
+    capture_logger.setLevel(logging.INFO)
+    capture_logger.propagate = False
+    handler = _Records()
+    capture_logger.addHandler(handler)
+    yield capture_logger, handler.lines
+    capture_logger.removeHandler(handler)
+
+
+async def _app(scope, receive, send):
+    """Echoes the request body; fails on /fail"""
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+    if scope["path"] == "/fail":
+        raise RuntimeError("boom")
+    await send({"type": "http.response.start", "status": 201, "headers": []})
+    await send({"type": "http.response.body", "body": body})
+
+
+def _request(middleware, path="/api/1.0/tasks", chunks=(b"",), method="POST"):
+    messages = []
+    pending = list(chunks)
+
+    async def send(message):
+        messages.append(message)
+
+    async def receive():
+        chunk = pending.pop(0)
+        return {"type": "http.request", "body": chunk, "more_body": bool(pending)}
+
+    scope = {"type": "http", "method": method, "path": path, "query_string": b"opt_pretty=true",
+             "headers": [(b"authorization", b"Bearer secret")]}
+    asyncio.run(middleware(scope, receive, send))
+    return messages
+
+
+def test_sampled_request_is_recorded_without_headers(records):
+    capture_logger, lines = records
+    middleware = TrafficCaptureMiddleware(_app, sample_rate=1.0, capture_logger=capture_logger)
+
+    messages = _request(middleware, chunks=(b'{"name":', b' "Plan"}'))
+    assert messages[1]["body"] == b'{"name": "Plan"}'
+    [line] = lines
+    assert {key: line[key] for key in ("method", "path", "query", "body", "status")} == {
+        "method": "POST", "path": "/api/1.0/tasks", "query": "opt_pretty=true", "body": '{"name": "Plan"}',
+        "status": 201,
+    }
+    assert line["duration_ms"] >= 0 and line["ts"] > 0
+    assert "secret" not in json.dumps(line)
+
+
+def test_large_bodies_are_truncated_and_failures_recorded_as_500(records):
+    capture_logger, lines = records
+    middleware = TrafficCaptureMiddleware(_app, sample_rate=1.0, capture_logger=capture_logger)
+
+    _request(middleware, chunks=(b"a" * MAX_BODY_BYTES, b"b" * 10))
+    with pytest.raises(RuntimeError):
+        _request(middleware, path="/fail", method="GET")
+    assert len(lines[0]["body"]) == MAX_BODY_BYTES and "b" not in lines[0]["body"]
+    assert (lines[1]["path"], lines[1]["body"], lines[1]["status"]) == ("/fail", None, 500)
+
+
+def test_unsampled_requests_are_not_recorded(records):
+    capture_logger, lines = records
+    middleware = TrafficCaptureMiddleware(_app, sample_rate=0.0, capture_logger=capture_logger)
+
+    assert _request(middleware, chunks=(b"x",))[0]["status"] == 201
+    assert lines == []
@@ -0,0 +1,94 @@
+"""
+Test Workload
+Checks the difference-array sweep of daily_loads against a day by day
+computation, conflict runs, period sums and the cache's invalidation
+"""
+from datetime import date, timedelta
+
+import numpy as np
+
+from services.workload import WorkloadCache, capacities, conflicts, daily_loads, period_sums
+
+MONDAY = date(2026, 3, 2)
+
+# (assignee, start, end, effort type, value)
+ALLOCATIONS = [
+    (1, MONDAY, MONDAY + timedelta(days=13), "percent", 50),
+    (1, MONDAY + timedelta(days=3), MONDAY + timedelta(days=4), "hours", 20),
+    # Only a weekend: spread over its calendar days
+    (2, MONDAY + timedelta(days=5), MONDAY + timedelta(days=6), "hours", 6),
+    # Starts before the window and ends inside it
+    (2, MONDAY - timedelta(days=10), MONDAY + timedelta(days=1), "percent", 100),
+    # Unknown assignee, unknown effort type, reversed dates: ignored
+    (9, MONDAY, MONDAY, "hours", 5),
+    (1, MONDAY, MONDAY, "points", 5),
+    (1, MONDAY + timedelta(days=2), MONDAY, "hours", 5),
+]
+
+
+def _naive_loads(user_ids, start, end, hours_per_day=8.0):
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    loads = np.zeros((len(user_ids), len(days)))
+    for assignee, first, last, effort_type, value in ALLOCATIONS:
+        if assignee not in user_ids or effort_type not in ("hours", "percent") or first > last:
+            continue
+        span = [first + timedelta(days=i) for i in range((last - first).days + 1)]
+        working = [day for day in span if day.weekday() < 5]
+        if effort_type == "percent":
+            booked = {day: value / 100 * hours_per_day for day in working}
+        elif working:
+            booked = {day: value / len(working) for day in working}
+        else:
+            booked = {day: value / len(span) for day in span}
+        for index, day in enumerate(days):
+            loads[user_ids.index(assignee), index] += booked.get(day, 0)
+    return loads
+
+
+def _loads(user_ids, start, end):
+    return daily_loads(
+        user_ids, start, end,
+        np.array([allocation[0] for allocation in ALLOCATIONS]),
+        np.array([allocation[1] for allocation in ALLOCATIONS], dtype="datetime64[D]"),
+        np.array([allocation[2] for allocation in ALLOCATIONS], dtype="datetime64[D]"),
+        np.array([allocation[3] for allocation in ALLOCATIONS]),
+        np.array([allocation[4] for allocation in ALLOCATIONS]),
+        hours_per_day=8.0,
+    )
+
+
+def test_sweep_matches_day_by_day_loads():
+    for start, end in ((MONDAY, MONDAY + timedelta(days=20)), (MONDAY + timedelta(days=4), MONDAY + timedelta(days=5))):
+        np.testing.assert_allclose(_loads([1, 2], start, end), _naive_loads([1, 2], start, end))
+    assert _loads([1, 2], date(2026, 6, 1), date(2026, 6, 7)).sum() == 0
+
+
+def test_conflicts_are_runs_of_over_allocated_days():
+    end = MONDAY + timedelta(days=13)
+    loads = _loads([1, 2], MONDAY, end)
+    # User 1 has 4 + 10 hours on Thursday and Friday; user 2 has 3 hours on each weekend day (capacity 0)
+    assert conflicts(loads, capacities(MONDAY, end, hours_per_day=8.0)) == [(0, 3, 4), (1, 5, 6)]
+
+
+def test_period_sums():
+    values = np.arange(10.0).reshape(1, 10)
+    assert period_sums(values, [0, 3, 7]).tolist() == [[3.0, 18.0, 24.0]]
+    assert period_sums(np.zeros((2, 0)), [0]).shape == (2, 1)
+
+
+def test_cache_skips_users_invalidated_during_a_computation():
+    cache = WorkloadCache(max_cells=100, ttl_seconds=60)
+    key = (1, MONDAY, MONDAY + timedelta(days=9))
+    found, missing = cache.get(key, [1, 2])
+    assert (found, missing) == ({}, {1: 0, 2: 0})
+
+    # User 2's allocations change while their loads are being computed
+    cache.invalidate([2])
+    cache.put(key, {1: np.ones(10), 2: np.ones(10)}, missing)
+    found, missing = cache.get(key, [1, 2])
+    assert (list(found), missing) == ([1], {2: 1})
+
+    # Windows are evicted least recently used first once the cells exceed the bound
+    for workspace_id in range(2, 12):
+        cache.put((workspace_id, MONDAY, MONDAY + timedelta(days=9)), {1: np.ones(10)}, {1: 0})
+    assert key not in cache.windows and cache.cells <= 100
@@ -0,0 +1,403 @@
+"""
+Request-to-SQL tracing with OpenTelemetry-compatible spans.
+
+Spans are exported in the OTLP/JSON layout (traceId, spanId, parentSpanId,
+name, kind, start/endTimeUnixNano, attributes, status), so the output can be
+read by OpenTelemetry tooling or sent to a collector as-is.
+
+    TRACE_EXPORT_FILE=traces.jsonl        append one OTLP/JSON export request per line
+                                          (the layout of the collector's file exporter)
+    TRACE_COLLECTOR_URL=http://localhost:4318/v1/traces
+                                          POST batches to an OTLP/HTTP collector instead
+    TRACE_SAMPLE_RATIO=0.01               fraction of new traces recorded
+    TRACE_SERVICE_NAME=asana-clone        service.name resource attribute
+
+W3C trace context: a request carrying a valid `traceparent` header joins the
+caller's trace and follows its sampled flag; otherwise the ratio sampler
+decides from the trace id. Sampled responses carry a `traceparent` header
+naming the server span.
+
+Spans cover the request (named by route template), the get_db session, each
+SQL statement, response serialization, batch actions, webhook registration and
+background jobs. Finished spans are queued and written by a background thread.
+
+Nothing is installed unless an exporter is configured; span() and start_span()
+then cost a context variable lookup and return a no-op span.
+"""
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# OTLP enum values
+KIND_INTERNAL, KIND_SERVER, KIND_CLIENT = 1, 2, 3
+STATUS_UNSET, STATUS_OK, STATUS_ERROR = 0, 1, 2
+
+MAX_STATEMENT_CHARS = 2000
+EXPORT_BATCH_SIZE = 512
+EXPORT_INTERVAL_SECONDS = 1.0
+MAX_QUEUED_SPANS = 10000
+SCOPE_NAME = "asana_clone.tracing"
+
+TRACEPARENT = re.compile(r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})(-.*)?$")
+
+logger = logging.getLogger("tracing")
+
+
+def _new_id(bits: int) -> str:
+    value = 0
+    while not value:
+        value = random.getrandbits(bits)
+    return format(value, f"0{bits // 4}x")
+
+
+def _attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class Span:
+    """A timed operation within a trace"""
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start", "end",
+                 "attributes", "status", "message")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], kind: int = KIND_INTERNAL,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes) if attributes else {}
+        self.status = STATUS_UNSET
+        self.message = None
+        self.start = time.time_ns()
+        self.end = None
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException):
+        self.status = STATUS_ERROR
+        self.message = f"{type(exc).__name__}: {exc}"
+        self.attributes["exception.type"] = type(exc).__name__
+        self.attributes["exception.message"] = str(exc)
+
+    def finish(self):
+        self.end = time.time_ns()
+        if _exporter is not None:
+            _exporter.export(self)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start),
+            "endTimeUnixNano": str(self.end),
+            "attributes": [_attribute(key, value) for key, value in self.attributes.items() if value is not None],
+            "status": {"code": self.status},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.message:
+            span["status"]["message"] = self.message
+        return span
+
+
+class _NoopSpan:
+    """Returned when the current request is not being traced"""
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def record_exception(self, exc: BaseException):
+        pass
+
+    def finish(self):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+# The innermost open span of the current request (copied into threadpool workers)
+_current: ContextVar[Optional[Span]] = ContextVar("trace_span", default=None)
+_exporter: Optional["SpanExporter"] = None
+
+
+def start_span(name: str, attributes: Optional[Dict[str, Any]] = None, kind: int = KIND_INTERNAL):
+    """
+    Start a child of the current span without making it current; the caller calls finish().
+    For spans that start and end in different contexts, e.g. generator dependencies.
+    """
+    parent = _current.get()
+    if parent is None:
+        return NOOP_SPAN
+    return Span(name, parent.trace_id, parent.span_id, kind, attributes)
+
+
+@contextmanager
+def span(name: str, attributes: Optional[Dict[str, Any]] = None, kind: int = KIND_INTERNAL):
+    """Run the block in a child span of the current span; exceptions mark the span as failed"""
+    child = start_span(name, attributes, kind)
+    if child is NOOP_SPAN:
+        yield child
+        return
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.record_exception(e)
+        raise
+    finally:
+        _current.reset(token)
+        child.finish()
+
+
+class RatioSampler:
+    """Samples a fixed fraction of traces, decided from the low 64 bits of the trace id"""
+
+    def __init__(self, ratio: float):
+        self.bound = int(min(max(ratio, 0.0), 1.0) * (1 << 64))
+
+    def should_sample(self, trace_id: str) -> bool:
+        return int(trace_id[16:], 16) < self.bound
+
+
+def parse_traceparent(value: str) -> Optional[Tuple[str, str, bool]]:
+    """(trace_id, parent span_id, sampled) from a W3C traceparent header, or None if invalid"""
+    match = TRACEPARENT.match(value.strip().lower())
+    if match is None:
+        return None
+    version, trace_id, parent_id, flags, rest = match.groups()
+    if version == "ff" or (version == "00" and rest):
+        return None
+    if trace_id == "0" * 32 or parent_id == "0" * 16:
+        return None
+    return trace_id, parent_id, bool(int(flags, 16) & 1)
+
+
+def _otlp_payload(spans: List[Dict[str, Any]], service_name: str) -> Dict[str, Any]:
+    return {"resourceSpans": [{
+        "resource": {"attributes": [_attribute("service.name", service_name)]},
+        "scopeSpans": [{"scope": {"name": SCOPE_NAME}, "spans": spans}],
+    }]}
+
+
+def file_writer(path: str, service_name: str) -> Callable[[List[Dict[str, Any]]], None]:
+    def write(spans):
+        with open(path, "a") as f:
+            f.write(json.dumps(_otlp_payload(spans, service_name), separators=(",", ":")) + "\n")
+    return write
+
+
+def collector_writer(url: str, service_name: str) -> Callable[[List[Dict[str, Any]]], None]:
+    def write(spans):
+        request = urllib.request.Request(
+            url,
+            data=json.dumps(_otlp_payload(spans, service_name)).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=10) as response:
+            response.read()
+    return write
+
+
+class SpanExporter:
+    """Queues finished spans and writes them in batches from a background thread"""
+
+    def __init__(self, write: Callable[[List[Dict[str, Any]]], None]):
+        self.write = write
+        self.spans: queue.Queue = queue.Queue(MAX_QUEUED_SPANS)
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def export(self, finished: Span):
+        try:
+            self.spans.put_nowait(finished)
+        except queue.Full:
+            # Never block a request on the exporter
+            self.dropped += 1
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.monotonic() + EXPORT_INTERVAL_SECONDS
+            while len(batch) < EXPORT_BATCH_SIZE:
+                try:
+                    item = self.spans.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            if batch:
+                try:
+                    self.write([item.to_otlp() for item in batch])
+                except Exception:
+                    logger.exception("Dropped %d span(s): export failed", len(batch))
+
+    def shutdown(self):
+        self.spans.put(None)
+        self.thread.join(timeout=10)
+        if self.dropped:
+            logger.warning("Dropped %d span(s): export queue full", self.dropped)
+
+
+class TracingMiddleware:
+    """ASGI middleware that opens the server span and propagates W3C trace context"""
+
+    def __init__(self, app, sampler: RatioSampler, route_template: Callable[[dict], str]):
+        self.app = app
+        self.sampler = sampler
+        self.route_template = route_template
+
+    def _incoming(self, scope) -> Optional[Tuple[str, str, bool]]:
+        for name, value in scope.get("headers", ()):
+            if name == b"traceparent":
+                return parse_traceparent(value.decode("latin-1"))
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = self._incoming(scope)
+        if incoming is not None:
+            trace_id, parent_id, sampled = incoming
+        else:
+            trace_id, parent_id = _new_id(128), None
+            sampled = self.sampler.should_sample(trace_id)
+        if not sampled:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        server_span = Span(method, trace_id, parent_id, KIND_SERVER, {
+            "http.request.method": method,
+            "url.path": scope["path"],
+        })
+        status = {"code": 500}
+
+        async def traced_send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"traceparent", server_span.traceparent.encode())
+                ]
+            await send(message)
+
+        token = _current.set(server_span)
+        try:
+            await self.app(scope, receive, traced_send)
+        except Exception as e:
+            server_span.record_exception(e)
+            raise
+        finally:
+            _current.reset(token)
+            route = self.route_template(scope)
+            server_span.name = f"{method} {route}"
+            server_span.set_attribute("http.route", route)
+            server_span.set_attribute("http.response.status_code", status["code"])
+            if status["code"] >= 500:
+                server_span.status = STATUS_ERROR
+            server_span.finish()
+
+
+def _instrument_engine(engine):
+    """One client span per SQL statement, parented to the span current when it runs"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_statement(conn, cursor, statement, parameters, context, executemany):
+        statement_span = start_span(
+            statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "SQL",
+            {
+                "db.system": "postgresql",
+                "db.statement": statement[:MAX_STATEMENT_CHARS],
+                "db.executemany": executemany,
+            },
+            KIND_CLIENT
+        )
+        conn.info.setdefault("trace_spans", []).append(statement_span)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _finish_statement(conn, cursor, statement, parameters, context, executemany):
+        statement_span = conn.info["trace_spans"].pop()
+        if cursor.rowcount >= 0:
+            statement_span.set_attribute("db.rows", cursor.rowcount)
+        statement_span.finish()
+
+    @event.listens_for(engine, "handle_error")
+    def _failed_statement(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("trace_spans"):
+            statement_span = connection.info["trace_spans"].pop()
+            statement_span.record_exception(exception_context.original_exception)
+            statement_span.finish()
+
+
+def _patch_serialize_response():
+    """
+    Time response validation and encoding. FastAPI calls serialize_response by
+    name from its request handler, so the module attribute is replaced.
+    """
+    import fastapi.routing
+    original = fastapi.routing.serialize_response
+
+    async def serialize_response(*args, **kwargs):
+        with span("serialize_response"):
+            return await original(*args, **kwargs)
+
+    fastapi.routing.serialize_response = serialize_response
+
+
+def install_tracing(app) -> Optional[SpanExporter]:
+    """Add the tracing middleware and instrumentation when an exporter is configured"""
+    global _exporter
+    path = os.getenv("TRACE_EXPORT_FILE")
+    url = os.getenv("TRACE_COLLECTOR_URL")
+    if not path and not url:
+        return None
+
+    from database import engines
+    from metrics import route_template
+
+    service_name = os.getenv("TRACE_SERVICE_NAME", "asana-clone")
+    _exporter = SpanExporter(collector_writer(url, service_name) if url else file_writer(path, service_name))
+    _exporter.start()
+    for engine in engines:
+        _instrument_engine(engine)
+    _patch_serialize_response()
+    app.add_middleware(
+        TracingMiddleware,
+        sampler=RatioSampler(float(os.getenv("TRACE_SAMPLE_RATIO", "0.01"))),
+        route_template=route_template
+    )
+    app.add_event_handler("shutdown", _exporter.shutdown)
+    return _exporter
@@ -0,0 +1,104 @@
+"""
+Opt-in traffic capture.
+
+Samples incoming API requests into rotating JSONL files so that real traffic
+can be replayed offline with benchmarks/replay.py. Enabled by setting
+TRAFFIC_CAPTURE_DIR; nothing is installed otherwise.
+
+    TRAFFIC_CAPTURE_DIR=/var/log/asana-capture   directory for capture.jsonl (+ .1, .2, ... when rotated)
+    TRAFFIC_CAPTURE_SAMPLE_RATE=0.01             fraction of requests recorded
+    TRAFFIC_CAPTURE_MAX_BYTES=52428800           rotate after this many bytes
+    TRAFFIC_CAPTURE_BACKUPS=10                   rotated files kept
+
+Each line records: ts (epoch seconds at arrival), method, path, query, body
+(request body text, truncated to MAX_BODY_BYTES), status and duration_ms.
+Headers are never recorded, so credentials stay out of captures. File writes
+happen on a background thread via a logging queue, off the request path.
+"""
+import json
+import logging
+import os
+import queue
+import random
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+MAX_BODY_BYTES = 64 * 1024
+CAPTURE_FILE = "capture.jsonl"
+
+logger = logging.getLogger("traffic_capture")
+
+
+class TrafficCaptureMiddleware:
+    """ASGI middleware that records a random sample of HTTP requests"""
+
+    def __init__(self, app, sample_rate: float, capture_logger: logging.Logger = logger):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.logger = capture_logger
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or random.random() >= self.sample_rate:
+            await self.app(scope, receive, send)
+            return
+
+        arrived = time.time()
+        started = time.perf_counter()
+        body = bytearray()
+        status = {"code": None}
+
+        async def capture_receive():
+            message = await receive()
+            if message["type"] == "http.request" and len(body) < MAX_BODY_BYTES:
+                body.extend(message.get("body", b"")[:MAX_BODY_BYTES - len(body)])
+            return message
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, capture_receive, capture_send)
+        finally:
+            self.logger.info(json.dumps({
+                "ts": arrived,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "body": body.decode("utf-8", errors="replace") if body else None,
+                "status": status["code"] if status["code"] is not None else 500,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+            }, separators=(",", ":")))
+
+
+def start_capture_writer(directory: str, max_bytes: int, backups: int) -> QueueListener:
+    """Route the capture logger through a queue to a rotating file written by a listener thread"""
+    os.makedirs(directory, exist_ok=True)
+    file_handler = RotatingFileHandler(
+        os.path.join(directory, CAPTURE_FILE), maxBytes=max_bytes, backupCount=backups
+    )
+    file_handler.setFormatter(logging.Formatter("%(message)s"))
+    records = queue.SimpleQueue()
+    logger.addHandler(QueueHandler(records))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    listener = QueueListener(records, file_handler)
+    listener.start()
+    return listener
+
+
+def install_traffic_capture(app) -> Optional[QueueListener]:
+    """Add the capture middleware when TRAFFIC_CAPTURE_DIR is set"""
+    directory = os.getenv("TRAFFIC_CAPTURE_DIR")
+    if not directory:
+        return None
+    listener = start_capture_writer(
+        directory,
+        int(os.getenv("TRAFFIC_CAPTURE_MAX_BYTES", str(50 * 1024 * 1024))),
+        int(os.getenv("TRAFFIC_CAPTURE_BACKUPS", "10"))
+    )
+    app.add_middleware(TrafficCaptureMiddleware, sample_rate=float(os.getenv("TRAFFIC_CAPTURE_SAMPLE_RATE", "0.01")))
+    app.add_event_handler("shutdown", listener.stop)
+    return listener
@@ -2,6 +2,16 @@
 Utility functions for the Asana API
 """
 import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlencode
+
+API_PREFIX = "/api/1.0"
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Largest value of a Postgres INTEGER (int4) column
+MAX_ROW_ID = 2**31 - 1
 
 
 def generate_gid() -> str:
@@ -11,3 +21,35 @@ def generate_gid() -> str:
     """
     return str(uuid.uuid4())
 
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """
+    Opaque position after a row in (created_at, id) order, used for sync and offset tokens.
+    Holds created_at in microseconds and the id, in hex.
+    """
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return f"{(created_at - EPOCH) // timedelta(microseconds=1):x}-{row_id:x}"
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[datetime, int]]:
+    """
+    (created_at, id) of an encode_cursor() token, or None if it is malformed or out of range.
+    The id may be 0, which events uses for a token taken before any row.
+    """
+    try:
+        micros, row_id = (int(part, 16) for part in cursor.split("-"))
+        if micros < 0 or not 0 <= row_id <= MAX_ROW_ID:
+            return None
+        return EPOCH + timedelta(microseconds=micros), row_id
+    except (ValueError, OverflowError):
+        return None
+
+
+def next_page_link(request, offset: str) -> Dict[str, str]:
+    """Asana's next_page object: the current request with its offset replaced"""
+    params = [(name, value) for name, value in request.query_params.multi_items() if name != "offset"]
+    params.append(("offset", offset))
+    path = f"{request.url.path[len(API_PREFIX):]}?{urlencode(params)}"
+    return {"offset": offset, "path": path, "uri": f"{str(request.base_url).rstrip('/')}{API_PREFIX}{path}"}